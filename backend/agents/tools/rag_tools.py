@@ -10,35 +10,18 @@ import os
 
 from langchain_core.tools import tool
 
-# Importar el sistema RAG existente
-try:
-    from rag.rag_engine import RAGEngine, create_rag_engine
-    from rag.vector_store import VectorStore
-    RAG_AVAILABLE = True
-except ImportError:
-    RAG_AVAILABLE = False
+# Servicio de recuperación compartido con la API
+from services.retrieval_service import RAG_AVAILABLE, get_retrieval_service
 
-# Singleton para el RAG engine
-_rag_engine: Optional["RAGEngine"] = None
 
-
-def get_rag_engine() -> Optional["RAGEngine"]:
+def get_rag_engine():
     """
-    Obtiene la instancia singleton del RAG engine.
+    Obtiene el RAG engine compartido del proceso.
 
     Returns:
         RAGEngine si está disponible, None si no está configurado
     """
-    global _rag_engine
-
-    if _rag_engine is not None:
-        return _rag_engine
-
-    if not RAG_AVAILABLE:
-        return None
-
-    _rag_engine = create_rag_engine()
-    return _rag_engine
+    return get_retrieval_service().engine
 
 
 @tool
@@ -62,9 +45,9 @@ def rag_search(
     Returns:
         Dict con los documentos encontrados y sus metadatos
     """
-    engine = get_rag_engine()
+    service = get_retrieval_service()
 
-    if engine is None:
+    if not service.enabled:
         return {
             "success": False,
             "error": "Sistema RAG no disponible",
@@ -79,7 +62,7 @@ def rag_search(
             filter_dict = {"category": category.lower()}
 
         # Buscar documentos relevantes
-        documents = engine.retrieve_context(query, filter=filter_dict)
+        documents = service.retrieve(query, filter=filter_dict, top_k=top_k)
 
         if not documents:
             return {
@@ -90,7 +73,7 @@ def rag_search(
             }
 
         # Construir contexto formateado
-        context = engine.build_context_prompt(documents)
+        context = service.build_context_prompt(documents)
 
         # Formatear resultados
         formatted_docs = []
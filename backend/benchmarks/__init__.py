@@ -0,0 +1,6 @@
+"""
+Benchmarks de rendimiento de LEIA.
+
+Se ejecutan desde backend/ como módulos, por ejemplo:
+    python -m benchmarks.bench_local_index
+"""
@@ -0,0 +1,107 @@
+"""
+Benchmark de throughput del motor async de embeddings
+
+Compara, contra el servidor falso (benchmarks/fake_embeddings_server.py):
+- secuencial: el patrón anterior de Embedder (batches de 100 textos, una
+  request a la vez, sleep fijo de 0.5 s entre batches)
+- engine: BatchEmbeddingEngine (batches por tokens, concurrencia adaptativa,
+  backoff según headers de rate limit)
+
+Uso:
+    python -m benchmarks.bench_batch_embedder
+    python -m benchmarks.bench_batch_embedder --texts 5000 --rps 20 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.fake_embeddings_server import create_app
+from data_processing.batch_embedder import BatchEmbeddingEngine
+
+
+def synthetic_texts(count: int):
+    """Chunks de largo variable, como los de TextProcessor"""
+    base = "El trabajador tiene derecho a una indemnización por años de servicio. "
+    return [(f"chunk_{i}", base * (2 + i % 14)) for i in range(count)]
+
+
+async def run_sequential(app, items, batch_size: int = 100, pause: float = 0.5) -> dict:
+    """Patrón anterior: un batch de 100 a la vez con pausa fija"""
+    transport = httpx.ASGITransport(app=app)
+    done, failed = 0, 0
+    start = time.perf_counter()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://fake/v1") as client:
+        for i in range(0, len(items), batch_size):
+            batch = items[i:i + batch_size]
+            response = await client.post(
+                "/embeddings",
+                json={"model": "text-embedding-3-small", "input": [text for _, text in batch]}
+            )
+            if response.status_code == 200:
+                done += len(batch)
+            else:
+                # El código anterior devolvía [None] * len(texts): el batch se pierde
+                failed += len(batch)
+            if i + batch_size < len(items):
+                await asyncio.sleep(pause)
+
+    return {"embedded": done, "failed": failed, "seconds": time.perf_counter() - start}
+
+
+async def run_engine(app, items, concurrency: int, max_batch_tokens: int) -> dict:
+    engine = BatchEmbeddingEngine(
+        api_key="bench",
+        base_url="http://fake/v1",
+        max_concurrency=concurrency,
+        max_batch_tokens=max_batch_tokens,
+        transport=httpx.ASGITransport(app=app)
+    )
+    result = await engine.embed(items)
+    return {**result["stats"], "embedded": len(result["vectors"]), "failed": len(result["failed"])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor async de embeddings")
+    parser.add_argument("--texts", type=int, default=3000)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Latencia base por request")
+    parser.add_argument("--rps", type=int, default=10, help="Requests por segundo permitidas")
+    parser.add_argument("--tps", type=int, default=150_000, help="Tokens por segundo permitidos")
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--batch-tokens", type=int, default=8000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK EMBEDDINGS ASYNC - LEIA")
+    print("=" * 60)
+
+    items = synthetic_texts(args.texts)
+
+    def server():
+        return create_app(
+            dimensions=256,
+            latency_ms=args.latency_ms,
+            requests_per_window=args.rps,
+            tokens_per_window=args.tps,
+            window_seconds=1.0
+        )
+
+    sequential = asyncio.run(run_sequential(server(), items))
+    engine = asyncio.run(run_engine(server(), items, args.concurrency, args.batch_tokens))
+
+    print(f"\n{args.texts:,} textos | latencia {args.latency_ms:.0f} ms | límite {args.rps} req/s, {args.tps:,} tokens/s")
+    print(f"{'':>12} {'segundos':>9} {'textos/s':>9} {'fallidos':>9} {'429':>5}")
+    for name, result in (("secuencial", sequential), ("engine", engine)):
+        rate = result["embedded"] / result["seconds"] if result["seconds"] else 0
+        print(
+            f"{name:>12} {result['seconds']:>9.2f} {rate:>9.0f} "
+            f"{result['failed']:>9} {result.get('throttled', '-'):>5}"
+        )
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark del parser de leyes BCN (data_collection/bcn_parser.py)
+
+Mide tiempo de parseo y tamaño del JSON resultante sobre páginas guardadas:
+- bs4: BeautifulSoup con html.parser y el HTML de cada artículo en la
+  salida (parser anterior de BCNScraper; requiere beautifulsoup4)
+- lxml: iterparse en streaming, salida compacta (default)
+- lxml+html: lo mismo pero con keep_html
+
+Sin --html se generan páginas sintéticas con la estructura de LeyChile
+(un código tipo Código Civil de varios MB y leyes medianas).
+
+Uso:
+    python -m benchmarks.bench_bcn_parser
+    python -m benchmarks.bench_bcn_parser --articles 2500 --repeat 3
+    python -m benchmarks.bench_bcn_parser --html data/cache/http/*.body
+"""
+
+import argparse
+import json
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from data_collection.bcn_parser import BS4_AVAILABLE, LXML_AVAILABLE, parse_law
+
+if BS4_AVAILABLE:
+    from bs4 import BeautifulSoup
+
+
+INCISO = (
+    "Las obligaciones nacen, ya del concurso real de las voluntades de dos o más personas, como en los "
+    "contratos o convenciones; ya de un hecho voluntario de la persona que se obliga, como en la "
+    "aceptación de una herencia o legado y en todos los <a href=\"/leychile/navegar?idNorma={n}\">cuasicontratos</a>."
+)
+
+
+def law_page(articles: int, incisos: int = 3) -> str:
+    """Página tipo LeyChile: navegación, encabezados y un div.art por artículo"""
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Norma</title>",
+        "<script>var x = 1;</script></head><body>",
+        "<div class=\"menu\">" + "".join(f"<a href=\"#{i}\">Sección {i}</a>" for i in range(200)) + "</div>",
+        "<div id=\"textolei\">"
+    ]
+    for n in range(1, articles + 1):
+        if n % 50 == 1:
+            parts.append(f"<div class=\"titulo\"><b>TÍTULO {n // 50 + 1}</b><br>De las obligaciones en general</div>")
+        body = "".join(f"<p class=\"inciso\">{INCISO.format(n=n)}</p>" for _ in range(incisos))
+        parts.append(
+            f"<div class=\"art\" id=\"art{n}\"><span class=\"n\">Artículo {n}.</span> "
+            f"<span class=\"texto\">{body}</span></div>"
+        )
+    parts.append("</div></body></html>")
+    return "\n".join(parts)
+
+
+def parse_bs4_legacy(html: str, law_info: dict) -> dict:
+    """Parser anterior: html.parser, número posicional y HTML por artículo"""
+    soup = BeautifulSoup(html, 'html.parser')
+    articles = []
+    for idx, elem in enumerate(soup.find_all(['div', 'p'], class_=re.compile(r'(art|articulo)', re.I)), 1):
+        text = elem.get_text(strip=True)
+        if text and len(text) > 20:
+            articles.append({"article_number": idx, "content": text, "html": str(elem)})
+    return {"law_name": law_info.get("name"), "articles": articles, "total_articles": len(articles)}
+
+
+def run(name: str, parse, pages, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = [parse(html) for html in pages]
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    size = sum(len(json.dumps(output, ensure_ascii=False, indent=2).encode("utf-8")) for output in outputs)
+    articles = sum(output["total_articles"] for output in outputs)
+    return {"name": name, "seconds": best, "bytes": size, "articles": articles}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser de leyes BCN")
+    parser.add_argument("--html", nargs="*", help="Páginas guardadas (default: sintéticas)")
+    parser.add_argument("--articles", type=int, default=2500, help="Artículos del código sintético grande")
+    parser.add_argument("--laws", type=int, default=4, help="Leyes sintéticas medianas (300 artículos)")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK PARSER BCN - LEIA")
+    print("=" * 60)
+
+    if not LXML_AVAILABLE:
+        print("⚠️  Requiere lxml: pip install lxml")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.html:
+            files = [Path(path) for path in args.html]
+        else:
+            files = [Path(tmp) / "codigo.html"] + [Path(tmp) / f"ley_{i}.html" for i in range(args.laws)]
+            files[0].write_text(law_page(args.articles), encoding="utf-8")
+            for path in files[1:]:
+                path.write_text(law_page(300), encoding="utf-8")
+
+        pages = [path.read_text(encoding="utf-8", errors="replace") for path in files]
+
+    total_mb = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+    print(f"📄 {len(pages)} páginas, {total_mb:.1f} MB de HTML\n")
+
+    law_info = {"id": "0", "name": "Benchmark", "category": "civil", "url": None}
+    results = []
+    if BS4_AVAILABLE:
+        results.append(run("bs4", lambda html: parse_bs4_legacy(html, law_info), pages, args.repeat))
+    else:
+        print("ℹ️  beautifulsoup4 no instalado: sin línea base bs4\n")
+    results.append(run("lxml", lambda html: parse_law(html, law_info), pages, args.repeat))
+    results.append(run("lxml+html", lambda html: parse_law(html, law_info, keep_html=True), pages, args.repeat))
+
+    for result in results:
+        mb_per_s = total_mb / result["seconds"] if result["seconds"] else 0
+        print(
+            f"{result['name']:<10} {result['articles']:>6} artículos  {result['seconds']:>7.2f}s  "
+            f"{mb_per_s:>6.1f} MB/s  JSON {result['bytes'] / 1e6:>6.2f} MB"
+        )
+
+    baseline = results[0]
+    compact = next(result for result in results if result["name"] == "lxml")
+    if baseline is not compact and compact["seconds"]:
+        print(f"\n🚀 Speedup: {baseline['seconds'] / compact['seconds']:.1f}x, "
+              f"JSON {baseline['bytes'] / compact['bytes']:.1f}x más chico")
+
+
+if __name__ == "__main__":
+    main()
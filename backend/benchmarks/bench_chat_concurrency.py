@@ -0,0 +1,154 @@
+"""
+Benchmark de concurrencia de la ruta de chat (un worker, un event loop)
+
+Compara dos endpoints con la misma latencia simulada de OpenAI y Claude:
+- blocking: el patrón anterior (clientes síncronos dentro de `async def`)
+- async: AsyncRAGEngine + cliente async de Claude
+
+Ambos usan un índice local real para la búsqueda vectorial. Las llamadas
+a las APIs se simulan con esperas, así el benchmark no necesita red ni
+API keys. Las peticiones se envían en proceso con httpx.ASGITransport.
+
+Uso:
+    python -m benchmarks.bench_chat_concurrency
+    python -m benchmarks.bench_chat_concurrency --embed-ms 80 --llm-ms 600 --levels 1 8 32
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from rag.async_engine import AsyncRAGEngine
+from rag.local_index import LocalVectorIndex
+from rag.rag_engine import RAGEngine
+from rag.vector_store import VectorStore
+
+DIMENSION = 256
+
+
+class FakeAsyncEmbeddings:
+    """Imita openai.AsyncOpenAI().embeddings"""
+
+    def __init__(self, latency: float, vectors: np.ndarray):
+        self.latency = latency
+        self.vectors = vectors
+
+    async def create(self, model: str, input: str):
+        await asyncio.sleep(self.latency)
+        vector = self.vectors[hash(input) % len(self.vectors)].tolist()
+        return SimpleNamespace(data=[SimpleNamespace(embedding=vector)])
+
+
+class FakeAsyncMessages:
+    """Imita anthropic.AsyncAnthropic().messages"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return fake_message()
+
+
+def fake_message():
+    return SimpleNamespace(
+        content=[SimpleNamespace(text="respuesta")],
+        usage=SimpleNamespace(input_tokens=500, output_tokens=200)
+    )
+
+
+def build_app(engine: RAGEngine, embed_latency: float, llm_latency: float, vectors: np.ndarray) -> FastAPI:
+    app = FastAPI()
+
+    # Ruta anterior: todo síncrono dentro de un endpoint async
+    def blocking_embed(query):
+        time.sleep(embed_latency)
+        return vectors[hash(query) % len(vectors)].tolist()
+
+    engine._embed_query = blocking_embed
+
+    @app.post("/blocking")
+    async def blocking_chat(body: dict):
+        docs = engine.retrieve_context(body["message"])
+        engine.build_rag_request(body["message"], [], "system", docs)
+        time.sleep(llm_latency)
+        return engine.format_rag_response(fake_message(), docs)
+
+    # Ruta nueva: async de punta a punta
+    async_engine = AsyncRAGEngine(
+        engine,
+        openai_client=SimpleNamespace(embeddings=FakeAsyncEmbeddings(embed_latency, vectors))
+    )
+    claude = SimpleNamespace(messages=FakeAsyncMessages(llm_latency))
+
+    @app.post("/async")
+    async def async_chat(body: dict):
+        return await async_engine.generate_response(body["message"], [], claude, "system")
+
+    return app
+
+
+async def run_level(app: FastAPI, path: str, concurrency: int, requests_per_session: int) -> float:
+    """Lanza `concurrency` sesiones en paralelo; retorna requests/segundo"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def session(session_id: int):
+            for turn in range(requests_per_session):
+                response = await client.post(path, json={"message": f"consulta {session_id}-{turn}"})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return concurrency * requests_per_session / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia del chat")
+    parser.add_argument("--embed-ms", type=float, default=60.0, help="Latencia simulada de embeddings")
+    parser.add_argument("--llm-ms", type=float, default=300.0, help="Latencia simulada de Claude")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--turns", type=int, default=3, help="Requests por sesión")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK CONCURRENCIA CHAT - LEIA")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((2000, DIMENSION)).astype(np.float32)
+    records = [(f"doc_{i}", vectors[i].tolist(), {"text": f"doc {i}", "category": "laboral"}) for i in range(len(vectors))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        LocalVectorIndex.build(records, Path(tmp), dimension=DIMENSION)
+        store = VectorStore(backend="local", dimension=DIMENSION, local_index_dir=tmp)
+        engine = RAGEngine(vector_store=store, similarity_threshold=0.0)
+        app = build_app(engine, args.embed_ms / 1000, args.llm_ms / 1000, vectors)
+
+        print(f"\nLatencia simulada: embeddings {args.embed_ms:.0f} ms, Claude {args.llm_ms:.0f} ms")
+        print(f"{'sesiones':>10} {'blocking req/s':>16} {'async req/s':>14} {'speedup':>9}")
+
+        for level in args.levels:
+            blocking = asyncio.run(run_level(app, "/blocking", level, args.turns))
+            async_rps = asyncio.run(run_level(app, "/async", level, args.turns))
+            print(f"{level:>10} {blocking:>16.1f} {async_rps:>14.1f} {async_rps / blocking:>8.1f}x")
+
+        store.backend.index.close()
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
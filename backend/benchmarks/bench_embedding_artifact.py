@@ -0,0 +1,148 @@
+"""
+Benchmark del artefacto binario de embeddings vs *_embedded.json
+
+Genera un *_embedded.json sintético con el mismo formato que escribía
+Embedder (indent=2), lo convierte con embedding_artifact y compara:
+- tamaño en disco
+- tiempo de carga hasta tener las tuplas (id, vector, metadata) listas
+- pico de memoria (RSS) del proceso que carga
+
+Cada carga corre en un proceso nuevo para que el pico de RSS sea comparable.
+
+Uso:
+    python -m benchmarks.bench_embedding_artifact
+    python -m benchmarks.bench_embedding_artifact --count 20000 --dtype float32
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from data_processing.embedding_artifact import EmbeddingArtifact, convert_json_file
+
+
+def write_synthetic_json(path: Path, count: int, dimension: int, seed: int = 0):
+    """Chunks con embedding en el formato de Embedder.process_chunks_file"""
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for i in range(count):
+        chunks.append({
+            "chunk_id": f"ley_{i // 50}_chunk_{i % 50}",
+            "text": "El empleador podrá poner término al contrato de trabajo " * 12,
+            "metadata": {
+                "source": "BCN",
+                "law_name": f"Ley {19000 + i // 50}",
+                "category": "laboral",
+                "url": "https://www.bcn.cl/leychile",
+                "article_number": str(i % 50 + 1)
+            },
+            "chunk_number": i % 50,
+            "total_chunks": 50,
+            "size": 700,
+            "embedding": rng.standard_normal(dimension).astype(np.float32).tolist(),
+            "embedding_model": "text-embedding-3-small",
+            "embedding_dim": dimension
+        })
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chunks, f, ensure_ascii=False, indent=2)
+
+
+def peak_rss_mb() -> float:
+    """
+    Pico de RSS del proceso. En Linux se usa VmHWM: ru_maxrss se hereda a
+    través de exec y reportaría el pico del proceso padre.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_json(path: str):
+    from rag.vector_store import chunk_to_vector
+
+    with open(path, 'r', encoding='utf-8') as f:
+        chunks = json.load(f)
+    return [chunk_to_vector(chunk) for chunk in chunks if "embedding" in chunk]
+
+
+def load_artifact(path: str):
+    with EmbeddingArtifact(path) as artifact:
+        return list(artifact.iter_vectors())
+
+
+def measure(loader_name: str, path: str, queue):
+    """Corre en un proceso nuevo: carga el archivo y reporta tiempo y pico de RSS"""
+    loader = {"json": load_json, "artifact": load_artifact}[loader_name]
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    records = loader(path)
+    elapsed = time.perf_counter() - start
+
+    queue.put({
+        "records": len(records),
+        "seconds": elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "delta_rss_mb": peak_rss_mb() - baseline
+    })
+
+
+def run_isolated(loader_name: str, path: Path) -> dict:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(loader_name, str(path), queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del artefacto binario de embeddings")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--dtype", choices=["float16", "float32"], default="float16")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK ARTEFACTO DE EMBEDDINGS - LEIA")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp) / "bench_chunks_embedded.json"
+        write_synthetic_json(json_path, args.count, args.dimension)
+
+        summary = convert_json_file(json_path, dtype=args.dtype)
+        artifact_path = json_path.with_suffix(".npy")
+
+        json_result = run_isolated("json", json_path)
+        artifact_result = run_isolated("artifact", artifact_path)
+
+    print(f"\n{args.count:,} chunks x {args.dimension} dimensiones ({args.dtype})")
+    print(f"{'':>10} {'disco MB':>10} {'carga s':>9} {'pico RSS MB':>12} {'Δ RSS MB':>10}")
+    for name, result, size in (
+        ("json", json_result, summary["json_bytes"]),
+        ("artifact", artifact_result, summary["artifact_bytes"]),
+    ):
+        print(
+            f"{name:>10} {size / 1e6:>10.1f} {result['seconds']:>9.2f} "
+            f"{result['peak_rss_mb']:>12.0f} {result['delta_rss_mb']:>10.0f}"
+        )
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Evaluación offline de perfiles de embeddings (rag/embedding_profiles.py)
+
+Para cada perfil arma un índice local con los vectores del corpus reducidos
+a sus dimensiones y precisión, y mide sobre un conjunto fijo de consultas:
+
+- recall@k contra la búsqueda exacta con los vectores completos (float32)
+- memoria: matriz que se recorre por consulta y vectores de rescore (mmap)
+- latencia de búsqueda por consulta (1 core)
+
+Los vectores del fixture son sintéticos y deterministas (semilla fija),
+con la varianza concentrada en las primeras dimensiones como en los
+modelos text-embedding-3; --fixture usa un archivo .npz guardado con
+--save-fixture, y --embeddings-dir los vectores reales de data/embeddings.
+
+Uso:
+    python -m benchmarks.bench_embedding_profiles
+    python -m benchmarks.bench_embedding_profiles --profiles full tiny --top-k 5
+    python -m benchmarks.bench_embedding_profiles --embeddings-dir data/embeddings
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Un solo core: evitar que BLAS paralelice la multiplicación
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+import numpy as np
+
+from rag.embedding_profiles import EMBEDDING_PROFILES, EmbeddingProfile
+from rag.local_index import LocalVectorIndex
+
+
+FIXTURE_SEED = 19
+FIXTURE_DIMENSION = 1536
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def fixture_vectors(
+    count: int = 5000,
+    queries: int = 200,
+    dimension: int = FIXTURE_DIMENSION,
+    clusters: int = 64,
+    seed: int = FIXTURE_SEED
+) -> Dict[str, np.ndarray]:
+    """
+    Corpus y consultas sintéticos: vectores agrupados cuya varianza decae
+    con la dimensión (el prefijo concentra la información, como en los
+    modelos entrenados para acortarse). Las consultas son filas del corpus
+    con ruido.
+    """
+    rng = np.random.default_rng(seed)
+    decay = (1.0 + np.arange(dimension) / 64.0) ** -0.5
+    centers = rng.standard_normal((clusters, dimension)) * decay
+    corpus = centers[np.arange(count) % clusters] + 0.5 * rng.standard_normal((count, dimension)) * decay
+    corpus = normalize(corpus)
+
+    rows = rng.choice(count, queries, replace=False)
+    noise = normalize(rng.standard_normal((queries, dimension)) * decay)
+    query_vectors = normalize(corpus[rows] + 0.35 * noise)
+    return {"corpus": corpus, "queries": query_vectors}
+
+
+def embeddings_dir_vectors(embeddings_dir: Path, queries: int, seed: int = FIXTURE_SEED) -> Dict[str, np.ndarray]:
+    """Vectores reales de data/embeddings; consultas = filas con ruido"""
+    from rag.local_index import iter_embedding_records
+
+    corpus = normalize(np.asarray([vector for _, vector, _ in iter_embedding_records(embeddings_dir)], dtype=np.float32))
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(corpus), min(queries, len(corpus)), replace=False)
+    noise = normalize(rng.standard_normal((len(rows), corpus.shape[1])))
+    return {"corpus": corpus, "queries": normalize(corpus[rows] + 0.35 * noise)}
+
+
+def reduce_matrix(matrix: np.ndarray, dimensions: int) -> np.ndarray:
+    """reduce_dimensions para una matriz (prefijo renormalizado)"""
+    return normalize(matrix[:, :dimensions])
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, top_k: int) -> List[set]:
+    """Referencia: top-k exacto con los vectores completos"""
+    scores = queries @ corpus.T
+    best = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    return [set(row.tolist()) for row in best]
+
+
+def evaluate_profile(
+    profile: EmbeddingProfile,
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    reference: List[set],
+    top_k: int,
+    work_dir: Path
+) -> Dict:
+    """
+    Construye el índice del perfil y mide recall@k, memoria y latencia
+
+    Returns:
+        Dict con profile, dimensions, dtype, recall, index_bytes,
+        rescore_bytes, p50_ms y p95_ms
+    """
+    dimensions = min(profile.dimensions, corpus.shape[1])
+    index_dir = work_dir / profile.name
+    LocalVectorIndex.build(
+        ((str(row), vector, {}) for row, vector in enumerate(reduce_matrix(corpus, dimensions))),
+        index_dir,
+        dimension=dimensions,
+        dtype=profile.dtype,
+        nlist=0,
+        rescore=profile.rescore
+    )
+    index = LocalVectorIndex(index_dir)
+    reduced_queries = reduce_matrix(queries, dimensions)
+
+    # Calentar page cache
+    for query in reduced_queries[:20]:
+        index.search(query, top_k=top_k)
+
+    hits = 0
+    latencies = []
+    for query, expected in zip(reduced_queries, reference):
+        start = time.perf_counter()
+        results = index.search(query, top_k=top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(expected & {int(vector_id) for vector_id, _, _ in results})
+    index.close()
+
+    index_bytes = sum(
+        (index_dir / name).stat().st_size
+        for name in ("vectors.npy", "scales.npy") if (index_dir / name).exists()
+    )
+    rescore_file = index_dir / "rescore.npy"
+
+    return {
+        "profile": profile.name,
+        "dimensions": dimensions,
+        "dtype": profile.dtype,
+        "rescore": profile.rescore,
+        "recall": round(hits / (len(reference) * top_k), 4),
+        "index_bytes": index_bytes,
+        "rescore_bytes": rescore_file.stat().st_size if rescore_file.exists() else 0,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3)
+    }
+
+
+def evaluate_profiles(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    profiles: Optional[List[EmbeddingProfile]] = None,
+    top_k: int = 5
+) -> List[Dict]:
+    """Evalúa cada perfil contra la misma referencia exacta"""
+    profiles = profiles or list(EMBEDDING_PROFILES.values())
+    reference = exact_top_k(corpus, queries, top_k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        return [
+            evaluate_profile(profile, corpus, queries, reference, top_k, Path(tmp))
+            for profile in profiles
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall, memoria y latencia por perfil de embeddings")
+    parser.add_argument("--profiles", nargs="*", choices=list(EMBEDDING_PROFILES), default=None)
+    parser.add_argument("--count", type=int, default=5000, help="Vectores del corpus sintético")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--fixture", type=Path, default=None, help="Archivo .npz con corpus y consultas")
+    parser.add_argument("--save-fixture", type=Path, default=None, help="Guardar el fixture usado en .npz")
+    parser.add_argument("--embeddings-dir", type=Path, default=None, help="Usar los vectores reales")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("PERFILES DE EMBEDDINGS - LEIA")
+    print("=" * 60)
+
+    if args.fixture:
+        with np.load(args.fixture) as data:
+            vectors = {"corpus": data["corpus"], "queries": data["queries"]}
+        source = str(args.fixture)
+    elif args.embeddings_dir:
+        vectors = embeddings_dir_vectors(args.embeddings_dir, args.queries)
+        source = str(args.embeddings_dir)
+    else:
+        vectors = fixture_vectors(args.count, args.queries)
+        source = f"sintético (semilla {FIXTURE_SEED})"
+
+    if args.save_fixture:
+        np.savez_compressed(args.save_fixture, **vectors)
+
+    profiles = [EMBEDDING_PROFILES[name] for name in args.profiles] if args.profiles else None
+    rows = evaluate_profiles(vectors["corpus"], vectors["queries"], profiles, args.top_k)
+
+    corpus = vectors["corpus"]
+    print(f"\nCorpus: {len(corpus):,} x {corpus.shape[1]} ({source}), {len(vectors['queries'])} consultas")
+    print(f"Referencia: top-{args.top_k} exacto con vectores completos float32\n")
+    print(f"{'perfil':<9} {'dims':>5} {'dtype':<8} {'recall':>7} {'índice':>10} {'rescore':>10} {'p50':>8} {'p95':>8}")
+    for row in rows:
+        print(
+            f"{row['profile']:<9} {row['dimensions']:>5} {row['dtype']:<8} {row['recall']:>7.3f} "
+            f"{row['index_bytes'] / 1e6:>8.2f}MB {row['rescore_bytes'] / 1e6:>8.2f}MB "
+            f"{row['p50_ms']:>6.3f}ms {row['p95_ms']:>6.3f}ms"
+        )
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
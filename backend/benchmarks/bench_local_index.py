@@ -0,0 +1,116 @@
+"""
+Benchmark del índice vectorial local (rag/local_index.py)
+
+Construye un índice sintético con vectores agrupados (similar a embeddings
+reales, que no son uniformes) y mide latencia de búsqueda en un solo core
+y recall@k contra búsqueda exacta.
+
+Uso:
+    python -m benchmarks.bench_local_index
+    python -m benchmarks.bench_local_index --count 300000 --dtype float16
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# Un solo core: evitar que BLAS paralelice la multiplicación
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+import numpy as np
+
+from rag.local_index import LocalVectorIndex
+
+
+def synthetic_records(count: int, dimension: int, clusters: int = 256, seed: int = 0):
+    """Vectores agrupados alrededor de centros aleatorios"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    categories = ["laboral", "familia", "consumidor", "civil", "penal"]
+
+    for i in range(count):
+        vector = centers[i % clusters] + 0.6 * rng.standard_normal(dimension).astype(np.float32)
+        yield f"chunk_{i}", vector, {"text": f"chunk {i}", "category": categories[i % len(categories)]}
+
+
+def percentile(values, p):
+    return float(np.percentile(np.asarray(values), p))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del índice local")
+    parser.add_argument("--count", type=int, default=50_000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK ÍNDICE LOCAL - LEIA")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = Path(tmp)
+
+        start = time.perf_counter()
+        manifest = LocalVectorIndex.build(
+            synthetic_records(args.count, args.dimension),
+            index_dir,
+            dimension=args.dimension,
+            dtype=args.dtype
+        )
+        build_time = time.perf_counter() - start
+
+        index = LocalVectorIndex(index_dir, nprobe=args.nprobe)
+        rng = np.random.default_rng(1)
+        matrix = np.asarray(index.vectors, dtype=np.float32)
+        query_rows = rng.choice(len(index), args.queries, replace=False)
+        queries = matrix[query_rows] + 0.3 * rng.standard_normal((args.queries, args.dimension)).astype(np.float32)
+
+        # Calentar page cache
+        for query in queries:
+            index.search(query, top_k=args.top_k)
+
+        latencies = []
+        filtered_latencies = []
+        all_results = []
+
+        for query in queries:
+            start = time.perf_counter()
+            all_results.append(index.search(query, top_k=args.top_k))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, top_k=args.top_k, filter={"category": "laboral"})
+            filtered_latencies.append((time.perf_counter() - start) * 1000)
+
+        # Recall@k contra búsqueda exacta (fuera de la medición de latencia)
+        hits = 0
+        for query, results in zip(queries, all_results):
+            q = query / np.linalg.norm(query)
+            exact = np.argpartition(-(matrix @ q), args.top_k)[:args.top_k]
+            exact_ids = {index._read_metadata(int(r))["id"] for r in exact}
+            hits += len(exact_ids & {r[0] for r in results})
+
+        index.close()
+
+    print(f"\nVectores: {manifest['count']:,} x {args.dimension} ({args.dtype})")
+    print(f"Listas IVF: {manifest['nlist']} (nprobe={args.nprobe or manifest['nprobe']})")
+    print(f"Construcción: {build_time:.1f}s")
+    print(f"\nBúsqueda top-{args.top_k} ({args.queries} consultas, 1 core):")
+    print(f"  • p50: {percentile(latencies, 50):.3f} ms")
+    print(f"  • p95: {percentile(latencies, 95):.3f} ms")
+    print(f"  • p50 con filtro category: {percentile(filtered_latencies, 50):.3f} ms")
+    print(f"  • recall@{args.top_k}: {hits / (args.queries * args.top_k):.3f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
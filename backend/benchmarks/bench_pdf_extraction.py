@@ -0,0 +1,104 @@
+"""
+Benchmark de extracción de texto de PDFs (data_collection/parallel_extractor.py)
+
+Genera PDFs sintéticos con reportlab (varios manuales medianos y uno muy
+grande, como una carpeta real de apuntes) y mide páginas/s:
+- secuencial: un proceso, página por página (DocumentLoader.load_pdf)
+- paralelo: ParallelExtractor por archivo y por rango de páginas
+
+Requiere PyPDF2 (extracción) y reportlab (generación).
+
+Uso:
+    python -m benchmarks.bench_pdf_extraction
+    python -m benchmarks.bench_pdf_extraction --files 16 --pages 150 --big-pages 1500 --workers 16
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from data_collection.parallel_extractor import PDF_AVAILABLE, ParallelExtractor, extract_pdf_pages
+
+try:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+
+PARAGRAPH = (
+    "Artículo {n}. El empleador podrá poner término al contrato de trabajo invocando "
+    "como causal las necesidades de la empresa, establecimiento o servicio."
+)
+
+
+def write_pdf(path: Path, pages: int, lines_per_page: int = 45):
+    """PDF de texto denso, parecido a un manual escaneado con OCR"""
+    pdf = canvas.Canvas(str(path), pagesize=letter)
+    for page in range(pages):
+        text = pdf.beginText(40, 750)
+        text.setFont("Helvetica", 8)
+        for line in range(lines_per_page):
+            text.textLine(PARAGRAPH.format(n=page * lines_per_page + line))
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+
+
+def run_sequential(files) -> dict:
+    start = time.perf_counter()
+    pages = sum(len(extract_pdf_pages(path)) for path in files)
+    return {"pages": pages, "seconds": time.perf_counter() - start}
+
+
+def run_parallel(files, workers: int) -> dict:
+    start = time.perf_counter()
+    pages = sum(result.pages for result in ParallelExtractor(max_workers=workers).extract(files))
+    return {"pages": pages, "seconds": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extracción de PDFs")
+    parser.add_argument("--files", type=int, default=8, help="PDFs medianos")
+    parser.add_argument("--pages", type=int, default=120, help="Páginas por PDF mediano")
+    parser.add_argument("--big-pages", type=int, default=800, help="Páginas del PDF grande (0 = sin PDF grande)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK EXTRACCIÓN DE PDFs - LEIA")
+    print("=" * 60)
+
+    if not PDF_AVAILABLE or not REPORTLAB_AVAILABLE:
+        print("⚠️  Requiere PyPDF2 y reportlab: pip install PyPDF2 reportlab")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        files = []
+        for i in range(args.files):
+            files.append(folder / f"manual_{i}.pdf")
+            write_pdf(files[-1], args.pages)
+        if args.big_pages:
+            files.append(folder / "tratado.pdf")
+            write_pdf(files[-1], args.big_pages)
+
+        total_pages = args.files * args.pages + args.big_pages
+        print(f"📄 {len(files)} PDFs, {total_pages} páginas, {args.workers} procesos\n")
+
+        sequential = run_sequential(files)
+        parallel = run_parallel(files, args.workers)
+
+    for name, result in [("secuencial", sequential), ("paralelo", parallel)]:
+        rate = result["pages"] / result["seconds"] if result["seconds"] else 0
+        print(f"{name:<11} {result['pages']:>6} páginas  {result['seconds']:>7.2f}s  {rate:>8.1f} páginas/s")
+
+    if parallel["seconds"]:
+        print(f"\n🚀 Speedup: {sequential['seconds'] / parallel['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,535 @@
+"""
+Benchmark de calidad y latencia de la recuperación con preguntas golden
+
+Corre el stack de recuperación completo y offline sobre un corpus fijo
+(benchmarks/golden/corpus, leyes en el formato de los scrapers):
+TextProcessor -> chunk store + índice léxico BM25 + índice vectorial local
+-> RAGEngine.retrieve_context -> TriageEngine.analyze. Los embeddings de
+las consultas y de los chunks son un bag-of-words con hashing (determinista,
+sin API): miden el pipeline, no la calidad del modelo de embeddings.
+
+Para cada pregunta del golden set (benchmarks/golden/golden_set.jsonl,
+versionado con GOLDEN_SET_VERSION) reporta:
+
+- recall@k y MRR contra las fuentes esperadas ("documento:artículo" o
+  "documento" para guías sin artículos)
+- tasa de NO_INFO_AVAILABLE del triage (total y en preguntas con respuesta)
+- latencia p50/p95 por etapa (embedding, vector, léxico, fusión, hidratación,
+  triage y total)
+
+Con --check compara contra benchmarks/golden/baseline.json y termina con
+código 1 si hay regresión (tests/test_retrieval_quality.py y el paso
+"Retrieval quality gate" de CI). El baseline versionado no fija latencia
+(depende de la máquina); --with-latency agrega un tope de p95 para
+comparar corridas locales. --seed propone preguntas nuevas desde /api/quick-questions y
+data/feedbacks para etiquetar a mano.
+
+Uso:
+    python -m benchmarks.bench_retrieval_quality
+    python -m benchmarks.bench_retrieval_quality --check
+    python -m benchmarks.bench_retrieval_quality --similarity-threshold 0.25 --triage-threshold 0.3
+    python -m benchmarks.bench_retrieval_quality --update-baseline
+    python -m benchmarks.bench_retrieval_quality --seed
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Un solo core: evitar que BLAS paralelice la multiplicación
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+import numpy as np
+
+from data_processing.text_processor import TextProcessor
+from rag.chunk_store import ChunkStore
+from rag.hybrid import RETRIEVAL_STAGES
+from rag.lexical_index import LexicalIndex, analyze, chunk_index_text
+from rag.local_index import LocalVectorIndex
+from rag.rag_engine import RAGEngine
+from rag.vector_store import VectorStore, chunk_metadata
+from services.triage_engine import TriageDecision, TriageEngine
+
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+GOLDEN_SET_PATH = GOLDEN_DIR / "golden_set.jsonl"
+CORPUS_DIR = GOLDEN_DIR / "corpus"
+BASELINE_PATH = GOLDEN_DIR / "baseline.json"
+FEEDBACK_PATH = Path(__file__).parent.parent / "data" / "feedbacks" / "feedbacks.json"
+
+# Subir al cambiar preguntas o fuentes esperadas (y regenerar el baseline)
+GOLDEN_SET_VERSION = 2
+
+HASH_DIMENSION = 256
+DEFAULT_TOP_K = 5
+
+# Umbral de similitud (RAGEngine y triage) para hashed_embedding. El umbral
+# se aplica solo a la similitud vectorial y el coseno de un bag-of-words con
+# hashing es mucho más bajo que el de los embeddings de OpenAI (0.2-0.6 para
+# chunks relevantes), así que los umbrales de producción (0.7 / 0.75) no
+# aplican offline.
+OFFLINE_SIMILARITY_THRESHOLD = 0.2
+
+# Margen al escribir el baseline: variaciones menores no fallan el gate
+RECALL_TOLERANCE = 0.02
+LATENCY_HEADROOM = 5.0
+
+LATENCY_STAGES = RETRIEVAL_STAGES + ("triage_ms", "total_ms")
+
+
+# ----------------------------------------------------------------------
+# Golden set y corpus
+# ----------------------------------------------------------------------
+
+def load_golden_set(path: Path = GOLDEN_SET_PATH) -> List[Dict]:
+    """
+    Lee el golden set (una pregunta por línea)
+
+    Raises:
+        ValueError: Si falta un campo o hay ids repetidos
+    """
+    entries = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if not entry.get("id") or not entry.get("question") or "expected_sources" not in entry:
+                raise ValueError(f"{path}:{line_number}: se requieren id, question y expected_sources")
+            if entry["id"] in seen:
+                raise ValueError(f"{path}:{line_number}: id repetido {entry['id']}")
+            seen.add(entry["id"])
+            entries.append(entry)
+    return entries
+
+
+def load_corpus_chunks(corpus_dir: Path = CORPUS_DIR, processor: Optional[TextProcessor] = None) -> List[Dict]:
+    """Chunks del corpus fijo, generados con TextProcessor (el mismo de la ingesta)"""
+    processor = processor or TextProcessor()
+    return [
+        chunk
+        for law_file in sorted(Path(corpus_dir).glob("*.json"))
+        for chunk in processor.process_law_file(law_file)
+    ]
+
+
+def result_source(result: Dict) -> str:
+    """Fuente de un resultado: "documento:artículo" o "documento" """
+    doc_id = result["id"].rsplit("_", 1)[0]
+    article = result.get("article_number") or (result.get("metadata") or {}).get("article_number")
+    return f"{doc_id}:{article}" if article else doc_id
+
+
+def corpus_sources(chunks: List[Dict]) -> set:
+    """Fuentes que existen en el corpus (documentos y documento:artículo)"""
+    sources = set()
+    for chunk in chunks:
+        doc_id = chunk["chunk_id"].rsplit("_", 1)[0]
+        sources.add(doc_id)
+        if chunk["metadata"].get("article_number"):
+            sources.add(f"{doc_id}:{chunk['metadata']['article_number']}")
+    return sources
+
+
+# ----------------------------------------------------------------------
+# Stack offline
+# ----------------------------------------------------------------------
+
+def hashed_embedding(text: str, dimension: int = HASH_DIMENSION) -> List[float]:
+    """
+    Embedding determinista sin API: términos del analizador léxico
+    repartidos en `dimension` buckets con signo (feature hashing), normalizado
+    """
+    vector = [0.0] * dimension
+    for term in analyze(text):
+        digest = hashlib.md5(term.encode("utf-8")).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimension
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class OfflineRAGEngine(RAGEngine):
+    """RAGEngine con embeddings de consulta locales (hashed_embedding)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.openai_key = "offline"
+
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        return hashed_embedding(query, self.vector_store.dimension)
+
+
+def build_offline_engine(
+    chunks: List[Dict],
+    work_dir: Path,
+    similarity_threshold: float = OFFLINE_SIMILARITY_THRESHOLD
+) -> OfflineRAGEngine:
+    """Construye índice vectorial, índice léxico y chunk store en work_dir"""
+    work_dir = Path(work_dir)
+    LocalVectorIndex.build(
+        ((chunk["chunk_id"], hashed_embedding(chunk_index_text(chunk)), chunk_metadata(chunk)) for chunk in chunks),
+        work_dir / "index",
+        dimension=HASH_DIMENSION,
+        nlist=0
+    )
+    LexicalIndex.build(
+        ((chunk["chunk_id"], chunk_index_text(chunk), chunk_metadata(chunk)) for chunk in chunks),
+        work_dir / "lexical"
+    )
+    ChunkStore.build(chunks, work_dir / "chunk_store.sqlite3")
+
+    return OfflineRAGEngine(
+        vector_store=VectorStore(backend="local", dimension=HASH_DIMENSION, local_index_dir=str(work_dir / "index")),
+        similarity_threshold=similarity_threshold,
+        lexical_index=LexicalIndex(work_dir / "lexical"),
+        chunk_store=ChunkStore(work_dir / "chunk_store.sqlite3")
+    )
+
+
+def close_offline_engine(engine: RAGEngine):
+    """Libera mmaps y SQLite (necesario antes de borrar el directorio en Windows)"""
+    engine.vector_store.backend.index.close()
+    engine.lexical_index.close()
+    engine.chunk_store.close()
+
+
+# ----------------------------------------------------------------------
+# Métricas
+# ----------------------------------------------------------------------
+
+def score_query(expected: List[str], results: List[Dict]) -> Dict:
+    """
+    recall@k y reciprocal rank de una pregunta
+
+    Una fuente esperada "documento" acepta cualquier artículo de ese documento.
+    """
+    found = set()
+    first_rank = None
+    for rank, result in enumerate(results, 1):
+        source = result_source(result)
+        doc_id = source.split(":", 1)[0]
+        matches = {e for e in expected if e == source or e == doc_id}
+        if matches and first_rank is None:
+            first_rank = rank
+        found |= matches
+
+    return {
+        "recall": len(found) / len(expected) if expected else None,
+        "reciprocal_rank": 1.0 / first_rank if first_rank else 0.0,
+        "found": sorted(found)
+    }
+
+
+def percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0}
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3)
+    }
+
+
+def evaluate(
+    golden: List[Dict],
+    engine: RAGEngine,
+    triage: TriageEngine,
+    top_k: int = DEFAULT_TOP_K
+) -> Dict:
+    """
+    Corre cada pregunta por recuperación y triage
+
+    Returns:
+        Dict con recall_at_k, mrr, no_info_rate, no_info_rate_answerable,
+        decisions, latency (p50/p95 por etapa) y queries (detalle por pregunta)
+    """
+    rows = []
+    latencies: Dict[str, List[float]] = {stage: [] for stage in LATENCY_STAGES}
+
+    for entry in golden:
+        start = time.perf_counter()
+        results = engine.retrieve_context(entry["question"], top_k=top_k)
+        retrieved = time.perf_counter()
+        result = triage.analyze(entry["question"], results)
+        end = time.perf_counter()
+
+        timings = dict(engine.stage_timings.last)
+        timings["triage_ms"] = (end - retrieved) * 1000
+        timings["total_ms"] = (end - start) * 1000
+        for stage, ms in timings.items():
+            latencies[stage].append(ms)
+
+        rows.append({
+            "id": entry["id"],
+            "question": entry["question"],
+            "expected": entry["expected_sources"],
+            "retrieved": [result_source(doc) for doc in results],
+            "decision": result.decision.value,
+            **score_query(entry["expected_sources"], results)
+        })
+
+    answerable = [row for row in rows if row["expected"]]
+    no_info = TriageDecision.NO_INFO_AVAILABLE.value
+
+    def rate(selected: List[Dict]) -> float:
+        if not selected:
+            return 0.0
+        return round(sum(row["decision"] == no_info for row in selected) / len(selected), 4)
+
+    return {
+        "golden_set_version": GOLDEN_SET_VERSION,
+        "top_k": top_k,
+        "queries": len(rows),
+        "answerable": len(answerable),
+        "recall_at_k": round(sum(row["recall"] for row in answerable) / max(len(answerable), 1), 4),
+        "mrr": round(sum(row["reciprocal_rank"] for row in answerable) / max(len(answerable), 1), 4),
+        "no_info_rate": rate(rows),
+        "no_info_rate_answerable": rate(answerable),
+        "decisions": dict(Counter(row["decision"] for row in rows)),
+        "latency": {stage: percentiles(values) for stage, values in latencies.items() if values},
+        "rows": rows
+    }
+
+
+def run_benchmark(
+    golden: Optional[List[Dict]] = None,
+    top_k: int = DEFAULT_TOP_K,
+    similarity_threshold: float = OFFLINE_SIMILARITY_THRESHOLD,
+    triage_threshold: Optional[float] = OFFLINE_SIMILARITY_THRESHOLD,
+    chunk_size: Optional[int] = None,
+    corpus_dir: Path = CORPUS_DIR,
+    warmup: int = 1
+) -> Dict:
+    """
+    Construye el stack offline en un directorio temporal y evalúa el golden set
+
+    Args:
+        golden: Preguntas (default: golden_set.jsonl)
+        top_k: Resultados por consulta (k de recall@k)
+        similarity_threshold: Umbral de RAGEngine (calibrado para hashed_embedding)
+        triage_threshold: Umbral del triage (None = TriageEngine.SIMILARITY_THRESHOLD)
+        chunk_size: Tokens por chunk de TextProcessor (default: el de la ingesta)
+        corpus_dir: Corpus a indexar
+        warmup: Pasadas previas sin medir (page cache, imports perezosos)
+    """
+    golden = golden if golden is not None else load_golden_set()
+    processor = TextProcessor(chunk_size=chunk_size) if chunk_size else TextProcessor()
+    chunks = load_corpus_chunks(corpus_dir, processor)
+
+    triage = TriageEngine()
+    if triage_threshold is not None:
+        triage.SIMILARITY_THRESHOLD = triage_threshold
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_offline_engine(chunks, Path(tmp), similarity_threshold)
+        try:
+            for _ in range(warmup):
+                evaluate(golden, engine, triage, top_k)
+            summary = evaluate(golden, engine, triage, top_k)
+        finally:
+            close_offline_engine(engine)
+
+    summary["chunks"] = len(chunks)
+    summary["similarity_threshold"] = similarity_threshold
+    summary["triage_threshold"] = triage.SIMILARITY_THRESHOLD
+    return summary
+
+
+# ----------------------------------------------------------------------
+# Baseline (gate de regresión)
+# ----------------------------------------------------------------------
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_baseline(summary: Dict, baseline: Dict) -> List[str]:
+    """Regresiones respecto del baseline (lista vacía = OK)"""
+    failures = []
+    if baseline.get("golden_set_version") != summary["golden_set_version"]:
+        failures.append(
+            f"golden set v{summary['golden_set_version']} pero el baseline es de "
+            f"v{baseline.get('golden_set_version')}: regenerar con --update-baseline"
+        )
+    if summary["recall_at_k"] < baseline["min_recall_at_k"]:
+        failures.append(f"recall@{summary['top_k']} {summary['recall_at_k']:.3f} < {baseline['min_recall_at_k']:.3f}")
+    if summary["mrr"] < baseline["min_mrr"]:
+        failures.append(f"MRR {summary['mrr']:.3f} < {baseline['min_mrr']:.3f}")
+    if summary["no_info_rate_answerable"] > baseline["max_no_info_rate_answerable"]:
+        failures.append(
+            f"NO_INFO en preguntas con respuesta {summary['no_info_rate_answerable']:.3f} "
+            f"> {baseline['max_no_info_rate_answerable']:.3f}"
+        )
+    # Latencia: solo si el baseline trae un tope (baselines locales; en CI
+    # la máquina varía demasiado para un valor absoluto)
+    p95 = summary["latency"]["total_ms"]["p95"]
+    if baseline.get("max_p95_total_ms") is not None and p95 > baseline["max_p95_total_ms"]:
+        failures.append(f"p95 total {p95:.2f} ms > {baseline['max_p95_total_ms']:.2f} ms")
+    return failures
+
+
+def baseline_from_summary(summary: Dict, with_latency: bool = False) -> Dict:
+    """
+    Baseline con margen a partir de una corrida
+
+    Args:
+        summary: Resultado de run_benchmark
+        with_latency: Incluir max_p95_total_ms (solo para comparar en la
+            misma máquina; el baseline versionado no lo lleva)
+    """
+    baseline = {
+        "golden_set_version": summary["golden_set_version"],
+        "top_k": summary["top_k"],
+        "min_recall_at_k": round(max(0.0, summary["recall_at_k"] - RECALL_TOLERANCE), 3),
+        "min_mrr": round(max(0.0, summary["mrr"] - RECALL_TOLERANCE), 3),
+        "max_no_info_rate_answerable": round(min(1.0, summary["no_info_rate_answerable"] + RECALL_TOLERANCE), 3),
+    }
+    if with_latency:
+        baseline["max_p95_total_ms"] = round(summary["latency"]["total_ms"]["p95"] * LATENCY_HEADROOM, 1)
+    return baseline
+
+
+# ----------------------------------------------------------------------
+# Semillas para el golden set
+# ----------------------------------------------------------------------
+
+def seed_candidates(golden: List[Dict], feedback_path: Path = FEEDBACK_PATH) -> List[Dict]:
+    """
+    Preguntas candidatas que aún no están en el golden set: las de
+    /api/quick-questions y las de los feedbacks (primero las marcadas
+    como no útiles o con corrección). Las fuentes esperadas se etiquetan a mano.
+    """
+    from services.legal_categories import QUICK_QUESTIONS
+
+    known = {entry["question"].strip().lower() for entry in golden}
+    candidates = []
+
+    def add(question: str, origin: str, note: Optional[str] = None):
+        key = question.strip().lower()
+        if not key or key in known:
+            return
+        known.add(key)
+        candidate = {"id": "", "question": question.strip(), "expected_sources": [], "origin": origin}
+        if note:
+            candidate["note"] = note
+        candidates.append(candidate)
+
+    for question in QUICK_QUESTIONS:
+        add(question, "quick_questions")
+
+    feedbacks = []
+    if Path(feedback_path).exists():
+        with open(feedback_path, "r", encoding="utf-8") as f:
+            feedbacks = json.load(f)
+    feedbacks.sort(key=lambda fb: fb.get("feedback") == "helpful" and not fb.get("correction"))
+    for feedback in feedbacks:
+        add(feedback.get("user_question", ""), "feedback", feedback.get("correction"))
+
+    return candidates
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def print_summary(summary: Dict, verbose: bool = False):
+    print(f"\nGolden set v{summary['golden_set_version']}: {summary['queries']} preguntas "
+          f"({summary['answerable']} con fuentes esperadas), corpus de {summary['chunks']} chunks")
+    print(f"Umbrales: RAG {summary['similarity_threshold']}, triage {summary['triage_threshold']}\n")
+    print(f"recall@{summary['top_k']}:              {summary['recall_at_k']:.3f}")
+    print(f"MRR:                    {summary['mrr']:.3f}")
+    print(f"NO_INFO (todas):        {summary['no_info_rate']:.1%}")
+    print(f"NO_INFO (con respuesta): {summary['no_info_rate_answerable']:.1%}")
+    print("\nDecisiones del triage:")
+    for decision, count in sorted(summary["decisions"].items(), key=lambda item: -item[1]):
+        print(f"  • {decision:<24} {count}")
+    print("\nLatencia por etapa:")
+    for stage, values in summary["latency"].items():
+        print(f"  • {stage:<12} p50 {values['p50']:>8.3f} ms   p95 {values['p95']:>8.3f} ms")
+
+    misses = [row for row in summary["rows"] if row["expected"] and row["recall"] < 1.0]
+    if misses:
+        print(f"\nPreguntas con fuentes no recuperadas ({len(misses)}):")
+        for row in misses if verbose else misses[:5]:
+            missing = sorted(set(row["expected"]) - set(row["found"]))
+            print(f"  ❌ [{row['id']}] {row['question']}")
+            print(f"     faltan {missing}; recuperadas {row['retrieved']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calidad y latencia de la recuperación con preguntas golden")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--similarity-threshold", type=float, default=OFFLINE_SIMILARITY_THRESHOLD, help="Umbral de RAGEngine")
+    parser.add_argument("--triage-threshold", type=float, default=OFFLINE_SIMILARITY_THRESHOLD, help="TriageEngine.SIMILARITY_THRESHOLD")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Tokens por chunk de TextProcessor")
+    parser.add_argument("--golden", type=Path, default=GOLDEN_SET_PATH)
+    parser.add_argument("--corpus-dir", type=Path, default=CORPUS_DIR)
+    parser.add_argument("--check", action="store_true", help="Fallar (código 1) si hay regresión vs baseline.json")
+    parser.add_argument("--update-baseline", action="store_true", help="Reescribir baseline.json con esta corrida")
+    parser.add_argument(
+        "--with-latency", action="store_true",
+        help="Con --update-baseline: incluir el tope de p95 (comparaciones en la misma máquina)"
+    )
+    parser.add_argument("--seed", action="store_true", help="Proponer preguntas desde quick-questions y feedbacks")
+    parser.add_argument("--seed-output", type=Path, default=GOLDEN_DIR / "candidates.jsonl")
+    parser.add_argument("--verbose", action="store_true", help="Listar todas las preguntas con fallas")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK CALIDAD DE RECUPERACIÓN (GOLDEN SET) - LEIA")
+    print("=" * 60)
+
+    golden = load_golden_set(args.golden)
+
+    if args.seed:
+        candidates = seed_candidates(golden)
+        with open(args.seed_output, "w", encoding="utf-8") as f:
+            for candidate in candidates:
+                f.write(json.dumps(candidate, ensure_ascii=False) + "\n")
+        print(f"\n🌱 {len(candidates)} preguntas candidatas en {args.seed_output}")
+        print("   Completar id y expected_sources y moverlas a golden_set.jsonl")
+        return
+
+    summary = run_benchmark(
+        golden,
+        top_k=args.top_k,
+        similarity_threshold=args.similarity_threshold,
+        triage_threshold=args.triage_threshold,
+        chunk_size=args.chunk_size,
+        corpus_dir=args.corpus_dir
+    )
+    print_summary(summary, args.verbose)
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline_from_summary(summary, with_latency=args.with_latency), f, indent=2)
+            f.write("\n")
+        print(f"\n💾 Baseline actualizado: {BASELINE_PATH}")
+
+    if args.check:
+        failures = check_baseline(summary, load_baseline())
+        print()
+        for failure in failures:
+            print(f"❌ Regresión: {failure}")
+        if failures:
+            print("=" * 60)
+            sys.exit(1)
+        print("✅ Sin regresiones respecto del baseline")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
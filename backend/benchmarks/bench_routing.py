@@ -0,0 +1,131 @@
+"""
+Benchmark del ruteo de consultas por partición (rag/partitions.py)
+
+Construye un índice local sintético particionado por área legal y pasa
+consultas por RAGEngine.search_vectors con router. Cada consulta lleva
+texto con palabras clave de su área (o ninguna, o las de otra área, para
+ejercitar la ruta global y la de respaldo). Reporta latencia y recall@k
+por ruta; el recall se mide contra la búsqueda global de la misma consulta.
+
+Uso:
+    python -m benchmarks.bench_routing
+    python -m benchmarks.bench_routing --count 50000 --nlist 0
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# Un solo core: evitar que BLAS paralelice la multiplicación
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import numpy as np
+
+from rag.local_index import LocalVectorIndex
+from rag.partitions import QueryRouter
+from rag.rag_engine import RAGEngine
+from rag.vector_store import VectorStore
+from services.legal_categories import LEGAL_CATEGORIES
+
+
+PARTITIONS = ["laboral", "familia", "consumidor", "civil", "penal", "tributario", "general"]
+
+# Fracción de consultas sin palabras clave y con las de otra área
+NO_KEYWORD_RATE = 0.2
+WRONG_AREA_RATE = 0.05
+
+
+def synthetic_records(count: int, dimension: int, clusters_per_partition: int = 16, seed: int = 0):
+    """Vectores agrupados: cada partición tiene sus propios centros"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((len(PARTITIONS), clusters_per_partition, dimension)).astype(np.float32)
+
+    for i in range(count):
+        partition = i % len(PARTITIONS)
+        vector = centers[partition, i % clusters_per_partition] + 0.6 * rng.standard_normal(dimension).astype(np.float32)
+        yield f"chunk_{i}", vector, {"category": PARTITIONS[partition]}
+
+
+def query_text(partition: str, rng) -> str:
+    """Texto de consulta: palabras clave del área, de otra área o ninguna"""
+    draw = rng.random()
+    if partition == "general" or draw < NO_KEYWORD_RATE:
+        return "¿Qué dice el artículo 5 de la ley?"
+    if draw < NO_KEYWORD_RATE + WRONG_AREA_RATE:
+        partition = PARTITIONS[(PARTITIONS.index(partition) + 1) % (len(PARTITIONS) - 1)]
+    keywords = LEGAL_CATEGORIES[partition].keywords
+    return "Consulta sobre " + " y ".join(rng.choice(keywords, 2, replace=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del ruteo de consultas por partición")
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--nlist", type=int, default=0, help="Listas IVF (0 = exacto, particiones contiguas)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK RUTEO POR PARTICIÓN - LEIA")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = Path(tmp)
+        LocalVectorIndex.build(
+            synthetic_records(args.count, args.dimension),
+            index_dir,
+            dimension=args.dimension,
+            nlist=args.nlist
+        )
+        store = VectorStore(backend="local", dimension=args.dimension, local_index_dir=str(index_dir))
+
+        rng = np.random.default_rng(1)
+        matrix = np.asarray(store.backend.index.vectors, dtype=np.float32)
+        partition_codes = store.backend.index.partition_codes
+        partitions = store.backend.index.partitions
+        rows = rng.choice(len(matrix), args.queries, replace=False)
+
+        queries = []
+        for row in rows:
+            # Filas normalizadas: ruido de norma ~0.3
+            vector = matrix[row] + 0.3 * rng.standard_normal(args.dimension).astype(np.float32) / np.sqrt(args.dimension)
+            queries.append((query_text(partitions[partition_codes[row]], rng), vector.tolist()))
+
+        engine = RAGEngine(vector_store=store, router=QueryRouter(), shadow_rate=1.0)
+
+        # Calentar page cache
+        for _, vector in queries[:50]:
+            store.search(vector, top_k=args.top_k)
+
+        global_latencies = []
+        for _, vector in queries:
+            start = time.perf_counter()
+            store.search(vector, top_k=args.top_k)
+            global_latencies.append((time.perf_counter() - start) * 1000)
+
+        for text, vector in queries:
+            engine.search_vectors(text, vector, args.top_k)
+
+        routes = engine.route_stats.summary()
+        store.backend.index.close()
+
+    print(f"\nVectores: {args.count:,} x {args.dimension} en {len(partitions)} particiones (nlist={args.nlist})")
+    print(f"Consultas: {args.queries} (top-{args.top_k}, 1 core)")
+    print(f"\nSin ruteo (global): p50 {np.percentile(global_latencies, 50):.3f} ms")
+    for route, entry in routes.items():
+        recall = f", recall@{args.top_k} {entry['recall']:.3f}" if "recall" in entry else ""
+        print(
+            f"  • {route:<9} {entry['queries']:>4} consultas ({entry['share']:.0%}): "
+            f"avg {entry['avg_ms']:.3f} ms, p95 {entry['p95_ms']:.3f} ms{recall}"
+        )
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
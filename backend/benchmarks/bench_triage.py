@@ -0,0 +1,131 @@
+"""
+Microbenchmark de las reglas del triage (services/triage_matcher.py)
+
+Mide el costo por mensaje de evaluar todas las reglas de TriageEngine:
+
+- legacy: un re.search por patrón y un substring por palabra clave, como
+  hacía TriageEngine antes del matcher compilado
+- compilado: Aho-Corasick + alternaciones, una pasada por texto
+- memoizado: el mismo texto vuelve a escanearse (consulta repetida,
+  historial que se revisa en cada turno)
+
+Los mensajes son las preguntas del golden set y respuestas largas de LEIA
+del estilo que se revisan en el historial.
+
+Uso:
+    python -m benchmarks.bench_triage
+    python -m benchmarks.bench_triage --repeat 200
+"""
+
+import argparse
+import re
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.bench_retrieval_quality import load_golden_set
+from services.triage_engine import TriageEngine
+from services.triage_matcher import TriageSignals
+
+
+# Respuesta larga típica de LEIA (se repite para simular el historial)
+ASSISTANT_REPLY = (
+    "Según el artículo 162 del Código del Trabajo, el empleador debe comunicar "
+    "el despido por escrito indicando la causal. Si no estás de acuerdo con la "
+    "causal invocada puedes reclamar ante la Inspección del Trabajo o presentar "
+    "una demanda por despido injustificado dentro de 60 días hábiles. Te puedo "
+    "conectarte con un abogado laboralista de LEIA si quieres revisar tu caso. "
+)
+
+
+def legacy_signals(engine: TriageEngine, text: str) -> TriageSignals:
+    """Reglas evaluadas una por una, sin compilar ni normalizar tildes"""
+    query = text.lower().strip()
+    specialties = tuple(
+        specialty for specialty, keywords in engine.SPECIALTY_KEYWORDS.items()
+        if any(kw in query for kw in keywords)
+    )
+    mentions = tuple(
+        specialty for specialty, phrases in engine.SPECIALTY_MENTIONS.items()
+        if any(phrase in query for phrase in phrases)
+    )
+    return TriageSignals(
+        direct_lawyer_request=any(re.search(p, query, re.IGNORECASE) for p in engine.DIRECT_LAWYER_REQUEST_PATTERNS),
+        urgent=any(kw in query for kw in engine.URGENT_KEYWORDS),
+        sensitive=any(topic in query for topic in engine.SENSITIVE_TOPICS),
+        lawyer_offer=any(phrase in query for phrase in engine.LAWYER_OFFER_PHRASES),
+        advice_request=any(re.search(p, query, re.IGNORECASE) for p in engine.ADVICE_REQUEST_PATTERNS),
+        concrete_problem=any(re.search(p, query, re.IGNORECASE) for p in engine.CONCRETE_LEGAL_PROBLEMS),
+        specialties=specialties,
+        specialty_mentions=mentions
+    )
+
+
+def benchmark_messages(history_turns: int = 6) -> Dict[str, List[str]]:
+    """Mensajes de usuario (golden set) y respuestas/historiales largos de LEIA"""
+    questions = [entry["question"] for entry in load_golden_set()]
+    history = [ASSISTANT_REPLY * turns for turns in range(1, history_turns + 1)]
+    return {"preguntas": questions, "historial": history}
+
+
+def time_per_message(scan: Callable[[str], object], messages: List[str], repeat: int) -> Dict[str, float]:
+    """µs por mensaje (mediana y p95 de las repeticiones)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            scan(message)
+        samples.append((time.perf_counter() - start) * 1e6 / len(messages))
+    samples.sort()
+    return {
+        "p50_us": statistics.median(samples),
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    }
+
+
+def run_benchmark(repeat: int = 100) -> List[Dict]:
+    """Filas (conjunto, modo, p50, p95) para legacy, compilado y memoizado"""
+    engine = TriageEngine()
+    matcher = engine.matcher
+    rows = []
+    for name, messages in benchmark_messages().items():
+        modes = {
+            "legacy": lambda text: legacy_signals(engine, text),
+            "compilado": matcher._scan,
+            "memoizado": matcher.scan,
+        }
+        for mode, scan in modes.items():
+            rows.append({"set": name, "mode": mode, "messages": len(messages), **time_per_message(scan, messages, repeat)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo por mensaje de las reglas del triage")
+    parser.add_argument("--repeat", type=int, default=100, help="Repeticiones por conjunto")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("REGLAS DEL TRIAGE - LEIA")
+    print("=" * 60)
+
+    engine = TriageEngine()
+    mismatches = [
+        message for messages in benchmark_messages().values() for message in messages
+        if legacy_signals(engine, message.lower()) != engine.matcher._scan(message)
+    ]
+    print(f"\nMensajes donde el matcher difiere del legacy (tildes): {len(mismatches)}")
+
+    print(f"\n{'conjunto':<11} {'modo':<10} {'msgs':>5} {'p50':>10} {'p95':>10}")
+    rows = run_benchmark(args.repeat)
+    for row in rows:
+        print(f"{row['set']:<11} {row['mode']:<10} {row['messages']:>5} {row['p50_us']:>8.1f}µs {row['p95_us']:>8.1f}µs")
+
+    for name in {row["set"] for row in rows}:
+        legacy = next(r for r in rows if r["set"] == name and r["mode"] == "legacy")["p50_us"]
+        compiled = next(r for r in rows if r["set"] == name and r["mode"] == "compilado")["p50_us"]
+        print(f"Aceleración {name}: {legacy / compiled:.1f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Servidor falso de embeddings (API compatible con POST /v1/embeddings de OpenAI)
+
+Para probar y medir data_processing/batch_embedder.py sin red ni API key:
+- Latencia simulada por request y por token
+- Límites de requests y tokens por ventana, con 429 y los headers de
+  rate limit de OpenAI (retry-after-ms, x-ratelimit-*)
+- Inputs que contienen "INVALID" hacen fallar la request completa (400)
+- Vectores deterministas por texto
+
+Uso en proceso (tests/benchmarks): httpx.ASGITransport(app=create_app(...))
+Como servidor real:
+    python -m benchmarks.fake_embeddings_server --port 8100
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 python -m data_processing.embedder
+"""
+
+import argparse
+import asyncio
+import hashlib
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from utils.text import estimate_tokens
+
+
+class RateWindow:
+    """Requests y tokens consumidos en una ventana deslizante"""
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.events = deque()
+
+    def _trim(self, now: float):
+        while self.events and now - self.events[0][0] >= self.window_seconds:
+            self.events.popleft()
+
+    def usage(self, now: float):
+        self._trim(now)
+        return len(self.events), sum(tokens for _, tokens in self.events)
+
+    def reset_in(self, now: float) -> float:
+        self._trim(now)
+        if not self.events:
+            return 0.0
+        return max(0.0, self.window_seconds - (now - self.events[0][0]))
+
+    def add(self, now: float, tokens: int):
+        self.events.append((now, tokens))
+
+
+def fake_vector(text: str, dimensions: int):
+    """Vector determinista a partir del hash del texto"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(dimensions)]
+
+
+def create_app(
+    dimensions: int = 1536,
+    latency_ms: float = 50.0,
+    ms_per_1k_tokens: float = 5.0,
+    requests_per_window: Optional[int] = None,
+    tokens_per_window: Optional[int] = None,
+    window_seconds: float = 1.0
+) -> FastAPI:
+    """
+    Args:
+        dimensions: Dimensiones de los vectores
+        latency_ms: Latencia base por request
+        ms_per_1k_tokens: Latencia adicional por cada 1000 tokens
+        requests_per_window / tokens_per_window: Límites (None = sin límite)
+        window_seconds: Tamaño de la ventana de rate limit
+    """
+    app = FastAPI()
+    window = RateWindow(window_seconds)
+    app.state.stats = {"requests": 0, "throttled": 0, "invalid": 0, "texts": 0}
+
+    def limit_headers(now: float, used_requests: int, used_tokens: int):
+        reset = f"{window.reset_in(now):.3f}s"
+        headers = {"x-ratelimit-reset-requests": reset, "x-ratelimit-reset-tokens": reset}
+        if requests_per_window:
+            headers["x-ratelimit-remaining-requests"] = str(max(0, requests_per_window - used_requests))
+        if tokens_per_window:
+            headers["x-ratelimit-remaining-tokens"] = str(max(0, tokens_per_window - used_tokens))
+        return headers
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        tokens = sum(estimate_tokens(text) for text in texts)
+        app.state.stats["requests"] += 1
+
+        now = time.monotonic()
+        used_requests, used_tokens = window.usage(now)
+        over_requests = requests_per_window and used_requests + 1 > requests_per_window
+        over_tokens = tokens_per_window and used_tokens + tokens > tokens_per_window
+        if over_requests or over_tokens:
+            app.state.stats["throttled"] += 1
+            headers = limit_headers(now, used_requests, used_tokens)
+            headers["retry-after-ms"] = str(int(window.reset_in(now) * 1000) + 1)
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "requests"}},
+                headers=headers
+            )
+
+        window.add(now, tokens)
+        await asyncio.sleep((latency_ms + ms_per_1k_tokens * tokens / 1000) / 1000)
+
+        if any("INVALID" in text for text in texts):
+            app.state.stats["invalid"] += 1
+            return JSONResponse(
+                status_code=400,
+                content={"error": {"message": "Invalid input", "type": "invalid_request_error"}}
+            )
+
+        app.state.stats["texts"] += len(texts)
+        size = body.get("dimensions") or dimensions
+        return JSONResponse(
+            content={
+                "object": "list",
+                "model": body.get("model"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": fake_vector(text, size)}
+                    for i, text in enumerate(texts)
+                ],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+            },
+            headers=limit_headers(now, used_requests + 1, used_tokens + tokens)
+        )
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor falso de embeddings")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--rpm", type=int, default=None, help="Requests por minuto")
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens por minuto")
+    args = parser.parse_args()
+
+    app = create_app(
+        latency_ms=args.latency_ms,
+        requests_per_window=args.rpm,
+        tokens_per_window=args.tpm,
+        window_seconds=60.0
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Sitio legal falso (páginas tipo BCN LeyChile) para probar el crawler
+
+- GET /leychile/navegar?idNorma=X devuelve el HTML de la ley X con
+  artículos en <div class="art">
+- ETag y Last-Modified por ley; If-None-Match / If-Modified-Since -> 304
+- Latencia simulada, 503 con Retry-After en los primeros requests
+  (fail_first) y registro de concurrencia y de instantes de cada request
+- app.state.laws se puede modificar para simular una ley reformada
+
+Uso en proceso (tests): httpx.ASGITransport(app=create_app(...))
+Como servidor real:
+    python -m benchmarks.fake_legal_site --port 8200
+"""
+
+import argparse
+import asyncio
+import hashlib
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, Response
+
+
+def law_html(law_id: str, articles: List[str]) -> str:
+    body = "".join(f'<div class="art">Artículo {i}. {text}</div>' for i, text in enumerate(articles, 1))
+    return f"<html><head><title>Norma {law_id}</title></head><body>{body}</body></html>"
+
+
+def default_laws() -> Dict[str, List[str]]:
+    return {
+        "207436": ["El empleador podrá poner término al contrato invocando necesidades de la empresa."],
+        "172986": ["La ley es una declaración de la voluntad soberana manifestada en la forma prescrita."],
+        "61438": ["Son derechos básicos del consumidor la libre elección del bien o servicio."],
+        "229557": ["El matrimonio es un contrato solemne por el cual un hombre y una mujer se unen."],
+        "28581": ["La obligación de proporcionar alimentos a los hijos menores de edad."],
+    }
+
+
+def create_app(
+    laws: Optional[Dict[str, List[str]]] = None,
+    latency_ms: float = 0.0,
+    fail_first: int = 0,
+    retry_after: float = 0.0
+) -> FastAPI:
+    """
+    Args:
+        laws: idNorma -> textos de los artículos
+        latency_ms: Latencia por request
+        fail_first: Cantidad de requests iniciales que responden 503
+        retry_after: Retry-After (segundos) de esas respuestas
+    """
+    app = FastAPI(title="Fake legal site")
+    app.state.laws = laws if laws is not None else default_laws()
+    app.state.modified = {law_id: time.time() - 86400 for law_id in app.state.laws}
+    app.state.stats = {"requests": 0, "ok": 0, "not_modified": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+    app.state.request_times = []
+    app.state.pending_failures = fail_first
+
+    def etag_for(html: str) -> str:
+        return '"' + hashlib.sha256(html.encode("utf-8")).hexdigest()[:16] + '"'
+
+    @app.get("/leychile/navegar")
+    async def navegar(request: Request, idNorma: str):
+        stats = app.state.stats
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        app.state.request_times.append(time.monotonic())
+        try:
+            if latency_ms:
+                await asyncio.sleep(latency_ms / 1000)
+
+            if app.state.pending_failures > 0:
+                app.state.pending_failures -= 1
+                stats["errors"] += 1
+                return Response(status_code=503, headers={"Retry-After": str(retry_after)})
+
+            if idNorma not in app.state.laws:
+                stats["errors"] += 1
+                return Response(status_code=404)
+
+            html = law_html(idNorma, app.state.laws[idNorma])
+            etag = etag_for(html)
+            last_modified = formatdate(app.state.modified[idNorma], usegmt=True)
+
+            if request.headers.get("if-none-match") == etag:
+                stats["not_modified"] += 1
+                return Response(status_code=304, headers={"ETag": etag})
+
+            since = request.headers.get("if-modified-since")
+            if since and "if-none-match" not in request.headers:
+                try:
+                    if parsedate_to_datetime(since).timestamp() >= int(app.state.modified[idNorma]):
+                        stats["not_modified"] += 1
+                        return Response(status_code=304)
+                except (TypeError, ValueError):
+                    pass
+
+            stats["ok"] += 1
+            return HTMLResponse(html, headers={"ETag": etag, "Last-Modified": last_modified})
+        finally:
+            stats["in_flight"] -= 1
+
+    return app
+
+
+def amend_law(app: FastAPI, law_id: str, articles: List[str]):
+    """Simula una reforma: cambia el texto y la fecha de modificación"""
+    app.state.laws[law_id] = articles
+    app.state.modified[law_id] = time.time()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Sitio legal falso para el crawler")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(latency_ms=args.latency_ms), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
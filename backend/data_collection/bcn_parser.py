@@ -0,0 +1,233 @@
+"""
+BCN Parser - Extracción de artículos de páginas de leyes de BCN LeyChile
+
+- lxml en modo streaming (iterparse): cada artículo se entrega apenas se
+  cierra su elemento y después se libera, así el Código Civil (varios MB
+  de HTML) no vive entero en memoria como árbol
+- Número real del artículo ("161", "161 bis", "1 transitorio") leído del
+  encabezado "Artículo N", no la posición del elemento en la página
+- Salida compacta: el HTML de cada artículo solo se guarda con keep_html
+  (duplicaba el tamaño del JSON que TextProcessor vuelve a cargar)
+- El texto conserva los saltos de línea de los bloques (<p>, <br>, ...)
+  para que el chunker reconozca incisos y numerales
+
+Si lxml no está instalado se usa BeautifulSoup (html.parser), más lento.
+
+Uso:
+    from data_collection.bcn_parser import parse_law
+    law = parse_law(html, {"id": "207436", "name": "Código del Trabajo", ...})
+"""
+
+import io
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Union
+
+try:
+    from lxml import etree
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from bs4 import BeautifulSoup
+    BS4_AVAILABLE = True
+except ImportError:
+    BS4_AVAILABLE = False
+
+
+# Clases de los contenedores de artículos ("art", "articulo", "art-texto", ...)
+ARTICLE_CLASS_PATTERN = re.compile(r'^(art|articulo)([-_]|$)', re.IGNORECASE)
+ARTICLE_TAGS = {"div", "p"}
+
+# "Artículo 161", "Art. 2°", "Artículo 161 bis", "Artículo primero transitorio"
+ARTICLE_NUMBER_PATTERN = re.compile(
+    r'^\s*Art(?:[íi]culo\s+|\.\s*)(\d+|[a-záéíóúñ]+)\s*[º°o]?\s*'
+    r'(bis|ter|qu[áa]ter|quinquies|sexies|septies|octies|nonies|decies)?',
+    re.IGNORECASE
+)
+# Divisiones "Artículo N" dentro de un texto sin contenedores por artículo
+ARTICLE_SPLIT_PATTERN = re.compile(r'(?m)^\s*(?=Art[íi]culo\s+\d+)', re.IGNORECASE)
+
+# Artículos con menos texto que esto son restos de navegación
+MIN_ARTICLE_CHARS = 20
+
+# Elementos que cortan línea en el texto extraído
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "table", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+    "blockquote", "pre", "section", "article"
+}
+SKIP_TAGS = {"script", "style", "head", "title"}
+
+
+def article_number(text: str) -> Optional[str]:
+    """Número del artículo según su encabezado, o None si el texto no empieza con uno"""
+    match = ARTICLE_NUMBER_PATTERN.match(text)
+    if not match:
+        return None
+
+    number = match.group(1).lower()
+    if match.group(2):
+        number += f" {match.group(2).lower()}"
+    if "transitori" in text[:match.end() + 20].lower():
+        number += " transitorio"
+    return number
+
+
+def normalize_text(text: str) -> str:
+    """Espacios colapsados por línea, sin líneas vacías"""
+    lines = (" ".join(line.split()) for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _is_article(elem) -> bool:
+    if elem.tag not in ARTICLE_TAGS:
+        return False
+    classes = elem.get("class")
+    return bool(classes) and any(ARTICLE_CLASS_PATTERN.match(token) for token in classes.split())
+
+
+def _collect_text(elem, parts: List[str]):
+    tag = elem.tag if isinstance(elem.tag, str) else None  # Comentarios: solo su tail
+    if tag in SKIP_TAGS:
+        return
+    block = tag in BLOCK_TAGS
+    if block:
+        parts.append("\n")
+    if tag and elem.text:
+        parts.append(elem.text)
+    for child in elem:
+        _collect_text(child, parts)
+        if child.tail:
+            parts.append(child.tail)
+    if block:
+        parts.append("\n")
+
+
+def element_text(elem) -> str:
+    """Texto de un elemento lxml con un salto de línea por bloque"""
+    parts: List[str] = []
+    _collect_text(elem, parts)
+    return normalize_text("".join(parts))
+
+
+def _make_article(text: str, html: Optional[str], keep_html: bool) -> Dict:
+    article = {"article_number": article_number(text), "content": text}
+    if keep_html:
+        article["html"] = html
+    return article
+
+
+def _as_bytes(html: Union[str, bytes]) -> bytes:
+    return html.encode("utf-8") if isinstance(html, str) else html
+
+
+def _iter_lxml(html: bytes, keep_html: bool) -> Iterator[Dict]:
+    """Artículos marcados por clase, liberando cada uno después de entregarlo"""
+    depth = 0
+    events = etree.iterparse(io.BytesIO(html), events=("start", "end"), html=True, recover=True, encoding="utf-8")
+
+    for event, elem in events:
+        if not _is_article(elem):
+            continue
+        if event == "start":
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth:
+            continue  # Artículo anidado: va dentro del texto del que lo contiene
+
+        text = element_text(elem)
+        if len(text) > MIN_ARTICLE_CHARS:
+            raw = etree.tostring(elem, encoding="unicode", method="html", with_tail=False) if keep_html else None
+            yield _make_article(text, raw, keep_html)
+
+        elem.clear(keep_tail=False)
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
+def _split_full_text(text: str, keep_html: bool) -> Iterator[Dict]:
+    """Texto completo de la norma dividido en sus encabezados "Artículo N" """
+    for part in ARTICLE_SPLIT_PATTERN.split(text):
+        part = part.strip()
+        if article_number(part) and len(part) > MIN_ARTICLE_CHARS:
+            yield _make_article(part, None, keep_html)
+
+
+def _iter_full_text_lxml(html: bytes, keep_html: bool) -> Iterator[Dict]:
+    """Páginas sin contenedores por artículo: texto de div#textolei o div.texto-norma"""
+    root = lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding="utf-8"))
+    containers = root.xpath(
+        '//div[@id="textolei"] | //div[contains(concat(" ", normalize-space(@class), " "), " texto-norma ")]'
+    )
+    if containers:
+        yield from _split_full_text(element_text(containers[0]), keep_html)
+
+
+def _iter_bs4(html: bytes, keep_html: bool) -> Iterator[Dict]:
+    """Mismo criterio con BeautifulSoup (sin lxml)"""
+    soup = BeautifulSoup(html, "html.parser")
+
+    def is_article_class(value):
+        return bool(value) and bool(ARTICLE_CLASS_PATTERN.match(value))
+
+    found = False
+    for elem in soup.find_all(list(ARTICLE_TAGS), class_=is_article_class):
+        if elem.find_parent(list(ARTICLE_TAGS), class_=is_article_class):
+            continue
+        text = normalize_text(elem.get_text(separator="\n"))
+        if len(text) > MIN_ARTICLE_CHARS:
+            found = True
+            yield _make_article(text, str(elem), keep_html)
+
+    if not found:
+        content_div = soup.find("div", id="textolei") or soup.find("div", class_="texto-norma")
+        if content_div:
+            yield from _split_full_text(normalize_text(content_div.get_text(separator="\n")), keep_html)
+
+
+def iter_articles(html: Union[str, bytes], keep_html: bool = False) -> Iterator[Dict]:
+    """
+    Artículos de una página de ley, en orden
+
+    Args:
+        html: HTML de la página (str o bytes en UTF-8)
+        keep_html: Incluir el HTML de cada artículo (default: no)
+
+    Yields:
+        {"article_number": "161" | None, "content": texto[, "html": ...]}
+    """
+    html = _as_bytes(html)
+
+    if LXML_AVAILABLE:
+        found = False
+        for article in _iter_lxml(html, keep_html):
+            found = True
+            yield article
+        if not found:
+            yield from _iter_full_text_lxml(html, keep_html)
+    elif BS4_AVAILABLE:
+        yield from _iter_bs4(html, keep_html)
+    else:
+        raise ImportError("Se requiere lxml (o beautifulsoup4): pip install lxml")
+
+
+def parse_law(html: Union[str, bytes], law_info: Dict, keep_html: bool = False) -> Dict:
+    """Ley estructurada (formato de data/raw/bcn) a partir de su página"""
+    articles = list(iter_articles(html, keep_html=keep_html))
+
+    return {
+        "law_id": law_info.get("id"),
+        "law_name": law_info.get("name"),
+        "category": law_info.get("category"),
+        "url": law_info.get("url"),
+        "articles": articles,
+        "total_articles": len(articles),
+        "scraped_at": datetime.now().isoformat(),
+        "source": "BCN LeyChile"
+    }
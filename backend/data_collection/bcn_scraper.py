@@ -5,16 +5,20 @@ Fuentes:
 - Código del Trabajo: https://www.bcn.cl/leychile/navegar?idNorma=207436
 - Código Civil: https://www.bcn.cl/leychile/navegar?idNorma=172986
 - Ley del Consumidor: https://www.bcn.cl/leychile/navegar?idNorma=61438
+
+Las descargas pasan por el crawler compartido (data_collection/crawler.py):
+GET condicional con caché en disco, así una ley que no cambió desde la
+corrida anterior responde 304, no se vuelve a parsear y su JSON queda
+intacto. El parseo (lxml en streaming, números reales de artículo, sin
+HTML en la salida) está en data_collection/bcn_parser.py.
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
-import time
 from pathlib import Path
-from datetime import datetime
 from typing import List, Dict, Optional
-import re
+
+from data_collection.bcn_parser import parse_law
+from data_collection.crawler import AsyncCrawler, FetchResult, write_json_if_changed
 
 class BCNScraper:
     """Scraper para leyes chilenas desde BCN LeyChile"""
@@ -55,118 +59,89 @@ class BCNScraper:
         }
     }
 
-    def __init__(self, output_dir: str = "data/raw/bcn"):
+    def __init__(
+        self,
+        output_dir: str = "data/raw/bcn",
+        crawler: Optional[AsyncCrawler] = None,
+        keep_html: bool = False
+    ):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'JusticiaAI-LegalBot/1.0 (Educational Purpose)'
-        })
+        self.crawler = crawler or AsyncCrawler()
+        # El HTML de cada artículo duplica el tamaño del JSON: solo para depurar el parser
+        self.keep_html = keep_html
+
+    def law_url(self, law_info: Dict) -> str:
+        return law_info.get("url") or f"{self.BASE_URL}/navegar?idNorma={law_info['id']}"
 
     def fetch_law_html(self, law_id: str) -> Optional[str]:
         """Descarga el HTML de una ley específica"""
         url = f"{self.BASE_URL}/navegar?idNorma={law_id}"
 
-        try:
-            print(f"📥 Descargando ley ID {law_id}...")
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            print(f"❌ Error descargando ley {law_id}: {e}")
-            return None
+        print(f"📥 Descargando ley ID {law_id}...")
+        result = self.crawler.fetch_all_sync([url])[0]
+        if not result.ok:
+            print(f"❌ Error descargando ley {law_id}: {result.error}")
+        return result.text
 
     def parse_law_content(self, html: str, law_info: Dict) -> Dict:
-        """Extrae el contenido estructurado de una ley"""
-        soup = BeautifulSoup(html, 'html.parser')
-
-        # Extraer artículos
-        articles = []
-
-        # Buscar divs con clase 'art' o 'articulo'
-        article_elements = soup.find_all(['div', 'p'], class_=re.compile(r'(art|articulo)', re.I))
-
-        for idx, elem in enumerate(article_elements, 1):
-            text = elem.get_text(strip=True)
-            if text and len(text) > 20:  # Filtrar elementos vacíos
-                articles.append({
-                    "article_number": idx,
-                    "content": text,
-                    "html": str(elem)
-                })
-
-        # Si no encontramos artículos por clase, buscar por estructura
-        if not articles:
-            # Buscar por patrón "Artículo X"
-            content_div = soup.find('div', id='textolei') or soup.find('div', class_='texto-norma')
-            if content_div:
-                text = content_div.get_text(separator='\n\n')
-                # Dividir por "Artículo"
-                parts = re.split(r'Artículo\s+(\d+[º°]?\.?-?)', text, flags=re.IGNORECASE)
-
-                for i in range(1, len(parts), 2):
-                    if i + 1 < len(parts):
-                        article_num = parts[i].strip()
-                        article_text = parts[i + 1].strip()
-                        articles.append({
-                            "article_number": article_num,
-                            "content": article_text,
-                            "html": None
-                        })
-
-        return {
-            "law_id": law_info.get("id"),
-            "law_name": law_info.get("name"),
-            "category": law_info.get("category"),
-            "url": law_info.get("url"),
-            "articles": articles,
-            "total_articles": len(articles),
-            "scraped_at": datetime.now().isoformat(),
-            "source": "BCN LeyChile"
-        }
-
-    def scrape_law(self, law_key: str) -> Optional[Dict]:
-        """Descarga y procesa una ley específica"""
-        if law_key not in self.PRIORITY_LAWS:
-            print(f"❌ Ley '{law_key}' no encontrada en lista prioritaria")
-            return None
+        """Extrae el contenido estructurado de una ley (ver data_collection/bcn_parser.py)"""
+        return parse_law(html, law_info, keep_html=self.keep_html)
 
+    def _save_law(self, law_key: str, result: FetchResult) -> Optional[Dict]:
+        """Parsea y guarda una ley descargada; si no cambió, reutiliza su JSON"""
         law_info = self.PRIORITY_LAWS[law_key]
+        output_file = self.output_dir / f"{law_key}.json"
 
-        # Descargar HTML
-        html = self.fetch_law_html(law_info["id"])
-        if not html:
+        if not result.ok:
+            print(f"❌ Error descargando {law_info['name']}: {result.error}")
             return None
 
-        # Parsear contenido
-        parsed_data = self.parse_law_content(html, law_info)
+        if not result.changed and output_file.exists():
+            with open(output_file, 'r', encoding='utf-8') as f:
+                parsed_data = json.load(f)
+            print(f"⏭️  Ley '{law_info['name']}' sin cambios ({result.status})")
+            return parsed_data
 
-        # Guardar JSON
-        output_file = self.output_dir / f"{law_key}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(parsed_data, f, ensure_ascii=False, indent=2)
+        # Parsear contenido
+        parsed_data = self.parse_law_content(result.text, law_info)
 
-        print(f"✅ Ley '{law_info['name']}' guardada: {parsed_data['total_articles']} artículos")
+        # Guardar JSON (solo si el contenido cambió)
+        if write_json_if_changed(output_file, parsed_data):
+            print(f"✅ Ley '{law_info['name']}' guardada: {parsed_data['total_articles']} artículos")
+        else:
+            print(f"⏭️  Ley '{law_info['name']}' sin cambios en su contenido")
         return parsed_data
 
-    def scrape_all_priority_laws(self) -> List[Dict]:
-        """Descarga todas las leyes prioritarias"""
-        results = []
+    def scrape_law(self, law_key: str) -> Optional[Dict]:
+        """Descarga y procesa una ley específica"""
+        if law_key not in self.PRIORITY_LAWS:
+            print(f"❌ Ley '{law_key}' no encontrada en lista prioritaria")
+            return None
+
+        result = self.crawler.fetch_all_sync([self.law_url(self.PRIORITY_LAWS[law_key])])[0]
+        return self._save_law(law_key, result)
 
+    def scrape_all_priority_laws(self) -> List[Dict]:
+        """
+        Descarga todas las leyes prioritarias en paralelo (con los límites
+        por host del crawler); las que no cambiaron no se vuelven a procesar
+        """
         print(f"\n🚀 Iniciando descarga de {len(self.PRIORITY_LAWS)} leyes prioritarias...\n")
 
+        urls = {law_key: self.law_url(law_info) for law_key, law_info in self.PRIORITY_LAWS.items()}
+        fetched = {result.url: result for result in self.crawler.fetch_all_sync(urls.values())}
+
+        results = []
         for idx, (law_key, law_info) in enumerate(self.PRIORITY_LAWS.items(), 1):
             print(f"[{idx}/{len(self.PRIORITY_LAWS)}] {law_info['name']}")
-
-            result = self.scrape_law(law_key)
+            result = self._save_law(law_key, fetched[urls[law_key]])
             if result:
                 results.append(result)
 
-            # Rate limiting: esperar entre requests
-            if idx < len(self.PRIORITY_LAWS):
-                time.sleep(2)  # 2 segundos entre requests
-
-        print(f"\n✅ Descarga completada: {len(results)} leyes guardadas\n")
+        stats = self.crawler.stats
+        print(f"\n✅ Descarga completada: {len(results)} leyes guardadas")
+        print(f"   {stats['downloaded']} descargadas, {stats['not_modified']} sin cambios (304), {stats['failed']} fallidas\n")
         return results
 
     def get_summary(self) -> Dict:
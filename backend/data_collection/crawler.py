@@ -0,0 +1,299 @@
+"""
+Crawler - Descargas HTTP async compartidas por los scrapers (BCN, DT, SERNAC)
+
+- Concurrencia limitada por host y un intervalo mínimo entre requests al
+  mismo host (cortesía con sitios públicos); Retry-After se respeta
+- Caché HTTP en disco (data/cache/http): cada respuesta guarda su ETag y
+  Last-Modified y la siguiente descarga es un GET condicional. Un 304
+  devuelve el cuerpo cacheado marcado como sin cambios
+- Reintentos con backoff ante 429, 5xx y errores de red
+
+Los scrapers son síncronos: fetch_all_sync corre el crawler en su propio
+event loop.
+
+Junto con write_json_if_changed, una ley que no cambió no reescribe su
+JSON y las etapas siguientes del pipeline (chunk, embed, upsert) se saltan.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+DEFAULT_CACHE_DIR = "data/cache/http"
+DEFAULT_USER_AGENT = "JusticiaAI-LegalBot/1.0 (Educational Purpose)"
+DEFAULT_PER_HOST_CONCURRENCY = 2
+DEFAULT_MIN_DELAY = 1.0  # Segundos entre inicios de request al mismo host
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 3
+MAX_RETRY_AFTER = 60.0
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class FetchResult:
+    """Resultado de una descarga"""
+    url: str
+    status: int  # 200, 304 o el último status de error (0 = error de red)
+    text: Optional[str] = None
+    changed: bool = True  # False si el contenido es el mismo de la descarga anterior
+    from_cache: bool = False
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.text is not None
+
+
+class HTTPCache:
+    """Cuerpos y validadores (ETag, Last-Modified) por URL, en disco"""
+
+    def __init__(self, cache_dir: Path = Path(DEFAULT_CACHE_DIR)):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Metadatos de la última respuesta (con "body") o None"""
+        meta_path, body_path = self._paths(url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            entry["body"] = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, url: str, body: bytes, headers: httpx.Headers, encoding: str):
+        meta_path, body_path = self._paths(url)
+        entry = {
+            "url": url,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "encoding": encoding,
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "fetched_at": time.time()
+        }
+        # Cuerpo primero: un metadato sin cuerpo no sirve, un cuerpo sin metadato se ignora
+        tmp_body = body_path.with_suffix(".tmp")
+        tmp_body.write_bytes(body)
+        tmp_body.replace(body_path)
+        tmp_meta = meta_path.with_suffix(".tmp")
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        tmp_meta.replace(meta_path)
+
+    def touch(self, url: str):
+        """Registra una revalidación (304) sin reescribir el cuerpo"""
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            entry["validated_at"] = time.time()
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+        except (OSError, ValueError):
+            pass
+
+
+class HostScheduler:
+    """Concurrencia máxima e intervalo mínimo entre requests, por host"""
+
+    def __init__(self, per_host_concurrency: int, min_delay: float):
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.min_delay = min_delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._next_start: Dict[str, float] = {}
+
+    def semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+            self._locks[host] = asyncio.Lock()
+        return self._semaphores[host]
+
+    async def wait_turn(self, host: str):
+        """Espera hasta que pase min_delay desde el último inicio de request al host"""
+        async with self._locks[host]:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, 0.0))
+            self._next_start[host] = start + self.min_delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def back_off(self, host: str, seconds: float):
+        """El host pidió esperar (429/503 con Retry-After): nadie le pide nada antes"""
+        self._next_start[host] = max(self._next_start.get(host, 0.0), time.monotonic() + seconds)
+
+
+def retry_after_seconds(headers: httpx.Headers) -> Optional[float]:
+    """Retry-After en segundos o como fecha HTTP"""
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return min(MAX_RETRY_AFTER, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        return min(MAX_RETRY_AFTER, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncCrawler:
+    """Descargas concurrentes y corteses con GET condicional y caché en disco"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = Path(DEFAULT_CACHE_DIR),
+        per_host_concurrency: int = DEFAULT_PER_HOST_CONCURRENCY,
+        min_delay: float = DEFAULT_MIN_DELAY,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = 1.0,
+        user_agent: str = DEFAULT_USER_AGENT,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Args:
+            cache_dir: Caché HTTP (None = sin caché ni GET condicional)
+            per_host_concurrency: Requests simultáneos máximos por host
+            min_delay: Segundos mínimos entre inicios de request al mismo host
+            timeout: Timeout por request
+            max_retries: Reintentos ante 429/5xx/errores de red
+            backoff_base: Base del backoff exponencial (segundos)
+            user_agent: User-Agent de los requests
+            transport: Transporte httpx (tests: httpx.ASGITransport)
+        """
+        self.cache = HTTPCache(cache_dir) if cache_dir is not None else None
+        self.per_host_concurrency = per_host_concurrency
+        self.min_delay = min_delay
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.user_agent = user_agent
+        self.transport = transport
+        self.stats = {"requests": 0, "not_modified": 0, "downloaded": 0, "retries": 0, "failed": 0}
+
+    def _conditional_headers(self, cached: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    async def _fetch(self, client: httpx.AsyncClient, scheduler: HostScheduler, url: str) -> FetchResult:
+        host = urlsplit(url).netloc
+        cached = self.cache.get(url) if self.cache else None
+        headers = self._conditional_headers(cached)
+        start = time.perf_counter()
+        last_status, last_error = 0, None
+
+        for attempt in range(self.max_retries + 1):
+            async with scheduler.semaphore(host):
+                await scheduler.wait_turn(host)
+                self.stats["requests"] += 1
+                try:
+                    response = await client.get(url, headers=headers)
+                except httpx.HTTPError as e:
+                    response, last_status, last_error = None, 0, str(e) or type(e).__name__
+
+            if response is not None:
+                last_status = response.status_code
+
+                if response.status_code == 304 and cached:
+                    self.stats["not_modified"] += 1
+                    self.cache.touch(url)
+                    return FetchResult(
+                        url, 304, cached["body"].decode(cached.get("encoding") or "utf-8", errors="replace"),
+                        changed=False, from_cache=True, seconds=time.perf_counter() - start
+                    )
+
+                if response.status_code == 200:
+                    self.stats["downloaded"] += 1
+                    body = response.content
+                    changed = not cached or cached.get("sha256") != hashlib.sha256(body).hexdigest()
+                    if self.cache:
+                        self.cache.put(url, body, response.headers, response.encoding or "utf-8")
+                    return FetchResult(url, 200, response.text, changed=changed, seconds=time.perf_counter() - start)
+
+                last_error = f"HTTP {response.status_code}"
+                if response.status_code not in RETRY_STATUS:
+                    break
+                wait = retry_after_seconds(response.headers)
+                if wait is not None:
+                    scheduler.back_off(host, wait)
+
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+
+        self.stats["failed"] += 1
+        return FetchResult(url, last_status, error=last_error, seconds=time.perf_counter() - start)
+
+    async def fetch_all(self, urls: Iterable[str]) -> List[FetchResult]:
+        """Descarga las URLs (sin repetir) y devuelve los resultados en el mismo orden"""
+        urls = list(dict.fromkeys(urls))
+        scheduler = HostScheduler(self.per_host_concurrency, self.min_delay)
+
+        async with httpx.AsyncClient(
+            transport=self.transport,
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": self.user_agent}
+        ) as client:
+            return list(await asyncio.gather(*(self._fetch(client, scheduler, url) for url in urls)))
+
+    def fetch_all_sync(self, urls: Iterable[str]) -> List[FetchResult]:
+        """fetch_all para código síncrono (los scrapers)"""
+        return asyncio.run(self.fetch_all(urls))
+
+
+def write_json_if_changed(path: Path, data: Dict, volatile: Iterable[str] = ("scraped_at",)) -> bool:
+    """
+    Escribe data como JSON solo si difiere del archivo existente, ignorando
+    campos volátiles (ej: la fecha de descarga). Así un archivo sin cambios
+    conserva su contenido y las etapas siguientes del pipeline se saltan.
+
+    Returns:
+        True si el archivo se escribió
+    """
+    path = Path(path)
+    volatile = set(volatile)
+
+    def stable(document: Dict) -> Dict:
+        return {key: value for key, value in document.items() if key not in volatile}
+
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if stable(json.load(f)) == stable(data):
+                    return False
+        except (OSError, ValueError):
+            pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+    return True
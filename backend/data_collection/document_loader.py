@@ -12,6 +12,10 @@ Uso:
     python document_loader.py                    # Procesar todos los documentos
     python document_loader.py --folder civil     # Solo carpeta civil
     python document_loader.py --file archivo.pdf # Solo un archivo
+    python document_loader.py --workers 16       # Extracción en 16 procesos
+
+Los archivos ya extraídos y sin cambios (según data/cache/extraction_manifest.json)
+no se vuelven a extraer.
 """
 
 import os
@@ -21,28 +25,58 @@ import re
 import argparse
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
-
-# Intentar importar dependencias opcionales
-try:
-    import PyPDF2
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+from typing import Dict, Iterator, List, Optional
+
+from data_collection.parallel_extractor import (
+    DEFAULT_MANIFEST_PATH,
+    DOCX_AVAILABLE,
+    PDF_AVAILABLE,
+    ExtractionManifest,
+    ParallelExtractor,
+    default_workers,
+    extract_docx_paragraphs,
+    extract_pdf_pages,
+    find_documents,
+    read_text_file,
+)
 
 
 class DocumentLoader:
     """Carga y procesa documentos legales de múltiples formatos"""
 
-    def __init__(self, output_dir: str = "data/raw/apuntes"):
+    def __init__(
+        self,
+        output_dir: str = "data/raw/apuntes",
+        workers: Optional[int] = None,
+        manifest_path: str = DEFAULT_MANIFEST_PATH
+    ):
+        """
+        Args:
+            output_dir: Carpeta base de los JSON generados
+            workers: Procesos para extraer texto (default: EXTRACT_WORKERS o 1)
+            manifest_path: Manifiesto de archivos ya extraídos
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers or default_workers()
+        self.manifest = ExtractionManifest(Path(manifest_path))
+
+    @staticmethod
+    def build_document(file_path: Path, units: List[str]) -> Dict:
+        """Documento a partir de las unidades extraídas (páginas, párrafos o contenido)"""
+        fmt = file_path.suffix[1:].lower()
+        doc = {"title": file_path.stem}
+
+        if fmt == "pdf":
+            doc.update(content="\n\n".join(text for text in units if text), format="pdf", pages=len(units))
+        elif fmt == "docx":
+            doc.update(content="\n\n".join(units), format="docx", paragraphs=len(units))
+        else:
+            content = units[0] if units else ""
+            doc.update(content=content, format=fmt, characters=len(content))
+
+        doc.update(file_path=str(file_path), loaded_at=datetime.now().isoformat())
+        return doc
 
     def load_pdf(self, file_path: Path) -> Dict:
         """
@@ -53,29 +87,9 @@ class DocumentLoader:
             return None
 
         try:
-            text_content = []
-
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                num_pages = len(pdf_reader.pages)
-
-                print(f"   📄 {num_pages} páginas encontradas")
-
-                for page_num, page in enumerate(pdf_reader.pages):
-                    text = page.extract_text()
-                    if text:
-                        text_content.append(text)
-
-            full_text = "\n\n".join(text_content)
-
-            return {
-                "title": file_path.stem,
-                "content": full_text,
-                "format": "pdf",
-                "pages": num_pages,
-                "file_path": str(file_path),
-                "loaded_at": datetime.now().isoformat()
-            }
+            pages = extract_pdf_pages(file_path)
+            print(f"   📄 {len(pages)} páginas encontradas")
+            return self.build_document(file_path, pages)
 
         except Exception as e:
             print(f"   ❌ Error leyendo PDF: {e}")
@@ -90,23 +104,7 @@ class DocumentLoader:
             return None
 
         try:
-            doc = Document(file_path)
-            paragraphs = []
-
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    paragraphs.append(para.text)
-
-            full_text = "\n\n".join(paragraphs)
-
-            return {
-                "title": file_path.stem,
-                "content": full_text,
-                "format": "docx",
-                "paragraphs": len(paragraphs),
-                "file_path": str(file_path),
-                "loaded_at": datetime.now().isoformat()
-            }
+            return self.build_document(file_path, extract_docx_paragraphs(file_path))
 
         except Exception as e:
             print(f"   ❌ Error leyendo DOCX: {e}")
@@ -117,34 +115,11 @@ class DocumentLoader:
         Carga un archivo de texto plano (.txt o .md)
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            return {
-                "title": file_path.stem,
-                "content": content,
-                "format": file_path.suffix[1:],  # txt o md
-                "characters": len(content),
-                "file_path": str(file_path),
-                "loaded_at": datetime.now().isoformat()
-            }
-
-        except UnicodeDecodeError:
-            # Intentar con latin-1 si UTF-8 falla
-            try:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    content = f.read()
-                return {
-                    "title": file_path.stem,
-                    "content": content,
-                    "format": file_path.suffix[1:],
-                    "characters": len(content),
-                    "file_path": str(file_path),
-                    "loaded_at": datetime.now().isoformat()
-                }
-            except Exception as e:
-                print(f"   ❌ Error leyendo archivo: {e}")
-                return None
+            return self.build_document(file_path, [read_text_file(file_path)])
+
+        except Exception as e:
+            print(f"   ❌ Error leyendo archivo: {e}")
+            return None
 
     def load_file(self, file_path: Path, category: str = "general") -> Optional[Dict]:
         """
@@ -165,48 +140,101 @@ class DocumentLoader:
             return None
 
         if data:
-            data["category"] = category
-            data["source"] = "apuntes_abogado"
-
-            # Estadísticas
-            content_length = len(data.get("content", ""))
-            words = len(data.get("content", "").split())
-            print(f"   ✅ {words:,} palabras extraídas")
+            self._finish_document(data, category)
 
         return data
 
-    def process_folder(self, folder_path: Path, category: str) -> List[Dict]:
+    @staticmethod
+    def _finish_document(data: Dict, category: str):
+        data["category"] = category
+        data["source"] = "apuntes_abogado"
+
+        # Estadísticas
+        words = len(data.get("content", "").split())
+        print(f"   ✅ {words:,} palabras extraídas")
+
+    def output_file(self, file_path: Path, category: str) -> Path:
+        return self.output_dir / category / f"{file_path.stem}.json"
+
+    def _iter_documents(self, folder_path: Path, category: str, skip_unchanged: bool) -> Iterator[tuple]:
         """
-        Procesa todos los archivos de una carpeta
+        (archivo, documento, desde_cache). Con skip_unchanged, los archivos
+        sin cambios según el manifiesto se leen del JSON ya generado en vez
+        de volver a extraerse.
         """
-        documents = []
-
-        # Buscar archivos soportados
-        patterns = ['*.pdf', '*.docx', '*.txt', '*.md']
-        files = []
-        for pattern in patterns:
-            files.extend(folder_path.glob(pattern))
+        files = find_documents(folder_path)
 
         if not files:
             print(f"   ⚠️  No se encontraron documentos en {folder_path}")
-            return documents
+            return
 
         print(f"\n📂 Procesando carpeta: {category.upper()}")
         print(f"   {len(files)} archivos encontrados")
         print("-" * 40)
 
-        for file_path in sorted(files):
-            doc = self.load_file(file_path, category)
-            if doc:
+        pending = []
+        for file_path in files:
+            output_file = self.output_file(file_path, category)
+            if skip_unchanged and output_file.exists() and self.manifest.is_unchanged(file_path):
+                with open(output_file, 'r', encoding='utf-8') as f:
+                    yield file_path, json.load(f), True
+            else:
+                pending.append(file_path)
+
+        if len(files) > len(pending):
+            print(f"   ⏭️  {len(files) - len(pending)} sin cambios desde la última extracción")
+
+        if self.workers == 1:
+            for file_path in pending:
+                doc = self.load_file(file_path, category)
+                if doc:
+                    yield file_path, doc, False
+            return
+
+        # Modo paralelo: el pool extrae, el documento se arma acá
+        for result in ParallelExtractor(self.workers).extract(pending):
+            print(f"📥 Cargado: {result.path.name} ({result.seconds:.1f}s)")
+            if result.error:
+                print(f"   ❌ Error leyendo {result.path.suffix[1:].upper()}: {result.error}")
+                continue
+            doc = self.build_document(result.path, result.units)
+            self._finish_document(doc, category)
+            yield result.path, doc, False
+
+    def iter_folder(self, folder_path: Path, category: str) -> Iterator[tuple]:
+        """
+        Carga los documentos de una carpeta de a uno, sin acumularlos
+        (lo usa el pipeline en streaming)
+
+        Yields:
+            (archivo, documento)
+        """
+        for file_path, doc, _ in self._iter_documents(folder_path, category, skip_unchanged=False):
+            yield file_path, doc
+
+    def process_folder(self, folder_path: Path, category: str) -> List[Dict]:
+        """
+        Procesa todos los archivos de una carpeta (salta los que no cambiaron)
+        """
+        documents = []
+
+        try:
+            for file_path, doc, cached in self._iter_documents(folder_path, category, skip_unchanged=True):
                 documents.append(doc)
+                if cached:
+                    continue
 
                 # Guardar JSON individual
-                output_file = self.output_dir / category / f"{file_path.stem}.json"
+                output_file = self.output_file(file_path, category)
                 output_file.parent.mkdir(parents=True, exist_ok=True)
 
                 with open(output_file, 'w', encoding='utf-8') as f:
                     json.dump(doc, f, ensure_ascii=False, indent=2)
 
+                self.manifest.record(file_path, output=str(output_file), pages=doc.get("pages", 0))
+        finally:
+            self.manifest.save()
+
         return documents
 
     def process_all(self) -> Dict:
@@ -273,6 +301,8 @@ def main():
     parser.add_argument("--folder", type=str, help="Procesar solo una carpeta")
     parser.add_argument("--file", type=str, help="Procesar solo un archivo")
     parser.add_argument("--check", action="store_true", help="Verificar dependencias")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos para extraer texto (default: EXTRACT_WORKERS o 1)")
 
     args = parser.parse_args()
 
@@ -280,7 +310,7 @@ def main():
         check_dependencies()
         return
 
-    loader = DocumentLoader()
+    loader = DocumentLoader(workers=args.workers)
 
     if args.file:
         file_path = Path(args.file)
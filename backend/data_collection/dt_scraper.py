@@ -7,8 +7,6 @@ Fuente oficial: https://www.dt.gob.cl
 - Guías laborales
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import time
 from pathlib import Path
@@ -16,6 +14,8 @@ from datetime import datetime
 from typing import List, Dict, Optional
 import re
 
+from data_collection.crawler import AsyncCrawler, write_json_if_changed
+
 class DTScraper:
     """Scraper para dictámenes y contenido de la Dirección del Trabajo"""
 
@@ -45,13 +45,11 @@ class DTScraper:
         }
     }
 
-    def __init__(self, output_dir: str = "data/raw/dt"):
+    def __init__(self, output_dir: str = "data/raw/dt", crawler: Optional[AsyncCrawler] = None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'JusticiaAI-LegalBot/1.0 (Educational Purpose)'
-        })
+        # Crawler compartido (GET condicional, límites por host) para las páginas del sitio
+        self.crawler = crawler or AsyncCrawler()
 
     def scrape_guias_laborales(self) -> List[Dict]:
         """
@@ -249,13 +247,13 @@ class DTScraper:
             "scraped_at": datetime.now().isoformat()
         })
 
-        # Guardar guías
+        # Guardar guías (una guía sin cambios no se reescribe: el pipeline la salta)
         for idx, guia in enumerate(guias, 1):
             output_file = self.output_dir / f"guia_{idx}_{guia['category']}.json"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(guia, f, ensure_ascii=False, indent=2)
-
-            print(f"✅ Guía guardada: {guia['title']}")
+            if write_json_if_changed(output_file, guia):
+                print(f"✅ Guía guardada: {guia['title']}")
+            else:
+                print(f"⏭️  Guía sin cambios: {guia['title']}")
 
         return guias
 
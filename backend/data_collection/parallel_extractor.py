@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Parallel Extractor - Extracción de texto de apuntes en varios procesos
+
+Extraer texto de un PDF con PyPDF2 es trabajo de CPU puro: en un solo
+proceso, una carpeta de manuales gruesos usa un núcleo y deja el resto
+ocioso. Este módulo reparte la extracción en un pool de procesos:
+
+- por archivo (cada PDF, Word o texto es una tarea)
+- por rango de páginas para PDFs muy grandes (un manual de 1.500 páginas
+  se parte en tareas de PAGES_PER_TASK páginas)
+
+El manifiesto (data/cache/extraction_manifest.json) guarda ruta, tamaño,
+mtime y sha256 de cada archivo ya extraído; en la siguiente corrida los
+archivos sin cambios se saltan.
+
+Uso:
+    python -m data_collection.parallel_extractor data/raw/apuntes/civil
+    python -m data_collection.parallel_extractor data/raw/apuntes --workers 16
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from data_processing.dag_runner import sha256_file
+
+try:
+    import PyPDF2
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+try:
+    from docx import Document
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+
+SUPPORTED_PATTERNS = ["*.pdf", "*.docx", "*.txt", "*.md"]
+DEFAULT_MANIFEST_PATH = "data/cache/extraction_manifest.json"
+
+# PDFs con más páginas que esto se parten por rangos
+DEFAULT_SPLIT_THRESHOLD = 200
+DEFAULT_PAGES_PER_TASK = 100
+
+# Tarea: (archivo, página inicial, página final); (archivo, None, None) = archivo completo
+Task = Tuple[str, Optional[int], Optional[int]]
+
+
+def default_workers() -> int:
+    """EXTRACT_WORKERS del entorno, o un proceso (modo secuencial)"""
+    return max(1, int(os.getenv("EXTRACT_WORKERS", "1")))
+
+
+def find_documents(folder: Path) -> List[Path]:
+    """Archivos soportados de una carpeta (sin recursión), ordenados"""
+    files = []
+    for pattern in SUPPORTED_PATTERNS:
+        files.extend(Path(folder).glob(pattern))
+    return sorted(files)
+
+
+# ----------------------------------------------------------------------
+# Extracción (funciones de módulo: se ejecutan en los procesos del pool)
+# ----------------------------------------------------------------------
+
+def pdf_page_count(file_path: Path) -> int:
+    with open(file_path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_pdf_pages(file_path: Path, start: int = 0, end: Optional[int] = None) -> List[str]:
+    """Texto de las páginas [start, end) de un PDF ('' si una página no tiene texto)"""
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        pages = reader.pages
+        end = len(pages) if end is None else min(end, len(pages))
+        return [pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def extract_docx_paragraphs(file_path: Path) -> List[str]:
+    """Párrafos con texto de un .docx"""
+    return [para.text for para in Document(file_path).paragraphs if para.text.strip()]
+
+
+def read_text_file(file_path: Path) -> str:
+    """Contenido de un .txt/.md (UTF-8, o latin-1 si falla)"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        with open(file_path, 'r', encoding='latin-1') as f:
+            return f.read()
+
+
+def run_task(task: Task) -> Tuple[Task, List[str], Optional[str]]:
+    """
+    Ejecuta una tarea de extracción
+
+    Returns:
+        (tarea, unidades de texto, error). Las unidades son páginas (PDF),
+        párrafos (Word) o el contenido completo (texto plano).
+    """
+    path_str, start, end = task
+    file_path = Path(path_str)
+    suffix = file_path.suffix.lower()
+
+    try:
+        if suffix == ".pdf":
+            if not PDF_AVAILABLE:
+                return task, [], "PyPDF2 no instalado. Ejecuta: pip install PyPDF2"
+            return task, extract_pdf_pages(file_path, start or 0, end), None
+        if suffix == ".docx":
+            if not DOCX_AVAILABLE:
+                return task, [], "python-docx no instalado. Ejecuta: pip install python-docx"
+            return task, extract_docx_paragraphs(file_path), None
+        if suffix in (".txt", ".md"):
+            return task, [read_text_file(file_path)], None
+        return task, [], f"Formato no soportado: {suffix}"
+    except Exception as e:
+        return task, [], str(e)
+
+
+# ----------------------------------------------------------------------
+# Manifiesto
+# ----------------------------------------------------------------------
+
+class ExtractionManifest:
+    """Archivos ya extraídos: ruta -> tamaño, mtime, sha256 y datos de la extracción"""
+
+    def __init__(self, path: Path = Path(DEFAULT_MANIFEST_PATH)):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️  Manifiesto de extracción ilegible, se regenera: {self.path}")
+
+    @staticmethod
+    def key(file_path: Path) -> str:
+        return str(Path(file_path).resolve())
+
+    def get(self, file_path: Path) -> Optional[Dict]:
+        with self._lock:
+            return self.entries.get(self.key(file_path))
+
+    def is_unchanged(self, file_path: Path) -> bool:
+        """
+        True si el archivo es igual al de la última extracción. Si solo
+        cambió el mtime (ej: se copió de nuevo), se compara el hash y se
+        actualiza la entrada.
+        """
+        entry = self.get(file_path)
+        if not entry:
+            return False
+
+        stat = Path(file_path).stat()
+        if entry["size"] != stat.st_size:
+            return False
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+
+        if sha256_file(file_path) != entry["sha256"]:
+            return False
+        with self._lock:
+            entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def record(self, file_path: Path, **info):
+        """Registra una extracción exitosa (info: páginas, archivo de salida, ...)"""
+        stat = Path(file_path).stat()
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256_file(file_path),
+            "extracted_at": datetime.now().isoformat()
+        }
+        entry.update(info)
+        with self._lock:
+            self.entries[self.key(file_path)] = entry
+
+    def save(self):
+        """Escritura atómica"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.path)
+
+
+# ----------------------------------------------------------------------
+# Pool
+# ----------------------------------------------------------------------
+
+@dataclass
+class ExtractionResult:
+    """Texto extraído de un archivo"""
+    path: Path
+    units: List[str] = field(default_factory=list)
+    pages: int = 0  # Páginas del PDF (0 para otros formatos)
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+class ParallelExtractor:
+    """Reparte la extracción de texto por archivo y por rango de páginas en un pool de procesos"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        split_threshold: int = DEFAULT_SPLIT_THRESHOLD,
+        pages_per_task: int = DEFAULT_PAGES_PER_TASK
+    ):
+        """
+        Args:
+            max_workers: Procesos del pool (1 = en el proceso actual)
+            split_threshold: PDFs con más páginas se parten por rangos
+            pages_per_task: Páginas por tarea al partir un PDF
+        """
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.split_threshold = split_threshold
+        self.pages_per_task = max(1, pages_per_task)
+
+    def plan(self, files: Iterable[Path]) -> Tuple[List[Task], Dict[str, int]]:
+        """
+        Tareas a ejecutar y páginas por PDF. Los PDFs grandes van primero
+        para que no queden solos al final de la corrida.
+        """
+        sized = []
+        page_counts = {}
+
+        for file_path in files:
+            path_str = str(file_path)
+            pages = 0
+            if PDF_AVAILABLE and Path(file_path).suffix.lower() == ".pdf":
+                try:
+                    pages = pdf_page_count(file_path)
+                except Exception:
+                    pages = 0  # El worker reportará el error
+                page_counts[path_str] = pages
+
+            if pages > self.split_threshold:
+                ranges = [
+                    (path_str, start, min(start + self.pages_per_task, pages))
+                    for start in range(0, pages, self.pages_per_task)
+                ]
+            else:
+                ranges = [(path_str, None, None)]
+            sized.append((pages, ranges))
+
+        sized.sort(key=lambda item: -item[0])
+        tasks = [task for _, ranges in sized for task in ranges]
+        return tasks, page_counts
+
+    def extract(self, files: Iterable[Path]) -> Iterator[ExtractionResult]:
+        """
+        Extrae los archivos y entrega cada uno apenas terminan todas sus
+        tareas (en orden de término, no de entrada)
+        """
+        tasks, page_counts = self.plan(files)
+        if not tasks:
+            return
+
+        remaining: Dict[str, int] = {}
+        parts: Dict[str, List[Tuple[int, List[str]]]] = {}
+        errors: Dict[str, str] = {}
+        started: Dict[str, float] = {}
+        for path_str, _, _ in tasks:
+            remaining[path_str] = remaining.get(path_str, 0) + 1
+
+        def collect(task, units, error) -> Optional[ExtractionResult]:
+            path_str, start, _ = task
+            parts.setdefault(path_str, []).append((start or 0, units))
+            if error:
+                errors[path_str] = error
+            remaining[path_str] -= 1
+            if remaining[path_str]:
+                return None
+
+            ordered = [unit for _, chunk in sorted(parts.pop(path_str), key=lambda p: p[0]) for unit in chunk]
+            return ExtractionResult(
+                path=Path(path_str),
+                units=[] if path_str in errors else ordered,
+                pages=page_counts.get(path_str, len(ordered) if path_str.lower().endswith(".pdf") else 0),
+                seconds=time.perf_counter() - started[path_str],
+                error=errors.pop(path_str, None)
+            )
+
+        if self.max_workers == 1:
+            for task in tasks:
+                started.setdefault(task[0], time.perf_counter())
+                result = collect(*run_task(task))
+                if result:
+                    yield result
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            # En vuelo: 2 tareas por proceso (el resto espera en la lista, no en el pool)
+            queue = iter(tasks)
+            in_flight = set()
+
+            def submit_next() -> bool:
+                task = next(queue, None)
+                if task is None:
+                    return False
+                started.setdefault(task[0], time.perf_counter())
+                in_flight.add(pool.submit(run_task, task))
+                return True
+
+            for _ in range(self.max_workers * 2):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    submit_next()
+                    result = collect(*future.result())
+                    if result:
+                        yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrae texto de apuntes en paralelo y mide páginas/s")
+    parser.add_argument("folder", type=str, help="Carpeta con PDFs, Word o texto (recorre subcarpetas)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Procesos del pool")
+    parser.add_argument("--pages-per-task", type=int, default=DEFAULT_PAGES_PER_TASK)
+    parser.add_argument("--split-threshold", type=int, default=DEFAULT_SPLIT_THRESHOLD)
+    args = parser.parse_args()
+
+    folder = Path(args.folder)
+    files = find_documents(folder) + [f for sub in sorted(folder.iterdir()) if sub.is_dir() for f in find_documents(sub)]
+    if not files:
+        print(f"⚠️  No se encontraron documentos en {folder}")
+        return
+
+    extractor = ParallelExtractor(args.workers, args.split_threshold, args.pages_per_task)
+    print(f"📂 {len(files)} archivos, {extractor.max_workers} procesos")
+
+    start = time.perf_counter()
+    pages, failed = 0, 0
+    for result in extractor.extract(files):
+        if result.error:
+            failed += 1
+            print(f"   ❌ {result.path.name}: {result.error}")
+            continue
+        pages += result.pages
+        print(f"   ✅ {result.path.name}: {result.pages} páginas en {result.seconds:.2f}s")
+    elapsed = time.perf_counter() - start
+
+    print(f"\n📊 {pages} páginas en {elapsed:.2f}s ({pages / elapsed if elapsed else 0:.1f} páginas/s), {failed} fallidos")
+
+
+if __name__ == "__main__":
+    main()
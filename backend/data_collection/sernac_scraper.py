@@ -7,26 +7,24 @@ Fuente oficial: https://www.sernac.cl
 - Casos frecuentes
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import time
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from data_collection.crawler import AsyncCrawler, write_json_if_changed
+
 class SERNACScraper:
     """Scraper para contenido de derechos del consumidor desde SERNAC"""
 
     BASE_URL = "https://www.sernac.cl"
 
-    def __init__(self, output_dir: str = "data/raw/sernac"):
+    def __init__(self, output_dir: str = "data/raw/sernac", crawler: Optional[AsyncCrawler] = None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'JusticiaAI-LegalBot/1.0 (Educational Purpose)'
-        })
+        # Crawler compartido (GET condicional, límites por host) para las páginas del sitio
+        self.crawler = crawler or AsyncCrawler()
 
     def scrape_consumer_guides(self) -> List[Dict]:
         """
@@ -222,13 +220,13 @@ class SERNACScraper:
             "scraped_at": datetime.now().isoformat()
         })
 
-        # Guardar guías
+        # Guardar guías (una guía sin cambios no se reescribe: el pipeline la salta)
         for idx, guia in enumerate(guias, 1):
             output_file = self.output_dir / f"guia_{idx}_{guia['category']}.json"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(guia, f, ensure_ascii=False, indent=2)
-
-            print(f"✅ Guía guardada: {guia['title']}")
+            if write_json_if_changed(output_file, guia):
+                print(f"✅ Guía guardada: {guia['title']}")
+            else:
+                print(f"⏭️  Guía sin cambios: {guia['title']}")
 
         return guias
 
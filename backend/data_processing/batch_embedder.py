@@ -0,0 +1,356 @@
+"""
+Batch Embedder - Motor async de embeddings con concurrencia acotada
+
+Reemplaza el envío secuencial de batches de 100 textos con sleep fijo:
+- Batches empaquetados por tokens estimados (no por cantidad de textos)
+- Varias requests en vuelo, con un límite que baja a la mitad ante un 429
+  y sube de a uno tras respuestas exitosas (AIMD)
+- Espera según los headers de rate limit de OpenAI (retry-after,
+  x-ratelimit-reset-*) y pausa preventiva si quedan pocos tokens
+- Un batch que falla se reintenta texto por texto: un input inválido no
+  descarta el resto del batch
+- Cada batch completado se entrega a on_batch (el Embedder lo guarda en el
+  embedding store), así una corrida interrumpida retoma donde quedó
+
+Habla directo con POST {base_url}/embeddings vía httpx, así que se puede
+probar contra un servidor local falso (benchmarks/fake_embeddings_server.py).
+"""
+
+import asyncio
+import os
+import random
+import re
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from utils.text import estimate_tokens
+
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# Límites por request de la API de embeddings
+MAX_BATCH_ITEMS = 2048
+DEFAULT_MAX_BATCH_TOKENS = 60_000
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 6
+
+# Backoff exponencial cuando la respuesta no trae headers de espera
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+
+# Tope de 429 por batch (evita esperar para siempre si la cuota está agotada)
+MAX_THROTTLE_RETRIES = 50
+
+# Respuestas exitosas seguidas antes de subir el límite de concurrencia
+SUCCESSES_PER_INCREASE = 4
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Convierte los headers de OpenAI a segundos:
+    "20ms" -> 0.02, "1s" -> 1.0, "6m0s" -> 360.0, "2.5" -> 2.5
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_delay_from_headers(headers: httpx.Headers) -> Optional[float]:
+    """Espera sugerida por el servidor (None si no la informa)"""
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+
+    delay = parse_reset_duration(headers.get("retry-after"))
+    if delay is not None:
+        return delay
+
+    resets = [
+        parse_reset_duration(headers.get(name))
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+def pack_batches(
+    items: Sequence[Tuple[str, str]],
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+    max_batch_items: int = MAX_BATCH_ITEMS
+) -> List[List[Tuple[str, str, int]]]:
+    """
+    Agrupa (clave, texto) en batches por tokens estimados
+
+    Returns:
+        Lista de batches de (clave, texto, tokens)
+    """
+    batches: List[List[Tuple[str, str, int]]] = []
+    current: List[Tuple[str, str, int]] = []
+    current_tokens = 0
+
+    for key, text in items:
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > max_batch_tokens or len(current) >= max_batch_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((key, text, tokens))
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+class AdaptiveLimiter:
+    """Límite de requests en vuelo que se ajusta con AIMD"""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= SUCCESSES_PER_INCREASE and self.limit < self.max_concurrency:
+            self.limit += 1
+            self._successes = 0
+
+    def on_throttle(self):
+        self.limit = max(1, self.limit // 2)
+        self._successes = 0
+
+
+class BatchEmbeddingEngine:
+    """Motor async de embeddings por batches"""
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "text-embedding-3-small",
+        dimensions: Optional[int] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_batch_items: int = MAX_BATCH_ITEMS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        timeout: float = 60.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Args:
+            api_key: API key de OpenAI
+            model: Modelo de embeddings
+            dimensions: Dimensiones pedidas a la API (None = las del modelo)
+            base_url: URL base (default OPENAI_BASE_URL o la de OpenAI)
+            max_concurrency: Máximo de requests en vuelo
+            max_batch_tokens: Tokens estimados por request
+            max_batch_items: Textos por request
+            max_retries: Reintentos por batch ante 5xx/errores de red (los 429 tienen su propio tope)
+            timeout: Timeout por request (segundos)
+            transport: Transport httpx (tests / servidor falso en proceso)
+        """
+        self.api_key = api_key
+        self.model = model
+        self.dimensions = dimensions
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.transport = transport
+
+        self._pause_until = 0.0
+        self._limiter: Optional[AdaptiveLimiter] = None
+        self.stats: Dict = {}
+
+    # ------------------------------------------------------------------
+    # Rate limit
+    # ------------------------------------------------------------------
+
+    async def _wait_for_window(self):
+        """Espera si el servidor pidió pausar (429 o pocos tokens restantes)"""
+        while True:
+            delay = self._pause_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def _pause(self, seconds: float):
+        self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def _observe_headers(self, headers: httpx.Headers, next_tokens: int):
+        """Pausa preventiva si los tokens restantes no alcanzan para otro batch"""
+        remaining = headers.get("x-ratelimit-remaining-tokens")
+        if remaining is None:
+            return
+        try:
+            remaining_tokens = int(remaining)
+        except ValueError:
+            return
+        if remaining_tokens < next_tokens:
+            reset = parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+            if reset:
+                self._pause(reset)
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial con jitter"""
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    async def _request(self, client: httpx.AsyncClient, texts: List[str]) -> httpx.Response:
+        payload = {"model": self.model, "input": texts}
+        if self.dimensions:
+            payload["dimensions"] = self.dimensions
+        return await client.post("/embeddings", json=payload)
+
+    async def _run_batch(
+        self,
+        client: httpx.AsyncClient,
+        batch: List[Tuple[str, str, int]],
+        on_batch: Optional[Callable[[List[Tuple[str, List[float]]]], None]],
+        vectors: Dict[str, List[float]],
+        failed: Dict[str, str]
+    ):
+        """Envía un batch con reintentos; si no se recupera, reintenta texto por texto"""
+        batch_tokens = sum(tokens for _, _, tokens in batch)
+        error = "sin respuesta"
+        attempt = 0
+        throttles = 0
+
+        # Los 429 no consumen los reintentos por error: el servidor indica cuánto esperar
+        while attempt <= self.max_retries and throttles <= MAX_THROTTLE_RETRIES:
+            try:
+                async with self._limiter:
+                    # Dentro del slot: si otra request recibió un 429 mientras
+                    # esperábamos turno, respetar la pausa antes de enviar
+                    await self._wait_for_window()
+                    self.stats["requests"] += 1
+                    response = await self._request(client, [text for _, text, _ in batch])
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code == 200:
+                data = sorted(response.json()["data"], key=lambda item: item["index"])
+                pairs = [(key, item["embedding"]) for (key, _, _), item in zip(batch, data)]
+                vectors.update(pairs)
+                if on_batch is not None:
+                    on_batch(pairs)
+
+                self._limiter.on_success()
+                self._observe_headers(response.headers, batch_tokens)
+                self.stats["embedded"] += len(pairs)
+                self.stats["tokens"] += batch_tokens
+                return
+
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+            if response.status_code not in RETRYABLE_STATUS:
+                break
+
+            self.stats["retries"] += 1
+            delay = retry_delay_from_headers(response.headers)
+            if response.status_code == 429:
+                self.stats["throttled"] += 1
+                self._limiter.on_throttle()
+                self._pause(delay if delay is not None else self._backoff(throttles))
+                throttles += 1
+            else:
+                await asyncio.sleep(delay if delay is not None else self._backoff(attempt))
+                attempt += 1
+
+        if len(batch) > 1:
+            # Reintento por texto: aísla el input que falla
+            self.stats["split_batches"] += 1
+            await asyncio.gather(*(
+                self._run_batch(client, [item], on_batch, vectors, failed) for item in batch
+            ))
+            return
+
+        key = batch[0][0]
+        failed[key] = error
+        print(f"   ⚠️  Embedding fallido ({key[:12]}…): {error}")
+
+    async def embed(
+        self,
+        items: Sequence[Tuple[str, str]],
+        on_batch: Optional[Callable[[List[Tuple[str, List[float]]]], None]] = None
+    ) -> Dict:
+        """
+        Embebe (clave, texto)
+
+        Args:
+            items: Pares (clave, texto); la clave identifica el resultado
+            on_batch: Se llama con [(clave, vector)] por cada batch completado
+
+        Returns:
+            {"vectors": {clave: vector}, "failed": {clave: error}, "stats": {...}}
+        """
+        batches = pack_batches(items, self.max_batch_tokens, self.max_batch_items)
+        vectors: Dict[str, List[float]] = {}
+        failed: Dict[str, str] = {}
+
+        self._limiter = AdaptiveLimiter(self.max_concurrency)
+        self._pause_until = 0.0
+        self.stats = {
+            "batches": len(batches),
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "split_batches": 0,
+            "embedded": 0,
+            "tokens": 0
+        }
+
+        start = time.perf_counter()
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=self.timeout,
+            transport=self.transport,
+            limits=httpx.Limits(max_connections=self.max_concurrency)
+        ) as client:
+            await asyncio.gather(*(
+                self._run_batch(client, batch, on_batch, vectors, failed) for batch in batches
+            ))
+
+        self.stats["failed"] = len(failed)
+        self.stats["seconds"] = round(time.perf_counter() - start, 3)
+        return {"vectors": vectors, "failed": failed, "stats": dict(self.stats)}
@@ -0,0 +1,325 @@
+"""
+Chunker - Motor único de chunking para textos legales
+
+- Mide el tamaño en tokens (tiktoken si está instalado, si no ~4 caracteres
+  por token), no en caracteres
+- Respeta la estructura: nunca corta dentro de un inciso o una oración si
+  cabe entera, y los encabezados (Título, Capítulo, Párrafo, Artículo)
+  abren siempre un chunk nuevo (un título sin contenido propio va junto
+  con la sección que lo sigue)
+- Solapamiento real entre chunks consecutivos de una misma sección, en
+  unidades completas (incisos u oraciones), sin cruzar encabezados
+- Reparte cada sección en chunks parejos en vez de dejar un resto diminuto
+
+Una sola pasada por el texto: cada unidad se cuenta una vez y el texto de
+cada chunk se arma con un join al final, sin concatenaciones repetidas.
+
+Uso (histogramas para calibrar tamaño de índice vs recall):
+    python -m data_processing.chunker --stats data/processed
+    python -m data_processing.chunker data/raw/bcn --max-tokens 128 256 512
+"""
+
+import argparse
+import json
+import math
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+from utils.text import estimate_tokens
+
+
+DEFAULT_MAX_TOKENS = 256
+DEFAULT_OVERLAP_TOKENS = 40
+# Encoding de text-embedding-3-small
+DEFAULT_ENCODING = "cl100k_base"
+
+# Encabezados al inicio de línea: abren un chunk nuevo
+HEADING_PATTERN = re.compile(
+    r'^(LIBRO|T[ÍI]TULO|CAP[ÍI]TULO|P[ÁA]RRAFO|SECCI[ÓO]N)\b|^(Art[íi]culo|Art\.)\s*\d+',
+    re.IGNORECASE
+)
+# Incisos y numerales al inicio de línea ("1.-", "a)", "2°"): unidad propia
+INCISO_PATTERN = re.compile(r'^(\d+[\.\-°º)]+|[a-zñ]\)|[ivx]+\))\s', re.IGNORECASE)
+# Fin de oración: punto seguido de espacio y mayúscula
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?;:])\s+(?=[A-ZÁÉÍÓÚÑ¿¡0-9])')
+
+# Líneas más cortas que esto y sin punto final son títulos: se unen a la sección siguiente
+TITLE_LINE_CHARS = 80
+
+HISTOGRAM_EDGES = [0, 32, 64, 128, 192, 256, 384, 512, 768, 1024]
+
+
+class TokenCounter:
+    """Cuenta tokens con tiktoken, o los estima si no está instalado"""
+
+    def __init__(self, encoding: str = DEFAULT_ENCODING):
+        self.exact = TIKTOKEN_AVAILABLE
+        self._encoding = tiktoken.get_encoding(encoding) if TIKTOKEN_AVAILABLE else None
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return estimate_tokens(text)
+
+
+@dataclass
+class Unit:
+    """Pieza indivisible de texto (inciso, oración o ventana de palabras)"""
+    text: str
+    tokens: int
+    sep: str = "\n\n"  # Separador con la unidad anterior
+
+
+class Chunker:
+    """Divide textos legales en chunks por presupuesto de tokens"""
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+        counter: Optional[TokenCounter] = None
+    ):
+        """
+        Args:
+            max_tokens: Tamaño máximo de cada chunk en tokens
+            overlap_tokens: Tokens de la sección que se repiten al inicio del chunk siguiente
+            counter: Contador de tokens (default: tiktoken o estimación)
+        """
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens debe ser menor que max_tokens")
+
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.counter = counter or TokenCounter()
+
+    # ------------------------------------------------------------------
+    # Segmentación
+    # ------------------------------------------------------------------
+
+    def _segments(self, text: str) -> List[Tuple[Optional[str], List[str]]]:
+        """
+        Secciones del texto: (encabezado, párrafos). Un encabezado al inicio
+        de línea abre una sección; una línea en blanco o un inciso numerado
+        abre un párrafo.
+        """
+        segments: List[Tuple[Optional[str], List[str]]] = [(None, [])]
+        lines: List[str] = []
+
+        def close_paragraph():
+            if lines:
+                segments[-1][1].append("\n".join(lines))
+                lines.clear()
+
+        # La sección abierta es solo un título (ej: "TÍTULO I" + "De las personas")
+        title_block = False
+
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line:
+                close_paragraph()
+                continue
+
+            is_title = len(line) < TITLE_LINE_CHARS and not line.endswith((".", ":", ";"))
+            if HEADING_PATTERN.match(line) and not title_block:
+                close_paragraph()
+                segments.append((line[:120], []))
+                title_block = is_title
+            elif HEADING_PATTERN.match(line):
+                # Encabezados anidados: van juntos con el contenido que sigue
+                title_block = is_title
+            else:
+                if INCISO_PATTERN.match(line):
+                    close_paragraph()
+                title_block = title_block and is_title
+            lines.append(line)
+        close_paragraph()
+
+        return [(heading, paragraphs) for heading, paragraphs in segments if paragraphs]
+
+    def _split_words(self, text: str, tokens: int) -> List[Unit]:
+        """Último recurso para una oración enorme: ventanas de palabras"""
+        chars_per_token = len(text) / max(tokens, 1)
+        budget = max(1, int(self.max_tokens * chars_per_token * 0.9))
+
+        units = []
+        start = 0
+        while start < len(text):
+            end = min(len(text), start + budget)
+            if end < len(text):
+                space = text.rfind(" ", start, end)
+                if space > start:
+                    end = space
+            piece = text[start:end].strip()
+            if piece:
+                units.append(Unit(piece, self.counter.count(piece), " "))
+            start = end
+        return units
+
+    def _units(self, paragraph: str) -> List[Unit]:
+        """Un párrafo como una unidad, o partido en oraciones si excede el máximo"""
+        tokens = self.counter.count(paragraph)
+        if tokens <= self.max_tokens:
+            return [Unit(paragraph, tokens)]
+
+        units = []
+        for sentence in SENTENCE_PATTERN.split(paragraph):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            sentence_tokens = self.counter.count(sentence)
+            if sentence_tokens <= self.max_tokens:
+                units.append(Unit(sentence, sentence_tokens, " "))
+            else:
+                units.extend(self._split_words(sentence, sentence_tokens))
+
+        if units:
+            units[0].sep = "\n\n"
+        return units
+
+    # ------------------------------------------------------------------
+    # Empaquetado
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _join(units: List[Unit]) -> str:
+        parts = [units[0].text]
+        for unit in units[1:]:
+            parts.append(unit.sep)
+            parts.append(unit.text)
+        return "".join(parts)
+
+    def _pack(self, units: List[Unit]) -> List[Tuple[str, int]]:
+        """
+        Agrupa unidades en chunks. El presupuesto se ajusta para repartir la
+        sección en partes parejas (sin un último chunk diminuto).
+        """
+        total = sum(unit.tokens for unit in units)
+        budget = self.max_tokens
+        if total > self.max_tokens:
+            # Cada chunk después del primero repite ~overlap_tokens del anterior
+            step = self.max_tokens - self.overlap_tokens
+            parts = math.ceil((total - self.overlap_tokens) / step)
+            budget = min(self.max_tokens, math.ceil((total - self.overlap_tokens) / parts) + self.overlap_tokens)
+
+        chunks = []
+        current: List[Unit] = []
+        current_tokens = 0
+
+        for unit in units:
+            if current and current_tokens + unit.tokens > budget:
+                chunks.append((self._join(current), current_tokens))
+
+                # Solapamiento: unidades finales completas, nunca el chunk entero
+                carry: List[Unit] = []
+                carry_tokens = 0
+                for previous in reversed(current[1:]):
+                    if carry_tokens + previous.tokens > self.overlap_tokens:
+                        break
+                    carry.insert(0, previous)
+                    carry_tokens += previous.tokens
+                while carry and carry_tokens + unit.tokens > self.max_tokens:
+                    carry_tokens -= carry.pop(0).tokens
+
+                current, current_tokens = carry, carry_tokens
+
+            current.append(unit)
+            current_tokens += unit.tokens
+
+        if current:
+            chunks.append((self._join(current), current_tokens))
+        return chunks
+
+    def split(self, text: str) -> List[Tuple[str, int, Optional[str]]]:
+        """
+        Divide un texto (ya limpio) en chunks
+
+        Returns:
+            Lista de (texto, tokens, encabezado de la sección o None)
+        """
+        chunks = []
+        for heading, paragraphs in self._segments(text):
+            units = [unit for paragraph in paragraphs for unit in self._units(paragraph)]
+            for chunk_text, tokens in self._pack(units):
+                chunks.append((chunk_text, tokens, heading))
+        return chunks
+
+
+# ----------------------------------------------------------------------
+# Histogramas
+# ----------------------------------------------------------------------
+
+def token_histogram(token_counts: Iterable[int], edges: List[int] = HISTOGRAM_EDGES) -> List[Tuple[str, int]]:
+    """Cantidad de chunks por rango de tokens: [("0-31", n), ..., ("1024+", n)]"""
+    labels = [f"{low}-{high - 1}" for low, high in zip(edges, edges[1:])] + [f"{edges[-1]}+"]
+    counts = [0] * len(labels)
+    for tokens in token_counts:
+        bucket = len(edges) - 1
+        for i, high in enumerate(edges[1:]):
+            if tokens < high:
+                bucket = i
+                break
+        counts[bucket] += 1
+    return list(zip(labels, counts))
+
+
+def print_histogram(token_counts: List[int], title: str = "Tokens por chunk"):
+    """Histograma de texto con percentiles"""
+    if not token_counts:
+        print(f"   {title}: sin chunks")
+        return
+
+    ordered = sorted(token_counts)
+    p50 = ordered[len(ordered) // 2]
+    p90 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+    print(f"\n📊 {title}: {len(ordered)} chunks, p50={p50}, p90={p90}, máx={ordered[-1]}")
+
+    histogram = token_histogram(ordered)
+    peak = max(count for _, count in histogram) or 1
+    for label, count in histogram:
+        if count:
+            print(f"   {label:>9} │ {'█' * max(1, round(30 * count / peak)):<30} {count}")
+
+
+def main():
+    from data_processing.text_processor import TextProcessor, find_chunk_files, iter_chunks_file
+
+    parser = argparse.ArgumentParser(description="Histogramas de tamaño de chunks")
+    parser.add_argument("raw_dir", nargs="?", help="Directorio con JSONs a chunkear (sin escribir nada)")
+    parser.add_argument("--max-tokens", type=int, nargs="+", default=[DEFAULT_MAX_TOKENS])
+    parser.add_argument("--overlap", type=int, default=DEFAULT_OVERLAP_TOKENS)
+    parser.add_argument("--stats", type=str, help="Directorio con *_chunks.jsonl ya generados")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CHUNKER - HISTOGRAMAS")
+    print("=" * 60)
+    if not TIKTOKEN_AVAILABLE:
+        print("ℹ️  tiktoken no instalado: tokens estimados (~4 caracteres por token)")
+
+    if args.stats:
+        counter = TokenCounter()
+        for chunks_file in find_chunk_files(Path(args.stats)):
+            counts = [chunk.get("tokens") or counter.count(chunk["text"]) for chunk in iter_chunks_file(chunks_file)]
+            print_histogram(counts, chunks_file.name)
+
+    if args.raw_dir:
+        json_files = sorted(Path(args.raw_dir).glob("*.json"))
+        for max_tokens in args.max_tokens:
+            processor = TextProcessor(chunk_size=max_tokens, chunk_overlap=min(args.overlap, max_tokens // 2))
+            counts = []
+            for json_file in json_files:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    counts.extend(chunk["tokens"] for chunk in processor.process_law_data(json.load(f), json_file.stem))
+            print_histogram(counts, f"max_tokens={max_tokens}")
+
+
+if __name__ == "__main__":
+    main()
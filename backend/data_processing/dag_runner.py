@@ -0,0 +1,327 @@
+"""
+DAG Runner - Ejecuta el pipeline de datos como un grafo de etapas
+
+Cada etapa declara:
+- inputs / outputs: rutas o patrones glob de sus artefactos
+- deps: etapas que deben terminar antes
+- params: configuración que afecta su resultado (chunk_size, modelo, ...)
+
+Antes de correr una etapa se calcula la huella (sha256) del contenido de
+sus inputs + params. Si coincide con la de la última corrida exitosa y los
+outputs siguen intactos, la etapa se salta. Los hashes de archivos se
+cachean por (tamaño, mtime) para no releer lo que no cambió.
+
+Las etapas independientes (ej: las fuentes bcn, dt, sernac y cada
+categoría de apuntes) corren en paralelo en un pool de hilos. Al final se
+imprime un reporte con el estado y el tiempo de cada etapa.
+
+El estado vive en data/cache/pipeline_state.json.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+DEFAULT_STATE_PATH = "data/cache/pipeline_state.json"
+DEFAULT_MAX_WORKERS = 4
+
+GLOB_CHARS = set("*?[")
+
+# Estados de una etapa en el reporte
+RAN = "ejecutada"
+SKIPPED = "sin cambios"
+FAILED = "falló"
+BLOCKED = "bloqueada"
+DISABLED = "deshabilitada"
+
+STATUS_ICONS = {RAN: "✅", SKIPPED: "⏭️ ", FAILED: "❌", BLOCKED: "⛔", DISABLED: "⚪"}
+
+
+@dataclass
+class Stage:
+    """Etapa del pipeline con sus artefactos declarados"""
+    name: str
+    run: Callable[[], Any]
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    deps: List[str] = field(default_factory=list)
+    params: Dict = field(default_factory=dict)
+    always_run: bool = False  # Sin inputs locales (ej: scrapers): no se puede saltar
+    enabled: bool = True
+    disabled_reason: str = ""
+
+
+@dataclass
+class StageResult:
+    """Resultado de una etapa en una corrida"""
+    name: str
+    status: str
+    seconds: float = 0.0
+    detail: str = ""
+    value: Any = None
+
+
+def resolve_paths(patterns: Iterable[str], base_dir: Path) -> List[Path]:
+    """
+    Expande rutas y patrones glob (relativos a base_dir) a archivos
+    existentes. Un directorio incluye todos sus archivos.
+    """
+    files = set()
+    for pattern in patterns:
+        root = base_dir
+        if Path(pattern).is_absolute():
+            # Path.glob solo acepta patrones relativos
+            root = Path(Path(pattern).anchor)
+            pattern = str(Path(pattern).relative_to(root))
+
+        if GLOB_CHARS & set(pattern):
+            matches = root.glob(pattern)
+        else:
+            matches = [root / pattern]
+
+        for path in matches:
+            if path.is_dir():
+                files.update(p for p in path.rglob("*") if p.is_file())
+            elif path.is_file():
+                files.add(path)
+
+    return sorted(files)
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PipelineState:
+    """Huellas de la última corrida exitosa de cada etapa + caché de hashes de archivos"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.data = {"stages": {}, "files": {}}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️  Estado del pipeline ilegible, se recalcula: {self.path}")
+
+    def file_hash(self, path: Path) -> str:
+        """Hash del contenido; se reutiliza si el tamaño y el mtime no cambiaron"""
+        stat = path.stat()
+        key = str(path.resolve())
+        with self._lock:
+            cached = self.data["files"].get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = sha256_file(path)
+        with self._lock:
+            self.data["files"][key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def fingerprint(self, patterns: Iterable[str], base_dir: Path, params: Optional[Dict] = None) -> str:
+        """Huella de un conjunto de artefactos (rutas relativas + contenido) y params"""
+        entries = [
+            (os.path.relpath(path, base_dir), self.file_hash(path))
+            for path in resolve_paths(patterns, base_dir)
+        ]
+        payload = json.dumps({"files": entries, "params": params or {}}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, stage_name: str) -> Dict:
+        with self._lock:
+            return dict(self.data["stages"].get(stage_name, {}))
+
+    def record(self, stage_name: str, input_fingerprint: str, output_fingerprint: str):
+        with self._lock:
+            self.data["stages"][stage_name] = {
+                "inputs": input_fingerprint,
+                "outputs": output_fingerprint,
+                "completed_at": time.time()
+            }
+
+    def forget(self, stage_name: str):
+        with self._lock:
+            self.data["stages"].pop(stage_name, None)
+
+    def save(self):
+        """Escritura atómica: una corrida interrumpida no deja el estado a medias"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False)
+        tmp_path.replace(self.path)
+
+
+class DAGRunner:
+    """Ejecuta etapas en orden topológico, en paralelo y saltando las que no cambiaron"""
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        state_path: Path = Path(DEFAULT_STATE_PATH),
+        base_dir: Path = Path("."),
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        force: bool = False
+    ):
+        """
+        Args:
+            stages: Etapas del pipeline
+            state_path: Archivo con las huellas de la última corrida
+            base_dir: Directorio base de los inputs/outputs relativos
+            max_workers: Etapas en paralelo
+            force: Ejecutar todas las etapas aunque no hayan cambiado
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Hay etapas con nombre repetido")
+
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"La etapa '{stage.name}' depende de una etapa inexistente: '{dep}'")
+
+        self.order = self._topological_order()
+        self.state = PipelineState(state_path)
+        self.base_dir = Path(base_dir)
+        self.max_workers = max(1, max_workers)
+        self.force = force
+
+    def _topological_order(self) -> List[str]:
+        """Orden de Kahn; falla si hay ciclos"""
+        remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+        order = []
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(f"Ciclo entre las etapas: {', '.join(sorted(remaining))}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def _execute(self, stage: Stage) -> StageResult:
+        """Corre en un worker: decide si saltar la etapa y si no, la ejecuta"""
+        start = time.perf_counter()
+        input_fingerprint = self.state.fingerprint(stage.inputs, self.base_dir, stage.params)
+
+        if not self.force and not stage.always_run:
+            previous = self.state.get(stage.name)
+            if previous.get("inputs") == input_fingerprint:
+                output_fingerprint = self.state.fingerprint(stage.outputs, self.base_dir)
+                if previous.get("outputs") == output_fingerprint:
+                    return StageResult(stage.name, SKIPPED, time.perf_counter() - start)
+
+        print(f"\n▶️  {stage.name}")
+        try:
+            value = stage.run()
+        except Exception as e:
+            # Sin huella: la próxima corrida la vuelve a intentar
+            self.state.forget(stage.name)
+            return StageResult(stage.name, FAILED, time.perf_counter() - start, detail=str(e))
+
+        # Los inputs pueden haber cambiado durante la etapa (ej: un scraper): se recalcula
+        self.state.record(
+            stage.name,
+            self.state.fingerprint(stage.inputs, self.base_dir, stage.params),
+            self.state.fingerprint(stage.outputs, self.base_dir)
+        )
+        return StageResult(stage.name, RAN, time.perf_counter() - start, value=value)
+
+    def run(self, only: Optional[Iterable[str]] = None) -> List[StageResult]:
+        """
+        Ejecuta el pipeline
+
+        Args:
+            only: Nombres de etapas a ejecutar (default: todas). Las dependencias
+                fuera de la selección se asumen al día.
+
+        Returns:
+            Resultados en orden topológico
+        """
+        selected = set(only) if only is not None else set(self.stages)
+        unknown = selected - set(self.stages)
+        if unknown:
+            raise ValueError(f"Etapas desconocidas: {', '.join(sorted(unknown))}")
+
+        pending = {name: set(self.stages[name].deps) & selected for name in self.order if name in selected}
+        results: Dict[str, StageResult] = {}
+        start = time.perf_counter()
+
+        def finish(result: StageResult):
+            results[result.name] = result
+            pending.pop(result.name, None)
+            if result.status in (RAN, SKIPPED):
+                for deps in pending.values():
+                    deps.discard(result.name)
+                return
+            # Todo lo que depende (directa o indirectamente) de la etapa queda bloqueado
+            for name in self.order:
+                if name in pending and result.name in self.stages[name].deps:
+                    finish(StageResult(name, BLOCKED, detail=f"depende de {result.name}"))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            in_flight = {}
+
+            while pending or in_flight:
+                for name in [n for n in self.order if n in pending and not pending[n] and n not in in_flight.values()]:
+                    stage = self.stages[name]
+                    if not stage.enabled:
+                        finish(StageResult(name, DISABLED, detail=stage.disabled_reason))
+                        continue
+                    in_flight[pool.submit(self._execute, stage)] = name
+
+                if not in_flight:
+                    # Las etapas deshabilitadas pudieron liberar o bloquear otras
+                    continue
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.pop(future)
+                    finish(future.result())
+                self.state.save()
+
+        self.state.save()
+        ordered = [results[name] for name in self.order if name in results]
+        print_report(ordered, time.perf_counter() - start)
+        return ordered
+
+
+def print_report(results: List[StageResult], wall_seconds: float):
+    """Reporte de la corrida: estado y tiempo por etapa"""
+    print("\n" + "=" * 60)
+    print("⏱️  REPORTE DEL PIPELINE")
+    print("=" * 60)
+
+    width = max([len(result.name) for result in results] + [5])
+    for result in results:
+        line = f"{STATUS_ICONS[result.status]} {result.name:<{width}} {result.status:<14} {result.seconds:>8.2f}s"
+        if result.detail:
+            line += f"  ({result.detail})"
+        print(line)
+
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    stage_seconds = sum(result.seconds for result in results)
+
+    print("-" * 60)
+    print(", ".join(f"{count} {status}" for status, count in counts.items()))
+    print(f"Tiempo total: {wall_seconds:.2f}s (suma de etapas: {stage_seconds:.2f}s)")
+    print("=" * 60)
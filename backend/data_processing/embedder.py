@@ -2,32 +2,97 @@
 Embedder - Genera embeddings vectoriales de textos legales usando OpenAI
 
 Utiliza el modelo text-embedding-3-small de OpenAI:
-- Dimensiones: 1536
+- Dimensiones: 1536 (o menos según el perfil EMBEDDING_PROFILE, ver
+  rag/embedding_profiles.py; los vectores reducidos se derivan de los
+  completos ya guardados en el store sin llamar a la API)
 - Costo: ~$0.02 por 1M tokens
 - Alta calidad para búsqueda semántica
+
+Los embeddings se guardan en el formato binario de embedding_artifact
+(.npy float16 + tabla SQLite); output_format="json" conserva el formato anterior.
+
+Incremental: los vectores se guardan por hash de contenido (embedding_store),
+así que volver a correr el pipeline solo paga los chunks nuevos o cambiados.
+Los textos pendientes se envían con el motor async de batch_embedder.
 """
 
-import openai
+import asyncio
 import json
-import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+from data_processing.batch_embedder import (
+    DEFAULT_MAX_BATCH_TOKENS,
+    DEFAULT_MAX_CONCURRENCY,
+    BatchEmbeddingEngine
+)
+from data_processing.embedding_artifact import (
+    DEFAULT_ARTIFACT_DTYPE,
+    EmbeddingArtifactWriter,
+    artifact_exists,
+    artifact_paths,
+    iter_file_chunks
+)
+from data_processing.embedding_store import (
+    ContentEmbeddingStore,
+    chunk_content_hash,
+    content_hash,
+    diff_chunks,
+    print_diff_summary
+)
+from data_processing.text_processor import find_chunk_files, iter_chunks_file
+from rag.embedding_profiles import get_profile, native_dimensions, reduce_dimensions
+
 load_dotenv()
 
 class Embedder:
     """Generador de embeddings para textos legales"""
 
-    def __init__(self, model: str = "text-embedding-3-small", api_key: Optional[str] = None):
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        output_format: str = "npy",
+        artifact_dtype: str = DEFAULT_ARTIFACT_DTYPE,
+        embedding_store: Optional[ContentEmbeddingStore] = None,
+        incremental: bool = True,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        base_url: Optional[str] = None,
+        transport=None,
+        dimensions: Optional[int] = None
+    ):
         """
         Args:
-            model: Modelo de OpenAI para embeddings
+            model: Modelo de OpenAI para embeddings (default: el del perfil EMBEDDING_PROFILE)
             api_key: API key de OpenAI (si no está en .env)
+            output_format: "npy" (artefacto binario) o "json" (formato anterior)
+            artifact_dtype: dtype de la matriz del artefacto binario
+            embedding_store: Store por hash de contenido (por defecto el de data/embeddings)
+            incremental: False para volver a embeber todo sin usar el store
+            max_concurrency: Requests de embeddings en vuelo (se reduce ante 429)
+            max_batch_tokens: Tokens estimados por request
+            base_url: URL base de la API (default OPENAI_BASE_URL o la de OpenAI)
+            transport: Transport httpx (tests contra un servidor falso)
+            dimensions: Dimensiones de los vectores (default: las del perfil
+                EMBEDDING_PROFILE, o las nativas si model no es el del perfil)
         """
-        self.model = model
+        if output_format not in ("npy", "json"):
+            raise ValueError(f"Formato de salida no soportado: {output_format}")
+
+        profile = get_profile()
+        self.model = model or profile.model
+        self.output_format = output_format
+        self.artifact_dtype = artifact_dtype
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
 
         if not self.api_key:
@@ -37,10 +102,22 @@ class Embedder:
             )
 
         # Configurar cliente OpenAI
-        openai.api_key = self.api_key
-
-        self.embedding_dim = 1536  # Dimensiones de text-embedding-3-small
-        self.batch_size = 100  # Procesar hasta 100 textos por batch
+        if OPENAI_AVAILABLE:
+            openai.api_key = self.api_key
+        else:
+            print("⚠️  Paquete openai no instalado. Instala con: pip install openai")
+
+        if dimensions is None:
+            dimensions = profile.dimensions if self.model == profile.model else native_dimensions(self.model)
+        self.embedding_dim = dimensions
+        self.max_concurrency = max_concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self.base_url = base_url
+        self.transport = transport
+
+        self.store = embedding_store
+        if self.store is None and incremental:
+            self.store = ContentEmbeddingStore()
 
     def generate_embedding(self, text: str) -> List[float]:
         """
@@ -55,7 +132,8 @@ class Embedder:
         try:
             response = openai.embeddings.create(
                 model=self.model,
-                input=text
+                input=text,
+                **self.dimension_options()
             )
             return response.data[0].embedding
         except Exception as e:
@@ -78,7 +156,8 @@ class Embedder:
         try:
             response = openai.embeddings.create(
                 model=self.model,
-                input=texts
+                input=texts,
+                **self.dimension_options()
             )
 
             # Ordenar embeddings según el índice original
@@ -92,12 +171,50 @@ class Embedder:
             print(f"❌ Error generando batch de embeddings: {e}")
             return [None] * len(texts)
 
+    @property
+    def api_dimensions(self) -> Optional[int]:
+        """Parámetro `dimensions` de la API (None = dimensiones nativas del modelo)"""
+        if self.embedding_dim == native_dimensions(self.model):
+            return None
+        return self.embedding_dim
+
+    def dimension_options(self) -> Dict:
+        """Argumentos extra para openai.embeddings.create"""
+        return {} if self.api_dimensions is None else {"dimensions": self.api_dimensions}
+
+    def reduce_native_vectors(self, pending: Dict[str, str]) -> Dict[str, List[float]]:
+        """
+        Perfil reducido: deriva los vectores pendientes de los completos ya
+        guardados en el store (mismo texto y modelo), sin llamar a la API
+
+        Args:
+            pending: clave (con las dimensiones del perfil) -> texto
+
+        Returns:
+            clave -> vector reducido (también se guardan en el store)
+        """
+        if self.store is None or self.api_dimensions is None or not pending:
+            return {}
+
+        native = native_dimensions(self.model)
+        native_keys = {key: content_hash(text, self.model, native) for key, text in pending.items()}
+        native_vectors = self.store.get_many(native_keys.values())
+
+        reduced = {
+            key: reduce_dimensions(native_vectors[native_key], self.embedding_dim)
+            for key, native_key in native_keys.items()
+            if native_key in native_vectors
+        }
+        if reduced:
+            self.store.put_many(reduced.items(), self.model, self.embedding_dim)
+        return reduced
+
     def process_chunks_file(self, input_file: Path, output_file: Path) -> Dict:
         """
         Procesa un archivo de chunks y genera embeddings
 
         Args:
-            input_file: Archivo JSON con chunks procesados
+            input_file: Archivo de chunks (*_chunks.jsonl o *_chunks.json)
             output_file: Archivo donde guardar chunks con embeddings
 
         Returns:
@@ -105,47 +222,87 @@ class Embedder:
         """
         print(f"\n📥 Cargando chunks desde: {input_file.name}")
 
-        with open(input_file, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
+        chunks = list(iter_chunks_file(input_file))
 
         total_chunks = len(chunks)
         print(f"📊 Total chunks a procesar: {total_chunks}")
 
-        # Procesar en batches
+        previous_hashes = self._load_previous_output(output_file)
+
+        # Vectores ya calculados (mismo texto, modelo y dimensiones)
+        keys = [content_hash(chunk["text"], self.model, self.embedding_dim) for chunk in chunks]
+        vectors = self.store.get_many(keys) if self.store is not None else {}
+        reused = sum(1 for key in keys if key in vectors)
+
+        # Solo los textos que faltan van a la API (deduplicados)
+        pending = {}
+        for chunk, key in zip(chunks, keys):
+            if key not in vectors:
+                pending.setdefault(key, chunk["text"])
+
+        # Perfil reducido: lo que ya está embebido en dimensiones completas no se paga de nuevo
+        derived = self.reduce_native_vectors(pending)
+        if derived:
+            print(f"✂️  {len(derived)} vectores derivados de los de {native_dimensions(self.model)} dimensiones")
+            vectors.update(derived)
+            reused += sum(1 for key in keys if key in derived)
+            pending = {key: text for key, text in pending.items() if key not in derived}
+        pending_items = list(pending.items())
+
+        if pending_items:
+            print(f"🔄 {len(pending_items)} textos por embeber ({reused} reutilizados)")
+            vectors.update(self.embed_pending(pending_items))
+
+        # Escribir chunks con embeddings, en el orden original
         chunks_with_embeddings = []
+        current_hashes = {}
         failed_chunks = 0
 
-        for i in range(0, total_chunks, self.batch_size):
-            batch = chunks[i:i + self.batch_size]
-            batch_texts = [chunk["text"] for chunk in batch]
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        writer = None
+        if self.output_format == "npy":
+            writer = EmbeddingArtifactWriter(
+                output_file,
+                dimension=self.embedding_dim,
+                dtype=self.artifact_dtype,
+                model=self.model
+            )
 
-            print(f"🔄 Procesando batch {i // self.batch_size + 1} ({len(batch)} chunks)...")
+        try:
+            for chunk, key in zip(chunks, keys):
+                embedding = vectors.get(key)
+                if not embedding:
+                    failed_chunks += 1
+                    print(f"   ⚠️  Falló chunk: {chunk.get('chunk_id', 'unknown')}")
+                    continue
 
-            embeddings = self.generate_embeddings_batch(batch_texts)
+                self.annotate_chunk(chunk, key)
+                current_hashes[chunk["chunk_id"]] = key
 
-            # Agregar embeddings a chunks
-            for chunk, embedding in zip(batch, embeddings):
-                if embedding:
+                if writer is not None:
+                    # Streaming: el vector va directo al artefacto
+                    writer.write(chunk, embedding)
+                else:
                     chunk["embedding"] = embedding
-                    chunk["embedding_model"] = self.model
-                    chunk["embedding_dim"] = self.embedding_dim
-                    chunk["embedded_at"] = datetime.now().isoformat()
                     chunks_with_embeddings.append(chunk)
-                else:
-                    failed_chunks += 1
-                    print(f"   ⚠️  Falló chunk: {chunk.get('chunk_id', 'unknown')}")
-
-            # Rate limiting: pequeña pausa entre batches
-            if i + self.batch_size < total_chunks:
-                time.sleep(0.5)
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
 
         # Guardar chunks con embeddings
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(chunks_with_embeddings, f, ensure_ascii=False, indent=2)
-
-        print(f"\n✅ Embeddings generados: {len(chunks_with_embeddings)}")
+        if writer is not None:
+            writer.close()
+            output_file = writer.vectors_path
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(chunks_with_embeddings, f, ensure_ascii=False, indent=2)
+
+        successful = len(current_hashes)
+        diff = diff_chunks(previous_hashes, current_hashes)
+
+        print(f"\n✅ Embeddings listos: {successful} ({len(pending_items)} nuevos en la API)")
+        print_diff_summary(input_file.name, diff, reused=reused)
         if failed_chunks > 0:
             print(f"❌ Chunks fallidos: {failed_chunks}")
         print(f"💾 Guardados en: {output_file}")
@@ -155,27 +312,102 @@ class Embedder:
             "input_file": str(input_file),
             "output_file": str(output_file),
             "total_chunks": total_chunks,
-            "successful_embeddings": len(chunks_with_embeddings),
+            "successful_embeddings": successful,
             "failed_chunks": failed_chunks,
+            "embedded": len(pending_items),
+            "reused": reused,
+            "added": len(diff["added"]),
+            "changed": len(diff["changed"]),
+            "removed": len(diff["removed"]),
+            "unchanged": len(diff["unchanged"]),
             "model": self.model,
             "embedding_dim": self.embedding_dim,
+            "output_format": self.output_format,
             "processed_at": datetime.now().isoformat()
         }
 
         return summary
 
+    def annotate_chunk(self, chunk: Dict, key: str) -> Dict:
+        """Agrega al chunk los datos del embedding (modelo, dimensiones, hash)"""
+        chunk["embedding_model"] = self.model
+        chunk["embedding_dim"] = self.embedding_dim
+        chunk["content_hash"] = key
+        chunk["embedded_at"] = datetime.now().isoformat()
+        return chunk
+
+    def embed_pending(self, items: List[Tuple[str, str]]) -> Dict[str, List[float]]:
+        """
+        Embebe (clave, texto) con el motor async por batches. Cada batch
+        completado se guarda en el store al instante: si la corrida se corta,
+        la siguiente retoma desde ahí.
+
+        Returns:
+            clave -> vector (las claves fallidas no aparecen)
+        """
+        return asyncio.run(self.embed_pending_async(items))
+
+    async def embed_pending_async(self, items: List[Tuple[str, str]]) -> Dict[str, List[float]]:
+        """Versión async de embed_pending (para usar dentro de un event loop)"""
+        def checkpoint(pairs):
+            if self.store is not None:
+                self.store.put_many(pairs, self.model, self.embedding_dim)
+
+        engine = BatchEmbeddingEngine(
+            api_key=self.api_key,
+            model=self.model,
+            dimensions=self.api_dimensions,
+            max_concurrency=self.max_concurrency,
+            max_batch_tokens=self.max_batch_tokens,
+            base_url=self.base_url,
+            transport=self.transport
+        )
+        result = await engine.embed(items, on_batch=checkpoint)
+
+        stats = result["stats"]
+        print(
+            f"⚡ {stats['embedded']} embeddings en {stats['seconds']:.1f}s "
+            f"({stats['batches']} batches, {stats['requests']} requests, {stats['throttled']} 429)"
+        )
+        return result["vectors"]
+
+    def _load_previous_output(self, output_file: Path) -> Dict[str, str]:
+        """
+        Lee la salida anterior de este archivo (si existe): retorna
+        chunk_id -> hash de contenido para el diff, e importa sus vectores
+        al store la primera vez (no se vuelven a pagar)
+        """
+        vectors_path, _ = artifact_paths(output_file)
+        if artifact_exists(vectors_path):
+            previous_file = vectors_path
+        elif output_file.suffix == ".json" and output_file.exists():
+            previous_file = output_file
+        else:
+            return {}
+
+        previous_chunks = list(iter_file_chunks(previous_file))
+        if self.store is not None:
+            seeded = self.store.seed_from_chunks(previous_chunks, self.model, self.embedding_dim)
+            if seeded:
+                print(f"♻️  {seeded} embeddings importados desde {previous_file.name}")
+
+        return {
+            chunk["chunk_id"]: chunk_content_hash(chunk, self.model, self.embedding_dim)
+            for chunk in previous_chunks
+        }
+
     def process_all_chunk_files(self, input_dir: Path, output_dir: Path) -> List[Dict]:
         """
         Procesa todos los archivos de chunks en un directorio
 
         Args:
-            input_dir: Directorio con archivos *_chunks.json
+            input_dir: Directorio con archivos *_chunks.jsonl / *_chunks.json
             output_dir: Directorio donde guardar chunks con embeddings
 
         Returns:
             Lista de resúmenes de procesamiento
         """
-        chunk_files = list(input_dir.glob("*_chunks.json"))
+        chunk_files = find_chunk_files(input_dir)
 
         if not chunk_files:
             print(f"⚠️  No se encontraron archivos de chunks en {input_dir}")
@@ -246,9 +478,16 @@ def main():
         total_chunks = sum(s["total_chunks"] for s in summaries)
         total_successful = sum(s["successful_embeddings"] for s in summaries)
         total_failed = sum(s["failed_chunks"] for s in summaries)
+        total_embedded = sum(s["embedded"] for s in summaries)
 
         print(f"Total chunks procesados: {total_chunks}")
         print(f"Embeddings exitosos: {total_successful}")
+        print(
+            f"Diff: +{sum(s['added'] for s in summaries)} nuevos, "
+            f"~{sum(s['changed'] for s in summaries)} cambiados, "
+            f"-{sum(s['removed'] for s in summaries)} eliminados, "
+            f"♻️  {sum(s['reused'] for s in summaries)} reutilizados"
+        )
         if total_failed > 0:
             print(f"Fallos: {total_failed}")
 
@@ -256,9 +495,9 @@ def main():
         for summary in summaries:
             print(f"  • {Path(summary['output_file']).name}: {summary['successful_embeddings']} embeddings")
 
-        # Estimación de costo (aproximada)
+        # Estimación de costo (aproximada), solo de lo enviado a la API
         # Asumimos ~300 tokens por chunk en promedio
-        estimated_tokens = total_successful * 300
+        estimated_tokens = total_embedded * 300
         estimated_cost = estimate_cost(estimated_tokens)
 
         print(f"\n💰 Costo estimado: ${estimated_cost:.4f} USD")
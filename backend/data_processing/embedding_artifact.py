@@ -0,0 +1,442 @@
+"""
+Embedding Artifact - Formato binario para chunks con embeddings
+
+Reemplaza a *_embedded.json (cada float escrito como texto con indent=2,
+~30-40 bytes por float) por dos archivos hermanos:
+
+    <nombre>_embedded.npy      Matriz N x dim (float16 por defecto), memory-mapped
+    <nombre>_embedded.sqlite3  Tabla lateral: fila -> chunk_id, metadata, texto
+
+La fila i de la matriz corresponde a la fila i de la tabla. El .npy es un
+archivo NumPy estándar (np.load(..., mmap_mode="r")); el writer reserva un
+header de tamaño fijo para poder escribir vectores en streaming y fijar el
+número de filas al cerrar.
+
+Uso:
+    # Convertir los *_embedded.json existentes
+    python -m data_processing.embedding_artifact --embeddings-dir data/embeddings
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+VECTORS_SUFFIX = ".npy"
+TABLE_SUFFIX = ".sqlite3"
+
+DEFAULT_ARTIFACT_DTYPE = "float16"
+
+# Header .npy de tamaño fijo (magic + versión + largo + dict con padding)
+NPY_HEADER_BYTES = 128
+
+# Filas por transacción SQLite al escribir / filas por lectura al iterar
+WRITE_BATCH_ROWS = 500
+READ_BATCH_ROWS = 1000
+
+
+def artifact_paths(base: Path) -> Tuple[Path, Path]:
+    """Rutas (.npy, .sqlite3) de un artefacto a partir de su nombre base"""
+    base = Path(base)
+    if base.suffix in (".json", VECTORS_SUFFIX, TABLE_SUFFIX):
+        base = base.with_suffix("")
+    return base.with_name(base.name + VECTORS_SUFFIX), base.with_name(base.name + TABLE_SUFFIX)
+
+
+def artifact_exists(base: Path) -> bool:
+    vectors_path, table_path = artifact_paths(base)
+    return vectors_path.exists() and table_path.exists()
+
+
+def _npy_header(count: int, dimension: int, dtype: str) -> bytes:
+    """Header .npy v1.0 con padding fijo a NPY_HEADER_BYTES"""
+    header = {"descr": np.dtype(dtype).str, "fortran_order": False, "shape": (count, dimension)}
+    text = repr(header).encode("latin1")
+    prefix = b"\x93NUMPY\x01\x00"
+    padding = NPY_HEADER_BYTES - len(prefix) - 2 - len(text) - 1
+    if padding < 0:
+        raise ValueError("Header .npy excede el tamaño reservado")
+    body = text + b" " * padding + b"\n"
+    return prefix + len(body).to_bytes(2, "little") + body
+
+
+def _chunk_record(chunk: Dict) -> Dict:
+    """Campos del chunk que van a la tabla lateral (todo menos el vector)"""
+    return {key: value for key, value in chunk.items() if key != "embedding"}
+
+
+class EmbeddingArtifactWriter:
+    """
+    Escribe un artefacto en streaming (un chunk a la vez)
+
+        with EmbeddingArtifactWriter(base, dimension=1536, model=...) as writer:
+            writer.write(chunk, embedding)
+
+    Los archivos se escriben en temporales y se reemplazan al cerrar:
+    un artefacto a medio escribir nunca queda visible.
+    """
+
+    def __init__(
+        self,
+        base: Path,
+        dimension: int,
+        dtype: str = DEFAULT_ARTIFACT_DTYPE,
+        model: Optional[str] = None
+    ):
+        """
+        Args:
+            base: Ruta base (ej: data/embeddings/ley_chunks_embedded)
+            dimension: Dimensiones de los vectores
+            dtype: "float16" (default) o "float32"
+            model: Modelo de embeddings (se guarda en la tabla lateral)
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy no instalado. pip install numpy")
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"dtype no soportado: {dtype}")
+
+        self.vectors_path, self.table_path = artifact_paths(base)
+        self.vectors_path.parent.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.dtype = dtype
+        self.model = model
+        self.count = 0
+
+        self._tmp_vectors = self.vectors_path.with_name(self.vectors_path.name + ".tmp")
+        self._tmp_table = self.table_path.with_name(self.table_path.name + ".tmp")
+        if self._tmp_table.exists():
+            self._tmp_table.unlink()
+
+        self._vectors_file = open(self._tmp_vectors, 'wb')
+        self._vectors_file.write(_npy_header(0, dimension, dtype))
+
+        self._db = sqlite3.connect(str(self._tmp_table))
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE chunks (row INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL, chunk TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._pending: List[Tuple[int, str, str]] = []
+        self._closed = False
+
+    def __enter__(self) -> "EmbeddingArtifactWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, chunk: Dict, embedding) -> int:
+        """
+        Agrega un chunk con su vector
+
+        Args:
+            chunk: Chunk de TextProcessor (se ignora "embedding" si viene)
+            embedding: Vector (lista o array)
+
+        Returns:
+            Fila asignada
+        """
+        vector = np.asarray(embedding, dtype=self.dtype)
+        if vector.shape != (self.dimension,):
+            raise ValueError(
+                f"Chunk '{chunk.get('chunk_id')}' tiene {vector.size} dimensiones, "
+                f"se esperaban {self.dimension}"
+            )
+
+        self._vectors_file.write(vector.tobytes())
+        self._pending.append((
+            self.count,
+            chunk["chunk_id"],
+            json.dumps(_chunk_record(chunk), ensure_ascii=False)
+        ))
+        self.count += 1
+
+        if len(self._pending) >= WRITE_BATCH_ROWS:
+            self._flush()
+        return self.count - 1
+
+    def write_chunk(self, chunk: Dict) -> int:
+        """Agrega un chunk de *_embedded.json (con la clave "embedding")"""
+        return self.write(chunk, chunk["embedding"])
+
+    def _flush(self):
+        self._db.executemany("INSERT INTO chunks (row, chunk_id, chunk) VALUES (?, ?, ?)", self._pending)
+        self._pending = []
+
+    def close(self):
+        """Fija el número de filas en el header y publica ambos archivos"""
+        if self._closed:
+            return
+        self._closed = True
+
+        self._flush()
+        self._db.execute("CREATE INDEX idx_chunks_chunk_id ON chunks(chunk_id)")
+        info = {
+            "count": self.count,
+            "dimension": self.dimension,
+            "dtype": self.dtype,
+            "model": self.model or "",
+            "created_at": datetime.now().isoformat()
+        }
+        self._db.executemany(
+            "INSERT INTO info (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in info.items()]
+        )
+        self._db.commit()
+        self._db.close()
+
+        self._vectors_file.seek(0)
+        self._vectors_file.write(_npy_header(self.count, self.dimension, self.dtype))
+        self._vectors_file.close()
+
+        os.replace(self._tmp_table, self.table_path)
+        os.replace(self._tmp_vectors, self.vectors_path)
+
+    def abort(self):
+        """Descarta lo escrito (error a mitad de camino)"""
+        if self._closed:
+            return
+        self._closed = True
+        self._db.close()
+        self._vectors_file.close()
+        for path in (self._tmp_vectors, self._tmp_table):
+            if path.exists():
+                path.unlink()
+
+
+class EmbeddingArtifact:
+    """Lector de un artefacto: vectores memory-mapped + tabla lateral SQLite"""
+
+    def __init__(self, base: Path):
+        """
+        Args:
+            base: Ruta base o cualquiera de sus archivos (.npy / .sqlite3 / .json)
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy no instalado. pip install numpy")
+
+        self.vectors_path, self.table_path = artifact_paths(base)
+        if not (self.vectors_path.exists() and self.table_path.exists()):
+            raise FileNotFoundError(f"Artefacto de embeddings no encontrado: {self.vectors_path}")
+
+        self.vectors = np.load(self.vectors_path, mmap_mode="r")
+        self._db = sqlite3.connect(f"file:{self.table_path}?mode=ro", uri=True, check_same_thread=False)
+        self.info = {
+            key: json.loads(value)
+            for key, value in self._db.execute("SELECT key, value FROM info")
+        }
+
+        if len(self.vectors) != self.info.get("count"):
+            raise ValueError(f"Artefacto inconsistente: {self.vectors_path}")
+
+    @property
+    def name(self) -> str:
+        return self.vectors_path.name
+
+    @property
+    def dimension(self) -> int:
+        return int(self.vectors.shape[1])
+
+    @property
+    def model(self) -> str:
+        return self.info.get("model", "")
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def close(self):
+        self._db.close()
+        # np.load(mmap_mode) no expone close: soltar la referencia libera el mapa
+        self.vectors = None
+
+    def __enter__(self) -> "EmbeddingArtifact":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _iter_rows(self, batch_size: int = READ_BATCH_ROWS) -> Iterator[Tuple[int, str, Dict]]:
+        """(fila, chunk_id, chunk sin vector), leyendo la tabla por bloques"""
+        start = 0
+        while start < len(self):
+            rows = self._db.execute(
+                "SELECT row, chunk_id, chunk FROM chunks WHERE row >= ? AND row < ? ORDER BY row",
+                (start, start + batch_size)
+            ).fetchall()
+            for row, chunk_id, chunk in rows:
+                yield row, chunk_id, json.loads(chunk)
+            start += batch_size
+
+    def vector(self, row: int) -> "np.ndarray":
+        """Vector de una fila (float32)"""
+        return np.asarray(self.vectors[row], dtype=np.float32)
+
+    def get(self, chunk_id: str) -> Optional[Dict]:
+        """Chunk completo (con "embedding") por id"""
+        found = self._db.execute(
+            "SELECT row, chunk FROM chunks WHERE chunk_id = ? ORDER BY row DESC LIMIT 1", (chunk_id,)
+        ).fetchone()
+        if found is None:
+            return None
+        chunk = json.loads(found[1])
+        chunk["embedding"] = self.vector(found[0]).tolist()
+        return chunk
+
+    def iter_chunks(self) -> Iterator[Dict]:
+        """Chunks con "embedding" como lista, igual que *_embedded.json"""
+        for row, _, chunk in self._iter_rows():
+            chunk["embedding"] = self.vector(row).tolist()
+            yield chunk
+
+    def iter_rows(self) -> Iterator[Tuple[Dict, "np.ndarray"]]:
+        """(chunk sin vector, vector float32) sin convertir el vector a lista"""
+        for row, _, chunk in self._iter_rows():
+            yield chunk, self.vector(row)
+
+    def iter_vectors(self) -> Iterator[Tuple[str, "np.ndarray", Dict]]:
+        """
+        Tuplas (id, vector float32, metadata) listas para indexar,
+        con la misma metadata que chunk_to_vector
+        """
+        from rag.vector_store import chunk_metadata
+
+        for row, chunk_id, chunk in self._iter_rows():
+            yield chunk_id, self.vector(row), chunk_metadata(chunk)
+
+
+def convert_json_file(
+    json_file: Path,
+    dtype: str = DEFAULT_ARTIFACT_DTYPE,
+    remove_json: bool = False
+) -> Dict:
+    """
+    Convierte un *_embedded.json al formato binario
+
+    Args:
+        json_file: Archivo *_embedded.json
+        dtype: dtype de la matriz
+        remove_json: Borrar el JSON tras convertir
+
+    Returns:
+        Resumen de la conversión
+    """
+    json_file = Path(json_file)
+    print(f"📥 Convirtiendo: {json_file.name}")
+
+    with open(json_file, 'r', encoding='utf-8') as f:
+        chunks = json.load(f)
+
+    embedded = [chunk for chunk in chunks if chunk.get("embedding")]
+    skipped = len(chunks) - len(embedded)
+    if not embedded:
+        print(f"   ⚠️  Sin embeddings, se omite")
+        return {"file": str(json_file), "converted": 0, "skipped": skipped}
+
+    dimension = len(embedded[0]["embedding"])
+    model = embedded[0].get("embedding_model")
+
+    with EmbeddingArtifactWriter(json_file, dimension=dimension, dtype=dtype, model=model) as writer:
+        for chunk in embedded:
+            writer.write_chunk(chunk)
+
+    json_bytes = json_file.stat().st_size
+    artifact_bytes = writer.vectors_path.stat().st_size + writer.table_path.stat().st_size
+
+    if remove_json:
+        json_file.unlink()
+
+    print(
+        f"   ✅ {writer.count} vectores: {json_bytes / 1e6:.1f} MB -> {artifact_bytes / 1e6:.1f} MB"
+    )
+    return {
+        "file": str(json_file),
+        "converted": writer.count,
+        "skipped": skipped,
+        "json_bytes": json_bytes,
+        "artifact_bytes": artifact_bytes
+    }
+
+
+def find_embedding_files(embeddings_dir: Path) -> List[Path]:
+    """
+    Archivos de embeddings de un directorio, uno por fuente:
+    el artefacto binario si existe, si no el *_embedded.json
+    """
+    embeddings_dir = Path(embeddings_dir)
+    files = {path.stem: path for path in embeddings_dir.glob("*_embedded.json")}
+    for path in embeddings_dir.glob(f"*_embedded{VECTORS_SUFFIX}"):
+        if artifact_exists(path):
+            files[path.stem] = path
+    return [files[stem] for stem in sorted(files)]
+
+
+def iter_file_chunks(path: Path) -> Iterator[Dict]:
+    """Chunks con embedding de un archivo de embeddings (binario o JSON)"""
+    path = Path(path)
+    if path.suffix == VECTORS_SUFFIX:
+        with EmbeddingArtifact(path) as artifact:
+            yield from artifact.iter_chunks()
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        chunks = json.load(f)
+    for chunk in chunks:
+        if "embedding" in chunk:
+            yield chunk
+
+
+def iter_file_rows(path: Path) -> Iterator[Tuple[Dict, List[float]]]:
+    """(chunk, vector) de un archivo de embeddings (binario o JSON)"""
+    path = Path(path)
+    if path.suffix == VECTORS_SUFFIX:
+        with EmbeddingArtifact(path) as artifact:
+            yield from artifact.iter_rows()
+        return
+
+    for chunk in iter_file_chunks(path):
+        yield chunk, chunk["embedding"]
+
+
+def main():
+    """Convierte los *_embedded.json de un directorio al formato binario"""
+    parser = argparse.ArgumentParser(description="Convierte embeddings JSON al formato binario")
+    parser.add_argument("--embeddings-dir", default="data/embeddings")
+    parser.add_argument("--dtype", choices=["float16", "float32"], default=DEFAULT_ARTIFACT_DTYPE)
+    parser.add_argument("--remove-json", action="store_true", help="Borrar los JSON convertidos")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CONVERSIÓN DE EMBEDDINGS - LEIA")
+    print("=" * 60)
+
+    json_files = sorted(Path(args.embeddings_dir).glob("*_embedded.json"))
+    if not json_files:
+        print(f"⚠️  No se encontraron archivos *_embedded.json en {args.embeddings_dir}")
+        return
+
+    summaries = [convert_json_file(f, dtype=args.dtype, remove_json=args.remove_json) for f in json_files]
+
+    json_bytes = sum(s.get("json_bytes", 0) for s in summaries)
+    artifact_bytes = sum(s.get("artifact_bytes", 0) for s in summaries)
+    print(f"\n✅ {sum(s['converted'] for s in summaries)} vectores convertidos")
+    if artifact_bytes:
+        print(f"💾 {json_bytes / 1e6:.1f} MB -> {artifact_bytes / 1e6:.1f} MB ({json_bytes / artifact_bytes:.1f}x)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Embedding Store - Embeddings direccionados por contenido
+
+Evita volver a generar embeddings de chunks que no cambiaron entre
+corridas del pipeline (ej: solo cambió una ley de la BCN):
+
+- ContentEmbeddingStore: vector por sha256(modelo + dimensiones + texto).
+  El Embedder solo envía a la API los textos que no están en el store.
+- SyncState: qué chunk (id + hash) quedó subido a cada vector store, para
+  que el upsert solo empuje ids nuevos o cambiados y borre los que ya no existen.
+
+Ambos viven en el mismo archivo SQLite (data/embeddings/embedding_store.sqlite3).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+DEFAULT_EMBEDDING_STORE_PATH = "data/embeddings/embedding_store.sqlite3"
+
+
+def content_hash(text: str, model: str, dimensions: int) -> str:
+    """Clave del embedding: sha256(modelo + dimensiones + texto exacto)"""
+    return hashlib.sha256(f"{model}\n{dimensions}\n{text}".encode("utf-8")).hexdigest()
+
+
+def chunk_content_hash(chunk: Dict, model: Optional[str] = None, dimensions: Optional[int] = None) -> str:
+    """
+    Hash de contenido de un chunk ya embebido. Usa el guardado por el
+    Embedder si existe; si no (archivos antiguos), lo calcula.
+    """
+    if chunk.get("content_hash"):
+        return chunk["content_hash"]
+    model = model or chunk.get("embedding_model", "")
+    dimensions = dimensions or chunk.get("embedding_dim") or len(chunk.get("embedding") or [])
+    return content_hash(chunk["text"], model, dimensions)
+
+
+def record_hash(chunk: Dict) -> str:
+    """
+    Hash de lo que se sube al vector store para un chunk: contenido + metadata.
+    Cambia si cambia el texto, el modelo o la metadata indexada.
+    """
+    from rag.vector_store import chunk_metadata
+
+    metadata = json.dumps(chunk_metadata(chunk), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{chunk_content_hash(chunk)}\n{metadata}".encode("utf-8")).hexdigest()
+
+
+class ContentEmbeddingStore:
+    """Vectores por hash de contenido en SQLite"""
+
+    def __init__(self, db_path: Path = Path(DEFAULT_EMBEDDING_STORE_PATH)):
+        """
+        Args:
+            db_path: Archivo SQLite del store
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vector_sync (
+                target TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                record_hash TEXT NOT NULL,
+                source TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (target, chunk_id)
+            )
+            """
+        )
+        self._db.commit()
+
+        # Contadores de la corrida
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Vectores existentes para las claves pedidas"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            # SQLite limita los parámetros por consulta
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, vector in self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ):
+                    found[key] = array("f", vector).tolist()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]], model: str, dimensions: int):
+        """Guarda vectores (clave, vector) calculados por la API"""
+        now = time.time()
+        rows = [(key, model, dimensions, array("f", vector).tobytes(), now) for key, vector in items]
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dimensions, vector, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._db.commit()
+
+    def seed_from_chunks(self, chunks: Iterable[Dict], model: str, dimensions: int) -> int:
+        """
+        Importa vectores de un archivo de embeddings anterior (primera corrida
+        con el store: lo ya embebido no se vuelve a pagar)
+
+        Returns:
+            Vectores importados
+        """
+        items = []
+        for chunk in chunks:
+            embedding = chunk.get("embedding")
+            if not embedding or len(embedding) != dimensions:
+                continue
+            if chunk.get("embedding_model", model) != model:
+                continue
+            items.append((chunk_content_hash(chunk, model, dimensions), embedding))
+
+        if not items:
+            return 0
+
+        existing = set()
+        with self._lock:
+            for start in range(0, len(items), 500):
+                batch = [key for key, _ in items[start:start + 500]]
+                placeholders = ",".join("?" * len(batch))
+                existing.update(
+                    row[0] for row in self._db.execute(
+                        f"SELECT key FROM embeddings WHERE key IN ({placeholders})", batch
+                    )
+                )
+
+        new_items = [(key, vector) for key, vector in items if key not in existing]
+        self.put_many(new_items, model, dimensions)
+        return len(new_items)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Estado de sincronización con vector stores
+    # ------------------------------------------------------------------
+
+    def synced_records(self, target: str) -> Dict[str, Tuple[str, str]]:
+        """chunk_id -> (record_hash, archivo de origen) subidos a `target`"""
+        with self._lock:
+            return {
+                chunk_id: (hash_, source)
+                for chunk_id, hash_, source in self._db.execute(
+                    "SELECT chunk_id, record_hash, source FROM vector_sync WHERE target = ?", (target,)
+                )
+            }
+
+    def mark_synced(self, target: str, records: Iterable[Tuple[str, str, str]]):
+        """Registra (chunk_id, record_hash, origen) como subidos"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vector_sync (target, chunk_id, record_hash, source, synced_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(target, chunk_id, hash_, source, now) for chunk_id, hash_, source in records]
+            )
+            self._db.commit()
+
+    def mark_deleted(self, target: str, chunk_ids: Iterable[str]):
+        """Quita ids borrados del vector store"""
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM vector_sync WHERE target = ? AND chunk_id = ?",
+                [(target, chunk_id) for chunk_id in chunk_ids]
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+
+def diff_chunks(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Compara dos mapas chunk_id -> hash
+
+    Returns:
+        {"added": [...], "changed": [...], "removed": [...], "unchanged": [...]}
+    """
+    return {
+        "added": [cid for cid in current if cid not in previous],
+        "changed": [cid for cid in current if cid in previous and previous[cid] != current[cid]],
+        "removed": [cid for cid in previous if cid not in current],
+        "unchanged": [cid for cid in current if previous.get(cid) == current[cid]],
+    }
+
+
+def print_diff_summary(label: str, diff: Dict[str, List[str]], reused: Optional[int] = None):
+    """Resumen de cambios de una corrida"""
+    line = (
+        f"📋 {label}: +{len(diff['added'])} nuevos, ~{len(diff['changed'])} cambiados, "
+        f"-{len(diff['removed'])} eliminados, ={len(diff['unchanged'])} sin cambios"
+    )
+    if reused is not None:
+        line += f", ♻️  {reused} embeddings reutilizados"
+    print(line)
@@ -0,0 +1,280 @@
+"""
+Pipeline Stages - El pipeline de datos de LEIA como grafo de etapas
+
+    scrape:{fuente} ─┐
+    load:apuntes/{c} ┴→ chunk:{fuente} → embed:{fuente} ─→ upsert
+                                       ├────────────────→ lexical_index
+                                       └────────────────→ chunk_store
+
+Una cadena por fuente (bcn, dt, sernac y cada categoría de apuntes): las
+cadenas son independientes y el runner las ejecuta en paralelo. Lo usan
+run_rag_pipeline.py y train_chatbot.py.
+
+Uso:
+    python -m data_processing.pipeline_stages              # Todo lo que cambió
+    python -m data_processing.pipeline_stages --scrape     # Incluye scrapers
+    python -m data_processing.pipeline_stages --only chunk embed
+    python -m data_processing.pipeline_stages --force      # Ignora las huellas
+"""
+
+import argparse
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from data_processing.chunker import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS
+from data_processing.dag_runner import BLOCKED, DEFAULT_MAX_WORKERS, FAILED, DAGRunner, Stage, StageResult
+from rag.chunk_store import DEFAULT_CHUNK_STORE_PATH
+from rag.embedding_profiles import get_profile
+
+load_dotenv()
+
+STANDARD_SOURCES = ["bcn", "dt", "sernac"]
+APUNTES_CATEGORIES = ["todos", "civil", "procesal", "leyes", "laboral", "familia", "consumidor", "penal"]
+APUNTES_PATTERNS = ["*.pdf", "*.docx", "*.txt", "*.md"]
+
+# En tokens (data_processing/chunker.py)
+CHUNK_SIZE = DEFAULT_MAX_TOKENS
+CHUNK_OVERLAP = DEFAULT_OVERLAP_TOKENS
+
+# Tipos de etapa (prefijo del nombre)
+STAGE_KINDS = ["scrape", "load", "chunk", "embed", "upsert", "lexical_index", "chunk_store"]
+
+# Pasos de train_chatbot / run_rag_pipeline -> tipos de etapa
+PIPELINE_STEPS = {
+    1: ["scrape", "load"],
+    2: ["chunk", "lexical_index", "chunk_store"],
+    3: ["embed"],
+    4: ["upsert"]
+}
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def stage_kind(name: str) -> str:
+    """'embed:bcn' -> 'embed'"""
+    return name.split(":", 1)[0]
+
+
+def shared_embedder():
+    """Un solo Embedder (y embedding store) para todas las etapas embed"""
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            from data_processing.embedder import Embedder
+            _embedder = Embedder()
+        return _embedder
+
+
+def _scrape(source: str):
+    if source == "bcn":
+        from data_collection.bcn_scraper import BCNScraper
+        return len(BCNScraper().scrape_all_priority_laws())
+    if source == "dt":
+        from data_collection.dt_scraper import DTScraper
+        return len(DTScraper().scrape_guias_laborales())
+    from data_collection.sernac_scraper import SERNACScraper
+    return len(SERNACScraper().scrape_consumer_guides())
+
+
+def _load_apuntes(folder: Path, category: str):
+    from data_collection.document_loader import DocumentLoader
+    return len(DocumentLoader(output_dir=str(folder.parent)).process_folder(folder, category))
+
+
+def _chunk(source_dir: Path, processed_dir: Path):
+    from data_processing.text_processor import TextProcessor
+    processor = TextProcessor(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return processor.process_directory(source_dir, processed_dir)
+
+
+def _embed(chunks_file: Path, embeddings_dir: Path):
+    output_file = embeddings_dir / f"{chunks_file.stem}_embedded.json"
+    summary = shared_embedder().process_chunks_file(chunks_file, output_file)
+    if summary["failed_chunks"]:
+        # Sin huella: la próxima corrida reintenta solo los que faltan (el resto está en el store)
+        raise RuntimeError(f"{summary['failed_chunks']} chunks sin embedding")
+    return summary
+
+
+def _upsert(embeddings_dir: Path):
+    from rag.vector_store import VectorStore
+    summary = VectorStore().sync_embeddings(embeddings_dir, verify=True)
+    if summary["vectors_failed"] or summary["verify"]["missing"]:
+        raise RuntimeError(
+            f"{summary['vectors_failed']} vectores fallidos, "
+            f"{len(summary['verify']['missing'])} ids faltantes en el índice"
+        )
+    return summary
+
+
+def _lexical_index(processed_dir: Path, lexical_dir: Path):
+    from rag.lexical_index import LexicalIndex, iter_chunk_documents
+    return LexicalIndex.build(iter_chunk_documents(processed_dir), lexical_dir)
+
+
+def _chunk_store(processed_dir: Path, chunk_store_path: Path):
+    from rag.chunk_store import ChunkStore, iter_store_chunks
+    return ChunkStore.build(iter_store_chunks(processed_dir), chunk_store_path)
+
+
+def build_pipeline(
+    raw_dir: Path = Path("data/raw"),
+    processed_dir: Path = Path("data/processed"),
+    embeddings_dir: Path = Path("data/embeddings"),
+    lexical_dir: Path = Path("data/lexical"),
+    scrape: bool = False,
+    chunk_store_path: Optional[Path] = None
+) -> List[Stage]:
+    """
+    Arma las etapas para las fuentes presentes en raw_dir
+
+    Args:
+        raw_dir / processed_dir / embeddings_dir / lexical_dir: Directorios de datos
+        scrape: Incluir los scrapers (se ejecutan siempre: no hay forma local
+            de saber si la fuente remota cambió)
+        chunk_store_path: Texto completo de los chunks (default: CHUNK_STORE_PATH
+            o data/processed/chunk_store.sqlite3)
+    """
+    stages: List[Stage] = []
+    chunk_stages, embed_stages = [], []
+
+    openai_ready = bool(os.getenv("OPENAI_API_KEY"))
+    profile = get_profile()
+    backend = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+    vector_store_ready = backend == "local" or bool(os.getenv("PINECONE_API_KEY"))
+
+    def add_chain(name: str, source_dir: Path, first_dep: Optional[str]):
+        chunks_file = processed_dir / f"{source_dir.name}_chunks.jsonl"
+        artifact = embeddings_dir / f"{source_dir.name}_chunks_embedded"
+
+        chunk_name = f"chunk:{name}"
+        stages.append(Stage(
+            name=chunk_name,
+            run=lambda: _chunk(source_dir, processed_dir),
+            inputs=[str(source_dir / "*.json")],
+            outputs=[str(chunks_file)],
+            deps=[first_dep] if first_dep else [],
+            params={"chunk_tokens": CHUNK_SIZE, "chunk_overlap_tokens": CHUNK_OVERLAP}
+        ))
+        chunk_stages.append(chunk_name)
+
+        embed_name = f"embed:{name}"
+        stages.append(Stage(
+            name=embed_name,
+            run=lambda: _embed(chunks_file, embeddings_dir),
+            inputs=[str(chunks_file)],
+            outputs=[f"{artifact}.npy", f"{artifact}.sqlite3"],
+            deps=[chunk_name],
+            params={"model": profile.model, "dimensions": profile.dimensions},
+            enabled=openai_ready,
+            disabled_reason="OPENAI_API_KEY no configurada"
+        ))
+        embed_stages.append(embed_name)
+
+    for source in STANDARD_SOURCES:
+        source_dir = raw_dir / source
+        scrape_name = None
+        if scrape:
+            scrape_name = f"scrape:{source}"
+            stages.append(Stage(
+                name=scrape_name,
+                run=lambda source=source: _scrape(source),
+                outputs=[str(source_dir / "*.json")],
+                always_run=True
+            ))
+        if scrape or source_dir.exists():
+            add_chain(source, source_dir, scrape_name)
+
+    for category in APUNTES_CATEGORIES:
+        folder = raw_dir / "apuntes" / category
+        if not folder.exists():
+            continue
+        load_name = f"load:apuntes/{category}"
+        stages.append(Stage(
+            name=load_name,
+            run=lambda folder=folder, category=category: _load_apuntes(folder, category),
+            inputs=[str(folder / pattern) for pattern in APUNTES_PATTERNS],
+            outputs=[str(folder / "*.json")]
+        ))
+        add_chain(f"apuntes/{category}", folder, load_name)
+
+    stages.append(Stage(
+        name="lexical_index",
+        run=lambda: _lexical_index(processed_dir, lexical_dir),
+        inputs=[str(processed_dir / "*_chunks.jsonl"), str(processed_dir / "*_chunks.json")],
+        outputs=[str(lexical_dir)],
+        deps=chunk_stages
+    ))
+
+    chunk_store_path = Path(chunk_store_path or os.getenv("CHUNK_STORE_PATH") or DEFAULT_CHUNK_STORE_PATH)
+    stages.append(Stage(
+        name="chunk_store",
+        run=lambda: _chunk_store(processed_dir, chunk_store_path),
+        inputs=[str(processed_dir / "*_chunks.jsonl"), str(processed_dir / "*_chunks.json")],
+        outputs=[str(chunk_store_path)],
+        deps=chunk_stages
+    ))
+
+    stages.append(Stage(
+        name="upsert",
+        run=lambda: _upsert(embeddings_dir),
+        inputs=[
+            str(embeddings_dir / "*_embedded.npy"),
+            str(embeddings_dir / "*_embedded.sqlite3"),
+            str(embeddings_dir / "*_embedded.json")
+        ],
+        deps=embed_stages,
+        params={"backend": backend, "profile": profile.name},
+        enabled=vector_store_ready,
+        disabled_reason="PINECONE_API_KEY no configurada"
+    ))
+
+    return stages
+
+
+def run_pipeline(
+    kinds: Optional[List[str]] = None,
+    scrape: bool = False,
+    force: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS
+) -> List[StageResult]:
+    """
+    Ejecuta el pipeline (o solo las etapas de los tipos indicados)
+
+    Args:
+        kinds: Tipos de etapa a ejecutar (ver STAGE_KINDS); None = todas
+        scrape: Incluir los scrapers
+        force: Ejecutar aunque las huellas no hayan cambiado
+        max_workers: Etapas en paralelo
+    """
+    stages = build_pipeline(scrape=scrape)
+    only = None
+    if kinds is not None:
+        only = [stage.name for stage in stages if stage_kind(stage.name) in kinds]
+    return DAGRunner(stages, max_workers=max_workers, force=force).run(only=only)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline de datos de LEIA con etapas incrementales")
+    parser.add_argument("--scrape", action="store_true", help="Incluir los scrapers (BCN, DT, SERNAC)")
+    parser.add_argument("--only", nargs="*", choices=STAGE_KINDS, help="Solo estos tipos de etapa")
+    parser.add_argument("--force", action="store_true", help="Ejecutar aunque nada haya cambiado")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Etapas en paralelo")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("PIPELINE DE DATOS - LEIA")
+    print("=" * 60)
+
+    results = run_pipeline(kinds=args.only, scrape=args.scrape, force=args.force, max_workers=args.workers)
+    failed = [result for result in results if result.status in (FAILED, BLOCKED)]
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
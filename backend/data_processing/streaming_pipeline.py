@@ -0,0 +1,428 @@
+"""
+Streaming Pipeline - Ingesta de punta a punta sin cargar el corpus en memoria
+
+    documentos → chunks → embeddings → vector store
+
+Cada etapa corre como una tarea asyncio y se conecta con la siguiente por
+una cola acotada: si el embedding o el upsert se atrasan, la carga y el
+chunking se detienen (backpressure) en vez de acumular el corpus. Mientras
+una tanda espera a la API de embeddings, la siguiente ya se está
+chunkeando y la anterior subiendo al vector store.
+
+Artefactos (mismos nombres que el pipeline por pasos, así los demás
+scripts los siguen encontrando):
+- data/processed/{fuente}_chunks.jsonl          un chunk por línea
+- data/embeddings/{fuente}_chunks_embedded.npy  artefacto binario (+ .sqlite3)
+
+Incremental: los vectores ya pagados salen del embedding store y al vector
+store solo van los chunks nuevos o cambiados; los que desaparecieron de la
+fuente se borran.
+
+Uso:
+    python -m data_processing.streaming_pipeline
+    python -m data_processing.streaming_pipeline --sources bcn dt --skip-upsert
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from data_processing.embedder import Embedder
+from data_processing.embedding_artifact import EmbeddingArtifactWriter
+from data_processing.embedding_store import content_hash, record_hash
+from data_processing.text_processor import TextProcessor
+
+load_dotenv()
+
+STANDARD_SOURCES = ["bcn", "dt", "sernac"]
+APUNTES_CATEGORIES = ["todos", "civil", "procesal", "leyes", "laboral", "familia", "consumidor", "penal"]
+
+# Documentos en cola entre la carga y el chunking (un PDF puede ser grande)
+DEFAULT_DOCUMENT_QUEUE_SIZE = 4
+# Chunks en cola entre etapas
+DEFAULT_QUEUE_SIZE = 512
+# Chunks por tanda enviada al motor de embeddings
+DEFAULT_EMBED_BATCH = 512
+# Vectores por llamada a VectorStore.upsert_vectors
+DEFAULT_UPSERT_BATCH = 1000
+
+# Fin de stream entre etapas
+_DONE = object()
+
+Document = Tuple[str, Dict]
+
+
+def iter_json_documents(source_dir: Path) -> Iterator[Document]:
+    """JSONs de los scrapers (o de DocumentLoader), de a uno"""
+    for json_file in sorted(Path(source_dir).glob("*.json")):
+        with open(json_file, 'r', encoding='utf-8') as f:
+            yield json_file.stem, json.load(f)
+
+
+def iter_apuntes_documents(category_dir: Path, category: str) -> Iterator[Document]:
+    """Apuntes (PDF, Word, texto) cargados directamente con DocumentLoader"""
+    from data_collection.document_loader import DocumentLoader
+
+    loader = DocumentLoader(output_dir=str(category_dir.parent))
+    for file_path, doc in loader.iter_folder(category_dir, category):
+        yield file_path.stem, doc
+
+
+def discover_sources(raw_dir: Path, names: Optional[List[str]] = None) -> List[Tuple[str, Iterator[Document]]]:
+    """
+    Fuentes a ingerir: (nombre, documentos). Los iteradores son perezosos:
+    ningún documento se lee hasta que el pipeline lo pide.
+    """
+    sources = []
+
+    for name in STANDARD_SOURCES:
+        source_dir = raw_dir / name
+        if (names is None or name in names) and source_dir.exists():
+            sources.append((name, iter_json_documents(source_dir)))
+
+    for category in APUNTES_CATEGORIES:
+        category_dir = raw_dir / "apuntes" / category
+        if (names is None or category in names or "apuntes" in names) and category_dir.exists():
+            sources.append((category, iter_apuntes_documents(category_dir, category)))
+
+    return sources
+
+
+class StreamingPipeline:
+    """Carga → chunking → embeddings → upsert como etapas concurrentes con colas acotadas"""
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        vector_store=None,
+        processor: Optional[TextProcessor] = None,
+        processed_dir: Path = Path("data/processed"),
+        embeddings_dir: Path = Path("data/embeddings"),
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        embed_batch: int = DEFAULT_EMBED_BATCH,
+        upsert_batch: int = DEFAULT_UPSERT_BATCH
+    ):
+        """
+        Args:
+            embedder: Configuración de embeddings (modelo, API, embedding store)
+            vector_store: VectorStore destino (None = solo generar artefactos)
+            processor: TextProcessor para el chunking
+            processed_dir: Salida de los *_chunks.jsonl
+            embeddings_dir: Salida de los artefactos de embeddings
+            queue_size: Chunks máximos en cada cola entre etapas
+            embed_batch: Chunks por tanda de embeddings
+            upsert_batch: Vectores por tanda de upsert
+        """
+        if embedder.store is None:
+            raise ValueError("El pipeline en streaming requiere un embedding store (incremental=True)")
+
+        self.embedder = embedder
+        self.store = embedder.store
+        self.vector_store = vector_store
+        self.processor = processor or TextProcessor()
+        self.processed_dir = Path(processed_dir)
+        self.embeddings_dir = Path(embeddings_dir)
+        self.queue_size = queue_size
+        self.embed_batch = embed_batch
+        self.upsert_batch = upsert_batch
+
+        # Con un índice que se reconstruye en cada escritura (local) conviene
+        # una sola sincronización al final en vez de un upsert por tanda
+        self.stream_upserts = vector_store is not None and not vector_store.backend.rebuilds_on_write
+
+    # ------------------------------------------------------------------
+    # Etapas
+    # ------------------------------------------------------------------
+
+    async def _load_stage(self, documents: Iterable[Document], out: asyncio.Queue, stats: Dict):
+        """Lee documentos en un hilo (PDFs y JSONs grandes no bloquean el event loop)"""
+        iterator = iter(documents)
+        while True:
+            document = await asyncio.to_thread(next, iterator, _DONE)
+            if document is _DONE:
+                break
+            stats["documents"] += 1
+            await out.put(document)
+        await out.put(_DONE)
+
+    async def _chunk_stage(self, inp: asyncio.Queue, out: asyncio.Queue, chunks_file, stats: Dict):
+        """Chunkea cada documento y escribe sus chunks al JSONL a medida que salen"""
+        while True:
+            document = await inp.get()
+            if document is _DONE:
+                break
+            source_id, data = document
+            chunks = await asyncio.to_thread(self.processor.process_law_data, data, source_id)
+            for chunk in chunks:
+                chunks_file.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                stats["chunks"] += 1
+                await out.put(chunk)
+        await out.put(_DONE)
+
+    async def _embed_batch(self, batch: List[Dict], writer: EmbeddingArtifactWriter, out: asyncio.Queue, stats: Dict):
+        model, dimensions = self.embedder.model, self.embedder.embedding_dim
+        keys = [content_hash(chunk["text"], model, dimensions) for chunk in batch]
+        vectors = self.store.get_many(keys)
+        stats["reused"] += sum(1 for key in keys if key in vectors)
+
+        pending = {}
+        for chunk, key in zip(batch, keys):
+            if key not in vectors:
+                pending.setdefault(key, chunk["text"])
+
+        # Perfil reducido: derivar de los vectores completos ya pagados
+        derived = self.embedder.reduce_native_vectors(pending)
+        if derived:
+            vectors.update(derived)
+            stats["reused"] += sum(1 for key in keys if key in derived)
+            pending = {key: text for key, text in pending.items() if key not in derived}
+        if pending:
+            stats["embedded"] += len(pending)
+            vectors.update(await self.embedder.embed_pending_async(list(pending.items())))
+
+        for chunk, key in zip(batch, keys):
+            vector = vectors.get(key)
+            if not vector:
+                stats["failed"] += 1
+                print(f"   ⚠️  Falló chunk: {chunk.get('chunk_id', 'unknown')}")
+                continue
+            self.embedder.annotate_chunk(chunk, key)
+            writer.write(chunk, vector)
+            await out.put((chunk, vector))
+
+    async def _embed_stage(self, inp: asyncio.Queue, out: asyncio.Queue, writer: EmbeddingArtifactWriter, stats: Dict):
+        """Junta tandas de chunks, embebe solo los que no están en el store y escribe el artefacto"""
+        batch: List[Dict] = []
+        while True:
+            chunk = await inp.get()
+            if chunk is _DONE:
+                break
+            batch.append(chunk)
+            if len(batch) >= self.embed_batch:
+                await self._embed_batch(batch, writer, out, stats)
+                batch = []
+        if batch:
+            await self._embed_batch(batch, writer, out, stats)
+        await out.put(_DONE)
+
+    async def _upsert_stage(self, inp: asyncio.Queue, source_file: str, stats: Dict):
+        """Sube al vector store los chunks nuevos o cambiados y borra los que ya no existen"""
+        if not self.stream_upserts:
+            while await inp.get() is not _DONE:
+                pass
+            return
+
+        from rag.vector_store import chunk_metadata
+
+        target = self.vector_store.backend.sync_target
+        # Solo ids y hashes (no vectores): lo subido en corridas anteriores
+        synced = self.store.synced_records(target)
+        seen = {}
+        batch = []
+
+        async def flush():
+            hashes = {chunk_id: seen[chunk_id] for chunk_id, _, _ in batch}
+            result = await asyncio.to_thread(
+                self.vector_store.upsert_vectors,
+                list(batch),
+                lambda ids: self.store.mark_synced(target, [(vid, hashes[vid], source_file) for vid in ids])
+            )
+            stats["upserted"] += result["upserted_count"]
+            stats["upsert_failed"] += result["failed_count"]
+            batch.clear()
+
+        while True:
+            item = await inp.get()
+            if item is _DONE:
+                break
+            chunk, vector = item
+            chunk_id = chunk["chunk_id"]
+            seen[chunk_id] = record_hash(chunk)
+            if synced.get(chunk_id, (None,))[0] == seen[chunk_id]:
+                stats["unchanged"] += 1
+                continue
+            batch.append((chunk_id, vector, chunk_metadata(chunk)))
+            if len(batch) >= self.upsert_batch:
+                await flush()
+        if batch:
+            await flush()
+
+        removed = [
+            chunk_id for chunk_id, (_, source) in synced.items()
+            if source == source_file and chunk_id not in seen
+        ]
+        if removed:
+            print(f"🗑️  Borrando {len(removed)} vectores que ya no existen...")
+            deleted = await asyncio.to_thread(self.vector_store.backend.delete, removed)
+            if deleted == len(removed):
+                self.store.mark_deleted(target, removed)
+            stats["deleted"] += deleted
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    async def run_source(self, name: str, documents: Iterable[Document]) -> Dict:
+        """
+        Ingiere una fuente completa en streaming
+
+        Args:
+            name: Nombre de la fuente (prefijo de los artefactos)
+            documents: Iterable de (source_id, documento)
+
+        Returns:
+            Resumen con conteos por etapa
+        """
+        print(f"\n🌊 Ingesta en streaming: {name}")
+        start = time.perf_counter()
+
+        self.processed_dir.mkdir(parents=True, exist_ok=True)
+        self.embeddings_dir.mkdir(parents=True, exist_ok=True)
+        chunks_path = self.processed_dir / f"{name}_chunks.jsonl"
+        chunks_tmp = chunks_path.with_suffix(".jsonl.tmp")
+
+        writer = EmbeddingArtifactWriter(
+            self.embeddings_dir / f"{name}_chunks_embedded",
+            dimension=self.embedder.embedding_dim,
+            dtype=self.embedder.artifact_dtype,
+            model=self.embedder.model
+        )
+
+        stats = {
+            "source": name, "documents": 0, "chunks": 0, "embedded": 0, "reused": 0, "failed": 0,
+            "upserted": 0, "upsert_failed": 0, "unchanged": 0, "deleted": 0
+        }
+        documents_queue = asyncio.Queue(maxsize=DEFAULT_DOCUMENT_QUEUE_SIZE)
+        chunks_queue = asyncio.Queue(maxsize=self.queue_size)
+        vectors_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        try:
+            with open(chunks_tmp, 'w', encoding='utf-8') as chunks_file:
+                tasks = [
+                    asyncio.create_task(self._load_stage(documents, documents_queue, stats)),
+                    asyncio.create_task(self._chunk_stage(documents_queue, chunks_queue, chunks_file, stats)),
+                    asyncio.create_task(self._embed_stage(chunks_queue, vectors_queue, writer, stats)),
+                    asyncio.create_task(self._upsert_stage(vectors_queue, writer.vectors_path.name, stats)),
+                ]
+                try:
+                    await asyncio.gather(*tasks)
+                except BaseException:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    raise
+        except BaseException:
+            writer.abort()
+            chunks_tmp.unlink(missing_ok=True)
+            raise
+
+        writer.close()
+        chunks_tmp.replace(chunks_path)
+
+        stats["seconds"] = time.perf_counter() - start
+        stats["chunks_file"] = str(chunks_path)
+        stats["embeddings_file"] = str(writer.vectors_path)
+        print(
+            f"✅ {name}: {stats['documents']} documentos, {stats['chunks']} chunks, "
+            f"{stats['embedded']} embebidos (♻️  {stats['reused']} reutilizados), "
+            f"{stats['upserted']} subidos, {stats['deleted']} borrados en {stats['seconds']:.1f}s"
+        )
+        return stats
+
+    async def run(self, sources: List[Tuple[str, Iterable[Document]]]) -> List[Dict]:
+        """Ingiere varias fuentes; con un índice local sincroniza una vez al final"""
+        summaries = []
+        for name, documents in sources:
+            summaries.append(await self.run_source(name, documents))
+
+        if self.vector_store is not None and not self.stream_upserts:
+            self.vector_store.sync_embeddings(self.embeddings_dir, store=self.store)
+
+        return summaries
+
+
+def ingest(
+    raw_dir: Path = Path("data/raw"),
+    names: Optional[List[str]] = None,
+    upsert: bool = True,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    embed_batch: int = DEFAULT_EMBED_BATCH
+) -> List[Dict]:
+    """Ingesta en streaming de las fuentes de raw_dir con la configuración de .env"""
+    vector_store = None
+    if upsert:
+        from rag.vector_store import VectorStore
+        vector_store = VectorStore()
+
+    pipeline = StreamingPipeline(
+        Embedder(),
+        vector_store=vector_store,
+        queue_size=queue_size,
+        embed_batch=embed_batch
+    )
+
+    sources = discover_sources(Path(raw_dir), names)
+    if not sources:
+        print(f"\n⚠️  No se encontraron fuentes en {raw_dir}")
+        return []
+
+    summaries = asyncio.run(pipeline.run(sources))
+
+    # El índice solo guarda el comienzo del texto: el chunk store tiene que reflejar los chunks nuevos
+    from rag.chunk_store import DEFAULT_CHUNK_STORE_PATH, ChunkStore, iter_store_chunks
+    chunk_store_path = Path(os.getenv("CHUNK_STORE_PATH") or DEFAULT_CHUNK_STORE_PATH)
+    manifest = ChunkStore.build(iter_store_chunks(pipeline.processed_dir), chunk_store_path)
+    print(f"✅ Chunk store actualizado: {manifest['count']} chunks ({chunk_store_path})")
+
+    return summaries
+
+
+def main():
+    """Ejecuta la ingesta en streaming para las fuentes de data/raw"""
+    parser = argparse.ArgumentParser(description="Ingesta en streaming: documentos → chunks → embeddings → vector store")
+    parser.add_argument("--sources", nargs="*", help="Fuentes a procesar (default: todas); 'apuntes' incluye todas las categorías")
+    parser.add_argument("--raw-dir", default="data/raw")
+    parser.add_argument("--skip-upsert", action="store_true", help="Solo generar chunks y embeddings")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--embed-batch", type=int, default=DEFAULT_EMBED_BATCH)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("STREAMING PIPELINE - LEIA")
+    print("=" * 60)
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("\n❌ ERROR: OPENAI_API_KEY no configurada")
+        print("=" * 60)
+        return
+
+    summaries = ingest(
+        Path(args.raw_dir),
+        names=args.sources,
+        upsert=not args.skip_upsert,
+        queue_size=args.queue_size,
+        embed_batch=args.embed_batch
+    )
+    if not summaries:
+        return
+
+    print("\n" + "=" * 60)
+    print("📊 RESUMEN FINAL")
+    print("=" * 60)
+    for summary in summaries:
+        print(
+            f"  • {summary['source']}: {summary['chunks']} chunks, {summary['embedded']} embebidos, "
+            f"{summary['upserted']} subidos"
+        )
+    print(f"\nTotal chunks: {sum(s['chunks'] for s in summaries)}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,27 +3,58 @@ Text Processor - Limpia y prepara textos legales para el RAG system
 
 - Normaliza textos
 - Elimina caracteres innecesarios
-- Divide en chunks apropiados para embeddings
+- Divide en chunks por tokens respetando artículos, incisos y encabezados
+  (data_processing/chunker.py)
 - Mantiene contexto legal importante
+
+Los chunks se escriben en JSONL (un chunk por línea), en streaming: ni el
+procesador ni quien los lee necesita tener todos los chunks en memoria.
 """
 
 import re
 import json
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
 
+from data_processing.chunker import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, Chunker, print_histogram
+
+
+def iter_chunks_file(path: Path) -> Iterator[Dict]:
+    """
+    Lee un archivo de chunks: *_chunks.jsonl de a una línea, o el
+    *_chunks.json antiguo (un arreglo JSON completo)
+    """
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def find_chunk_files(input_dir: Path) -> List[Path]:
+    """Archivos de chunks de un directorio; si hay .jsonl y .json del mismo nombre, gana el .jsonl"""
+    files = {path.stem: path for path in Path(input_dir).glob("*_chunks.json")}
+    for path in Path(input_dir).glob("*_chunks.jsonl"):
+        files[path.stem] = path
+    return sorted(files.values())
+
+
 class TextProcessor:
     """Procesador de textos legales para RAG"""
 
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = DEFAULT_MAX_TOKENS, chunk_overlap: int = DEFAULT_OVERLAP_TOKENS):
         """
         Args:
-            chunk_size: Tamaño máximo de cada chunk en caracteres
-            chunk_overlap: Solapamiento entre chunks para mantener contexto
+            chunk_size: Tamaño máximo de cada chunk en tokens
+            chunk_overlap: Tokens de solapamiento entre chunks para mantener contexto
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunker = Chunker(max_tokens=chunk_size, overlap_tokens=chunk_overlap)
 
     def clean_text(self, text: str) -> str:
         """
@@ -47,105 +78,41 @@ class TextProcessor:
 
         return text
 
-    def chunk_text(self, text: str, metadata: Dict) -> List[Dict]:
-        """
-        Divide texto en chunks apropiados para embeddings
-
-        Estrategia:
-        1. Intenta dividir por párrafos completos
-        2. Si un párrafo es muy largo, divide por oraciones
-        3. Mantiene solapamiento para contexto
-        """
-        text = self.clean_text(text)
-
-        # Dividir por doble salto de línea (párrafos)
-        paragraphs = text.split('\n\n')
-
+    def _make_chunks(self, text: str, metadata: Dict) -> List[Dict]:
+        """Chunks (sin ids) de un texto con su metadata"""
         chunks = []
-        current_chunk = ""
-        current_size = 0
-
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
-                continue
-
-            paragraph_size = len(paragraph)
-
-            # Si el párrafo cabe en el chunk actual
-            if current_size + paragraph_size + 2 <= self.chunk_size:
-                if current_chunk:
-                    current_chunk += "\n\n" + paragraph
-                    current_size += paragraph_size + 2
-                else:
-                    current_chunk = paragraph
-                    current_size = paragraph_size
-            else:
-                # Guardar chunk actual si tiene contenido
-                if current_chunk:
-                    chunks.append({
-                        "text": current_chunk,
-                        "size": current_size,
-                        "metadata": metadata.copy()
-                    })
-
-                # Si el párrafo es muy grande, dividirlo por oraciones
-                if paragraph_size > self.chunk_size:
-                    sentences = self._split_sentences(paragraph)
-                    temp_chunk = ""
-                    temp_size = 0
-
-                    for sentence in sentences:
-                        sentence_size = len(sentence)
-
-                        if temp_size + sentence_size + 1 <= self.chunk_size:
-                            if temp_chunk:
-                                temp_chunk += " " + sentence
-                                temp_size += sentence_size + 1
-                            else:
-                                temp_chunk = sentence
-                                temp_size = sentence_size
-                        else:
-                            if temp_chunk:
-                                chunks.append({
-                                    "text": temp_chunk,
-                                    "size": temp_size,
-                                    "metadata": metadata.copy()
-                                })
-                            temp_chunk = sentence
-                            temp_size = sentence_size
-
-                    if temp_chunk:
-                        current_chunk = temp_chunk
-                        current_size = temp_size
-                else:
-                    current_chunk = paragraph
-                    current_size = paragraph_size
-
-        # Agregar último chunk
-        if current_chunk:
+        for chunk_text, tokens, heading in self.chunker.split(self.clean_text(text)):
+            chunk_metadata = metadata.copy()
+            if heading:
+                chunk_metadata["section"] = heading
             chunks.append({
-                "text": current_chunk,
-                "size": current_size,
-                "metadata": metadata.copy()
+                "text": chunk_text,
+                "size": len(chunk_text),
+                "tokens": tokens,
+                "metadata": chunk_metadata
             })
+        return chunks
 
-        # Agregar IDs y números de chunk
+    @staticmethod
+    def _number_chunks(chunks: List[Dict], source_id: str) -> List[Dict]:
+        """IDs y números de chunk, correlativos en todo el documento"""
         for idx, chunk in enumerate(chunks):
-            chunk["chunk_id"] = f"{metadata.get('source_id', 'unknown')}_{idx}"
+            chunk["chunk_id"] = f"{source_id}_{idx}"
             chunk["chunk_number"] = idx + 1
             chunk["total_chunks"] = len(chunks)
-
         return chunks
 
-    def _split_sentences(self, text: str) -> List[str]:
-        """Divide texto en oraciones"""
-        # Patrón para detectar fin de oración
-        # Busca punto seguido de espacio y mayúscula, o punto final
-        pattern = r'(?<=[.!?])\s+(?=[A-ZÁÉÍÓÚÑ])|(?<=[.!?])$'
+    def chunk_text(self, text: str, metadata: Dict) -> List[Dict]:
+        """
+        Divide texto en chunks apropiados para embeddings
 
-        sentences = re.split(pattern, text)
-        return [s.strip() for s in sentences if s.strip()]
+        Estrategia (ver Chunker):
+        1. Encabezados (Título, Capítulo, Artículo) abren un chunk nuevo
+        2. Agrupa incisos/párrafos completos hasta el máximo de tokens
+        3. Si un párrafo excede el máximo, lo divide por oraciones
+        4. Solapa unidades completas entre chunks de la misma sección
+        """
+        return self._number_chunks(self._make_chunks(text, metadata), metadata.get('source_id', 'unknown'))
 
     def process_law_file(self, input_file: Path) -> List[Dict]:
         """
@@ -160,12 +127,26 @@ class TextProcessor:
         with open(input_file, 'r', encoding='utf-8') as f:
             law_data = json.load(f)
 
+        return self.process_law_data(law_data, input_file.stem)
+
+    def process_law_data(self, law_data: Dict, source_id: str) -> List[Dict]:
+        """
+        Genera los chunks de un documento ya cargado (JSON de scraper o
+        documento de DocumentLoader)
+
+        Args:
+            law_data: Documento con "articles" o "content"
+            source_id: Identificador del documento (prefijo de los chunk_id)
+
+        Returns:
+            Lista de chunks procesados con metadata
+        """
         all_chunks = []
 
         # Metadata base
         base_metadata = {
             "source": law_data.get("source", "Unknown"),
-            "source_id": input_file.stem,
+            "source_id": source_id,
             "law_name": law_data.get("law_name") or law_data.get("title"),
             "category": law_data.get("category"),
             "url": law_data.get("url"),
@@ -173,7 +154,7 @@ class TextProcessor:
             "processed_at": datetime.now().isoformat()
         }
 
-        # Procesar artículos (si existen)
+        # Procesar artículos (si existen): cada artículo es un límite de chunk
         if "articles" in law_data:
             for article in law_data["articles"]:
                 article_text = article.get("content", "")
@@ -181,16 +162,14 @@ class TextProcessor:
                 article_metadata["article_number"] = article.get("article_number")
                 article_metadata["type"] = "article"
 
-                chunks = self.chunk_text(article_text, article_metadata)
-                all_chunks.extend(chunks)
+                all_chunks.extend(self._make_chunks(article_text, article_metadata))
 
         # Procesar contenido general (guías, etc.)
         elif "content" in law_data:
-            content_text = law_data["content"]
-            chunks = self.chunk_text(content_text, base_metadata)
-            all_chunks.extend(chunks)
+            all_chunks.extend(self._make_chunks(law_data["content"], base_metadata))
 
-        return all_chunks
+        # IDs correlativos en todo el documento (no por artículo: evita colisiones)
+        return self._number_chunks(all_chunks, source_id)
 
     def process_directory(self, input_dir: Path, output_dir: Path) -> Dict:
         """
@@ -205,35 +184,51 @@ class TextProcessor:
         """
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        json_files = list(input_dir.glob("*.json"))
-        all_chunks = []
+        json_files = sorted(input_dir.glob("*.json"))
 
         print(f"\n📂 Procesando {len(json_files)} archivos desde {input_dir}...\n")
 
-        for json_file in json_files:
-            print(f"📄 Procesando: {json_file.name}")
-
-            chunks = self.process_law_file(json_file)
-            all_chunks.extend(chunks)
-
-            print(f"   ✅ {len(chunks)} chunks generados")
-
-        # Guardar todos los chunks en un archivo
-        output_file = output_dir / f"{input_dir.name}_chunks.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_chunks, f, ensure_ascii=False, indent=2)
-
-        print(f"\n✅ Total chunks procesados: {len(all_chunks)}")
+        # Streaming: los chunks de cada archivo se escriben y se descartan
+        output_file = output_dir / f"{input_dir.name}_chunks.jsonl"
+        tmp_file = output_file.with_suffix(".jsonl.tmp")
+        total_chunks = 0
+        total_size = 0
+        token_counts = []
+        categories = set()
+        sources = set()
+
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for json_file in json_files:
+                print(f"📄 Procesando: {json_file.name}")
+
+                chunks = self.process_law_file(json_file)
+                for chunk in chunks:
+                    f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                    total_size += chunk["size"]
+                    token_counts.append(chunk["tokens"])
+                    sources.add(chunk["metadata"]["source"])
+                    if chunk["metadata"].get("category"):
+                        categories.add(chunk["metadata"]["category"])
+                total_chunks += len(chunks)
+
+                print(f"   ✅ {len(chunks)} chunks generados")
+
+        tmp_file.replace(output_file)
+
+        print(f"\n✅ Total chunks procesados: {total_chunks}")
         print(f"💾 Guardados en: {output_file}")
+        print_histogram(token_counts, f"Tokens por chunk ({input_dir.name})")
 
         # Resumen
         summary = {
-            "total_chunks": len(all_chunks),
+            "total_chunks": total_chunks,
             "input_files": len(json_files),
             "output_file": str(output_file),
-            "avg_chunk_size": sum(c["size"] for c in all_chunks) / len(all_chunks) if all_chunks else 0,
-            "categories": list(set(c["metadata"]["category"] for c in all_chunks if c["metadata"].get("category"))),
-            "sources": list(set(c["metadata"]["source"] for c in all_chunks))
+            "avg_chunk_size": total_size / total_chunks if total_chunks else 0,
+            "avg_chunk_tokens": sum(token_counts) / total_chunks if total_chunks else 0,
+            "max_chunk_tokens": max(token_counts, default=0),
+            "categories": sorted(categories),
+            "sources": sorted(sources)
         }
 
         return summary
@@ -245,7 +240,7 @@ def main():
     print("TEXT PROCESSOR - JUSTICIAAI")
     print("=" * 60)
 
-    processor = TextProcessor(chunk_size=1000, chunk_overlap=200)
+    processor = TextProcessor()
 
     # Directorios a procesar
     base_dir = Path("data/raw")
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, Depends, status, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 from sqlalchemy.orm import Session
@@ -12,13 +12,15 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
-# RAG imports
-try:
-    from rag.rag_engine import create_rag_engine
-    RAG_AVAILABLE = True
-except ImportError:
-    RAG_AVAILABLE = False
-    print("ℹ️  RAG module not available")
+# RAG: servicio de recuperación compartido (se inicializa en startup)
+from services.retrieval_service import (
+    get_retrieval_service, init_retrieval_service, shutdown_retrieval_service
+)
+from rag.async_engine import get_async_anthropic_client, close_async_clients, stream_claude
+from rag.rag_engine import RAGEngine, CLAUDE_MODEL
+from services.history_compactor import get_history_compactor
+from services.legal_categories import QUICK_QUESTIONS
+from utils.sse import format_sse, SSE_HEADERS, SSE_MEDIA_TYPE
 
 # Rate limiting imports
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -48,6 +50,7 @@ from routers import messages as messages_router
 from routers import notifications as notifications_router
 from routers import calls as calls_router
 from routers import oauth as oauth_router
+from routers import rag as rag_router
 
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
@@ -73,12 +76,19 @@ app.include_router(messages_router.router)
 app.include_router(notifications_router.router)
 app.include_router(calls_router.router)
 app.include_router(oauth_router.router)
+app.include_router(rag_router.router)
 
-# Initialize database on startup
+# Initialize database and RAG on startup
 @app.on_event("startup")
 async def startup_event():
     init_db()
     print("✅ Database initialized")
+    init_retrieval_service()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_retrieval_service()
+    await close_async_clients()
 
 # CORS Configuration
 app.add_middleware(
@@ -98,22 +108,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Anthropic Client
+# Anthropic Client (async, con pool HTTP compartido): se obtiene por request con
+# get_async_anthropic_client(), así un shutdown (que cierra el pool) no deja un
+# cliente cerrado en un global
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 if not ANTHROPIC_API_KEY:
     print("⚠️  WARNING: ANTHROPIC_API_KEY not set. Chat will not work.")
-    client = None
-else:
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-
-# RAG Engine - Para respuestas con legislación chilena real
-rag_engine = None
-if RAG_AVAILABLE:
-    rag_engine = create_rag_engine()
-    if rag_engine:
-        print("✅ RAG Engine initialized - Chat will use Chilean legal knowledge")
-    else:
-        print("ℹ️  RAG Engine not configured - Chat will use base Claude knowledge")
 
 # Validation constants
 MAX_MESSAGE_LENGTH = 5000
@@ -159,6 +159,7 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     tokens_used: Optional[int] = None
+    history_tokens_saved: Optional[int] = None  # Tokens de entrada evitados al resumir turnos antiguos
 
 
 class FeedbackRequest(BaseModel):
@@ -565,6 +566,7 @@ async def chat(request: Request, chat_request: ChatRequest):
 
     Si RAG está configurado, enriquece las respuestas con legislación chilena real.
     """
+    client = get_async_anthropic_client()
     if not client:
         raise HTTPException(
             status_code=500,
@@ -572,16 +574,9 @@ async def chat(request: Request, chat_request: ChatRequest):
         )
 
     try:
-        # Construir el historial de mensajes para Claude
-        messages = []
-
-        # Agregar historial previo
-        for msg in chat_request.conversation_history:
-            if msg.role in ['user', 'assistant']:
-                messages.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
+        # Historial previo: últimos turnos completos + resumen de los anteriores
+        history = get_history_compactor().compact(chat_request.conversation_history, CLAUDE_MODEL)
+        messages = list(history.messages)
 
         # Agregar el mensaje actual del usuario
         messages.append({
@@ -593,14 +588,15 @@ async def chat(request: Request, chat_request: ChatRequest):
         enhanced_system_prompt = SYSTEM_PROMPT
         rag_sources = []
 
-        if rag_engine:
+        retrieval = get_retrieval_service()
+        if retrieval.enabled:
             try:
                 # Buscar contexto legal relevante
-                relevant_docs = rag_engine.retrieve_context(chat_request.message)
+                relevant_docs = await retrieval.aretrieve(chat_request.message)
 
                 if relevant_docs:
                     # Construir contexto con los documentos encontrados
-                    context = rag_engine.build_context_prompt(relevant_docs)
+                    context = retrieval.build_context_prompt(relevant_docs)
 
                     # Enriquecer el prompt con el contexto legal
                     enhanced_system_prompt = f"""{SYSTEM_PROMPT}
@@ -628,9 +624,11 @@ INSTRUCCIONES ESPECIALES RAG:
                 # Si RAG falla, continuar sin él
                 print(f"⚠️  RAG error (continuing without): {rag_error}")
 
+        enhanced_system_prompt += history.system_section()
+
         # Llamar a Claude API
-        response = client.messages.create(
-            model="claude-3-haiku-20240307",
+        response = await client.messages.create(
+            model=CLAUDE_MODEL,
             max_tokens=1024,
             system=enhanced_system_prompt,
             messages=messages
@@ -641,7 +639,8 @@ INSTRUCCIONES ESPECIALES RAG:
 
         return ChatResponse(
             response=assistant_message,
-            tokens_used=response.usage.input_tokens + response.usage.output_tokens
+            tokens_used=response.usage.input_tokens + response.usage.output_tokens,
+            history_tokens_saved=history.tokens_saved
         )
 
     except anthropic.APIError as e:
@@ -649,21 +648,56 @@ INSTRUCCIONES ESPECIALES RAG:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error inesperado: {str(e)}")
 
+@app.post("/api/chat/stream")
+@limiter.limit("20/minute")
+async def chat_stream(request: Request, chat_request: ChatRequest):
+    """
+    Versión streaming (Server-Sent Events) de /api/chat.
+
+    Eventos: sources (fuentes RAG), token (fragmentos de la respuesta),
+    done (tokens usados y ahorrados al resumir el historial) y error.
+    """
+    client = get_async_anthropic_client()
+    if not client:
+        raise HTTPException(
+            status_code=500,
+            detail="Anthropic API no está configurada. Por favor configura ANTHROPIC_API_KEY en el archivo .env"
+        )
+
+    history = get_history_compactor().compact(chat_request.conversation_history, CLAUDE_MODEL)
+
+    # Buscar contexto legal relevante antes de empezar a emitir
+    retrieval = get_retrieval_service()
+    relevant_docs = await retrieval.aretrieve(chat_request.message) if retrieval.enabled else []
+    system_prompt, messages = RAGEngine.build_rag_request(
+        chat_request.message, history.messages, SYSTEM_PROMPT, relevant_docs
+    )
+    system_prompt += history.system_section()
+
+    async def event_stream():
+        yield format_sse("sources", {
+            "rag_enabled": bool(relevant_docs),
+            "sources": RAGEngine.format_sources(relevant_docs)
+        })
+
+        try:
+            async for event, data in stream_claude(client, system_prompt, messages):
+                if event == "token":
+                    yield format_sse("token", {"text": data})
+                else:
+                    yield format_sse("done", {"tokens_used": data, "history_tokens_saved": history.tokens_saved})
+        except anthropic.APIError as e:
+            yield format_sse("error", {"detail": f"Error de Anthropic API: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
 @app.get("/api/quick-questions")
 async def get_quick_questions():
     """
     Devuelve preguntas rápidas sugeridas para el usuario.
     """
-    return {
-        "questions": [
-            "Me despidieron sin finiquito, ¿qué hago?",
-            "Quiero divorciarme, ¿cuáles son los pasos?",
-            "Tengo deudas que no puedo pagar",
-            "Mi arrendador no me devuelve el depósito",
-            "¿Cómo calcular la indemnización por años de servicio?",
-            "¿Qué es la pensión alimenticia y cómo se calcula?"
-        ]
-    }
+    return {"questions": QUICK_QUESTIONS}
 
 # Directorio para almacenar feedbacks
 FEEDBACK_DIR = Path(__file__).parent / "data" / "feedbacks"
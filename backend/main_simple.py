@@ -4,6 +4,7 @@ Sin Pydantic para evitar problemas de compilación
 """
 
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import anthropic
 import os
@@ -22,28 +23,28 @@ except ImportError:
 # Importar base de datos y routers extendidos
 try:
     from database import engine, Base, get_db
-    from routers import chat_v2, lawyers_extended, auth, pjud, notifications, cases, direct_chat, categories, oauth
+    from routers import chat_v2, lawyers_extended, auth, pjud, notifications, cases, direct_chat, categories, oauth, rag
     EXTENDED_ROUTERS = True
 except ImportError as e:
     print(f"ℹ️  Routers extendidos no disponibles: {e}")
     EXTENDED_ROUTERS = False
 
-# Intentar cargar RAG Engine
+from rag.async_engine import get_async_anthropic_client, close_async_clients, stream_claude
+from rag.rag_engine import RAGEngine, CLAUDE_MODEL
+from services.history_compactor import get_history_compactor
+from services.legal_categories import QUICK_QUESTIONS
+from utils.sse import format_sse, SSE_HEADERS, SSE_MEDIA_TYPE
+
+# RAG: servicio de recuperación compartido (se inicializa en startup)
 try:
-    from rag.rag_engine import create_rag_engine
-    rag_engine = create_rag_engine()
-    RAG_ENABLED = rag_engine is not None
-    if RAG_ENABLED:
-        print("✅ RAG HABILITADO - Usando apuntes de Pinecone")
-    else:
-        print("⚠️ RAG engine creado pero es None")
+    from services.retrieval_service import (
+        get_retrieval_service, init_retrieval_service, shutdown_retrieval_service
+    )
+    RAG_AVAILABLE = True
 except Exception as e:
-    import traceback
     print(f"ℹ️  RAG no disponible: {e}")
-    print(f"   Traceback: {traceback.format_exc()}")
     print("   Chatbot funcionará sin RAG (solo Claude)")
-    rag_engine = None
-    RAG_ENABLED = False
+    RAG_AVAILABLE = False
 
 app = FastAPI(
     title="LEIA API",
@@ -74,7 +75,34 @@ if EXTENDED_ROUTERS:
     app.include_router(cases.router)
     app.include_router(direct_chat.router)
     app.include_router(categories.router)
-    print("✅ Routers cargados (auth, oauth, chat_v2, lawyers_extended, pjud, notifications, cases, direct_chat, categories)")
+    app.include_router(rag.router)
+    print("✅ Routers cargados (auth, oauth, chat_v2, lawyers_extended, pjud, notifications, cases, direct_chat, categories, rag)")
+
+# Inicializar RAG una sola vez por proceso
+@app.on_event("startup")
+async def startup_event():
+    if RAG_AVAILABLE:
+        init_retrieval_service()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if RAG_AVAILABLE:
+        shutdown_retrieval_service()
+    await close_async_clients()
+
+
+def get_rag_engine():
+    """RAG Engine compartido (None si RAG no está habilitado)"""
+    if not RAG_AVAILABLE:
+        return None
+    return get_retrieval_service().engine
+
+
+def get_async_rag_engine():
+    """Vista async del RAG Engine compartido (None si RAG no está habilitado)"""
+    if not RAG_AVAILABLE:
+        return None
+    return get_retrieval_service().async_engine
 
 # Anthropic Client
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
@@ -82,9 +110,8 @@ if not ANTHROPIC_API_KEY:
     print("⚠️  WARNING: ANTHROPIC_API_KEY not set. Chat will not work.")
     print("   Get your key at: https://console.anthropic.com/")
     print("   Then add it to backend/.env file")
-    client = None
 else:
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    # El cliente se obtiene en cada request: shutdown lo cierra y get_async_anthropic_client crea otro
     print("✅ Anthropic API configured successfully!")
 
 # System Prompt para el Asistente Legal
@@ -117,10 +144,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    rag_engine = get_rag_engine()
     return {
         "status": "healthy",
         "anthropic_configured": ANTHROPIC_API_KEY is not None,
-        "rag_enabled": RAG_ENABLED,
+        "rag_enabled": rag_engine is not None,
         "rag_engine_exists": rag_engine is not None,
         "message": "Backend is running" if ANTHROPIC_API_KEY else "Configure ANTHROPIC_API_KEY in .env"
     }
@@ -128,11 +156,13 @@ async def health_check():
 @app.get("/debug/rag")
 async def debug_rag():
     """Endpoint temporal de debug para RAG"""
+    rag_engine = get_rag_engine()
     return {
-        "RAG_ENABLED": RAG_ENABLED,
+        "RAG_ENABLED": rag_engine is not None,
         "rag_engine": str(rag_engine),
         "rag_engine_type": type(rag_engine).__name__ if rag_engine else None,
-        "has_vector_store": hasattr(rag_engine, 'vector_store') and rag_engine.vector_store is not None if rag_engine else False
+        "has_vector_store": hasattr(rag_engine, 'vector_store') and rag_engine.vector_store is not None if rag_engine else False,
+        "embedding_cache": rag_engine.get_cache_stats() if rag_engine else None
     }
 
 @app.post("/api/chat")
@@ -151,9 +181,11 @@ async def chat(request: dict):
     Devuelve:
     {
         "response": "string",
-        "tokens_used": int
+        "tokens_used": int,
+        "history_tokens_saved": int
     }
     """
+    client = get_async_anthropic_client()
     if not client:
         raise HTTPException(
             status_code=500,
@@ -173,10 +205,10 @@ async def chat(request: dict):
             raise HTTPException(status_code=400, detail="El campo 'message' es requerido")
 
         # Si RAG está habilitado, usar RAG Engine
-        print(f"🔍 DEBUG: RAG_ENABLED={RAG_ENABLED}, rag_engine={rag_engine}")
-        if RAG_ENABLED and rag_engine:
+        rag_engine = get_async_rag_engine()
+        if rag_engine:
             try:
-                result = rag_engine.generate_response(
+                result = await rag_engine.generate_response(
                     user_query=user_message,
                     conversation_history=conversation_history,
                     client=client,
@@ -188,22 +220,18 @@ async def chat(request: dict):
                     "tokens_used": result["tokens_used"],
                     "rag_enabled": True,
                     "sources_used": result["sources_used"],
-                    "sources": result["sources"]
+                    "sources": result["sources"],
+                    "history_tokens_saved": result["history_tokens_saved"]
                 }
             except Exception as rag_error:
                 print(f"⚠️  Error en RAG, fallback a Claude: {rag_error}")
                 # Si falla RAG, continuar con Claude normal
 
         # Fallback: Claude sin RAG
-        messages = []
-
-        # Agregar historial previo
-        for msg in conversation_history:
-            if isinstance(msg, dict) and msg.get("role") in ['user', 'assistant']:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
+        # Historial previo: últimos turnos completos + resumen de los anteriores
+        history = get_history_compactor().compact(conversation_history, CLAUDE_MODEL)
+        messages = list(history.messages)
+        system_prompt = SYSTEM_PROMPT + history.system_section()
 
         # Agregar el mensaje actual del usuario
         messages.append({
@@ -212,10 +240,10 @@ async def chat(request: dict):
         })
 
         # Llamar a Claude API con el modelo correcto
-        response = client.messages.create(
-            model="claude-3-haiku-20240307",  # Modelo más reciente
+        response = await client.messages.create(
+            model=CLAUDE_MODEL,
             max_tokens=1024,
-            system=SYSTEM_PROMPT,
+            system=system_prompt,
             messages=messages
         )
 
@@ -226,16 +254,17 @@ async def chat(request: dict):
         return {
             "response": assistant_message,
             "tokens_used": tokens_used,
-            "rag_enabled": False
+            "rag_enabled": False,
+            "history_tokens_saved": history.tokens_saved
         }
 
     except anthropic.APIError as e:
         # Si el modelo no existe, intentar con claude-3-sonnet
         try:
-            response = client.messages.create(
-                model="claude-3-haiku-20240307",
+            response = await client.messages.create(
+                model=CLAUDE_MODEL,
                 max_tokens=1024,
-                system=SYSTEM_PROMPT,
+                system=system_prompt,
                 messages=messages
             )
 
@@ -244,28 +273,70 @@ async def chat(request: dict):
 
             return {
                 "response": assistant_message,
-                "tokens_used": tokens_used
+                "tokens_used": tokens_used,
+                "history_tokens_saved": history.tokens_saved
             }
         except Exception as fallback_error:
             raise HTTPException(status_code=500, detail=f"Error de Anthropic API: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error inesperado: {str(e)}")
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: dict):
+    """
+    Versión streaming (Server-Sent Events) de /api/chat.
+
+    Acepta el mismo body que /api/chat. Eventos:
+    - sources: {"rag_enabled": bool, "sources": [...]}
+    - token: {"text": "..."} por cada fragmento de la respuesta
+    - done: {"tokens_used": int, "history_tokens_saved": int}
+    - error: {"detail": "..."}
+    """
+    client = get_async_anthropic_client()
+    if not client:
+        raise HTTPException(status_code=500, detail="Anthropic API no configurada")
+
+    user_message = request.get("message", "")
+    conversation_history = request.get("conversation_history", [])
+
+    if not user_message:
+        raise HTTPException(status_code=400, detail="El campo 'message' es requerido")
+
+    history = get_history_compactor().compact(conversation_history, CLAUDE_MODEL)
+
+    # Buscar contexto legal relevante antes de empezar a emitir
+    relevant_docs = []
+    if RAG_AVAILABLE and get_retrieval_service().enabled:
+        relevant_docs = await get_retrieval_service().aretrieve(user_message)
+
+    system_prompt, messages = RAGEngine.build_rag_request(
+        user_message, history.messages, SYSTEM_PROMPT, relevant_docs
+    )
+    system_prompt += history.system_section()
+
+    async def event_stream():
+        yield format_sse("sources", {
+            "rag_enabled": bool(relevant_docs),
+            "sources": RAGEngine.format_sources(relevant_docs)
+        })
+
+        try:
+            async for event, data in stream_claude(client, system_prompt, messages):
+                if event == "token":
+                    yield format_sse("token", {"text": data})
+                else:
+                    yield format_sse("done", {"tokens_used": data, "history_tokens_saved": history.tokens_saved})
+        except anthropic.APIError as e:
+            yield format_sse("error", {"detail": f"Error de Anthropic API: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
 @app.get("/api/quick-questions")
 async def get_quick_questions():
     """
     Devuelve preguntas rápidas sugeridas para el usuario.
     """
-    return {
-        "questions": [
-            "Me despidieron sin finiquito, ¿qué hago?",
-            "Quiero divorciarme, ¿cuáles son los pasos?",
-            "Tengo deudas que no puedo pagar",
-            "Mi arrendador no me devuelve el depósito",
-            "¿Cómo calcular la indemnización por años de servicio?",
-            "¿Qué es la pensión alimenticia y cómo se calcula?"
-        ]
-    }
+    return {"questions": QUICK_QUESTIONS}
 
 @app.post("/api/feedback")
 async def save_feedback(request: dict):
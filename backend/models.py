@@ -52,6 +52,7 @@ class Conversation(Base):
     # Relationships
     user = relationship("User", back_populates="conversations")
     messages = relationship("ChatMessage", back_populates="conversation")
+    summary = relationship("ConversationSummary", back_populates="conversation", uselist=False)
 
 
 class ChatMessage(Base):
@@ -69,6 +70,21 @@ class ChatMessage(Base):
     conversation = relationship("Conversation", back_populates="messages")
 
 
+class ConversationSummary(Base):
+    """Rolling summary of the older turns of a conversation (history compaction)."""
+    __tablename__ = "conversation_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), unique=True, nullable=False)
+    summary = Column(Text, nullable=False)
+    summarized_messages = Column(Integer, nullable=False)  # Prefix of the history covered by the summary
+    history_digest = Column(String(64), nullable=False)  # Hash of that prefix (detects edited history)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    conversation = relationship("Conversation", back_populates="summary")
+
+
 class Feedback(Base):
     """Stores user feedback on AI responses."""
     __tablename__ = "feedbacks"
@@ -0,0 +1,271 @@
+"""
+Async RAG Engine - Ruta asíncrona de RAG + Claude
+
+Los endpoints de chat son `async def`; llamar a clientes síncronos desde
+ellos bloquea el event loop de uvicorn para todas las demás peticiones.
+Este módulo ofrece:
+1. Clientes async compartidos (AsyncAnthropic, AsyncOpenAI) con un pool
+   de conexiones HTTP por proceso
+2. AsyncRAGEngine: misma lógica que RAGEngine (caché de embeddings,
+   umbral, prompt) pero sin bloquear el loop. La búsqueda en Pinecone
+   (SDK síncrono) corre en un thread; el índice local responde en
+   menos de 1 ms y se consulta directamente, igual que el índice léxico.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import anthropic
+
+try:
+    import openai
+    from openai import AsyncOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+from rag.rag_engine import CLAUDE_MODEL
+from services.history_compactor import get_history_compactor
+
+
+# Pool HTTP compartido por proceso (keep-alive entre requests)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT_SECONDS = 60.0
+HTTP_CONNECT_TIMEOUT_SECONDS = 5.0
+
+# Backends cuya búsqueda es CPU local y rápida (no vale la pena un thread)
+INLINE_SEARCH_BACKENDS = {"local"}
+
+_anthropic_client: Optional[anthropic.AsyncAnthropic] = None
+_openai_client = None
+
+
+def _pooled_http_client(sdk):
+    """
+    Cliente HTTP async con el pool configurado, usando las clases del propio
+    SDK (cada SDK puede depender de una versión distinta de httpx)
+    """
+    limits_cls = type(sdk.DEFAULT_CONNECTION_LIMITS)
+    return sdk.DefaultAsyncHttpxClient(
+        limits=limits_cls(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=30.0
+        ),
+        timeout=sdk.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+    )
+
+
+def get_async_anthropic_client() -> Optional[anthropic.AsyncAnthropic]:
+    """Cliente AsyncAnthropic compartido (None si no hay API key)"""
+    global _anthropic_client
+
+    if _anthropic_client is None:
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            return None
+        _anthropic_client = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            http_client=_pooled_http_client(anthropic)
+        )
+
+    return _anthropic_client
+
+
+def get_async_openai_client():
+    """Cliente AsyncOpenAI compartido (None si no está disponible)"""
+    global _openai_client
+
+    if _openai_client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not OPENAI_AVAILABLE or not api_key:
+            return None
+        _openai_client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=_pooled_http_client(openai)
+        )
+
+    return _openai_client
+
+
+async def close_async_clients():
+    """Cierra los pools HTTP (evento shutdown de la app)"""
+    global _anthropic_client, _openai_client
+
+    for client in (_anthropic_client, _openai_client):
+        if client is not None:
+            await client.close()
+
+    _anthropic_client = None
+    _openai_client = None
+
+
+async def stream_claude(
+    client: anthropic.AsyncAnthropic,
+    system_prompt: str,
+    messages: List[Dict],
+    max_tokens: int = 1024,
+    model: str = CLAUDE_MODEL
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Respuesta de Claude en streaming
+
+    Yields:
+        ("token", texto) por cada fragmento recibido y al final
+        ("usage", tokens_totales)
+    """
+    async with client.messages.stream(
+        model=model,
+        max_tokens=max_tokens,
+        system=system_prompt,
+        messages=messages
+    ) as stream:
+        async for text in stream.text_stream:
+            yield "token", text
+        final_message = await stream.get_final_message()
+
+    yield "usage", final_message.usage.input_tokens + final_message.usage.output_tokens
+
+
+class AsyncRAGEngine:
+    """Versión async de RAGEngine; comparte vector store y caché con el engine síncrono"""
+
+    def __init__(self, engine, openai_client=None):
+        """
+        Args:
+            engine: RAGEngine ya inicializado
+            openai_client: Cliente AsyncOpenAI (por defecto el compartido)
+        """
+        self.engine = engine
+        self._openai_client = openai_client
+
+    @property
+    def vector_store(self):
+        return self.engine.vector_store
+
+    @property
+    def embedding_cache(self):
+        return self.engine.embedding_cache
+
+    async def _embed_query(self, query: str) -> Optional[List[float]]:
+        """Llama a la API de embeddings sin bloquear el loop"""
+        client = self._openai_client or get_async_openai_client()
+        if client is None:
+            # Sin cliente async: usar el síncrono en un thread
+            return await asyncio.to_thread(self.engine._embed_query, query)
+
+        try:
+            response = await client.embeddings.create(
+                model=self.engine.embedding_model,
+                input=query,
+                **self.engine.embedding_options()
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            print(f"❌ Error generando embedding de consulta: {e}")
+            return None
+
+    async def generate_query_embedding(self, query: str) -> Optional[List[float]]:
+        """Embedding de la consulta (usando la caché si existe)"""
+        if not self.engine.openai_key:
+            print("⚠️  OpenAI API key no configurada, RAG deshabilitado")
+            return None
+
+        if self.embedding_cache is not None:
+            return await self.embedding_cache.aget_or_compute(
+                query, self.engine.cache_model, self._embed_query
+            )
+
+        return await self._embed_query(query)
+
+    async def search(
+        self,
+        query: str,
+        query_vector: List[float],
+        top_k: int,
+        filter: Optional[Dict] = None
+    ) -> List[Dict]:
+        """Búsqueda vectorial (ruteada, ver RAGEngine.search_vectors) sin bloquear el loop"""
+        if self.vector_store.backend_name in INLINE_SEARCH_BACKENDS:
+            return self.engine.search_vectors(query, query_vector, top_k, filter)
+
+        return await asyncio.to_thread(self.engine.search_vectors, query, query_vector, top_k, filter)
+
+    async def retrieve_context(
+        self,
+        query: str,
+        filter: Optional[Dict] = None,
+        top_k: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Versión async de RAGEngine.retrieve_context
+
+        La búsqueda léxica (CPU local) corre mientras se espera el embedding.
+        """
+        if not self.vector_store:
+            print("⚠️  Vector store no inicializado, RAG deshabilitado")
+            return []
+
+        engine = self.engine
+        top_k = top_k or engine.top_k
+        timings: Dict[str, float] = {}
+
+        embedding_start = time.perf_counter()
+        embedding_task = asyncio.create_task(self.generate_query_embedding(query))
+        await asyncio.sleep(0)  # deja que la petición de embedding salga primero
+        lexical_results = engine.search_lexical(query, top_k, filter, timings)
+        query_embedding = await embedding_task
+        timings["embedding_ms"] = round((time.perf_counter() - embedding_start) * 1000, 2)
+
+        vector_results = []
+        if query_embedding:
+            with engine.stage_timings.stage("vector_ms", timings):
+                vector_results = await self.search(query, query_embedding, top_k, filter)
+
+        return engine.combine_results(vector_results, lexical_results, top_k, timings)
+
+    def build_context_prompt(self, relevant_docs: List[Dict]) -> str:
+        return self.engine.build_context_prompt(relevant_docs)
+
+    async def generate_response(
+        self,
+        user_query: str,
+        conversation_history: List[Dict],
+        client: anthropic.AsyncAnthropic,
+        system_prompt: str
+    ) -> Dict:
+        """
+        Versión async de RAGEngine.generate_response
+
+        Args:
+            user_query: Pregunta del usuario
+            conversation_history: Historial de conversación
+            client: Cliente AsyncAnthropic
+            system_prompt: Prompt del sistema base
+
+        Returns:
+            Dict con respuesta, fuentes, y metadata
+        """
+        relevant_docs = await self.retrieve_context(user_query)
+
+        history = get_history_compactor().compact(conversation_history, CLAUDE_MODEL)
+        enhanced_system_prompt, messages = self.engine.build_rag_request(
+            user_query, history.messages, system_prompt, relevant_docs
+        )
+        enhanced_system_prompt += history.system_section()
+
+        try:
+            response = await client.messages.create(
+                model=CLAUDE_MODEL,
+                max_tokens=1024,
+                system=enhanced_system_prompt,
+                messages=messages
+            )
+
+            return self.engine.format_rag_response(response, relevant_docs, history)
+
+        except Exception as e:
+            raise Exception(f"Error generando respuesta RAG: {e}")
@@ -0,0 +1,247 @@
+"""
+Bulk Upsert - Carga masiva de vectores con batches en paralelo
+
+Reemplaza el envío de batches de 100 vectores de a uno (donde un batch
+fallido solo se imprimía y se perdía):
+- Batches armados por tamaño del payload (bytes), no por cantidad: los
+  chunks con mucha metadata no pasan el límite por request de Pinecone
+- Varios batches en vuelo a la vez (pipeline acotado a max_workers)
+- Reintentos con backoff exponencial y jitter para errores transitorios
+- Un batch rechazado por datos inválidos se parte en mitades hasta aislar
+  los vectores culpables
+- Lo que falla definitivamente va a un dead-letter (.jsonl) para
+  reintentarlo después (python -m rag.vector_store --retry-dead-letters)
+"""
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Límites por request de Pinecone: 2 MB y 1000 vectores
+MAX_REQUEST_BYTES = 2 * 1024 * 1024
+DEFAULT_MAX_BATCH_BYTES = int(MAX_REQUEST_BYTES * 0.8)  # margen por el overhead del request
+MAX_BATCH_VECTORS = 1000
+
+DEFAULT_UPSERT_WORKERS = 4
+DEFAULT_MAX_RETRIES = 5
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+
+DEFAULT_DEAD_LETTER_PATH = "data/embeddings/upsert_dead_letter.jsonl"
+
+# Un float serializado en JSON ocupa ~10 bytes ("-0.01234567,")
+FLOAT_JSON_BYTES = 10
+RECORD_OVERHEAD_BYTES = 40
+
+Record = Tuple[str, List[float], Dict]
+
+
+def record_payload_bytes(record: Record) -> int:
+    """Bytes estimados de un vector (id, valores, metadata) en el request"""
+    vector_id, values, metadata = record
+    metadata_bytes = len(json.dumps(metadata, ensure_ascii=False, default=str).encode("utf-8"))
+    return len(vector_id.encode("utf-8")) + len(values) * FLOAT_JSON_BYTES + metadata_bytes + RECORD_OVERHEAD_BYTES
+
+
+def pack_by_bytes(
+    records: Iterable[Record],
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+    max_batch_vectors: int = MAX_BATCH_VECTORS
+) -> Iterator[List[Record]]:
+    """
+    Agrupa vectores en batches que no superan max_batch_bytes ni
+    max_batch_vectors. Es un generador: consume `records` de a poco.
+    """
+    batch: List[Record] = []
+    batch_bytes = 0
+
+    for record in records:
+        size = record_payload_bytes(record)
+        if batch and (batch_bytes + size > max_batch_bytes or len(batch) >= max_batch_vectors):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(record)
+        batch_bytes += size
+
+    if batch:
+        yield batch
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """
+    Errores que no se arreglan reintentando: 4xx (salvo 408/429) o datos
+    inválidos detectados por el cliente
+    """
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return 400 <= status < 500 and status not in (408, 429)
+    return isinstance(error, (ValueError, TypeError))
+
+
+def to_list(values) -> List[float]:
+    """Los artefactos binarios entregan arrays numpy: JSON y Pinecone esperan listas"""
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def write_dead_letters(path: Path, records: List[Record], error: str):
+    """Agrega vectores fallidos al dead-letter (una línea JSON por vector)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    failed_at = datetime.now().isoformat()
+
+    with open(path, 'a', encoding='utf-8') as f:
+        for vector_id, values, metadata in records:
+            f.write(json.dumps({
+                "id": vector_id,
+                "values": to_list(values),
+                "metadata": metadata,
+                "error": error,
+                "failed_at": failed_at
+            }, ensure_ascii=False) + "\n")
+
+
+def read_dead_letters(path: Path) -> List[Record]:
+    """Lee un dead-letter como tuplas (id, vector, metadata)"""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                records.append((entry["id"], entry["values"], entry["metadata"]))
+    return records
+
+
+class BulkUpserter:
+    """Sube vectores en batches por bytes, con N batches en vuelo y reintentos"""
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Record]], int],
+        max_workers: int = DEFAULT_UPSERT_WORKERS,
+        max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+        max_batch_vectors: int = MAX_BATCH_VECTORS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE_SECONDS,
+        dead_letter_path: Optional[Path] = Path(DEFAULT_DEAD_LETTER_PATH)
+    ):
+        """
+        Args:
+            write_batch: Escribe un batch y retorna cuántos vectores quedaron escritos
+            max_workers: Batches en vuelo a la vez
+            max_batch_bytes / max_batch_vectors: Límites por request
+            max_retries: Reintentos por batch ante errores transitorios
+            backoff_base: Espera base del backoff exponencial (segundos)
+            dead_letter_path: Archivo .jsonl para los fallos definitivos (None = no guardar)
+        """
+        self.write_batch = write_batch
+        self.max_workers = max(1, max_workers)
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_vectors = max_batch_vectors
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.dead_letter_path = Path(dead_letter_path) if dead_letter_path else None
+        self._retries = 0
+        self._retries_lock = threading.Lock()
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: evita que los workers reintenten todos al mismo tiempo"""
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, self.backoff_base * (2 ** attempt)))
+
+    def _write_with_retry(self, batch: List[Record]) -> Tuple[bool, Optional[Exception]]:
+        """
+        Corre en un worker. Returns:
+            (ok, error): error es None si ok; si no, el último error
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                written = self.write_batch(batch)
+                if written >= len(batch):
+                    return True, None
+                error: Exception = RuntimeError(f"Escritura parcial: {written}/{len(batch)} vectores")
+            except Exception as e:
+                error = e
+                if is_permanent_error(e):
+                    return False, e
+
+            if attempt < self.max_retries:
+                with self._retries_lock:
+                    self._retries += 1
+                time.sleep(self._backoff(attempt))
+
+        return False, error
+
+    def run(
+        self,
+        records: Iterable[Record],
+        on_batch: Optional[Callable[[List[str]], None]] = None
+    ) -> Dict:
+        """
+        Sube todos los vectores
+
+        Args:
+            records: Tuplas (id, vector, metadata); puede ser un generador
+            on_batch: Se llama con los ids de cada batch confirmado (en el hilo que llama a run)
+
+        Returns:
+            {"upserted", "failed", "failed_ids", "batches", "retries", "seconds", "dead_letter"}
+        """
+        start = time.perf_counter()
+        self._retries = 0
+        stats = {"upserted": 0, "failed": 0, "batches": 0}
+        failed_ids: List[str] = []
+
+        batches = pack_by_bytes(records, self.max_batch_bytes, self.max_batch_vectors)
+        # Mitades de batches rechazados por datos inválidos: tienen prioridad
+        retry_queue: List[List[Record]] = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            in_flight = {}
+
+            def submit_next() -> bool:
+                batch = retry_queue.pop() if retry_queue else next(batches, None)
+                if batch is None:
+                    return False
+                in_flight[pool.submit(self._write_with_retry, batch)] = batch
+                return True
+
+            while len(in_flight) < self.max_workers and submit_next():
+                pass
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    batch = in_flight.pop(future)
+                    ok, error = future.result()
+                    stats["batches"] += 1
+
+                    if ok:
+                        stats["upserted"] += len(batch)
+                        if on_batch:
+                            on_batch([vector_id for vector_id, _, _ in batch])
+                    elif len(batch) > 1 and is_permanent_error(error):
+                        middle = len(batch) // 2
+                        retry_queue.extend([batch[middle:], batch[:middle]])
+                    else:
+                        stats["failed"] += len(batch)
+                        failed_ids.extend(vector_id for vector_id, _, _ in batch)
+                        print(f"   ❌ {len(batch)} vectores fallaron definitivamente: {error}")
+                        if self.dead_letter_path:
+                            write_dead_letters(self.dead_letter_path, batch, repr(error))
+
+                while len(in_flight) < self.max_workers and submit_next():
+                    pass
+
+        return {
+            **stats,
+            "failed_ids": failed_ids,
+            "retries": self._retries,
+            "seconds": time.perf_counter() - start,
+            "dead_letter": str(self.dead_letter_path) if failed_ids and self.dead_letter_path else None
+        }
@@ -0,0 +1,346 @@
+"""
+Chunk Store - Texto completo de los chunks, fuera de la metadata del índice
+
+El índice vectorial (Pinecone o local) y el léxico guardan solo metadata
+corta para filtrar y citar; el texto vive aquí, en un SQLite local por
+chunk_id. Así cada consulta a Pinecone no trae ~1 KB de texto por match y
+el contexto que recibe Claude no queda cortado en 1000 caracteres.
+
+- hydrate(): completa texto y metadata de los resultados de búsqueda
+- Expansión a chunks vecinos (mismo documento, chunk_number ± 1, ...)
+  bajo un presupuesto de tokens por resultado; el solapamiento que el
+  chunker repite entre chunks consecutivos se quita al unirlos
+
+Se construye desde los *_chunks.jsonl de TextProcessor (etapa chunk_store
+del pipeline) y se reemplaza atómicamente: un servidor que lo tiene
+abierto sigue leyendo la versión anterior hasta que recarga.
+
+Uso:
+    python -m rag.chunk_store                      # data/processed -> data/processed/chunk_store.sqlite3
+    python -m rag.chunk_store --stats
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from utils.text import estimate_tokens
+
+
+DEFAULT_CHUNK_STORE_PATH = "data/processed/chunk_store.sqlite3"
+
+# Vecinos máximos por lado al expandir un resultado
+MAX_EXPAND_NEIGHBORS = 4
+
+# Largo del solapamiento que se busca al unir chunks consecutivos (el
+# chunker repite oraciones completas: menos que MIN es coincidencia)
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 4000
+
+# Campos planos de un resultado que se completan desde el store
+RESULT_FIELDS = ("source", "law_name", "category", "url", "article_number")
+
+
+def merge_overlap(first: str, second: str) -> str:
+    """Une dos chunks consecutivos quitando el texto que second repite del final de first"""
+    if not first or not second:
+        return first or second
+
+    start = max(0, len(first) - MAX_OVERLAP_CHARS)
+    last = len(first) - MIN_OVERLAP_CHARS
+    position = first.find(second[0], start, last + 1)
+    while position != -1:
+        tail = first[position:]
+        if second.startswith(tail):
+            return first + second[len(tail):]
+        position = first.find(second[0], position + 1, last + 1)
+
+    return f"{first}\n\n{second}"
+
+
+def iter_store_chunks(chunks_dir: Path) -> Iterable[Dict]:
+    """Chunks de los *_chunks.jsonl (o *_chunks.json) de un directorio"""
+    from data_processing.text_processor import find_chunk_files, iter_chunks_file
+
+    for chunks_file in find_chunk_files(chunks_dir):
+        print(f"📄 Leyendo: {chunks_file.name}")
+        yield from iter_chunks_file(chunks_file)
+
+
+class ChunkStore:
+    """Texto y vecinos de cada chunk en SQLite (solo lectura)"""
+
+    def __init__(self, db_path: Path = Path(DEFAULT_CHUNK_STORE_PATH)):
+        """
+        Args:
+            db_path: Archivo SQLite construido con ChunkStore.build
+
+        Raises:
+            FileNotFoundError: Si el store no fue construido
+        """
+        self.db_path = Path(db_path)
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"Chunk store no encontrado: {self.db_path}")
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.manifest = json.loads(
+            self._db.execute("SELECT value FROM store_info WHERE key = 'manifest'").fetchone()[0]
+        )
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build(chunks: Iterable[Dict], db_path: Path = Path(DEFAULT_CHUNK_STORE_PATH), batch_size: int = 1000) -> Dict:
+        """
+        Construye el store desde chunks de TextProcessor
+
+        Args:
+            chunks: Chunks con chunk_id, text, chunk_number, total_chunks y metadata
+            db_path: Archivo de salida (se reemplaza atómicamente)
+            batch_size: Filas por INSERT
+
+        Returns:
+            Manifiesto del store construido
+        """
+        from rag.vector_store import chunk_metadata
+
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = db_path.with_name(db_path.name + ".tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        db = sqlite3.connect(str(tmp_path))
+        db.execute(
+            """
+            CREATE TABLE chunks (
+                chunk_id TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                chunk_number INTEGER NOT NULL,
+                total_chunks INTEGER NOT NULL,
+                tokens INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+            """
+        )
+        db.execute("CREATE TABLE store_info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        count, total_tokens, text_bytes = 0, 0, 0
+        documents = set()
+        batch = []
+
+        def flush():
+            db.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            batch.clear()
+
+        for chunk in chunks:
+            text = chunk["text"]
+            doc_id = chunk.get("metadata", {}).get("source_id") or chunk["chunk_id"].rsplit("_", 1)[0]
+            tokens = chunk.get("tokens") or estimate_tokens(text)
+            batch.append((
+                chunk["chunk_id"],
+                doc_id,
+                chunk.get("chunk_number", 0),
+                chunk.get("total_chunks", 0),
+                tokens,
+                text,
+                json.dumps(chunk_metadata(chunk, include_text=False), ensure_ascii=False)
+            ))
+            count += 1
+            total_tokens += tokens
+            text_bytes += len(text.encode("utf-8"))
+            documents.add(doc_id)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        db.execute("CREATE INDEX idx_chunks_position ON chunks (doc_id, chunk_number)")
+
+        manifest = {
+            "count": count,
+            "documents": len(documents),
+            "tokens": total_tokens,
+            "text_bytes": text_bytes,
+            "built_at": datetime.now().isoformat()
+        }
+        db.execute("INSERT INTO store_info VALUES ('manifest', ?)", (json.dumps(manifest),))
+        db.commit()
+        db.close()
+
+        os.replace(tmp_path, db_path)
+        return manifest
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _row(row) -> Dict:
+        chunk_id, doc_id, chunk_number, total_chunks, tokens, text, metadata = row
+        return {
+            "chunk_id": chunk_id,
+            "doc_id": doc_id,
+            "chunk_number": chunk_number,
+            "total_chunks": total_chunks,
+            "tokens": tokens,
+            "text": text,
+            "metadata": json.loads(metadata)
+        }
+
+    def get_many(self, chunk_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Chunks guardados para los ids pedidos"""
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        found: Dict[str, Dict] = {}
+
+        with self._lock:
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for row in self._db.execute(f"SELECT * FROM chunks WHERE chunk_id IN ({placeholders})", batch):
+                    found[row[0]] = self._row(row)
+
+        return found
+
+    def window(self, doc_id: str, first: int, last: int) -> Dict[int, Dict]:
+        """Chunks de un documento con chunk_number entre first y last, por número"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM chunks WHERE doc_id = ? AND chunk_number BETWEEN ? AND ?",
+                (doc_id, first, last)
+            ).fetchall()
+        return {row[2]: self._row(row) for row in rows}
+
+    def _expand(self, chunk: Dict, budget: int, used: set) -> List[Dict]:
+        """
+        Chunk y sus vecinos contiguos (alternando siguiente y anterior)
+        mientras quepan en budget tokens
+        """
+        number = chunk["chunk_number"]
+        neighbors = self.window(chunk["doc_id"], number - MAX_EXPAND_NEIGHBORS, number + MAX_EXPAND_NEIGHBORS)
+
+        selected = {number: chunk}
+        tokens = chunk["tokens"]
+        open_sides = {1: True, -1: True}
+
+        for distance in range(1, MAX_EXPAND_NEIGHBORS + 1):
+            for side in (1, -1):
+                if not open_sides[side]:
+                    continue
+                neighbor = neighbors.get(number + side * distance)
+                # Un hueco, un chunk ya usado por otro resultado o el presupuesto cierran ese lado
+                if neighbor is None or neighbor["chunk_id"] in used or tokens + neighbor["tokens"] > budget:
+                    open_sides[side] = False
+                    continue
+                selected[neighbor["chunk_number"]] = neighbor
+                tokens += neighbor["tokens"]
+
+        return [selected[key] for key in sorted(selected)]
+
+    def hydrate(self, results: List[Dict], expand_tokens: int = 0) -> List[Dict]:
+        """
+        Completa texto y metadata de resultados de búsqueda (formato de
+        format_match) y opcionalmente los expande a sus chunks vecinos
+
+        Args:
+            results: Resultados del vector store / índice léxico / fusión
+            expand_tokens: Presupuesto de tokens por resultado (0 = sin expandir)
+
+        Returns:
+            Resultados con "text" completo; los expandidos llevan
+            metadata["expanded_chunks"] con los ids usados, en orden
+        """
+        if not results:
+            return results
+
+        stored = self.get_many(result["id"] for result in results)
+        used = {result["id"] for result in results}
+        hydrated = []
+
+        for result in results:
+            chunk = stored.get(result["id"])
+            if chunk is None:
+                # El índice tiene un id que el store no conoce (store atrasado): se deja como vino
+                hydrated.append(result)
+                continue
+
+            doc = dict(result)
+            metadata = dict(chunk["metadata"])
+            metadata.update(result.get("metadata") or {})
+            metadata.pop("text", None)
+
+            for field in RESULT_FIELDS:
+                if doc.get(field) in (None, "") and metadata.get(field) not in (None, ""):
+                    doc[field] = metadata[field]
+
+            pieces = [chunk]
+            if expand_tokens > chunk["tokens"]:
+                pieces = self._expand(chunk, expand_tokens, used)
+                used.update(piece["chunk_id"] for piece in pieces)
+
+            text = pieces[0]["text"]
+            for piece in pieces[1:]:
+                text = merge_overlap(text, piece["text"])
+
+            doc["text"] = text
+            if len(pieces) > 1:
+                metadata["expanded_chunks"] = [piece["chunk_id"] for piece in pieces]
+            doc["metadata"] = metadata
+            hydrated.append(doc)
+
+        return hydrated
+
+    def __len__(self) -> int:
+        return self.manifest.get("count", 0)
+
+    def get_stats(self) -> Dict:
+        """Estadísticas del store"""
+        return {
+            "total_chunks": len(self),
+            "documents": self.manifest.get("documents", 0),
+            "tokens": self.manifest.get("tokens", 0),
+            "text_bytes": self.manifest.get("text_bytes", 0),
+            "built_at": self.manifest.get("built_at")
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main():
+    """Construye el chunk store desde los chunks procesados"""
+    parser = argparse.ArgumentParser(description="Construye el chunk store de LEIA")
+    parser.add_argument("--chunks-dir", default="data/processed", help="Directorio con *_chunks.jsonl")
+    parser.add_argument("--db-path", default=DEFAULT_CHUNK_STORE_PATH, help="Archivo SQLite de salida")
+    parser.add_argument("--stats", action="store_true", help="Solo mostrar estadísticas del store existente")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CHUNK STORE - LEIA")
+    print("=" * 60)
+
+    if args.stats:
+        stats = ChunkStore(Path(args.db_path)).get_stats()
+    else:
+        stats = ChunkStore.build(iter_store_chunks(Path(args.chunks_dir)), Path(args.db_path))
+        print(f"\n✅ Chunk store construido en {args.db_path}")
+
+    print(f"   • Chunks: {stats.get('total_chunks', stats.get('count', 0)):,}")
+    print(f"   • Documentos: {stats['documents']:,}")
+    print(f"   • Tokens: {stats['tokens']:,}")
+    print(f"   • Texto: {stats['text_bytes'] / 1e6:.1f} MB")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
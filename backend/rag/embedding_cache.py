@@ -0,0 +1,290 @@
+"""
+Embedding Cache - Caché de embeddings de consultas en dos niveles
+
+Evita llamar a openai.embeddings.create para consultas repetidas
+(preguntas rápidas, "sí", "ok", etc.):
+1. LRU en memoria del proceso
+2. Store persistente en SQLite, compartido entre reinicios y workers
+
+La clave es el texto normalizado (minúsculas, sin tildes, espacios colapsados)
+más el nombre del modelo. Ambos niveles tienen tamaño acotado y
+contadores de aciertos/fallos para medir latencia y costo ahorrados.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from utils.text import estimate_tokens
+
+
+# Precio de text-embedding-3-small (USD por 1M tokens)
+EMBEDDING_COST_PER_MILLION_TOKENS = 0.02
+
+# Cada cuántas inserciones se revisa el límite del store en disco
+EVICTION_CHECK_INTERVAL = 100
+
+_PUNCTUATION_EDGES = "¿¡?!.,;: "
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normaliza una consulta para usarla como clave de caché
+
+    - Minúsculas (casefold)
+    - Sin tildes ni diacríticos ("Sí" -> "si", "pensión" -> "pension")
+    - Espacios colapsados y signos de puntuación en los extremos removidos
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"\s+", " ", text.casefold())
+    return text.strip(_PUNCTUATION_EDGES)
+
+
+def cache_key(text: str, model: str) -> str:
+    """Clave estable: sha256(modelo + texto normalizado)"""
+    return hashlib.sha256(f"{model}\n{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """Caché LRU en memoria + SQLite para embeddings de consultas"""
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        max_memory_entries: int = 2048,
+        max_disk_entries: int = 100_000
+    ):
+        """
+        Args:
+            db_path: Archivo SQLite (None = solo memoria)
+            max_memory_entries: Tamaño máximo del LRU en memoria
+            max_disk_entries: Filas máximas en SQLite (se eliminan las menos usadas)
+        """
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db: Optional[sqlite3.Connection] = None
+        self.db_path = Path(db_path) if db_path else None
+        if self.db_path:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used "
+                "ON query_embeddings(last_used)"
+            )
+            self._db.commit()
+
+        # Contadores
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_tokens = 0
+        self._miss_seconds = 0.0
+        self._inserts_since_check = 0
+
+    # ------------------------------------------------------------------
+    # Nivel 1: memoria
+    # ------------------------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+        return vector
+
+    def _memory_put(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # ------------------------------------------------------------------
+    # Nivel 2: SQLite
+    # ------------------------------------------------------------------
+
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+
+        row = self._db.execute(
+            "SELECT vector FROM query_embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._db.execute(
+            "UPDATE query_embeddings SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        self._db.commit()
+        return array("f", row[0]).tolist()
+
+    def _disk_put(self, key: str, model: str, vector: List[float]):
+        if self._db is None:
+            return
+
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO query_embeddings (key, model, vector, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, model, array("f", vector).tobytes(), now, now)
+        )
+
+        self._inserts_since_check += 1
+        if self._inserts_since_check >= EVICTION_CHECK_INTERVAL:
+            self._inserts_since_check = 0
+            self._evict_disk()
+
+        self._db.commit()
+
+    def _evict_disk(self):
+        """Elimina las filas menos usadas recientemente si se supera el límite"""
+        count = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM query_embeddings WHERE key IN ("
+                "SELECT key FROM query_embeddings ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def get(self, text: str, model: str) -> Optional[List[float]]:
+        """Busca un embedding en memoria y luego en disco"""
+        key = cache_key(text, model)
+
+        with self._lock:
+            vector = self._memory_get(key)
+            if vector is not None:
+                self.memory_hits += 1
+                self.saved_tokens += estimate_tokens(text)
+                return vector
+
+            vector = self._disk_get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self.saved_tokens += estimate_tokens(text)
+                self._memory_put(key, vector)
+                return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, model: str, vector: List[float]):
+        """Guarda un embedding en ambos niveles"""
+        key = cache_key(text, model)
+
+        with self._lock:
+            self._memory_put(key, vector)
+            self._disk_put(key, model, vector)
+
+    def get_or_compute(
+        self,
+        text: str,
+        model: str,
+        compute: Callable[[str], Optional[List[float]]]
+    ) -> Optional[List[float]]:
+        """
+        Devuelve el embedding cacheado o lo calcula con compute(text) y lo guarda.
+        Los resultados None (errores de la API) no se cachean.
+        """
+        vector = self.get(text, model)
+        if vector is not None:
+            return vector
+
+        start = time.perf_counter()
+        vector = compute(text)
+        elapsed = time.perf_counter() - start
+
+        if vector is not None:
+            self._miss_seconds += elapsed
+            self.put(text, model, vector)
+
+        return vector
+
+    async def aget_or_compute(
+        self,
+        text: str,
+        model: str,
+        compute: Callable[[str], Awaitable[Optional[List[float]]]]
+    ) -> Optional[List[float]]:
+        """Versión async de get_or_compute (compute es una corrutina)"""
+        vector = self.get(text, model)
+        if vector is not None:
+            return vector
+
+        start = time.perf_counter()
+        vector = await compute(text)
+        elapsed = time.perf_counter() - start
+
+        if vector is not None:
+            self._miss_seconds += elapsed
+            self.put(text, model, vector)
+
+        return vector
+
+    def get_stats(self) -> Dict:
+        """Contadores de aciertos/fallos y ahorro estimado"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        avg_miss_ms = (self._miss_seconds / self.misses * 1000) if self.misses else 0.0
+
+        disk_entries = 0
+        if self._db is not None:
+            with self._lock:
+                disk_entries = self._db.execute(
+                    "SELECT COUNT(*) FROM query_embeddings"
+                ).fetchone()[0]
+
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk_entries,
+            "evictions": self.evictions,
+            "avg_miss_latency_ms": round(avg_miss_ms, 1),
+            "estimated_latency_saved_s": round(hits * avg_miss_ms / 1000, 2),
+            "estimated_tokens_saved": self.saved_tokens,
+            "estimated_cost_saved_usd": round(
+                self.saved_tokens / 1_000_000 * EMBEDDING_COST_PER_MILLION_TOKENS, 6
+            )
+        }
+
+    def close(self):
+        """Cierra la conexión SQLite"""
+        if self._db is not None:
+            with self._lock:
+                self._db.commit()
+                self._db.close()
+                self._db = None
@@ -0,0 +1,106 @@
+"""
+Embedding Profiles - Dimensiones y precisión de los vectores del índice
+
+text-embedding-3-* acepta el parámetro `dimensions`: el vector corto es el
+prefijo del completo renormalizado, así que un perfil reducido se puede
+derivar de vectores completos ya pagados (reduce_dimensions) sin volver a
+llamar a la API. Cada perfil fija:
+
+- dimensions: largo del vector (pedido a la API y guardado en el índice)
+- dtype: precisión en el índice local (float32, float16 o int8 con escala por fila)
+- rescore: con int8, reordenar los mejores candidatos con vectores float16
+  (RESCORE_FACTOR candidatos por resultado, definido en rag/local_index.py)
+
+El perfil activo sale de EMBEDDING_PROFILE y lo comparten Embedder,
+VectorStore y RAGEngine: consultas e índice deben tener las mismas
+dimensiones. En Pinecone cada perfil reducido usa su propio índice
+(la dimensión de un índice es fija). Comparar perfiles:
+python -m benchmarks.bench_embedding_profiles
+"""
+
+import math
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Dimensiones nativas (sin el parámetro `dimensions`)
+MODEL_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+PROFILE_DTYPES = ("float32", "float16", "int8")
+
+DEFAULT_PROFILE = "full"
+
+
+@dataclass(frozen=True)
+class EmbeddingProfile:
+    """Configuración de embeddings compartida por ingesta y consultas"""
+    name: str
+    dimensions: int
+    dtype: str = "float32"
+    rescore: bool = False
+    model: str = DEFAULT_EMBEDDING_MODEL
+
+    @property
+    def api_dimensions(self) -> Optional[int]:
+        """Valor del parámetro `dimensions` de la API (None = las nativas)"""
+        return None if self.dimensions == native_dimensions(self.model) else self.dimensions
+
+    @property
+    def index_suffix(self) -> str:
+        """Sufijo del índice de Pinecone ("" para el perfil por defecto)"""
+        return "" if self.name == DEFAULT_PROFILE else f"-{self.name}"
+
+    def bytes_per_vector(self) -> int:
+        """Bytes de la matriz que se recorre en cada búsqueda (sin vectores de rescore)"""
+        itemsize = {"float32": 4, "float16": 2, "int8": 1}[self.dtype]
+        return self.dimensions * itemsize + (4 if self.dtype == "int8" else 0)
+
+
+EMBEDDING_PROFILES = {
+    "full": EmbeddingProfile("full", 1536, "float32"),
+    "compact": EmbeddingProfile("compact", 512, "float16"),
+    "tiny": EmbeddingProfile("tiny", 256, "int8", rescore=True),
+}
+
+
+def native_dimensions(model: str) -> int:
+    """Dimensiones nativas de un modelo de embeddings"""
+    return MODEL_DIMENSIONS.get(model, 1536)
+
+
+def get_profile(name: Optional[str] = None) -> EmbeddingProfile:
+    """
+    Perfil por nombre (default: EMBEDDING_PROFILE o "full")
+
+    Raises:
+        ValueError: Si el perfil no existe
+    """
+    name = (name or os.getenv("EMBEDDING_PROFILE") or DEFAULT_PROFILE).lower()
+    if name not in EMBEDDING_PROFILES:
+        raise ValueError(
+            f"Perfil de embeddings desconocido: {name} "
+            f"(disponibles: {', '.join(EMBEDDING_PROFILES)})"
+        )
+    return EMBEDDING_PROFILES[name]
+
+
+def reduce_dimensions(vector: List[float], dimensions: int) -> List[float]:
+    """
+    Acorta un vector de text-embedding-3 a `dimensions` (prefijo renormalizado),
+    equivalente a pedirlo a la API con ese parámetro
+    """
+    if len(vector) <= dimensions:
+        return list(vector)
+    prefix = vector[:dimensions]
+    norm = math.sqrt(sum(value * value for value in prefix)) or 1.0
+    return [value / norm for value in prefix]
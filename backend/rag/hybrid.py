@@ -0,0 +1,171 @@
+"""
+Hybrid Retrieval - Fusión de resultados vectoriales y léxicos (BM25)
+
+Reciprocal Rank Fusion (RRF): cada documento suma 1 / (k + rank) por cada
+lista en la que aparece. Solo usa posiciones, así que no hace falta
+calibrar los scores de coseno contra los de BM25.
+
+El "score" de cada resultado fusionado es solo su similitud vectorial: es
+el único valor calibrado contra el umbral de relevancia de RAGEngine y del
+triage. La cobertura léxica (~1.0 en cuanto el chunk contiene todos los
+términos) no sirve de umbral; BM25 solo reordena vía RRF.
+
+Excepción: citas exactas. Si la consulta cita un artículo o una ley por
+número ("artículo 161", "Ley 19.496") y uno de los primeros resultados BM25
+es ese artículo o esa ley, se acepta con score EXACT_MATCH_SCORE aunque el
+vector no lo haya encontrado. El resto de los documentos que solo encontró
+el índice léxico queda con score 0 y no pasa el umbral.
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+from rag.vector_store import format_match
+from utils.text import fold_accents
+
+
+# Constante estándar de RRF (Cormack et al.)
+RRF_K = 60
+
+# Candidatos que aporta cada lado antes de fusionar
+HYBRID_CANDIDATES = 20
+
+# Posiciones BM25 en las que una cita exacta se acepta sin similitud vectorial
+EXACT_MATCH_RANK = 3
+
+# Score de una cita exacta: sobre los umbrales de RAGEngine (0.7) y del triage (0.75)
+EXACT_MATCH_SCORE = 0.8
+
+# "art. 161", "artículo 3 bis", "Ley N° 19.496", "ley 20720"
+_CITATION_RE = re.compile(
+    r"\b(art|arts|articulo|articulos|ley|leyes)\b\.?\s*(?:(?:n|no|nro|numero)\b[°.]?\s*)?(\d{1,3}(?:\.\d{3})+|\d+)\b"
+)
+
+# Etapas medidas en cada recuperación
+RETRIEVAL_STAGES = ("embedding_ms", "vector_ms", "lexical_ms", "fusion_ms", "hydrate_ms")
+
+
+def cited_identifiers(text: str) -> Set[str]:
+    """Artículos y leyes citados por número: "art. 161 de la Ley 19.496" -> {"articulo:161", "ley:19496"}"""
+    return {
+        f"{'ley' if kind.startswith('ley') else 'articulo'}:{number.replace('.', '')}"
+        for kind, number in _CITATION_RE.findall(fold_accents(text))
+    }
+
+
+def document_identifiers(metadata: Dict) -> Set[str]:
+    """Ley y artículo de un chunk, en el formato de cited_identifiers"""
+    text = metadata.get("law_name") or ""
+    if metadata.get("article_number"):
+        text += f" artículo {metadata['article_number']}"
+    return cited_identifiers(text)
+
+
+def covers_citations(citations: Set[str], identifiers: Set[str]) -> bool:
+    """El chunk es una de las leyes citadas y uno de los artículos citados (si la consulta los cita)"""
+    laws = {c for c in citations if c.startswith("ley:")}
+    articles = citations - laws
+    return bool(citations) and all(not cited or cited & identifiers for cited in (laws, articles))
+
+
+def lexical_matches(results: List[Tuple[str, float, float, Dict]], query: str = "") -> List[Dict]:
+    """
+    Convierte resultados de LexicalIndex.search al formato de VectorStore.search
+
+    Marca con exact_match los primeros EXACT_MATCH_RANK resultados que son
+    el artículo y/o la ley que cita la consulta.
+    """
+    citations = cited_identifiers(query)
+    matches = []
+    for rank, (doc_id, bm25, coverage, metadata) in enumerate(results, 1):
+        match = format_match(doc_id, coverage, metadata)
+        match["bm25"] = round(bm25, 4)
+        if rank <= EXACT_MATCH_RANK and covers_citations(citations, document_identifiers(metadata)):
+            match["exact_match"] = True
+        matches.append(match)
+    return matches
+
+
+def reciprocal_rank_fusion(
+    vector_results: List[Dict],
+    lexical_results: List[Dict],
+    k: int = RRF_K,
+    top_k: Optional[int] = None
+) -> List[Dict]:
+    """
+    Fusiona dos listas rankeadas con RRF
+
+    Args:
+        vector_results: Resultados de VectorStore.search (score = similitud)
+        lexical_results: Resultados de lexical_matches (score = cobertura BM25)
+        k: Constante RRF
+        top_k: Máximo de resultados (None = todos)
+
+    Returns:
+        Resultados ordenados por rrf_score (y score en empates), con score
+        (= vector_score, o al menos EXACT_MATCH_SCORE si es una cita exacta),
+        vector_score, lexical_score y rrf_score
+    """
+    fused: Dict[str, Dict] = {}
+
+    for source, results in (("vector_score", vector_results), ("lexical_score", lexical_results)):
+        for rank, doc in enumerate(results, 1):
+            entry = fused.get(doc["id"])
+            if entry is None:
+                entry = dict(doc)
+                entry.update({"vector_score": 0.0, "lexical_score": 0.0, "rrf_score": 0.0})
+                fused[doc["id"]] = entry
+
+            entry[source] = float(doc["score"])
+            entry["rrf_score"] += 1.0 / (k + rank)
+            if doc.get("exact_match"):
+                entry["exact_match"] = True
+
+    for entry in fused.values():
+        entry["score"] = entry["vector_score"]
+        if entry.get("exact_match"):
+            entry["score"] = max(entry["score"], EXACT_MATCH_SCORE)
+        entry["rrf_score"] = round(entry["rrf_score"], 6)
+
+    # Empates de RRF (ej: primero en cada lista): gana el mejor score
+    ranked = sorted(fused.values(), key=lambda doc: (doc["rrf_score"], doc["score"]), reverse=True)
+    return ranked[:top_k] if top_k else ranked
+
+
+class StageTimings:
+    """Latencia acumulada por etapa de recuperación (embedding, vector, léxico, fusión)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self.last: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str, timings: Dict[str, float]):
+        """Mide un bloque y guarda su duración (ms) en `timings`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    def record(self, timings: Dict[str, float]):
+        """Acumula las etapas de una recuperación"""
+        with self._lock:
+            self.last = dict(timings)
+            for name, ms in timings.items():
+                self._totals[name] = self._totals.get(name, 0.0) + ms
+                self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self) -> Dict:
+        """Promedio (ms) por etapa y la última medición"""
+        with self._lock:
+            averages = {
+                name: round(self._totals[name] / self._counts[name], 2)
+                for name in RETRIEVAL_STAGES if self._counts.get(name)
+            }
+            return {"avg": averages, "last": dict(self.last)}
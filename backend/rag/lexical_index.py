@@ -0,0 +1,434 @@
+"""
+Lexical Index - Índice BM25 para búsqueda por términos exactos
+
+Complementa la búsqueda vectorial en consultas que dependen de tokens
+exactos ("artículo 161", "Ley 19.496", "RIT C-1234-2024", "finiquito"),
+que la similitud coseno suele rankear mal.
+
+- Analizador español: minúsculas, sin tildes, stopwords, stemming liviano
+  e identificadores legales normalizados ("19.496" -> "19496")
+- Postings con el peso BM25 precalculado por (término, documento), así una
+  consulta solo suma pesos
+- Construido offline y cargado memory-mapped
+
+Estructura del directorio del índice:
+    lexical.json          Manifiesto (documentos, términos, parámetros BM25)
+    vocab.txt             Términos, uno por línea (el número de línea es el term id)
+    idf.npy               IDF de cada término (float32)
+    postings_offsets.npy  Inicio de los postings de cada término (n_terms + 1)
+    postings_docs.npy     Fila del documento de cada posting (int32)
+    postings_weights.npy  Peso BM25 de cada posting (float32)
+    categories.npy        Código de categoría por fila (int16)
+    metadata.jsonl        {"id": ..., "metadata": {...}} por fila
+    metadata_offsets.npy  Offset en bytes de cada línea de metadata.jsonl
+
+Uso:
+    python -m rag.lexical_index --chunks-dir data/processed --index-dir data/lexical
+"""
+
+import argparse
+import json
+import mmap
+import re
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from rag.local_index import _parse_filter_value, _replace_file
+from utils.text import fold_accents
+
+
+MANIFEST_FILE = "lexical.json"
+
+# Parámetros BM25 estándar
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SPANISH_STOPWORDS = {
+    "a", "al", "algo", "ante", "antes", "como", "con", "contra", "cual", "cuando",
+    "de", "del", "desde", "donde", "durante", "e", "el", "ella", "ellos", "en",
+    "entre", "era", "es", "esa", "ese", "eso", "esta", "este", "esto", "estoy",
+    "fue", "ha", "hay", "hasta", "la", "las", "le", "les", "lo", "los", "mas",
+    "me", "mi", "mis", "muy", "no", "nos", "o", "para", "pero", "por", "porque",
+    "que", "quien", "se", "sea", "segun", "ser", "si", "sin", "sobre", "son",
+    "su", "sus", "tambien", "te", "tengo", "tiene", "toda", "todo", "tu", "un",
+    "una", "uno", "y", "ya", "yo",
+}
+
+# Abreviaturas frecuentes en textos legales
+ABBREVIATIONS = {
+    "art": "articulo",
+    "arts": "articulos",
+    "inc": "inciso",
+    "num": "numero",
+    "nro": "numero",
+    "dfl": "decreto",
+    "ds": "decreto",
+}
+
+# Palabras, números con puntos ("19.496") e identificadores con guiones ("c-1234-2024")
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+_THOUSANDS_RE = re.compile(r"^\d{1,3}(?:\.\d{3})+$")
+
+
+def stem(token: str) -> str:
+    """
+    Stemming liviano para español (variante del "light stemmer" de Savoy):
+    quita vocal final de género y plurales. Conserva números e identificadores.
+    """
+    if len(token) < 5 or not token.isalpha():
+        return token
+
+    if token.endswith(("o", "a", "e")):
+        return token[:-1]
+
+    if token.endswith("s"):
+        if token.endswith("eses"):
+            return token[:-2]
+        if token.endswith("ces"):
+            return token[:-3] + "z"
+        if token[-2] in "oae":
+            return token[:-2]
+
+    return token
+
+
+def analyze(text: str) -> List[str]:
+    """
+    Convierte un texto en la lista de términos del índice
+
+    - "Ley 19.496" -> ["ley", "19496"]
+    - "RIT C-1234-2024" -> ["rit", "c-1234-2024", "1234", "2024"]
+    - "artículos" / "art." -> ["articul"]
+    """
+    terms = []
+
+    for token in _TOKEN_RE.findall(fold_accents(text)):
+        # Números de ley con separador de miles: 19.496 -> 19496
+        if _THOUSANDS_RE.match(token):
+            terms.append(token.replace(".", ""))
+            continue
+
+        if any(sep in token for sep in ".-/"):
+            # Identificador compuesto: el token completo y sus partes significativas
+            terms.append(token)
+            parts = re.split(r"[.\-/]", token)
+        else:
+            parts = [token]
+
+        for part in parts:
+            part = ABBREVIATIONS.get(part, part)
+            if part in SPANISH_STOPWORDS:
+                continue
+            if len(part) < 2 and not part.isdigit():
+                continue
+            terms.append(stem(part))
+
+    return terms
+
+
+class LexicalIndex:
+    """Índice BM25 memory-mapped"""
+
+    def __init__(self, index_dir: Path):
+        """
+        Args:
+            index_dir: Directorio con un índice construido por build()
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy no instalado. pip install numpy")
+
+        self.index_dir = Path(index_dir)
+        manifest_path = self.index_dir / MANIFEST_FILE
+
+        if not manifest_path.exists():
+            raise FileNotFoundError(
+                f"Índice léxico no encontrado en {self.index_dir}. "
+                "Constrúyelo con: python -m rag.lexical_index"
+            )
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        self.categories: List[str] = self.manifest.get("categories", [])
+        self._category_codes = {cat: code for code, cat in enumerate(self.categories)}
+
+        with open(self.index_dir / "vocab.txt", 'r', encoding='utf-8') as f:
+            self.vocab = {term: term_id for term_id, term in enumerate(f.read().split("\n")) if term}
+
+        self.idf = np.load(self.index_dir / "idf.npy")
+        self.postings_offsets = np.load(self.index_dir / "postings_offsets.npy")
+        self.postings_docs = np.asarray(np.load(self.index_dir / "postings_docs.npy", mmap_mode="r"))
+        self.postings_weights = np.asarray(np.load(self.index_dir / "postings_weights.npy", mmap_mode="r"))
+        self.category_codes = np.asarray(np.load(self.index_dir / "categories.npy", mmap_mode="r"))
+        self.metadata_offsets = np.load(self.index_dir / "metadata_offsets.npy")
+
+        self._metadata_file = open(self.index_dir / "metadata.jsonl", 'rb')
+        self._metadata_map = (
+            mmap.mmap(self._metadata_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self) else None
+        )
+
+    def __len__(self) -> int:
+        return int(self.manifest.get("count", 0))
+
+    def close(self):
+        """Libera el mmap de metadata"""
+        if self._metadata_map is not None:
+            self._metadata_map.close()
+            self._metadata_map = None
+        self._metadata_file.close()
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build(
+        documents: Iterable[Tuple[str, str, Dict]],
+        index_dir: Path,
+        k1: float = BM25_K1,
+        b: float = BM25_B
+    ) -> Dict:
+        """
+        Construye el índice a partir de tuplas (id, texto, metadata)
+
+        Args:
+            documents: Tuplas (id, texto a indexar, metadata a devolver)
+            index_dir: Directorio de salida
+            k1, b: Parámetros BM25
+
+        Returns:
+            Manifiesto del índice construido
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy no instalado. pip install numpy")
+
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        # Deduplicar por id (el último gana)
+        rows: Dict[str, Tuple[Counter, Dict]] = {}
+        for doc_id, text, metadata in documents:
+            rows[doc_id] = (Counter(analyze(text)), metadata or {})
+
+        ids = list(rows.keys())
+        count = len(ids)
+
+        doc_lengths = np.asarray([sum(rows[i][0].values()) for i in ids], dtype=np.float32)
+        avg_length = float(doc_lengths.mean()) if count else 0.0
+
+        # Postings agrupados por término
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for row, doc_id in enumerate(ids):
+            for term, tf in rows[doc_id][0].items():
+                postings.setdefault(term, []).append((row, tf))
+
+        vocab = sorted(postings)
+        idf = np.zeros(len(vocab), dtype=np.float32)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        total_postings = sum(len(p) for p in postings.values())
+        posting_docs = np.zeros(total_postings, dtype=np.int32)
+        posting_weights = np.zeros(total_postings, dtype=np.float32)
+
+        position = 0
+        for term_id, term in enumerate(vocab):
+            term_postings = postings[term]
+            df = len(term_postings)
+            idf[term_id] = np.log(1 + (count - df + 0.5) / (df + 0.5))
+
+            docs = np.asarray([row for row, _ in term_postings], dtype=np.int32)
+            tfs = np.asarray([tf for _, tf in term_postings], dtype=np.float32)
+            norm = k1 * (1 - b + b * doc_lengths[docs] / avg_length)
+
+            end = position + df
+            posting_docs[position:end] = docs
+            posting_weights[position:end] = idf[term_id] * tfs * (k1 + 1) / (tfs + norm)
+            offsets[term_id + 1] = end
+            position = end
+
+        _replace_file(index_dir / "vocab.txt", lambda f: f.write("\n".join(vocab).encode("utf-8")))
+        _replace_file(index_dir / "idf.npy", lambda f: np.save(f, idf))
+        _replace_file(index_dir / "postings_offsets.npy", lambda f: np.save(f, offsets))
+        _replace_file(index_dir / "postings_docs.npy", lambda f: np.save(f, posting_docs))
+        _replace_file(index_dir / "postings_weights.npy", lambda f: np.save(f, posting_weights))
+
+        # Categorías codificadas para filtrar sin leer metadata
+        categories = sorted({str(rows[i][1].get("category", "")) for i in ids})
+        category_lookup = {cat: code for code, cat in enumerate(categories)}
+        category_codes = np.asarray(
+            [category_lookup[str(rows[i][1].get("category", ""))] for i in ids],
+            dtype=np.int16
+        )
+        _replace_file(index_dir / "categories.npy", lambda f: np.save(f, category_codes))
+
+        # Metadata en JSONL + offsets para lectura aleatoria vía mmap
+        metadata_offsets = np.zeros(count + 1, dtype=np.int64)
+
+        def write_metadata(f):
+            for row, doc_id in enumerate(ids):
+                line = json.dumps(
+                    {"id": doc_id, "metadata": rows[doc_id][1]},
+                    ensure_ascii=False
+                ).encode("utf-8") + b"\n"
+                f.write(line)
+                metadata_offsets[row + 1] = metadata_offsets[row] + len(line)
+
+        _replace_file(index_dir / "metadata.jsonl", write_metadata)
+        _replace_file(index_dir / "metadata_offsets.npy", lambda f: np.save(f, metadata_offsets))
+
+        manifest = {
+            "count": count,
+            "terms": len(vocab),
+            "postings": int(total_postings),
+            "avg_doc_length": avg_length,
+            "k1": k1,
+            "b": b,
+            "categories": categories,
+            "built_at": datetime.now().isoformat()
+        }
+
+        # El manifiesto se escribe al final: marca el índice como completo
+        _replace_file(
+            index_dir / MANIFEST_FILE,
+            lambda f: f.write(json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+        )
+
+        return manifest
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def _read_metadata(self, row: int) -> Dict:
+        """Lee la línea de metadata de una fila desde el mmap"""
+        start, end = self.metadata_offsets[row], self.metadata_offsets[row + 1]
+        return json.loads(self._metadata_map[start:end])
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 20,
+        filter: Optional[Dict] = None
+    ) -> List[Tuple[str, float, float, Dict]]:
+        """
+        Busca documentos por BM25
+
+        Args:
+            query: Texto de la consulta
+            top_k: Número de resultados
+            filter: Filtro de metadata (mismo formato que el índice vectorial)
+
+        Returns:
+            Lista de (id, bm25, cobertura, metadata). La cobertura es
+            bm25 / suma de IDF de los términos de la consulta, acotada a 1:
+            ~1.0 cuando el documento contiene todos los términos (ponderados
+            por rareza) con frecuencia normal.
+        """
+        if not len(self):
+            return []
+
+        term_ids = sorted({self.vocab[t] for t in analyze(query) if t in self.vocab})
+        if not term_ids:
+            return []
+
+        docs = np.concatenate([
+            self.postings_docs[self.postings_offsets[t]:self.postings_offsets[t + 1]]
+            for t in term_ids
+        ])
+        weights = np.concatenate([
+            self.postings_weights[self.postings_offsets[t]:self.postings_offsets[t + 1]]
+            for t in term_ids
+        ])
+
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights).astype(np.float32)
+
+        # Filtros: categoría vía códigos; el resto sobre la metadata
+        filter = dict(filter or {})
+        if "category" in filter:
+            accepted = _parse_filter_value(filter.pop("category"))
+            codes = [self._category_codes[c] for c in accepted if c in self._category_codes]
+            keep = np.isin(self.category_codes[candidates], codes)
+            candidates, scores = candidates[keep], scores[keep]
+
+        order = np.argsort(-scores, kind="stable")
+        query_weight = float(self.idf[term_ids].sum()) or 1.0
+
+        results = []
+        for position in order:
+            record = self._read_metadata(int(candidates[position]))
+            metadata = record["metadata"]
+
+            if any(metadata.get(key) not in _parse_filter_value(value) for key, value in filter.items()):
+                continue
+
+            score = float(scores[position])
+            results.append((record["id"], score, min(1.0, score / query_weight), metadata))
+            if len(results) >= top_k:
+                break
+
+        return results
+
+    def get_stats(self) -> Dict:
+        """Estadísticas del índice"""
+        return {
+            "total_documents": len(self),
+            "terms": self.manifest.get("terms", 0),
+            "postings": self.manifest.get("postings", 0),
+            "avg_doc_length": self.manifest.get("avg_doc_length", 0),
+            "categories": self.categories,
+            "built_at": self.manifest.get("built_at")
+        }
+
+
+def chunk_index_text(chunk: Dict) -> str:
+    """Texto que se indexa: ley + artículo + contenido del chunk completo"""
+    metadata = chunk.get("metadata", {})
+    parts = [metadata.get("law_name", "")]
+    if metadata.get("article_number"):
+        parts.append(f"artículo {metadata['article_number']}")
+    parts.append(chunk.get("text", ""))
+    return " ".join(p for p in parts if p)
+
+
+def iter_chunk_documents(chunks_dir: Path) -> Iterable[Tuple[str, str, Dict]]:
+    """Lee los *_chunks.jsonl (o *_chunks.json) de TextProcessor como tuplas (id, texto, metadata)"""
+    from data_processing.text_processor import find_chunk_files, iter_chunks_file
+    from rag.vector_store import chunk_metadata
+
+    for chunks_file in find_chunk_files(chunks_dir):
+        print(f"📄 Leyendo: {chunks_file.name}")
+        for chunk in iter_chunks_file(chunks_file):
+            yield chunk["chunk_id"], chunk_index_text(chunk), chunk_metadata(chunk)
+
+
+def main():
+    """Construye el índice léxico desde los chunks procesados"""
+    parser = argparse.ArgumentParser(description="Construye el índice BM25 de LEIA")
+    parser.add_argument("--chunks-dir", default="data/processed", help="Directorio con *_chunks.jsonl")
+    parser.add_argument("--index-dir", default="data/lexical", help="Directorio de salida del índice")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ÍNDICE LÉXICO (BM25) - LEIA")
+    print("=" * 60)
+
+    manifest = LexicalIndex.build(iter_chunk_documents(Path(args.chunks_dir)), Path(args.index_dir))
+
+    print(f"\n✅ Índice construido en {args.index_dir}")
+    print(f"   • Documentos: {manifest['count']:,}")
+    print(f"   • Términos: {manifest['terms']:,}")
+    print(f"   • Largo promedio: {manifest['avg_doc_length']:.1f} términos")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,779 @@
+"""
+Local Index - Índice vectorial embebido (en proceso) para LEIA
+
+Alternativa local a Pinecone para corpus pequeños/medianos:
+- Matriz de vectores float32/float16/int8 memory-mapped (vectors.npy)
+- Índice IVF (k-means esférico) para búsqueda aproximada
+- Metadata en JSONL con offsets, leída solo para los resultados
+- Mismo contrato que VectorStore.search(query_vector, top_k, filter)
+- Particiones por área legal (rag/partitions.py): en búsqueda exacta cada
+  partición es un tramo contiguo de filas y una consulta ruteada solo
+  puntúa esos tramos; con IVF se filtran por código como las categorías
+
+Estructura del directorio del índice:
+    index.json            Manifiesto (dimensión, dtype, nlist, categorías...)
+    vectors.npy           Vectores normalizados, ordenados por lista IVF
+                          (float32, float16 o int8 con escala por fila)
+    scales.npy            Escala de cada fila int8 (solo dtype int8)
+    rescore.npy           Vectores float16 para reordenar candidatos int8 (opcional)
+    centroids.npy         Centroides IVF (nlist x dim, float32)
+    list_offsets.npy      Inicio de cada lista IVF en vectors.npy (nlist + 1)
+    categories.npy        Código de categoría por fila (int16)
+    partitions.npy        Código de partición (área legal) por fila (int16)
+    metadata.jsonl        {"id": ..., "metadata": {...}} por fila
+    metadata_offsets.npy  Offset en bytes de cada línea de metadata.jsonl
+    deleted.npy           Filas borradas desde el último build (tombstones, opcional)
+
+Escrituras incrementales (LocalIndexBackend): delete() solo marca filas en
+deleted.npy; upsert() reescribe las matrices sin las filas borradas pero
+reutiliza los centroides IVF (sin k-means) mientras el índice no crezca
+más de RETRAIN_GROWTH veces respecto de cuando se entrenaron.
+"""
+
+import json
+import mmap
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rag.partitions import partition_for
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Bajo este número de vectores no vale la pena construir IVF: búsqueda exacta
+EXACT_SEARCH_THRESHOLD = 10_000
+
+# Listas IVF exploradas por defecto. nlist se elige como sqrt(nprobe * N), lo que
+# equilibra el costo de puntuar centroides con el de puntuar las listas elegidas
+DEFAULT_NPROBE = 12
+
+# Máximo de filas usadas para entrenar los centroides
+KMEANS_TRAINING_SAMPLE = 50_000
+
+INDEX_DTYPES = ("float32", "float16", "int8")
+
+# Con rescore: candidatos int8 por resultado que se reordenan con float16
+RESCORE_FACTOR = 4
+
+# Un upsert reentrena los centroides solo si el índice creció más que esto
+# desde el último entrenamiento
+RETRAIN_GROWTH = 2.0
+
+# Filas que se reservan de una vez al leer los registros de un build
+BUILD_BLOCK_ROWS = 4096
+
+MANIFEST_FILE = "index.json"
+DELETED_FILE = "deleted.npy"
+
+
+def _normalize_rows(matrix: "np.ndarray") -> "np.ndarray":
+    """Normaliza filas a norma 1 (cosine = producto punto)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _spherical_kmeans(
+    data: "np.ndarray",
+    nlist: int,
+    iterations: int = 8,
+    seed: int = 42
+) -> "np.ndarray":
+    """
+    K-means esférico simple para entrenar los centroides IVF
+
+    Args:
+        data: Vectores normalizados (float32)
+        nlist: Número de listas (centroides)
+        iterations: Iteraciones de refinamiento
+
+    Returns:
+        Centroides normalizados (nlist x dim)
+    """
+    rng = np.random.default_rng(seed)
+
+    if len(data) > KMEANS_TRAINING_SAMPLE:
+        sample = data[rng.choice(len(data), KMEANS_TRAINING_SAMPLE, replace=False)]
+    else:
+        sample = data
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign_lists(sample, centroids)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+
+        # Listas vacías: re-sembrar con un punto aleatorio
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+
+        centroids = _normalize_rows(sums).astype(np.float32)
+
+    return centroids
+
+
+def _assign_lists(
+    data: "np.ndarray",
+    centroids: "np.ndarray",
+    block_size: int = 8192
+) -> "np.ndarray":
+    """Asigna cada vector a su centroide más cercano (por bloques para acotar memoria)"""
+    assignments = np.empty(len(data), dtype=np.int32)
+
+    for start in range(0, len(data), block_size):
+        block = np.asarray(data[start:start + block_size], dtype=np.float32)
+        assignments[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+
+    return assignments
+
+
+def _replace_file(path: Path, write) -> None:
+    """
+    Escribe un archivo del índice en un temporal y lo reemplaza atómicamente.
+
+    Los lectores que ya tienen el archivo mapeado conservan el inodo anterior,
+    por lo que reconstruir el índice en caliente no corrompe búsquedas en curso.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _collect_rows(
+    records: Iterable[Tuple[str, "np.ndarray", Dict]],
+    dimension: int
+) -> Tuple[List[str], "np.ndarray", List[Dict]]:
+    """
+    Lee tuplas (id, vector, metadata) a una matriz float32 que crece por
+    bloques, sin listas intermedias de floats. Un id repetido reemplaza su
+    fila (el último gana, igual que un upsert).
+
+    Returns:
+        (ids, matriz count x dimension, metadata por fila)
+    """
+    ids: List[str] = []
+    metadata_rows: List[Dict] = []
+    row_of: Dict[str, int] = {}
+    matrix = np.empty((BUILD_BLOCK_ROWS, dimension), dtype=np.float32)
+
+    for vector_id, vector, metadata in records:
+        if len(vector) != dimension:
+            raise ValueError(
+                f"Vector '{vector_id}' tiene {len(vector)} dimensiones, se esperaban {dimension}"
+            )
+        row = row_of.get(vector_id)
+        if row is None:
+            row = row_of[vector_id] = len(ids)
+            ids.append(vector_id)
+            metadata_rows.append(metadata or {})
+            if row == len(matrix):
+                matrix = np.concatenate([matrix, np.empty((max(BUILD_BLOCK_ROWS, row), dimension), dtype=np.float32)])
+        else:
+            metadata_rows[row] = metadata or {}
+        matrix[row] = vector
+
+    return ids, matrix[:len(ids)], metadata_rows
+
+
+def _row_partition(metadata: Dict) -> str:
+    """Partición de una fila: la guardada en la metadata o la de su categoría"""
+    return str(metadata.get("partition") or partition_for(metadata.get("category")))
+
+
+def _parse_filter_value(condition) -> Optional[set]:
+    """
+    Traduce una condición de filtro estilo Pinecone a un set de valores aceptados
+
+    Soporta: "laboral", {"$eq": "laboral"}, {"$in": ["laboral", "familia"]}
+    """
+    if isinstance(condition, dict):
+        if "$eq" in condition:
+            return {condition["$eq"]}
+        if "$in" in condition:
+            return set(condition["$in"])
+        raise ValueError(f"Operador de filtro no soportado: {list(condition.keys())}")
+    return {condition}
+
+
+class LocalVectorIndex:
+    """Índice vectorial local memory-mapped con búsqueda IVF"""
+
+    def __init__(self, index_dir: Path, nprobe: Optional[int] = None):
+        """
+        Args:
+            index_dir: Directorio con un índice construido por build()
+            nprobe: Listas IVF a explorar por consulta (None = automático)
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy no instalado. pip install numpy")
+
+        self.index_dir = Path(index_dir)
+        manifest_path = self.index_dir / MANIFEST_FILE
+
+        if not manifest_path.exists():
+            raise FileNotFoundError(
+                f"Índice local no encontrado en {self.index_dir}. "
+                "Constrúyelo con: python -m rag.local_index"
+            )
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        self.dimension = self.manifest["dimension"]
+        self.metric = self.manifest.get("metric", "cosine")
+        self.categories: List[str] = self.manifest.get("categories", [])
+        self._category_codes = {cat: code for code, cat in enumerate(self.categories)}
+
+        # Índices anteriores a las particiones no las tienen: solo búsqueda global
+        self.partitions: List[str] = self.manifest.get("partitions", [])
+        self._partition_codes = {part: code for code, part in enumerate(self.partitions)}
+        self.partition_offsets = self.manifest.get("partition_offsets")
+
+        # Matrices memory-mapped: el SO carga solo las páginas que se tocan.
+        # np.asarray quita la subclase memmap (más barata de rebanar por consulta)
+        self.vectors = np.asarray(np.load(self.index_dir / "vectors.npy", mmap_mode="r"))
+        self.dtype = self.manifest.get("dtype", "float32")
+        self.scales = np.load(self.index_dir / "scales.npy") if self.dtype == "int8" else None
+        self.rescore_vectors = (
+            np.asarray(np.load(self.index_dir / "rescore.npy", mmap_mode="r"))
+            if self.manifest.get("rescore") else None
+        )
+        self.rescore_factor = self.manifest.get("rescore_factor", RESCORE_FACTOR)
+        self.category_codes = np.asarray(np.load(self.index_dir / "categories.npy", mmap_mode="r"))
+        self.partition_codes = (
+            np.asarray(np.load(self.index_dir / "partitions.npy", mmap_mode="r"))
+            if self.partitions else None
+        )
+        self.metadata_offsets = np.load(self.index_dir / "metadata_offsets.npy")
+
+        self.nlist = self.manifest.get("nlist", 0)
+        if self.nlist:
+            self.centroids = np.load(self.index_dir / "centroids.npy")
+            self.list_offsets = np.load(self.index_dir / "list_offsets.npy")
+        else:
+            self.centroids = None
+            self.list_offsets = None
+
+        self.nprobe = nprobe or self.manifest.get("nprobe", 1)
+
+        # Filas físicas de las matrices; las borradas quedan marcadas en deleted
+        self.row_count = int(self.manifest.get("count", 0))
+        self.deleted = np.zeros(self.row_count, dtype=bool)
+        deleted_path = self.index_dir / DELETED_FILE
+        if deleted_path.exists():
+            self.deleted[np.load(deleted_path)] = True
+        self._deleted_count = int(self.deleted.sum())
+        self._row_ids: Optional[Dict[str, int]] = None
+
+        self._metadata_file = open(self.index_dir / "metadata.jsonl", 'rb')
+        self._metadata_map = (
+            mmap.mmap(self._metadata_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.row_count else None
+        )
+
+    def __len__(self) -> int:
+        return self.row_count - self._deleted_count
+
+    def close(self):
+        """Libera el mmap de metadata"""
+        if self._metadata_map is not None:
+            self._metadata_map.close()
+            self._metadata_map = None
+        self._metadata_file.close()
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build(
+        records: Iterable[Tuple[str, List[float], Dict]],
+        index_dir: Path,
+        dimension: int = 1536,
+        dtype: str = "float32",
+        metric: str = "cosine",
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        rescore: bool = False,
+        centroids: Optional["np.ndarray"] = None,
+        trained_count: Optional[int] = None
+    ) -> Dict:
+        """
+        Construye un índice local a partir de tuplas (id, vector, metadata)
+
+        Args:
+            records: Tuplas (id, vector, metadata) como las de VectorStore.upsert_vectors
+                (vector como lista o array de numpy)
+            index_dir: Directorio de salida
+            dimension: Dimensiones de los vectores
+            dtype: "float32", "float16" o "int8" (escala por fila) para la matriz en disco
+            metric: "cosine" o "dotproduct"
+            nlist: Listas IVF (None = automático, 0 = búsqueda exacta)
+            nprobe: Listas a explorar por consulta por defecto
+            rescore: Con int8, guardar vectores float16 para reordenar los candidatos
+            centroids: Centroides IVF ya entrenados (se asignan las filas sin k-means)
+            trained_count: Filas con que se entrenaron esos centroides
+
+        Returns:
+            Manifiesto del índice construido
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy no instalado. pip install numpy")
+        if metric not in ("cosine", "dotproduct"):
+            raise ValueError(f"Métrica no soportada por el índice local: {metric}")
+        if dtype not in INDEX_DTYPES:
+            raise ValueError(f"dtype no soportado: {dtype}")
+        rescore = rescore and dtype == "int8"
+
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        ids, matrix, metadata_rows = _collect_rows(records, dimension)
+        count = len(ids)
+
+        if metric == "cosine" and count:
+            matrix = _normalize_rows(matrix).astype(np.float32)
+
+        # Entrenar IVF (o reutilizar los centroides dados) y ordenar filas por
+        # lista para que cada lista sea contigua
+        if centroids is not None and count >= len(centroids):
+            nlist = len(centroids)
+            trained_count = trained_count or count
+        else:
+            centroids = None
+            if nlist is None:
+                nlist = 0 if count <= EXACT_SEARCH_THRESHOLD else int(np.sqrt(DEFAULT_NPROBE * count))
+            nlist = min(nlist, count)
+            trained_count = count if nlist else 0
+
+        # Partición de cada fila (la de la metadata o la derivada de la categoría)
+        row_partitions = [_row_partition(metadata) for metadata in metadata_rows]
+        partitions = sorted(set(row_partitions))
+        partition_lookup = {part: code for code, part in enumerate(partitions)}
+        partition_codes = np.asarray([partition_lookup[part] for part in row_partitions], dtype=np.int16)
+        partition_offsets = None
+
+        if nlist:
+            if centroids is None:
+                centroids = _spherical_kmeans(matrix, nlist)
+            assignments = _assign_lists(matrix, centroids)
+            order = np.argsort(assignments, kind="stable")
+            list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+            list_offsets[1:] = np.cumsum(np.bincount(assignments, minlength=nlist))
+            _replace_file(index_dir / "centroids.npy", lambda f: np.save(f, centroids))
+            _replace_file(index_dir / "list_offsets.npy", lambda f: np.save(f, list_offsets))
+        else:
+            # Búsqueda exacta: cada partición contigua, una consulta ruteada puntúa solo su tramo
+            order = np.argsort(partition_codes, kind="stable")
+            partition_offsets = [0] + np.cumsum(
+                np.bincount(partition_codes, minlength=len(partitions))
+            ).tolist()
+
+        matrix = matrix[order]
+        ids = [ids[i] for i in order]
+        metadata_rows = [metadata_rows[i] for i in order]
+        partition_codes = partition_codes[order]
+        _replace_file(index_dir / "partitions.npy", lambda f: np.save(f, partition_codes))
+
+        if dtype == "int8":
+            # Cuantización simétrica por fila: valor ≈ código * escala
+            scales = np.abs(matrix).max(axis=1) / 127.0 if count else np.zeros(0, dtype=np.float32)
+            scales[scales == 0] = 1.0
+            codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+            _replace_file(index_dir / "vectors.npy", lambda f: np.save(f, codes))
+            _replace_file(index_dir / "scales.npy", lambda f: np.save(f, scales.astype(np.float32)))
+            if rescore:
+                _replace_file(index_dir / "rescore.npy", lambda f: np.save(f, matrix.astype(np.float16)))
+        else:
+            _replace_file(index_dir / "vectors.npy", lambda f: np.save(f, matrix.astype(dtype)))
+
+        # Categorías codificadas para filtrar sin leer metadata
+        categories = sorted({str(metadata.get("category", "")) for metadata in metadata_rows})
+        category_lookup = {cat: code for code, cat in enumerate(categories)}
+        category_codes = np.asarray(
+            [category_lookup[str(metadata.get("category", ""))] for metadata in metadata_rows],
+            dtype=np.int16
+        )
+        _replace_file(index_dir / "categories.npy", lambda f: np.save(f, category_codes))
+
+        # Metadata en JSONL + offsets para lectura aleatoria vía mmap
+        offsets = np.zeros(count + 1, dtype=np.int64)
+
+        def write_metadata(f):
+            for row, vector_id in enumerate(ids):
+                line = json.dumps(
+                    {"id": vector_id, "metadata": metadata_rows[row]},
+                    ensure_ascii=False
+                ).encode("utf-8") + b"\n"
+                f.write(line)
+                offsets[row + 1] = offsets[row] + len(line)
+
+        _replace_file(index_dir / "metadata.jsonl", write_metadata)
+        _replace_file(index_dir / "metadata_offsets.npy", lambda f: np.save(f, offsets))
+
+        manifest = {
+            "count": count,
+            "dimension": dimension,
+            "dtype": dtype,
+            "rescore": rescore,
+            "rescore_factor": RESCORE_FACTOR if rescore else 0,
+            "metric": metric,
+            "nlist": nlist,
+            "trained_count": trained_count,
+            "nprobe": nprobe or (min(DEFAULT_NPROBE, nlist) if nlist else 0),
+            "categories": categories,
+            "partitions": partitions,
+            "partition_offsets": partition_offsets,
+            "built_at": datetime.now().isoformat()
+        }
+
+        # Las filas cambiaron: los tombstones del índice anterior ya no aplican
+        (index_dir / DELETED_FILE).unlink(missing_ok=True)
+
+        # El manifiesto se escribe al final: marca el índice como completo
+        _replace_file(
+            index_dir / MANIFEST_FILE,
+            lambda f: f.write(json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+        )
+
+        return manifest
+
+    @property
+    def trained_count(self) -> int:
+        """Filas con que se entrenaron los centroides IVF (0 = búsqueda exacta)"""
+        return int(self.manifest.get("trained_count", self.row_count if self.nlist else 0))
+
+    def iter_ids(self) -> Iterable[str]:
+        """Recorre los ids del índice (sin leer vectores ni filas borradas)"""
+        for row in range(self.row_count):
+            if not self.deleted[row]:
+                yield self._read_metadata(row)["id"]
+
+    def iter_records(self) -> Iterable[Tuple[str, "np.ndarray", Dict]]:
+        """
+        Recorre el índice como tuplas (id, vector float32, metadata), sin
+        filas borradas. Los vectores quedan en numpy para que build() los
+        copie directo a su matriz.
+        """
+        for row in range(self.row_count):
+            if self.deleted[row]:
+                continue
+            record = self._read_metadata(row)
+            yield record["id"], self._row_vector(row), record["metadata"]
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """
+        Marca filas como borradas (tombstones en deleted.npy) sin reconstruir
+        el índice: dejan de aparecer en búsquedas y se descartan en el
+        próximo build.
+
+        Returns:
+            Filas marcadas
+        """
+        if self._row_ids is None:
+            self._row_ids = {
+                self._read_metadata(row)["id"]: row
+                for row in range(self.row_count) if not self.deleted[row]
+            }
+
+        rows = [self._row_ids.pop(vector_id) for vector_id in set(ids) if vector_id in self._row_ids]
+        if not rows:
+            return 0
+
+        self.deleted[rows] = True
+        self._deleted_count = int(self.deleted.sum())
+        deleted_rows = np.flatnonzero(self.deleted)
+        _replace_file(self.index_dir / DELETED_FILE, lambda f: np.save(f, deleted_rows))
+        return len(rows)
+
+    def _row_vector(self, row: int) -> "np.ndarray":
+        """Vector float32 de una fila (con int8: el de rescore o el decuantizado)"""
+        if self.rescore_vectors is not None:
+            return self.rescore_vectors[row].astype(np.float32)
+        vector = self.vectors[row].astype(np.float32)
+        if self.scales is not None:
+            vector *= self.scales[row]
+        return vector
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def _read_metadata(self, row: int) -> Dict:
+        """Lee la línea de metadata de una fila desde el mmap"""
+        start, end = self.metadata_offsets[row], self.metadata_offsets[row + 1]
+        return json.loads(self._metadata_map[start:end])
+
+    def _candidate_ranges(
+        self,
+        query: "np.ndarray",
+        nprobe: int,
+        partition_codes: Optional[set] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Rangos de filas [inicio, fin) de las listas IVF más cercanas a la
+        consulta (en búsqueda exacta, los tramos de las particiones pedidas)
+        """
+        if not self.nlist:
+            if partition_codes is None:
+                return [(0, self.row_count)]
+            return [
+                (self.partition_offsets[code], self.partition_offsets[code + 1])
+                for code in sorted(partition_codes)
+                if self.partition_offsets[code + 1] > self.partition_offsets[code]
+            ]
+
+        nprobe = min(nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.nlist)
+
+        starts = self.list_offsets[probes].tolist()
+        ends = self.list_offsets[probes + 1].tolist()
+        return [(start, end) for start, end in zip(starts, ends) if end > start]
+
+    def _category_mask(self, accepted: set) -> Optional[set]:
+        """Códigos de categoría aceptados por el filtro"""
+        return {self._category_codes[c] for c in accepted if c in self._category_codes}
+
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        filter: Optional[Dict] = None,
+        partitions: Optional[List[str]] = None
+    ) -> List[Tuple[str, float, Dict]]:
+        """
+        Busca los vectores más similares
+
+        Args:
+            query_vector: Vector de la consulta
+            top_k: Número de resultados a devolver
+            filter: Filtros de metadata estilo Pinecone (ej: {"category": "laboral"})
+            partitions: Particiones a consultar (None = todo el índice; se
+                ignora en índices construidos sin particiones)
+
+        Returns:
+            Lista de tuplas (id, score, metadata) ordenadas por score
+        """
+        if not len(self) or top_k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape != (self.dimension,):
+            raise ValueError(
+                f"La consulta tiene {query.shape[0]} dimensiones, el índice {self.dimension}"
+            )
+        if self.metric == "cosine":
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+
+        filter = dict(filter or {})
+        category_codes = None
+        if "category" in filter:
+            category_codes = self._category_mask(_parse_filter_value(filter.pop("category")))
+            if not category_codes:
+                return []
+        other_filters = {key: _parse_filter_value(cond) for key, cond in filter.items()}
+
+        partition_codes = None
+        if partitions and self.partitions:
+            partition_codes = {self._partition_codes[p] for p in partitions if p in self._partition_codes}
+            if not partition_codes:
+                return []
+
+        # Con búsqueda exacta la partición ya acotó los rangos; con IVF se filtra por código
+        masks = []
+        if category_codes is not None:
+            masks.append((self.category_codes, category_codes))
+        if partition_codes is not None and self.nlist:
+            masks.append((self.partition_codes, partition_codes))
+
+        # Con filtros restrictivos las listas IVF pueden no tener suficientes
+        # candidatos: se duplica nprobe hasta completar top_k o recorrer todo
+        nprobe = self.nprobe
+        while True:
+            results = self._search_ranges(
+                query, self._candidate_ranges(query, nprobe, partition_codes), top_k,
+                masks, other_filters
+            )
+            if len(results) >= top_k or not self.nlist or nprobe >= self.nlist:
+                return results
+            nprobe *= 2
+
+    def _search_ranges(
+        self,
+        query: "np.ndarray",
+        ranges: List[Tuple[int, int]],
+        top_k: int,
+        masks: List[Tuple["np.ndarray", set]],
+        other_filters: Dict[str, set]
+    ) -> List[Tuple[str, float, Dict]]:
+        """Puntúa los rangos candidatos y devuelve el top_k que cumple los filtros"""
+        total = sum(end - start for start, end in ranges)
+        rows = np.empty(total, dtype=np.int64)
+        scores = np.empty(total, dtype=np.float32)
+
+        position = 0
+        for start, end in ranges:
+            size = end - start
+            block = self.vectors[start:end]
+            if block.dtype != np.float32:
+                block = block.astype(np.float32)
+            np.matmul(block, query, out=scores[position:position + size])
+            if self.scales is not None:
+                scores[position:position + size] *= self.scales[start:end]
+            rows[position:position + size] = np.arange(start, end)
+            position += size
+
+        if self._deleted_count:
+            keep = ~self.deleted[rows]
+            rows, scores = rows[keep], scores[keep]
+
+        # Filtros por código (categoría, partición) sin leer metadata
+        for codes, accepted in masks:
+            keep = np.isin(codes[rows], list(accepted))
+            rows, scores = rows[keep], scores[keep]
+
+        if not len(rows):
+            return []
+
+        # Filtros sobre otros campos requieren leer metadata: sobre-muestrear
+        limit = top_k if not other_filters else min(len(rows), top_k * 4)
+
+        # int8 con rescore: los mejores candidatos aproximados se puntúan con float16
+        if self.rescore_vectors is not None:
+            candidates = min(len(rows), limit * self.rescore_factor)
+            if candidates < len(rows):
+                keep = np.argpartition(-scores, candidates - 1)[:candidates]
+                rows = rows[keep]
+            order = np.argsort(rows)
+            rows = rows[order]
+            scores = self.rescore_vectors[rows].astype(np.float32) @ query
+        if limit < len(rows):
+            best = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            best = np.arange(len(rows))
+        best = best[np.argsort(-scores[best], kind="stable")]
+
+        results = []
+        for position in best:
+            record = self._read_metadata(int(rows[position]))
+            metadata = record["metadata"]
+            if other_filters and not all(
+                metadata.get(key) in accepted for key, accepted in other_filters.items()
+            ):
+                continue
+            results.append((record["id"], float(scores[position]), metadata))
+            if len(results) == top_k:
+                break
+
+        return results
+
+    def _partition_counts(self) -> Dict[str, Dict]:
+        """Vectores por partición, con el formato de namespaces de Pinecone"""
+        if not self.partitions:
+            return {}
+        counts = np.bincount(self.partition_codes[~self.deleted], minlength=len(self.partitions))
+        return {
+            partition: {"vector_count": int(count)}
+            for partition, count in zip(self.partitions, counts)
+        }
+
+    def get_stats(self) -> Dict:
+        """Estadísticas del índice (mismo formato que VectorStore.get_stats)"""
+        return {
+            "total_vectors": len(self),
+            "dimension": self.dimension,
+            "index_fullness": 0.0,
+            "namespaces": self._partition_counts(),
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "deleted": self._deleted_count,
+            "dtype": self.dtype,
+            "rescore": self.rescore_vectors is not None,
+            "built_at": self.manifest.get("built_at")
+        }
+
+
+def iter_embedding_records(embeddings_dir: Path) -> Iterable[Tuple[str, List[float], Dict]]:
+    """
+    Recorre los archivos de embeddings (artefactos *_embedded.npy o
+    *_embedded.json) y genera tuplas (id, vector, metadata) con la misma
+    metadata que se sube a Pinecone
+    """
+    from data_processing.embedding_artifact import EmbeddingArtifact, find_embedding_files
+    from rag.vector_store import chunk_to_vector
+
+    for emb_file in find_embedding_files(embeddings_dir):
+        if emb_file.suffix == ".npy":
+            with EmbeddingArtifact(emb_file) as artifact:
+                yield from artifact.iter_vectors()
+            continue
+
+        with open(emb_file, 'r', encoding='utf-8') as f:
+            chunks = json.load(f)
+
+        for chunk in chunks:
+            if "embedding" in chunk:
+                yield chunk_to_vector(chunk)
+
+
+def main():
+    """Construye el índice local desde data/embeddings"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Índice vectorial local de LEIA")
+    parser.add_argument("--embeddings-dir", default="data/embeddings")
+    parser.add_argument("--index-dir", default="data/index")
+    parser.add_argument("--dtype", choices=list(INDEX_DTYPES), default=None,
+                        help="Precisión de la matriz (default: la del perfil EMBEDDING_PROFILE)")
+    parser.add_argument("--nlist", type=int, default=None, help="Listas IVF (0 = exacto)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ÍNDICE VECTORIAL LOCAL - LEIA")
+    print("=" * 60)
+
+    embeddings_dir = Path(args.embeddings_dir)
+    if not embeddings_dir.exists():
+        print(f"\n❌ Directorio no encontrado: {embeddings_dir}")
+        print("Primero ejecuta embedder.py para generar embeddings")
+        return
+
+    from rag.embedding_profiles import get_profile
+    profile = get_profile()
+
+    manifest = LocalVectorIndex.build(
+        iter_embedding_records(embeddings_dir),
+        Path(args.index_dir),
+        dimension=profile.dimensions,
+        dtype=args.dtype or profile.dtype,
+        nlist=args.nlist,
+        rescore=profile.rescore
+    )
+
+    print(f"\n✅ Índice construido en {args.index_dir}")
+    print(f"  • Perfil: {profile.name} ({manifest['dimension']} dims, {manifest['dtype']})")
+    print(f"  • Vectores: {manifest['count']}")
+    print(f"  • Listas IVF: {manifest['nlist']} (nprobe={manifest['nprobe']})")
+    print(f"  • Categorías: {', '.join(c for c in manifest['categories'] if c) or '-'}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Partitions - Particiones del índice vectorial por área legal y ruteo de consultas
+
+Cada vector se guarda en la partición de su área legal: un namespace en
+Pinecone, un tramo contiguo de filas en el índice local. La partición sale
+de la categoría del chunk (TextProcessor, DocumentLoader o
+upload_apuntes.get_category), normalizada a las áreas de
+services/legal_categories.
+
+Antes de buscar, QueryRouter predice las áreas de la consulta con las
+palabras clave de cada categoría y busca solo en las particiones más
+probables. Con confianza baja (o sin resultados relevantes en la
+partición) se busca en todo el índice. RouteStats mide latencia y recall
+por ruta: el recall se estima repitiendo una muestra de las búsquedas
+ruteadas contra el índice completo.
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from services.legal_categories import LEGAL_CATEGORIES, score_categories
+
+
+# Partición de los chunks sin área reconocible (códigos generales, procesal...)
+DEFAULT_PARTITION = "general"
+
+# Categorías de las fuentes que no son IDs de LEGAL_CATEGORIES -> área legal
+CATEGORY_PARTITIONS = {
+    # Dirección del Trabajo
+    "terminacion_contrato": "laboral",
+    "condiciones_trabajo": "laboral",
+    "remuneraciones": "laboral",
+    # SERNAC
+    "derechos_basicos": "consumidor",
+    "garantias": "consumidor",
+    "cobranzas": "consumidor",
+    # upload_apuntes.get_category
+    "comercial": "societario",
+    # Áreas que viven en el Código Civil
+    "arriendos": "civil",
+    "deudas": "civil",
+    "sucesiones": "civil",
+}
+
+# Rutas de una búsqueda vectorial
+ROUTE_PARTITION = "partition"  # Solo en las particiones predichas
+ROUTE_FALLBACK = "fallback"    # Ruteada sin resultados relevantes: se repitió global
+ROUTE_GLOBAL = "global"        # Confianza baja, filtro explícito o sin particiones
+ROUTES = (ROUTE_PARTITION, ROUTE_FALLBACK, ROUTE_GLOBAL)
+
+DEFAULT_MAX_PARTITIONS = 2
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+# Mediciones de latencia guardadas por ruta (para el p95)
+LATENCY_WINDOW = 1000
+
+
+def partition_for(category: Optional[str]) -> str:
+    """Partición de un chunk según su categoría ("laboral", "terminacion_contrato"...)"""
+    category = (category or "").strip().lower()
+    category = CATEGORY_PARTITIONS.get(category, category)
+    return category if category in LEGAL_CATEGORIES else DEFAULT_PARTITION
+
+
+@dataclass
+class RouteDecision:
+    """Particiones elegidas para una consulta (vacío = búsqueda global)"""
+    partitions: List[str]
+    confidence: float
+    scores: Dict[str, int] = field(default_factory=dict)
+
+
+class QueryRouter:
+    """
+    Predice las particiones de una consulta a partir de las palabras clave
+    de services/legal_categories.
+
+    La confianza es la fracción de coincidencias de palabras clave que cae
+    en las particiones elegidas: "despido y finiquito" -> laboral con 1.0;
+    una consulta que reparte coincidencias entre tres áreas queda bajo el
+    umbral y se busca en todo el índice.
+    """
+
+    def __init__(
+        self,
+        max_partitions: int = DEFAULT_MAX_PARTITIONS,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE
+    ):
+        """
+        Args:
+            max_partitions: Máximo de particiones a consultar
+            min_confidence: Confianza mínima (0-1) para no buscar global
+        """
+        self.max_partitions = max_partitions
+        self.min_confidence = min_confidence
+
+    def route(self, query: str, available: Optional[Iterable[str]] = None) -> RouteDecision:
+        """
+        Args:
+            query: Consulta del usuario
+            available: Particiones presentes en el índice (None = todas)
+
+        Returns:
+            RouteDecision; partitions vacío si conviene buscar global
+        """
+        scores = score_categories(query)
+        total = sum(scores.values())
+        if not total:
+            return RouteDecision([], 0.0, scores)
+
+        available = set(available) if available is not None else None
+        partitions: List[str] = []
+        covered = 0
+
+        for category, score in sorted(scores.items(), key=lambda item: (-item[1], item[0])):
+            partition = partition_for(category)
+            if available is not None and partition not in available:
+                continue
+            if partition not in partitions:
+                if len(partitions) == self.max_partitions:
+                    continue
+                partitions.append(partition)
+            covered += score
+
+        confidence = round(covered / total, 3)
+        if confidence < self.min_confidence:
+            return RouteDecision([], confidence, scores)
+        return RouteDecision(partitions, confidence, scores)
+
+
+def route_recall(routed: List[Dict], reference: List[Dict]) -> float:
+    """Fracción de los ids de la búsqueda global que también trajo la ruteada"""
+    if not reference:
+        return 1.0
+    routed_ids = {doc["id"] for doc in routed}
+    return len(routed_ids & {doc["id"] for doc in reference}) / len(reference)
+
+
+class RouteStats:
+    """Consultas, latencia de búsqueda vectorial (ms) y recall medido por ruta"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {route: deque(maxlen=LATENCY_WINDOW) for route in ROUTES}
+        self._counts = {route: 0 for route in ROUTES}
+        self._recall_totals = {route: 0.0 for route in ROUTES}
+        self._recall_counts = {route: 0 for route in ROUTES}
+
+    def record(self, route: str, ms: float, recall: Optional[float] = None):
+        """Registra una búsqueda (recall solo si se comparó contra la global)"""
+        with self._lock:
+            self._counts[route] += 1
+            self._latencies[route].append(ms)
+            if recall is not None:
+                self._recall_totals[route] += recall
+                self._recall_counts[route] += 1
+
+    def summary(self) -> Dict:
+        """Por ruta: consultas, latencia promedio y p95, recall promedio de la muestra"""
+        with self._lock:
+            total = sum(self._counts.values())
+            routes = {}
+            for route in ROUTES:
+                if not self._counts[route]:
+                    continue
+                latencies = sorted(self._latencies[route])
+                entry = {
+                    "queries": self._counts[route],
+                    "share": round(self._counts[route] / total, 3),
+                    "avg_ms": round(sum(latencies) / len(latencies), 2),
+                    "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2)
+                }
+                if self._recall_counts[route]:
+                    entry["recall"] = round(self._recall_totals[route] / self._recall_counts[route], 3)
+                    entry["recall_samples"] = self._recall_counts[route]
+                routes[route] = entry
+            return routes
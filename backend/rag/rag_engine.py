@@ -4,24 +4,64 @@ RAG Engine - Sistema de Retrieval-Augmented Generation
 Integra búsqueda vectorial con Claude para respuestas legales precisas:
 1. Usuario hace pregunta
 2. Genera embedding de la pregunta
-3. Busca contexto relevante en Pinecone
+3. Busca contexto relevante en el vector store (Pinecone o índice local)
+   y, si existe, en el índice léxico BM25; ambas listas se fusionan con RRF.
+   Los índices devuelven ids y scores; el texto completo (y opcionalmente
+   los chunks vecinos) sale del chunk store local. Con router, la búsqueda
+   vectorial va solo a las particiones del área legal predicha
 4. Envía contexto + pregunta a Claude
 5. Claude responde usando información verificada
 """
 
-import openai
 import os
-from typing import List, Dict, Optional
+import random
+import time
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
 try:
     from rag.vector_store import VectorStore
     VECTOR_STORE_AVAILABLE = True
 except ImportError:
     VECTOR_STORE_AVAILABLE = False
 
+from rag.embedding_cache import QueryEmbeddingCache
+from rag.hybrid import HYBRID_CANDIDATES, StageTimings, lexical_matches, reciprocal_rank_fusion
+
+try:
+    from rag.lexical_index import LexicalIndex
+    LEXICAL_INDEX_AVAILABLE = True
+except ImportError:
+    LexicalIndex = None
+    LEXICAL_INDEX_AVAILABLE = False
+
+from rag.chunk_store import DEFAULT_CHUNK_STORE_PATH, ChunkStore
+from rag.embedding_profiles import get_profile
+from services.history_compactor import CompactedHistory, get_history_compactor
+from rag.partitions import (
+    DEFAULT_MAX_PARTITIONS,
+    DEFAULT_MIN_CONFIDENCE,
+    ROUTE_FALLBACK,
+    ROUTE_GLOBAL,
+    ROUTE_PARTITION,
+    QueryRouter,
+    RouteStats,
+    route_recall,
+)
+
 load_dotenv()
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+CLAUDE_MODEL = "claude-3-haiku-20240307"
+DEFAULT_EMBEDDING_CACHE_PATH = "data/cache/query_embeddings.sqlite3"
+DEFAULT_LEXICAL_INDEX_DIR = "data/lexical"
+
 
 class RAGEngine:
     """Motor de RAG para respuestas legales precisas"""
@@ -30,26 +70,60 @@ class RAGEngine:
         self,
         vector_store: Optional[VectorStore] = None,
         top_k: int = 3,
-        similarity_threshold: float = 0.7
+        similarity_threshold: float = 0.7,
+        embedding_cache: Optional[QueryEmbeddingCache] = None,
+        embedding_model: str = EMBEDDING_MODEL,
+        lexical_index: Optional["LexicalIndex"] = None,
+        hybrid_candidates: int = HYBRID_CANDIDATES,
+        chunk_store: Optional[ChunkStore] = None,
+        expand_tokens: int = 0,
+        router: Optional[QueryRouter] = None,
+        shadow_rate: float = 0.0,
+        embedding_dimensions: Optional[int] = None
     ):
         """
         Args:
-            vector_store: Instancia de VectorStore (Pinecone)
+            vector_store: Instancia de VectorStore (Pinecone o índice local)
             top_k: Número de documentos relevantes a recuperar
             similarity_threshold: Umbral mínimo de similitud (0-1)
+            embedding_cache: Caché de embeddings de consultas (opcional)
+            embedding_model: Modelo de embeddings de OpenAI
+            lexical_index: Índice BM25 para búsqueda híbrida (opcional)
+            hybrid_candidates: Candidatos por lado antes de fusionar con RRF
+            chunk_store: Texto completo de los chunks (opcional; sin él se usa
+                la metadata del índice)
+            expand_tokens: Presupuesto de tokens por resultado para sumar
+                chunks vecinos (0 = sin expandir; requiere chunk_store)
+            router: Ruteo de consultas a particiones por área legal (opcional;
+                sin él la búsqueda vectorial es siempre global)
+            shadow_rate: Fracción de búsquedas ruteadas que se repiten en todo
+                el índice para medir su recall
+            embedding_dimensions: Parámetro `dimensions` de la API para las
+                consultas (None = nativas); debe coincidir con el perfil del índice
         """
         self.vector_store = vector_store
         self.top_k = top_k
         self.similarity_threshold = similarity_threshold
+        self.embedding_cache = embedding_cache
+        self.embedding_model = embedding_model
+        self.embedding_dimensions = embedding_dimensions
+        self.lexical_index = lexical_index
+        self.hybrid_candidates = hybrid_candidates
+        self.chunk_store = chunk_store
+        self.expand_tokens = expand_tokens
+        self.router = router
+        self.shadow_rate = shadow_rate
+        self.stage_timings = StageTimings()
+        self.route_stats = RouteStats()
 
         # Configurar OpenAI para embeddings
         self.openai_key = os.getenv("OPENAI_API_KEY")
-        if self.openai_key:
+        if self.openai_key and OPENAI_AVAILABLE:
             openai.api_key = self.openai_key
 
     def generate_query_embedding(self, query: str) -> Optional[List[float]]:
         """
-        Genera embedding de la consulta del usuario
+        Genera embedding de la consulta del usuario (usando la caché si existe)
 
         Args:
             query: Pregunta del usuario
@@ -61,10 +135,37 @@ class RAGEngine:
             print("⚠️  OpenAI API key no configurada, RAG deshabilitado")
             return None
 
+        if self.embedding_cache is not None:
+            return self.embedding_cache.get_or_compute(
+                query, self.cache_model, self._embed_query
+            )
+
+        return self._embed_query(query)
+
+    @property
+    def cache_model(self) -> str:
+        """Modelo en las claves de la caché (incluye las dimensiones si son reducidas)"""
+        if self.embedding_dimensions is None:
+            return self.embedding_model
+        return f"{self.embedding_model}@{self.embedding_dimensions}"
+
+    def embedding_options(self) -> Dict:
+        """Argumentos extra para embeddings.create (dimensiones del perfil)"""
+        if self.embedding_dimensions is None:
+            return {}
+        return {"dimensions": self.embedding_dimensions}
+
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        """Llama a la API de OpenAI para obtener el embedding"""
+        if not OPENAI_AVAILABLE:
+            print("⚠️  Paquete openai no instalado, RAG deshabilitado")
+            return None
+
         try:
             response = openai.embeddings.create(
-                model="text-embedding-3-small",
-                input=query
+                model=self.embedding_model,
+                input=query,
+                **self.embedding_options()
             )
             return response.data[0].embedding
         except Exception as e:
@@ -74,7 +175,8 @@ class RAGEngine:
     def retrieve_context(
         self,
         query: str,
-        filter: Optional[Dict] = None
+        filter: Optional[Dict] = None,
+        top_k: Optional[int] = None
     ) -> List[Dict]:
         """
         Recupera contexto relevante de la base de conocimiento
@@ -82,6 +184,7 @@ class RAGEngine:
         Args:
             query: Pregunta del usuario
             filter: Filtros opcionales (ej: {"category": "laboral"})
+            top_k: Número de documentos (por defecto self.top_k)
 
         Returns:
             Lista de documentos relevantes con scores
@@ -90,27 +193,166 @@ class RAGEngine:
             print("⚠️  Vector store no inicializado, RAG deshabilitado")
             return []
 
+        top_k = top_k or self.top_k
+        timings: Dict[str, float] = {}
+
         # Generar embedding de la consulta
-        query_embedding = self.generate_query_embedding(query)
-        if not query_embedding:
-            return []
+        with self.stage_timings.stage("embedding_ms", timings):
+            query_embedding = self.generate_query_embedding(query)
 
         # Buscar documentos similares
-        results = self.vector_store.search(
-            query_vector=query_embedding,
-            top_k=self.top_k,
-            filter=filter
-        )
+        vector_results = []
+        if query_embedding:
+            with self.stage_timings.stage("vector_ms", timings):
+                vector_results = self.search_vectors(query, query_embedding, top_k, filter)
+
+        lexical_results = self.search_lexical(query, top_k, filter, timings)
+
+        return self.combine_results(vector_results, lexical_results, top_k, timings)
+
+    def search_vectors(
+        self,
+        query: str,
+        query_embedding: List[float],
+        top_k: int,
+        filter: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Búsqueda vectorial ruteada: primero en las particiones predichas para
+        la consulta y, si ahí no hay nada relevante, en todo el índice.
+        Un filtro de categoría explícito (ej: del agente) busca global.
+        """
+        def search(partitions: Optional[List[str]] = None) -> List[Dict]:
+            options = self.search_options()
+            if partitions:
+                options["partitions"] = partitions
+            return self.vector_store.search(
+                query_vector=query_embedding,
+                top_k=self.candidate_count(top_k),
+                filter=filter,
+                **options
+            )
+
+        start = time.perf_counter()
+        partitions = self.route(query, filter)
+
+        if not partitions:
+            results = search()
+            self.route_stats.record(ROUTE_GLOBAL, _elapsed_ms(start))
+            return results
+
+        results = search(partitions)
+        if not self.filter_relevant(results):
+            results = search()
+            self.route_stats.record(ROUTE_FALLBACK, _elapsed_ms(start))
+            return results
+
+        elapsed = _elapsed_ms(start)
+        recall = None
+        if self.shadow_rate and random.random() < self.shadow_rate:
+            recall = route_recall(
+                self.filter_relevant(results)[:top_k],
+                self.filter_relevant(search())[:top_k]
+            )
+        self.route_stats.record(ROUTE_PARTITION, elapsed, recall)
+        return results
+
+    def route(self, query: str, filter: Optional[Dict] = None) -> List[str]:
+        """Particiones para la consulta (vacío = búsqueda global)"""
+        if self.router is None or (filter and "category" in filter):
+            return []
+        available = self.vector_store.partitions()
+        if not available:
+            return []
+        return self.router.route(query, available).partitions
+
+    def search_options(self) -> Dict:
+        """Con chunk store, el vector store solo necesita devolver ids y scores"""
+        if self.chunk_store is None:
+            return {}
+        return {"include_metadata": False}
+
+    def candidate_count(self, top_k: int) -> int:
+        """Candidatos a pedir a cada índice (más que top_k si hay fusión)"""
+        if self.lexical_index is None:
+            return top_k
+        return max(top_k, self.hybrid_candidates)
+
+    def search_lexical(
+        self,
+        query: str,
+        top_k: int,
+        filter: Optional[Dict],
+        timings: Dict[str, float]
+    ) -> Optional[List[Dict]]:
+        """Búsqueda BM25 (None si no hay índice léxico)"""
+        if self.lexical_index is None:
+            return None
+
+        with self.stage_timings.stage("lexical_ms", timings):
+            try:
+                results = self.lexical_index.search(
+                    query, top_k=self.candidate_count(top_k), filter=filter
+                )
+            except Exception as e:
+                print(f"⚠️  Error en búsqueda léxica: {e}")
+                return []
+
+        return lexical_matches(results, query)
 
-        # Filtrar por umbral de similitud
-        relevant_docs = [
+    def combine_results(
+        self,
+        vector_results: List[Dict],
+        lexical_results: Optional[List[Dict]],
+        top_k: int,
+        timings: Dict[str, float]
+    ) -> List[Dict]:
+        """
+        Fusiona (si hay índice léxico), filtra por umbral, hidrata el texto
+        desde el chunk store y registra latencias. El umbral se aplica a la
+        similitud vectorial: si el embedding falló, de los resultados solo
+        léxicos pasan únicamente las citas exactas (ver rag.hybrid) y el
+        resto de las consultas cae en NO_INFO.
+        """
+        if lexical_results is None:
+            results = self.filter_relevant(vector_results)[:top_k]
+        else:
+            with self.stage_timings.stage("fusion_ms", timings):
+                fused = reciprocal_rank_fusion(vector_results, lexical_results)
+                results = self.filter_relevant(fused)[:top_k]
+
+        results = self.hydrate(results, timings)
+        self.stage_timings.record(timings)
+        return results
+
+    def hydrate(self, results: List[Dict], timings: Dict[str, float]) -> List[Dict]:
+        """
+        Texto completo (y vecinos) de los resultados finales, desde el chunk
+        store. Los resultados que quedan sin texto (índice sin texto en la
+        metadata, o id que el store no conoce) se descartan: pasarlos a
+        Claude daría una fuente vacía que igual supera el umbral.
+        """
+        if self.chunk_store is not None and results:
+            with self.stage_timings.stage("hydrate_ms", timings):
+                try:
+                    results = self.chunk_store.hydrate(results, expand_tokens=self.expand_tokens)
+                except Exception as e:
+                    print(f"⚠️  Error leyendo el chunk store: {e}")
+
+        with_text = [doc for doc in results if doc.get("text")]
+        if len(with_text) < len(results):
+            print(f"⚠️  {len(results) - len(with_text)} resultados sin texto descartados (reindexar o construir el chunk store)")
+        return with_text
+
+    def filter_relevant(self, results: List[Dict]) -> List[Dict]:
+        """Filtra resultados por umbral de similitud"""
+        return [
             doc for doc in results
             if doc["score"] >= self.similarity_threshold
         ]
 
-        return relevant_docs
-
-    def build_context_prompt(self, relevant_docs: List[Dict]) -> str:
+    @staticmethod
+    def build_context_prompt(relevant_docs: List[Dict]) -> str:
         """
         Construye el contexto a inyectar en el prompt de Claude
 
@@ -145,32 +387,29 @@ class RAGEngine:
 
         return "\n".join(context_parts)
 
-    def generate_response(
-        self,
+    @staticmethod
+    def build_rag_request(
         user_query: str,
         conversation_history: List[Dict],
-        client,
-        system_prompt: str
-    ) -> Dict:
+        system_prompt: str,
+        relevant_docs: List[Dict]
+    ) -> Tuple[str, List[Dict]]:
         """
-        Genera respuesta usando RAG + Claude
+        Construye el system prompt enriquecido y los mensajes para Claude
 
         Args:
             user_query: Pregunta del usuario
             conversation_history: Historial de conversación
-            client: Cliente de Anthropic (Claude)
             system_prompt: Prompt del sistema base
+            relevant_docs: Documentos recuperados
 
         Returns:
-            Dict con respuesta, fuentes, y metadata
+            Tupla (system_prompt, messages)
         """
-        # 1. Recuperar contexto relevante
-        relevant_docs = self.retrieve_context(user_query)
+        # Construir contexto
+        context = RAGEngine.build_context_prompt(relevant_docs)
 
-        # 2. Construir contexto
-        context = self.build_context_prompt(relevant_docs)
-
-        # 3. Modificar system prompt si hay contexto
+        # Modificar system prompt si hay contexto
         enhanced_system_prompt = system_prompt
 
         if context:
@@ -186,7 +425,7 @@ INSTRUCCIONES ESPECIALES:
 - Si hay contradicciones, usa el contexto como fuente de verdad
 """
 
-        # 4. Construir mensajes
+        # Construir mensajes
         messages = []
 
         # Agregar historial previo
@@ -203,39 +442,199 @@ INSTRUCCIONES ESPECIALES:
             "content": user_query
         })
 
-        # 5. Llamar a Claude
+        return enhanced_system_prompt, messages
+
+    @staticmethod
+    def format_rag_response(
+        response,
+        relevant_docs: List[Dict],
+        history: Optional[CompactedHistory] = None
+    ) -> Dict:
+        """Respuesta de Claude + metadata de las fuentes usadas y del historial resumido"""
+        return {
+            "response": response.content[0].text,
+            "tokens_used": response.usage.input_tokens + response.usage.output_tokens,
+            "history_tokens_saved": history.tokens_saved if history else 0,
+            "rag_enabled": bool(relevant_docs),
+            "sources_used": len(relevant_docs),
+            "sources": RAGEngine.format_sources(relevant_docs)
+        }
+
+    @staticmethod
+    def format_sources(relevant_docs: List[Dict]) -> List[Dict]:
+        """Fuentes usadas, en el formato que recibe el frontend"""
+        return [
+            {
+                "law_name": doc.get("law_name"),
+                "article": doc.get("article_number"),
+                "category": doc.get("category"),
+                "url": doc.get("url"),
+                "similarity": doc.get("score")
+            }
+            for doc in relevant_docs
+        ]
+
+    def generate_response(
+        self,
+        user_query: str,
+        conversation_history: List[Dict],
+        client,
+        system_prompt: str
+    ) -> Dict:
+        """
+        Genera respuesta usando RAG + Claude
+
+        Args:
+            user_query: Pregunta del usuario
+            conversation_history: Historial de conversación
+            client: Cliente de Anthropic (Claude)
+            system_prompt: Prompt del sistema base
+
+        Returns:
+            Dict con respuesta, fuentes, y metadata
+        """
+        # 1. Recuperar contexto relevante
+        relevant_docs = self.retrieve_context(user_query)
+
+        # 2. Construir prompt y mensajes (turnos antiguos resumidos)
+        history = get_history_compactor().compact(conversation_history, CLAUDE_MODEL)
+        enhanced_system_prompt, messages = self.build_rag_request(
+            user_query, history.messages, system_prompt, relevant_docs
+        )
+        enhanced_system_prompt += history.system_section()
+
+        # 3. Llamar a Claude
         try:
             response = client.messages.create(
-                model="claude-3-haiku-20240307",
+                model=CLAUDE_MODEL,
                 max_tokens=1024,
                 system=enhanced_system_prompt,
                 messages=messages
             )
 
-            assistant_message = response.content[0].text
-            tokens_used = response.usage.input_tokens + response.usage.output_tokens
-
-            # 6. Preparar respuesta con metadata
-            return {
-                "response": assistant_message,
-                "tokens_used": tokens_used,
-                "rag_enabled": bool(relevant_docs),
-                "sources_used": len(relevant_docs),
-                "sources": [
-                    {
-                        "law_name": doc.get("law_name"),
-                        "article": doc.get("article_number"),
-                        "category": doc.get("category"),
-                        "url": doc.get("url"),
-                        "similarity": doc.get("score")
-                    }
-                    for doc in relevant_docs
-                ]
-            }
+            return self.format_rag_response(response, relevant_docs, history)
 
         except Exception as e:
             raise Exception(f"Error generando respuesta RAG: {e}")
 
+    def get_cache_stats(self) -> Optional[Dict]:
+        """Estadísticas de la caché de embeddings (None si está deshabilitada)"""
+        if self.embedding_cache is None:
+            return None
+        return self.embedding_cache.get_stats()
+
+    def get_retrieval_stats(self) -> Dict:
+        """Modo de recuperación y latencia por etapa (ms)"""
+        stats = {
+            "mode": "hybrid" if self.lexical_index is not None else "vector",
+            "embedding": {"model": self.embedding_model, "dimensions": self.embedding_dimensions},
+            "stages": self.stage_timings.summary()
+        }
+        vector_requests = self.vector_store.get_query_stats() if self.vector_store else {}
+        if vector_requests:
+            stats["vector_requests"] = vector_requests
+        if self.lexical_index is not None:
+            stats["lexical_index"] = self.lexical_index.get_stats()
+        if self.chunk_store is not None:
+            stats["chunk_store"] = {**self.chunk_store.get_stats(), "expand_tokens": self.expand_tokens}
+        if self.router is not None:
+            stats["routing"] = {
+                "max_partitions": self.router.max_partitions,
+                "min_confidence": self.router.min_confidence,
+                "shadow_rate": self.shadow_rate,
+                "routes": self.route_stats.summary()
+            }
+        return stats
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def create_embedding_cache() -> Optional[QueryEmbeddingCache]:
+    """
+    Crea la caché de embeddings de consultas según variables de entorno
+
+    - EMBEDDING_CACHE_ENABLED: "false" para deshabilitarla
+    - EMBEDDING_CACHE_PATH: archivo SQLite ("" = solo memoria)
+    - EMBEDDING_CACHE_MEMORY_SIZE / EMBEDDING_CACHE_DISK_SIZE: límites de entradas
+    """
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "false":
+        return None
+
+    db_path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_EMBEDDING_CACHE_PATH)
+
+    try:
+        return QueryEmbeddingCache(
+            db_path=db_path or None,
+            max_memory_entries=int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2048")),
+            max_disk_entries=int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "100000"))
+        )
+    except Exception as e:
+        print(f"⚠️  Error inicializando caché de embeddings en disco: {e}")
+        return QueryEmbeddingCache(db_path=None)
+
+
+def create_lexical_index() -> Optional["LexicalIndex"]:
+    """
+    Carga el índice BM25 si fue construido (python -m rag.lexical_index)
+
+    - LEXICAL_INDEX_DIR: directorio del índice ("" = búsqueda solo vectorial)
+    """
+    index_dir = os.getenv("LEXICAL_INDEX_DIR", DEFAULT_LEXICAL_INDEX_DIR)
+    if not LEXICAL_INDEX_AVAILABLE or not index_dir:
+        return None
+
+    try:
+        index = LexicalIndex(index_dir)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️  Error cargando índice léxico: {e}")
+        return None
+
+    print(f"✅ Índice léxico cargado ({len(index):,} documentos)")
+    return index
+
+
+def create_chunk_store() -> Optional[ChunkStore]:
+    """
+    Abre el chunk store si fue construido (python -m rag.chunk_store)
+
+    - CHUNK_STORE_PATH: archivo SQLite ("" = texto desde la metadata del índice)
+    """
+    db_path = os.getenv("CHUNK_STORE_PATH", DEFAULT_CHUNK_STORE_PATH)
+    if not db_path:
+        return None
+
+    try:
+        store = ChunkStore(db_path)
+    except FileNotFoundError:
+        print(f"⚠️  Chunk store no encontrado ({db_path}): el texto sale de la metadata del índice (primeros 1000 caracteres)")
+        return None
+    except Exception as e:
+        print(f"⚠️  Error abriendo chunk store: {e}")
+        return None
+
+    print(f"✅ Chunk store cargado ({len(store):,} chunks)")
+    return store
+
+
+def create_query_router() -> Optional[QueryRouter]:
+    """
+    Crea el router de consultas a particiones según variables de entorno
+
+    - RAG_ROUTING: "false" para buscar siempre en todo el índice
+    - RAG_ROUTING_MAX_PARTITIONS / RAG_ROUTING_MIN_CONFIDENCE: límites del ruteo
+    """
+    if os.getenv("RAG_ROUTING", "true").lower() == "false":
+        return None
+
+    return QueryRouter(
+        max_partitions=int(os.getenv("RAG_ROUTING_MAX_PARTITIONS", str(DEFAULT_MAX_PARTITIONS))),
+        min_confidence=float(os.getenv("RAG_ROUTING_MIN_CONFIDENCE", str(DEFAULT_MIN_CONFIDENCE)))
+    )
+
 
 def create_rag_engine() -> Optional[RAGEngine]:
     """
@@ -249,23 +648,35 @@ def create_rag_engine() -> Optional[RAGEngine]:
         print("ℹ️  Vector Store no disponible, RAG deshabilitado")
         return None
 
-    if not os.getenv("PINECONE_API_KEY"):
+    backend = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+    if backend == "pinecone" and not os.getenv("PINECONE_API_KEY"):
         print("ℹ️  Pinecone no configurado, RAG deshabilitado")
         return None
 
-    if not os.getenv("OPENAI_API_KEY"):
+    if not OPENAI_AVAILABLE or not os.getenv("OPENAI_API_KEY"):
         print("ℹ️  OpenAI no configurado, RAG deshabilitado")
         return None
 
     try:
+        # Perfil de embeddings: el índice y las consultas usan las mismas dimensiones
+        profile = get_profile()
+
         # Inicializar vector store
-        vector_store = VectorStore()
+        vector_store = VectorStore(backend=backend, profile=profile)
 
         # Crear RAG engine
         rag_engine = RAGEngine(
             vector_store=vector_store,
             top_k=3,
-            similarity_threshold=0.7
+            similarity_threshold=0.7,
+            embedding_cache=create_embedding_cache(),
+            embedding_model=profile.model,
+            embedding_dimensions=profile.api_dimensions,
+            lexical_index=create_lexical_index(),
+            chunk_store=create_chunk_store(),
+            expand_tokens=int(os.getenv("RAG_EXPAND_TOKENS", "0")),
+            router=create_query_router(),
+            shadow_rate=float(os.getenv("RAG_ROUTING_SHADOW_RATE", "0.02"))
         )
 
         print("✅ RAG Engine inicializado correctamente")
@@ -1,5 +1,14 @@
 """
-Vector Store - Maneja almacenamiento y búsqueda en Pinecone
+Vector Store - Maneja almacenamiento y búsqueda en Pinecone o en un índice local
+
+Backends disponibles (variable VECTOR_STORE_BACKEND):
+- pinecone (default): índice serverless en Pinecone
+- local: índice embebido memory-mapped (ver rag/local_index.py),
+  sin round trip de red por consulta
+
+Los vectores se particionan por área legal (rag/partitions.py): un namespace
+por partición en Pinecone, tramos de filas en el índice local. search()
+acepta las particiones a consultar; sin ellas busca en todo el índice.
 
 Pinecone Free Tier:
 - 100,000 vectores gratis
@@ -8,10 +17,13 @@ Pinecone Free Tier:
 - Perfecto para MVP
 """
 
+import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 import os
+import threading
 from dotenv import load_dotenv
 
 try:
@@ -21,24 +33,175 @@ except ImportError:
     PINECONE_AVAILABLE = False
     print("⚠️  Pinecone no instalado. Instala con: pip install pinecone-client")
 
+try:
+    from rag.local_index import RETRAIN_GROWTH, LocalVectorIndex
+    LOCAL_INDEX_AVAILABLE = True
+except ImportError:
+    LOCAL_INDEX_AVAILABLE = False
+
+from data_processing.embedding_artifact import EmbeddingArtifact, find_embedding_files, iter_file_rows
+from rag.bulk_upsert import (
+    DEFAULT_DEAD_LETTER_PATH,
+    DEFAULT_UPSERT_WORKERS,
+    BulkUpserter,
+    read_dead_letters,
+    to_list
+)
+from data_processing.embedding_store import ContentEmbeddingStore, diff_chunks, print_diff_summary, record_hash
+from rag.embedding_profiles import EmbeddingProfile, get_profile
+from rag.partitions import DEFAULT_PARTITION, partition_for
+
 load_dotenv()
 
+DEFAULT_BACKEND = "pinecone"
+DEFAULT_INDEX_NAME = "leia-legal"
+DEFAULT_LOCAL_INDEX_DIR = "data/index"
+
+# Namespaces consultados en paralelo en una búsqueda global
+PINECONE_QUERY_WORKERS = 8
+
+# Texto que se guarda en la metadata del índice (límite de Pinecone)
+METADATA_TEXT_CHARS = 1000
+
+
+def chunk_metadata(chunk: Dict, include_text: bool = True) -> Dict:
+    """
+    Metadata que se indexa para un chunk (vectorial o léxico)
+
+    Args:
+        chunk: Chunk de *_chunks.json o *_embedded.json
+        include_text: Incluir los primeros METADATA_TEXT_CHARS del texto.
+            El índice siempre lo lleva: el servidor puede no tener chunk
+            store (data/processed no se despliega) y entonces el texto sale
+            de aquí. Con chunk store las consultas no piden metadata y el
+            texto completo se hidrata desde el store.
+
+    Returns:
+        Metadata plana (Pinecone tiene límites: solo strings, numbers, bools, lists)
+    """
+    metadata = {
+        "source": chunk["metadata"].get("source", "unknown"),
+        "law_name": chunk["metadata"].get("law_name", "unknown"),
+        "category": chunk["metadata"].get("category", "general"),
+        "partition": partition_for(chunk["metadata"].get("category")),
+        "chunk_number": chunk.get("chunk_number", 0),
+        "total_chunks": chunk.get("total_chunks", 0),
+        "url": chunk["metadata"].get("url", ""),
+    }
+
+    # Agregar article_number si existe
+    if chunk["metadata"].get("article_number"):
+        metadata["article_number"] = str(chunk["metadata"]["article_number"])
+
+    if include_text:
+        metadata["text"] = chunk["text"][:METADATA_TEXT_CHARS]
+
+    return metadata
+
+
+def chunk_to_vector(chunk: Dict) -> Tuple[str, List[float], Dict]:
+    """
+    Convierte un chunk con embedding en la tupla (id, vector, metadata) que se indexa
+
+    Args:
+        chunk: Chunk de *_embedded.json
+
+    Returns:
+        Tupla (id, vector, metadata)
+    """
+    return chunk["chunk_id"], chunk["embedding"], chunk_metadata(chunk)
+
+
+def format_match(vector_id: str, score: float, metadata: Dict) -> Dict:
+    """
+    Formato común de un resultado de búsqueda, independiente del backend
+
+    Expone los campos principales al nivel superior (usados por
+    build_context_prompt) y el resto en "metadata" (usado por el triage
+    y chat v2: source, section, page). "text" es el comienzo guardado en la
+    metadata (vacío si se consultó sin metadata); con chunk store se
+    reemplaza por el texto completo.
+    """
+    return {
+        "id": vector_id,
+        "score": score,
+        "text": metadata.get("text", ""),
+        "source": metadata.get("source", ""),
+        "law_name": metadata.get("law_name", ""),
+        "category": metadata.get("category", ""),
+        "url": metadata.get("url", ""),
+        "article_number": metadata.get("article_number"),
+        "metadata": {k: v for k, v in metadata.items() if k != "text"}
+    }
+
+
+class VectorBackend:
+    """
+    Interfaz de backend para VectorStore.
+
+    Cada backend recibe tuplas (id, vector, metadata) y devuelve resultados
+    en el formato de format_match().
+    """
+
+    name = "base"
+
+    # True si cada escritura reconstruye el índice completo (conviene una sola llamada)
+    rebuilds_on_write = False
+
+    @property
+    def sync_target(self) -> str:
+        """Identificador del índice para el estado de sincronización"""
+        raise NotImplementedError
+
+    def upsert(self, vectors: List[Tuple[str, List[float], Dict]]) -> int:
+        """
+        Inserta o actualiza vectores. Retorna cuántos se escribieron.
+        Si rebuilds_on_write es False recibe un batch por request (ver bulk_upsert).
+        """
+        raise NotImplementedError
 
-class VectorStore:
-    """Maneja almacenamiento y búsqueda de vectores en Pinecone"""
+    def delete(self, ids: List[str]) -> int:
+        """Elimina vectores por id. Retorna cuántos se pidieron borrar."""
+        raise NotImplementedError
 
-    def __init__(
+    def existing_ids(self, ids: List[str]) -> set:
+        """Subconjunto de `ids` presente en el índice"""
+        raise NotImplementedError
+
+    def query(
         self,
-        index_name: str = "leia-legal",
-        dimension: int = 1536,
-        metric: str = "cosine"
-    ):
+        query_vector: List[float],
+        top_k: int,
+        filter: Optional[Dict] = None,
+        include_metadata: bool = True,
+        partitions: Optional[List[str]] = None
+    ) -> List[Dict]:
         """
-        Args:
-            index_name: Nombre del índice en Pinecone
-            dimension: Dimensiones de los vectores (1536 para OpenAI)
-            metric: Métrica de similitud (cosine, euclidean, dotproduct)
+        Busca los top_k vectores más similares. Con include_metadata=False
+        basta con ids y scores (el chunk store completa el resto).
+        partitions limita la búsqueda a esas particiones (None = todo el índice)
         """
+        raise NotImplementedError
+
+    def partitions(self) -> List[str]:
+        """Particiones con vectores (sin llamadas de red: se usa en cada consulta)"""
+        return []
+
+    def query_stats(self) -> Dict:
+        """Contadores de consultas del backend (vacío si no aplica)"""
+        return {}
+
+    def describe(self) -> Dict:
+        """Estadísticas del índice"""
+        raise NotImplementedError
+
+
+class PineconeBackend(VectorBackend):
+    """Backend remoto sobre un índice serverless de Pinecone"""
+
+    name = "pinecone"
+
+    def __init__(self, index_name: str, dimension: int, metric: str):
         if not PINECONE_AVAILABLE:
             raise ImportError("Pinecone no instalado. pip install pinecone-client")
 
@@ -61,6 +224,20 @@ class VectorStore:
         self.index = None
         self._initialize_index()
 
+        # Namespaces de particiones conocidos. "" (vectores anteriores a las
+        # particiones) se consulta solo hasta correr migrate_legacy_namespace()
+        namespaces = set(self.index.describe_index_stats().namespaces.keys())
+        self._legacy = "" in namespaces
+        self._namespaces = namespaces - {""}
+        self._namespaces_lock = threading.Lock()
+        self._query_pool = ThreadPoolExecutor(max_workers=PINECONE_QUERY_WORKERS)
+
+        # Fan-out: requests a Pinecone por búsqueda (uno por namespace)
+        self._queries = 0
+        self._namespace_requests = 0
+        if self._legacy:
+            print("⚠️  Namespace sin partición en el índice: correr python -m rag.vector_store --migrate-namespaces")
+
     def _initialize_index(self):
         """Crea o conecta al índice de Pinecone"""
         existing_indexes = [idx.name for idx in self.pc.list_indexes()]
@@ -84,91 +261,481 @@ class VectorStore:
 
         self.index = self.pc.Index(self.index_name)
 
-    def upsert_vectors(self, vectors: List[Tuple[str, List[float], Dict]]) -> Dict:
+    @property
+    def sync_target(self) -> str:
+        return f"pinecone:{self.index_name}"
+
+    def upsert(self, vectors: List[Tuple[str, List[float], Dict]]) -> int:
+        """
+        Sube un batch con un request por namespace (partición). Los errores se
+        propagan: BulkUpserter decide si reintentar, partir el batch o
+        mandarlo al dead-letter (reintentar un namespace ya escrito es inocuo).
+        La copia en "" de un id la limpia migrate_legacy_namespace(), no el upsert.
         """
-        Inserta o actualiza vectores en Pinecone
+        by_namespace: Dict[str, List[Tuple[str, List[float], Dict]]] = {}
+        for vector_id, vector, metadata in vectors:
+            namespace = metadata.get("partition") or DEFAULT_PARTITION
+            by_namespace.setdefault(namespace, []).append((vector_id, to_list(vector), metadata))
+
+        upserted = 0
+        for namespace, batch in by_namespace.items():
+            upserted += self.index.upsert(vectors=batch, namespace=namespace).upserted_count
+
+        with self._namespaces_lock:
+            self._namespaces.update(by_namespace)
+
+        return upserted
+
+    def migrate_legacy_namespace(self, batch_size: int = 100) -> Dict:
+        """
+        Mueve los vectores del namespace "" a su partición y los borra de "".
+        Paso único (python -m rag.vector_store --migrate-namespaces); si se
+        corta se puede repetir: cada batch se escribe en su partición antes
+        de borrarse de "". Al terminar "" deja de consultarse.
+
+        Un id que ya está en alguna partición (re-subido después de
+        particionar) solo se borra de "": su copia vieja no pisa la nueva.
+
+        Returns:
+            Dict con migrated (vectores movidos), skipped (ya particionados) y batches
+        """
+        migrated, skipped, batches = 0, 0, 0
+
+        for page in self.index.list(namespace=""):
+            ids = list(page)
+            for i in range(0, len(ids), batch_size):
+                batch = ids[i:i + batch_size]
+                partitioned = set()
+                for namespace in self.partitions():
+                    partitioned.update(self.index.fetch(ids=batch, namespace=namespace).vectors.keys())
+
+                pending = [vector_id for vector_id in batch if vector_id not in partitioned]
+                skipped += len(batch) - len(pending)
+
+                vectors = []
+                if pending:
+                    for vector_id, record in self.index.fetch(ids=pending, namespace="").vectors.items():
+                        metadata = dict(record.metadata or {})
+                        metadata["partition"] = metadata.get("partition") or partition_for(metadata.get("category"))
+                        vectors.append((vector_id, list(record.values), metadata))
+
+                if vectors:
+                    migrated += self.upsert(vectors)
+                self.index.delete(ids=batch, namespace="")
+                batches += 1
+
+        with self._namespaces_lock:
+            self._legacy = False
+
+        return {"migrated": migrated, "skipped": skipped, "batches": batches}
+
+    def _all_namespaces(self) -> List[str]:
+        with self._namespaces_lock:
+            namespaces = sorted(self._namespaces)
+            if self._legacy or not namespaces:
+                namespaces.append("")
+            return namespaces
+
+    def partitions(self) -> List[str]:
+        with self._namespaces_lock:
+            return sorted(self._namespaces)
+
+    def delete(self, ids: List[str]) -> int:
+        """Borra en batches de hasta 1000 ids (límite de Pinecone) en cada namespace"""
+        batch_size = 1000
+        total_deleted = 0
+
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+            try:
+                for namespace in self._all_namespaces():
+                    self.index.delete(ids=batch, namespace=namespace)
+                total_deleted += len(batch)
+            except Exception as e:
+                print(f"   ❌ Error borrando batch {i // batch_size + 1}: {e}")
+
+        return total_deleted
+
+    def existing_ids(self, ids: List[str]) -> set:
+        """Consulta con fetch en batches de 200 ids (van en la URL), en cada namespace"""
+        batch_size = 200
+        found = set()
+
+        for namespace in self._all_namespaces():
+            pending = [vector_id for vector_id in ids if vector_id not in found]
+            for i in range(0, len(pending), batch_size):
+                response = self.index.fetch(ids=pending[i:i + batch_size], namespace=namespace)
+                found.update(response.vectors.keys())
+
+        return found
+
+    def query(
+        self,
+        query_vector: List[float],
+        top_k: int,
+        filter: Optional[Dict] = None,
+        include_metadata: bool = True,
+        partitions: Optional[List[str]] = None
+    ) -> List[Dict]:
+        # Un request por namespace, en paralelo; se mezclan por score
+        namespaces = partitions or self._all_namespaces()
+        with self._namespaces_lock:
+            self._queries += 1
+            self._namespace_requests += len(namespaces)
+
+        def query_namespace(namespace: str):
+            # Sin metadata la respuesta trae solo ids y scores (el filtro se aplica igual en el servidor)
+            return self.index.query(
+                vector=query_vector,
+                top_k=top_k,
+                filter=filter,
+                include_metadata=include_metadata,
+                namespace=namespace
+            ).matches
+
+        if len(namespaces) == 1:
+            matches = query_namespace(namespaces[0])
+        else:
+            matches = [match for result in self._query_pool.map(query_namespace, namespaces) for match in result]
+
+        # Un id puede estar en "" y en su partición mientras dura la migración
+        best = {}
+        for match in matches:
+            if match.id not in best or match.score > best[match.id].score:
+                best[match.id] = match
+        ranked = sorted(best.values(), key=lambda match: match.score, reverse=True)[:top_k]
+
+        return [format_match(match.id, match.score, match.metadata or {}) for match in ranked]
+
+    def query_stats(self) -> Dict:
+        """Requests por búsqueda: una global cuesta un request por namespace"""
+        with self._namespaces_lock:
+            return {
+                "queries": self._queries,
+                "namespace_requests": self._namespace_requests,
+                "avg_fanout": round(self._namespace_requests / self._queries, 2) if self._queries else 0.0,
+                "global_fanout": len(self._namespaces) + (1 if self._legacy else 0),
+                "legacy_namespace": self._legacy
+            }
+
+    def describe(self) -> Dict:
+        stats = self.index.describe_index_stats()
+        return {
+            "total_vectors": stats.total_vector_count,
+            "dimension": stats.dimension,
+            "index_fullness": stats.index_fullness,
+            "namespaces": stats.namespaces
+        }
+
+
+class LocalIndexBackend(VectorBackend):
+    """
+    Backend embebido: búsqueda en proceso sobre un índice memory-mapped.
+
+    El índice se construye offline desde data/embeddings
+    (python -m rag.local_index). Un upsert reescribe el índice combinando
+    los vectores existentes con los nuevos, reutilizando los centroides IVF
+    (ver RETRAIN_GROWTH); un delete solo marca las filas (tombstones).
+    """
+
+    name = "local"
+    rebuilds_on_write = True
+
+    def __init__(
+        self,
+        index_dir: Path,
+        dimension: int,
+        metric: str,
+        dtype: str = "float32",
+        rescore: bool = False
+    ):
+        if not LOCAL_INDEX_AVAILABLE:
+            raise ImportError("Índice local no disponible. pip install numpy")
+
+        self.index_dir = Path(index_dir)
+        self.dimension = dimension
+        self.metric = metric
+        self.dtype = dtype
+        self.rescore = rescore
+        self.index = None
+
+        try:
+            self.index = LocalVectorIndex(self.index_dir)
+            print(f"✅ Índice local cargado: {self.index_dir} ({len(self.index)} vectores)")
+        except FileNotFoundError:
+            print(f"📝 Índice local vacío en {self.index_dir}, se creará en el primer upsert")
+
+    def upsert(self, vectors: List[Tuple[str, List[float], Dict]]) -> int:
+        def merged_records():
+            new_ids = {vector_id for vector_id, _, _ in vectors}
+            if self.index is not None:
+                for record in self.index.iter_records():
+                    if record[0] not in new_ids:
+                        yield record
+            yield from vectors
+
+        # Centroides entrenados: se reutilizan hasta que el índice crezca RETRAIN_GROWTH veces
+        centroids, trained_count = None, None
+        if self.index is not None and self.index.nlist:
+            expected = len(self.index) + len(vectors)
+            if expected <= RETRAIN_GROWTH * max(self.index.trained_count, 1):
+                centroids, trained_count = self.index.centroids, self.index.trained_count
+
+        LocalVectorIndex.build(
+            merged_records(),
+            self.index_dir,
+            dimension=self.dimension,
+            dtype=self.dtype,
+            metric=self.metric,
+            rescore=self.rescore,
+            centroids=centroids,
+            trained_count=trained_count
+        )
+        if self.index is not None:
+            self.index.close()
+        self.index = LocalVectorIndex(self.index_dir)
+        return len(vectors)
+
+    @property
+    def sync_target(self) -> str:
+        return f"local:{self.index_dir.resolve()}"
+
+    def delete(self, ids: List[str]) -> int:
+        if self.index is None or not ids:
+            return 0
+
+        # Tombstones: sin reescribir matrices ni reentrenar; el próximo upsert compacta
+        self.index.delete(ids)
+        return len(ids)
+
+    def existing_ids(self, ids: List[str]) -> set:
+        if self.index is None:
+            return set()
+        return set(ids) & set(self.index.iter_ids())
+
+    def query(
+        self,
+        query_vector: List[float],
+        top_k: int,
+        filter: Optional[Dict] = None,
+        include_metadata: bool = True,
+        partitions: Optional[List[str]] = None
+    ) -> List[Dict]:
+        # La metadata se lee del mmap local: no hay payload que ahorrar
+        if self.index is None:
+            return []
+
+        return [
+            format_match(vector_id, score, metadata)
+            for vector_id, score, metadata in self.index.search(query_vector, top_k, filter, partitions=partitions)
+        ]
+
+    def partitions(self) -> List[str]:
+        # Con IVF la partición es solo un filtro más (no reduce filas puntuadas): no se rutea
+        if self.index is None or self.index.nlist:
+            return []
+        return list(self.index.partitions)
+
+    def describe(self) -> Dict:
+        if self.index is None:
+            return {"total_vectors": 0, "dimension": self.dimension, "index_fullness": 0.0, "namespaces": {}}
+        return self.index.get_stats()
+
+
+class VectorStore:
+    """Maneja almacenamiento y búsqueda de vectores (Pinecone o índice local)"""
+
+    def __init__(
+        self,
+        index_name: Optional[str] = None,
+        dimension: Optional[int] = None,
+        metric: str = "cosine",
+        backend: Optional[str] = None,
+        local_index_dir: Optional[str] = None,
+        upsert_workers: Optional[int] = None,
+        dead_letter_path: Optional[str] = None,
+        profile: Optional[EmbeddingProfile] = None
+    ):
+        """
+        Args:
+            index_name: Nombre del índice en Pinecone (default: leia-legal
+                más el sufijo del perfil, ej: leia-legal-compact)
+            dimension: Dimensiones de los vectores (default: las del perfil)
+            metric: Métrica de similitud (cosine, euclidean, dotproduct)
+            backend: "pinecone" o "local" (default: VECTOR_STORE_BACKEND o pinecone)
+            local_index_dir: Directorio del índice local (default: LOCAL_INDEX_DIR o data/index)
+            upsert_workers: Batches de upsert en vuelo (default: UPSERT_WORKERS o 4)
+            dead_letter_path: Archivo de vectores que fallaron definitivamente
+                (default: UPSERT_DEAD_LETTER_PATH o data/embeddings/upsert_dead_letter.jsonl)
+            profile: Perfil de embeddings (default: EMBEDDING_PROFILE, ver
+                rag/embedding_profiles.py); fija dimensiones y precisión del índice local
+        """
+        self.profile = profile or get_profile()
+        self.index_name = index_name or DEFAULT_INDEX_NAME + self.profile.index_suffix
+        self.dimension = dimension or self.profile.dimensions
+        self.metric = metric
+        self.upsert_workers = upsert_workers or int(os.getenv("UPSERT_WORKERS", DEFAULT_UPSERT_WORKERS))
+        self.dead_letter_path = Path(
+            dead_letter_path or os.getenv("UPSERT_DEAD_LETTER_PATH", DEFAULT_DEAD_LETTER_PATH)
+        )
+        self.backend_name = (backend or os.getenv("VECTOR_STORE_BACKEND", DEFAULT_BACKEND)).lower()
+
+        if self.backend_name == "local":
+            self.backend = LocalIndexBackend(
+                Path(local_index_dir or os.getenv("LOCAL_INDEX_DIR", DEFAULT_LOCAL_INDEX_DIR)),
+                dimension=self.dimension,
+                metric=metric,
+                dtype=self.profile.dtype,
+                rescore=self.profile.rescore
+            )
+        elif self.backend_name == "pinecone":
+            self.backend = PineconeBackend(self.index_name, self.dimension, metric)
+        else:
+            raise ValueError(f"Backend de vector store desconocido: {self.backend_name}")
+
+    def upsert_vectors(
+        self,
+        vectors: List[Tuple[str, List[float], Dict]],
+        on_batch: Optional[Callable[[List[str]], None]] = None
+    ) -> Dict:
+        """
+        Inserta o actualiza vectores en el backend configurado
+
+        Backends remotos: batches por bytes, varios en vuelo, reintentos y
+        dead-letter para los fallos definitivos (ver rag/bulk_upsert.py).
+        El índice local se reconstruye en una sola escritura.
 
         Args:
             vectors: Lista de tuplas (id, vector, metadata)
+            on_batch: Se llama con los ids de cada batch confirmado
 
         Returns:
             Resumen de la operación
         """
         if not vectors:
-            return {"upserted_count": 0}
+            return {"upserted_count": 0, "failed_count": 0, "failed_ids": [], "dead_letter": None}
+
+        print(f"📤 Subiendo {len(vectors)} vectores ({self.backend_name})...")
+
+        if self.backend.rebuilds_on_write:
+            total_upserted = self.backend.upsert(vectors)
+            if on_batch and total_upserted == len(vectors):
+                on_batch([vector_id for vector_id, _, _ in vectors])
+            print(f"✅ Total vectores subidos: {total_upserted}")
+            return {"upserted_count": total_upserted, "failed_count": 0, "failed_ids": [], "dead_letter": None}
+
+        result = BulkUpserter(
+            self.backend.upsert,
+            max_workers=self.upsert_workers,
+            dead_letter_path=self.dead_letter_path
+        ).run(vectors, on_batch=on_batch)
+
+        print(
+            f"✅ Total vectores subidos: {result['upserted']} "
+            f"({result['batches']} batches, {result['retries']} reintentos, {result['seconds']:.1f}s)"
+        )
+        if result["failed"]:
+            print(f"⚠️  {result['failed']} vectores fallaron: guardados en {result['dead_letter']}")
+
+        return {
+            "upserted_count": result["upserted"],
+            "failed_count": result["failed"],
+            "failed_ids": result["failed_ids"],
+            "dead_letter": result["dead_letter"]
+        }
+
+    def retry_dead_letters(self) -> Dict:
+        """
+        Reintenta los vectores del dead-letter. Los que vuelven a fallar
+        quedan en un dead-letter nuevo en la misma ruta.
+        """
+        if not self.dead_letter_path.exists():
+            print(f"✅ Sin dead-letter pendiente ({self.dead_letter_path})")
+            return {"upserted_count": 0, "failed_count": 0, "failed_ids": [], "dead_letter": None}
 
-        print(f"📤 Subiendo {len(vectors)} vectores a Pinecone...")
+        # Se mueve antes de reintentar: los nuevos fallos se escriben en un archivo limpio
+        retrying = self.dead_letter_path.with_suffix(".retrying.jsonl")
+        self.dead_letter_path.replace(retrying)
+        records = read_dead_letters(retrying)
+        print(f"🔁 Reintentando {len(records)} vectores del dead-letter...")
 
-        # Pinecone acepta batches de hasta 100 vectores
-        batch_size = 100
-        total_upserted = 0
+        result = self.upsert_vectors(records)
+        retrying.unlink()
+        return result
 
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i + batch_size]
+    def verify_index(self, expected_ids: Iterable[str]) -> Dict:
+        """
+        Compara los ids que deberían estar en el índice con lo que reporta
+        el backend (describe_index_stats) y con los ids realmente presentes.
 
-            try:
-                response = self.index.upsert(vectors=batch)
-                total_upserted += response.upserted_count
-                print(f"   ✅ Batch {i // batch_size + 1}: {response.upserted_count} vectores")
-            except Exception as e:
-                print(f"   ❌ Error en batch {i // batch_size + 1}: {e}")
+        Pinecone serverless es eventualmente consistente: justo después de un
+        upsert el total puede venir atrasado; los ids faltantes se confirman
+        con fetch, que sí es exacto.
 
-        print(f"✅ Total vectores subidos: {total_upserted}")
+        Returns:
+            {"expected", "index_total", "missing", "unexpected", "ok"}
+        """
+        expected = list(dict.fromkeys(expected_ids))
+        index_total = self.get_stats().get("total_vectors", 0)
+        present = self.backend.existing_ids(expected)
+        missing = [vector_id for vector_id in expected if vector_id not in present]
+        # Vectores en el índice que no están en los embeddings (ej: borrados sin sincronizar)
+        unexpected = max(0, index_total - len(present))
+
+        ok = not missing and not unexpected
+        print(
+            f"{'✅' if ok else '⚠️ '} Verificación: {len(present)}/{len(expected)} ids presentes, "
+            f"{index_total} vectores en el índice"
+            + (f", {len(missing)} faltantes" if missing else "")
+            + (f", {unexpected} no esperados" if unexpected else "")
+        )
 
-        return {"upserted_count": total_upserted}
+        return {
+            "expected": len(expected),
+            "index_total": index_total,
+            "missing": missing,
+            "unexpected": unexpected,
+            "ok": ok
+        }
 
     def load_from_embeddings_file(self, embeddings_file: Path) -> Dict:
         """
-        Carga vectores desde un archivo de embeddings y los sube a Pinecone
+        Carga vectores desde un archivo de embeddings y los sube al índice
 
         Args:
-            embeddings_file: Archivo JSON con chunks y embeddings
+            embeddings_file: Artefacto binario (*_embedded.npy) o JSON con chunks y embeddings
 
         Returns:
             Resumen de la carga
         """
         print(f"\n📥 Cargando embeddings desde: {embeddings_file.name}")
 
-        with open(embeddings_file, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
-
-        # Preparar vectores para Pinecone
-        vectors = []
-
-        for chunk in chunks:
-            if "embedding" not in chunk:
-                print(f"⚠️  Chunk sin embedding: {chunk.get('chunk_id', 'unknown')}")
-                continue
-
-            # ID único
-            vector_id = chunk["chunk_id"]
-
-            # Vector de embeddings
-            vector = chunk["embedding"]
+        if Path(embeddings_file).suffix == ".npy":
+            # Artefacto binario: vectores float32 leídos del mmap, sin pasar por JSON
+            with EmbeddingArtifact(embeddings_file) as artifact:
+                vectors = list(artifact.iter_vectors())
+            total_chunks = len(vectors)
+        else:
+            with open(embeddings_file, 'r', encoding='utf-8') as f:
+                chunks = json.load(f)
 
-            # Metadata (Pinecone tiene límites: solo strings, numbers, bools, lists)
-            metadata = {
-                "text": chunk["text"][:1000],  # Primeros 1000 chars (límite Pinecone)
-                "source": chunk["metadata"].get("source", "unknown"),
-                "law_name": chunk["metadata"].get("law_name", "unknown"),
-                "category": chunk["metadata"].get("category", "general"),
-                "chunk_number": chunk.get("chunk_number", 0),
-                "total_chunks": chunk.get("total_chunks", 0),
-                "url": chunk["metadata"].get("url", ""),
-            }
+            # Preparar vectores para el índice
+            vectors = []
 
-            # Agregar article_number si existe
-            if chunk["metadata"].get("article_number"):
-                metadata["article_number"] = str(chunk["metadata"]["article_number"])
+            for chunk in chunks:
+                if "embedding" not in chunk:
+                    print(f"⚠️  Chunk sin embedding: {chunk.get('chunk_id', 'unknown')}")
+                    continue
 
-            vectors.append((vector_id, vector, metadata))
+                vectors.append(chunk_to_vector(chunk))
+            total_chunks = len(chunks)
 
-        # Subir a Pinecone
+        # Subir al backend configurado
         result = self.upsert_vectors(vectors)
 
         return {
             "file": str(embeddings_file),
-            "total_chunks": len(chunks),
+            "total_chunks": total_chunks,
             "vectors_upserted": result["upserted_count"]
         }
 
@@ -177,18 +744,18 @@ class VectorStore:
         Carga todos los archivos de embeddings de un directorio
 
         Args:
-            embeddings_dir: Directorio con archivos *_embedded.json
+            embeddings_dir: Directorio con archivos *_embedded.npy / *_embedded.json
 
         Returns:
             Lista de resúmenes de carga
         """
-        embedding_files = list(embeddings_dir.glob("*_embedded.json"))
+        embedding_files = find_embedding_files(embeddings_dir)
 
         if not embedding_files:
             print(f"⚠️  No se encontraron archivos de embeddings en {embeddings_dir}")
             return []
 
-        print(f"\n🚀 Cargando {len(embedding_files)} archivos a Pinecone...\n")
+        print(f"\n🚀 Cargando {len(embedding_files)} archivos ({self.backend_name})...\n")
 
         summaries = []
 
@@ -201,61 +768,135 @@ class VectorStore:
 
         return summaries
 
+    def sync_embeddings(
+        self,
+        embeddings_dir: Path,
+        store: Optional[ContentEmbeddingStore] = None,
+        verify: bool = False
+    ) -> Dict:
+        """
+        Sincronización incremental: sube solo los chunks nuevos o cambiados
+        (texto, modelo o metadata) y borra del índice los que ya no existen
+        en data/embeddings. El estado de lo subido vive en el embedding store.
+
+        Args:
+            embeddings_dir: Directorio con archivos *_embedded.npy / *_embedded.json
+            store: Store con el estado de sincronización (por defecto el de data/embeddings)
+            verify: Al final, comprobar que todos los ids esperados estén en el índice
+
+        Returns:
+            Resumen con el diff y los vectores subidos/borrados
+        """
+        if store is None:
+            store = ContentEmbeddingStore()
+        target = self.backend.sync_target
+        synced = store.synced_records(target)
+
+        embedding_files = find_embedding_files(embeddings_dir)
+        print(f"\n🔁 Sincronizando {len(embedding_files)} archivos con {target}...")
+
+        current: Dict[str, Tuple[str, str]] = {}
+        pending: List[Tuple[str, List[float], Dict]] = []
+
+        for emb_file in embedding_files:
+            for chunk, vector in iter_file_rows(emb_file):
+                chunk_id = chunk["chunk_id"]
+                hash_ = record_hash(chunk)
+                current[chunk_id] = (hash_, emb_file.name)
+                if synced.get(chunk_id, (None,))[0] != hash_:
+                    pending.append((chunk_id, vector, chunk_metadata(chunk)))
+
+        diff = diff_chunks(
+            {chunk_id: hash_ for chunk_id, (hash_, _) in synced.items()},
+            {chunk_id: hash_ for chunk_id, (hash_, _) in current.items()}
+        )
+
+        # Cada batch confirmado queda registrado (un corte no pierde lo ya subido)
+        result = self.upsert_vectors(
+            pending,
+            on_batch=lambda ids: store.mark_synced(target, [(vid, *current[vid]) for vid in ids])
+        )
+
+        deleted = 0
+        if diff["removed"]:
+            print(f"🗑️  Borrando {len(diff['removed'])} vectores que ya no existen...")
+            deleted = self.backend.delete(diff["removed"])
+            if deleted == len(diff["removed"]):
+                store.mark_deleted(target, diff["removed"])
+
+        print_diff_summary("Vector store", diff)
+
+        summary = {
+            "target": target,
+            "total_chunks": len(current),
+            "added": len(diff["added"]),
+            "changed": len(diff["changed"]),
+            "removed": len(diff["removed"]),
+            "unchanged": len(diff["unchanged"]),
+            "vectors_upserted": result["upserted_count"],
+            "vectors_failed": result["failed_count"],
+            "vectors_deleted": deleted
+        }
+        if verify:
+            summary["verify"] = self.verify_index(current)
+        return summary
+
     def search(
         self,
         query_vector: List[float],
         top_k: int = 5,
-        filter: Optional[Dict] = None
+        filter: Optional[Dict] = None,
+        include_metadata: bool = True,
+        partitions: Optional[List[str]] = None
     ) -> List[Dict]:
         """
-        Busca vectores similares en Pinecone
+        Busca vectores similares en el backend configurado
 
         Args:
             query_vector: Vector de la consulta
             top_k: Número de resultados a devolver
             filter: Filtros de metadata (ej: {"category": "laboral"})
+            include_metadata: False = solo ids y scores (el chunk store hidrata el resto)
+            partitions: Particiones a consultar (ver rag/partitions.py; None = todo el índice)
 
         Returns:
             Lista de resultados con scores y metadata
         """
         try:
-            results = self.index.query(
-                vector=query_vector,
+            return self.backend.query(
+                query_vector,
                 top_k=top_k,
                 filter=filter,
-                include_metadata=True
+                include_metadata=include_metadata,
+                partitions=partitions
             )
 
-            # Formatear resultados
-            matches = []
-            for match in results.matches:
-                matches.append({
-                    "id": match.id,
-                    "score": match.score,
-                    "text": match.metadata.get("text", ""),
-                    "source": match.metadata.get("source", ""),
-                    "law_name": match.metadata.get("law_name", ""),
-                    "category": match.metadata.get("category", ""),
-                    "url": match.metadata.get("url", ""),
-                    "article_number": match.metadata.get("article_number")
-                })
-
-            return matches
-
         except Exception as e:
             print(f"❌ Error en búsqueda: {e}")
             return []
 
+    def partitions(self) -> List[str]:
+        """Particiones presentes en el índice (vacío = el backend no particiona)"""
+        try:
+            return self.backend.partitions()
+        except Exception as e:
+            print(f"⚠️  Error leyendo particiones: {e}")
+            return []
+
+    def get_query_stats(self) -> Dict:
+        """Fan-out de las búsquedas (requests por búsqueda en Pinecone)"""
+        return self.backend.query_stats()
+
+    def migrate_legacy_namespace(self) -> Dict:
+        """Mueve los vectores anteriores a las particiones a su namespace (solo Pinecone)"""
+        if not hasattr(self.backend, "migrate_legacy_namespace"):
+            return {"migrated": 0, "skipped": 0, "batches": 0}
+        return self.backend.migrate_legacy_namespace()
+
     def get_stats(self) -> Dict:
         """Obtiene estadísticas del índice"""
         try:
-            stats = self.index.describe_index_stats()
-            return {
-                "total_vectors": stats.total_vector_count,
-                "dimension": stats.dimension,
-                "index_fullness": stats.index_fullness,
-                "namespaces": stats.namespaces
-            }
+            return self.backend.describe()
         except Exception as e:
             print(f"❌ Error obteniendo estadísticas: {e}")
             return {}
@@ -263,6 +904,15 @@ class VectorStore:
 
 def main():
     """Script principal para cargar vectores a Pinecone"""
+    parser = argparse.ArgumentParser(description="Sincroniza data/embeddings con el vector store")
+    parser.add_argument("--workers", type=int, default=None, help="Batches de upsert en vuelo")
+    parser.add_argument("--no-verify", action="store_true", help="No verificar los ids al terminar")
+    parser.add_argument("--retry-dead-letters", action="store_true",
+                        help="Solo reintentar los vectores que fallaron en corridas anteriores")
+    parser.add_argument("--migrate-namespaces", action="store_true",
+                        help="Solo mover los vectores sin partición (namespace \"\") a su partición")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("PINECONE VECTOR STORE - LEIA")
     print("=" * 60)
@@ -288,7 +938,22 @@ def main():
 
     try:
         # Inicializar vector store
-        vector_store = VectorStore()
+        vector_store = VectorStore(upsert_workers=args.workers)
+
+        if args.retry_dead_letters:
+            result = vector_store.retry_dead_letters()
+            print(f"\nVectores recuperados: {result['upserted_count']}, aún fallidos: {result['failed_count']}")
+            print("=" * 60)
+            return
+
+        if args.migrate_namespaces:
+            result = vector_store.migrate_legacy_namespace()
+            print(
+                f"\nVectores migrados a su partición: {result['migrated']} "
+                f"(ya particionados: {result['skipped']}, {result['batches']} batches)"
+            )
+            print("=" * 60)
+            return
 
         # Cargar todos los embeddings
         embeddings_dir = Path("data/embeddings")
@@ -298,22 +963,25 @@ def main():
             print("Primero ejecuta embedder.py para generar embeddings")
             return
 
-        summaries = vector_store.load_all_embeddings(embeddings_dir)
+        # Incremental: solo chunks nuevos/cambiados, y borra los eliminados
+        summary = vector_store.sync_embeddings(embeddings_dir, verify=not args.no_verify)
 
         # Resumen final
         print("\n" + "=" * 60)
         print("📊 RESUMEN FINAL")
         print("=" * 60)
 
-        total_chunks = sum(s["total_chunks"] for s in summaries)
-        total_upserted = sum(s["vectors_upserted"] for s in summaries)
-
-        print(f"Total chunks procesados: {total_chunks}")
-        print(f"Vectores subidos a Pinecone: {total_upserted}")
-
-        print(f"\nArchivos cargados:")
-        for summary in summaries:
-            print(f"  • {Path(summary['file']).name}: {summary['vectors_upserted']} vectores")
+        print(f"Total chunks: {summary['total_chunks']}")
+        print(
+            f"Diff: +{summary['added']} nuevos, ~{summary['changed']} cambiados, "
+            f"-{summary['removed']} eliminados, ={summary['unchanged']} sin cambios"
+        )
+        print(f"Vectores subidos a Pinecone: {summary['vectors_upserted']}")
+        print(f"Vectores borrados: {summary['vectors_deleted']}")
+        if summary["vectors_failed"]:
+            print(f"Vectores fallidos: {summary['vectors_failed']} (reintentar con --retry-dead-letters)")
+        if "verify" in summary and summary["verify"]["missing"]:
+            print(f"Ids faltantes en el índice: {len(summary['verify']['missing'])}")
 
         # Estadísticas del índice
         stats = vector_store.get_stats()
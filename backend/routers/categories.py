@@ -7,7 +7,7 @@ from typing import List, Dict, Optional
 from services.legal_categories import (
     get_all_categories,
     get_category,
-    get_category_by_keyword,
+    rank_categories,
     LEGAL_CATEGORIES
 )
 
@@ -57,15 +57,20 @@ async def detect_category(text: str) -> Dict:
     """
     Detecta la categoría más probable basándose en el texto.
     """
-    category_id = get_category_by_keyword(text)
-    if not category_id:
+    ranking = rank_categories(text)
+    if not ranking:
         return {"category": None, "confidence": 0}
 
+    # Confianza: fracción del puntaje total que se lleva la mejor categoría
+    category_id, score = ranking[0]
     category = get_category(category_id)
     return {
         "category": {
             "id": category.id,
             "name": category.name
         },
-        "confidence": 0.8  # Simplificado, podría mejorarse
+        "confidence": round(score / sum(s for _, s in ranking), 2),
+        "alternatives": [
+            {"id": cat_id, "score": cat_score} for cat_id, cat_score in ranking[1:3]
+        ]
     }
@@ -2,25 +2,34 @@
 LEIA - Router de Chat V2
 
 Chat mejorado con:
-- Motor de triage anti-alucinación
+- Motor de triage anti-alucinación (reglas primero: RAG solo si hace falta)
 - Integración con sistema de casos
 - Derivación inteligente a abogados
 - Citación obligatoria de fuentes
 """
 
 from fastapi import APIRouter, HTTPException, Depends, status, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import anthropic
+import asyncio
 import os
 import json
+import threading
+import time
 
 from database import get_db
 from auth import get_current_user, get_current_user_optional
 from models import User, Conversation, ChatMessage
 from services.triage_engine import get_triage_engine, TriageDecision, TriageResult
+from services.retrieval_service import get_retrieval_service
+from services.history_compactor import CompactedHistory, get_history_compactor
+from rag.async_engine import get_async_anthropic_client, stream_claude
+from utils.text import estimate_tokens
+from utils.sse import format_sse, SSE_HEADERS, SSE_MEDIA_TYPE
 from prompts.leia_system_prompt import build_system_prompt
 
 # Rate limiting
@@ -71,6 +80,7 @@ class ChatResponseV2(BaseModel):
     has_sufficient_info: bool
     referral: Optional[ReferralSuggestion]
     tokens_used: Optional[int] = None
+    history_tokens_saved: Optional[int] = None  # Tokens de entrada evitados al resumir turnos antiguos
     conversation_id: Optional[int] = None
 
 
@@ -78,43 +88,34 @@ class ChatResponseV2(BaseModel):
 # CLIENTE ANTHROPIC
 # ============================================================
 
-def get_anthropic_client():
-    """Obtiene el cliente de Anthropic"""
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
+def get_anthropic_client() -> anthropic.AsyncAnthropic:
+    """Obtiene el cliente async de Anthropic (compartido, con pool de conexiones)"""
+    client = get_async_anthropic_client()
+    if client is None:
         raise HTTPException(
             status_code=500,
             detail="ANTHROPIC_API_KEY no configurada"
         )
-    return anthropic.Anthropic(api_key=api_key)
+    return client
 
 
 # ============================================================
 # RAG ENGINE
 # ============================================================
 
-def get_rag_results(query: str) -> List[Dict[str, Any]]:
+# Recuperación especulativa: el RAG parte en paralelo con el triage por reglas
+# y se cancela si una regla decide (por defecto el RAG parte solo si hace falta)
+SPECULATIVE_RETRIEVAL = os.getenv("CHAT_SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+
+
+async def get_rag_results(query: str) -> List[Dict[str, Any]]:
     """
     Obtiene resultados del RAG.
 
+    Usa el servicio de recuperación compartido por el proceso.
     Retorna lista de documentos con scores de similitud.
     """
-    try:
-        from rag.rag_engine import create_rag_engine
-
-        engine = create_rag_engine()
-        if not engine:
-            return []
-
-        results = engine.retrieve_context(query)
-        return results or []
-
-    except ImportError:
-        # RAG no disponible
-        return []
-    except Exception as e:
-        print(f"Error en RAG: {e}")
-        return []
+    return await get_retrieval_service().aretrieve(query)
 
 
 def format_rag_context(results: List[Dict[str, Any]]) -> str:
@@ -147,53 +148,160 @@ def format_rag_context(results: List[Dict[str, Any]]) -> str:
 
 
 # ============================================================
-# ENDPOINT PRINCIPAL
+# RESPUESTAS SIN LLM (plantillas del triage)
 # ============================================================
 
-@router.post("/", response_model=ChatResponseV2)
-@limiter.limit("30/minute")
-async def chat_v2(
-    request: Request,
-    chat_request: ChatRequestV2,
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
-):
+def parse_template_decisions(value: str) -> set:
+    """Decisiones de CHAT_TEMPLATE_DECISIONS (valores de TriageDecision separados por coma)"""
+    decisions = set()
+    for name in filter(None, (part.strip().lower() for part in value.split(","))):
+        try:
+            decisions.add(TriageDecision(name))
+        except ValueError:
+            print(f"⚠️  CHAT_TEMPLATE_DECISIONS: decisión desconocida '{name}'")
+    return decisions
+
+
+# Decisiones que se responden con la plantilla del triage, sin llamar a Claude
+# ("" = siempre Claude). Ej: direct_lawyer_request,urgent_matter,sensitive_topic
+TEMPLATE_DECISIONS = parse_template_decisions(os.getenv("CHAT_TEMPLATE_DECISIONS", "direct_lawyer_request"))
+
+
+def template_response(triage_result: TriageResult) -> Optional[str]:
+    """Respuesta de plantilla si la decisión está habilitada para responder sin LLM"""
+    if triage_result.decision in TEMPLATE_DECISIONS and triage_result.suggested_response:
+        return triage_result.suggested_response
+    return None
+
+
+def estimate_llm_tokens(system_prompt: str, messages: List[Dict[str, str]], response: str) -> int:
+    """Tokens que habría costado responder con Claude (prompt + respuesta)"""
+    prompt = system_prompt + "".join(m["content"] for m in messages)
+    return estimate_tokens(prompt) + estimate_tokens(response)
+
+
+class ResponsePathStats:
+    """Turnos, latencia y tokens por decisión del triage y camino (plantilla o Claude)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paths: Dict[tuple, Dict[str, float]] = {}
+
+    def record(self, decision: TriageDecision, path: str, elapsed_ms: float, tokens: int):
+        """
+        Args:
+            decision: Decisión del triage
+            path: "template" (tokens = estimados ahorrados) o "llm" (tokens = usados)
+            elapsed_ms: Latencia del turno completo
+            tokens: Tokens ahorrados o usados
+        """
+        with self._lock:
+            entry = self._paths.setdefault((decision.value, path), {"turns": 0, "ms": 0.0, "tokens": 0})
+            entry["turns"] += 1
+            entry["ms"] += elapsed_ms
+            entry["tokens"] += tokens
+
+    def summary(self) -> Dict:
+        """Por decisión: turnos, latencia promedio y tokens de cada camino"""
+        with self._lock:
+            summary: Dict[str, Dict] = {}
+            for (decision, path), entry in self._paths.items():
+                tokens_key = "tokens_saved" if path == "template" else "tokens_used"
+                summary.setdefault(decision, {})[path] = {
+                    "turns": entry["turns"],
+                    "avg_ms": round(entry["ms"] / entry["turns"], 2),
+                    tokens_key: entry["tokens"]
+                }
+            return summary
+
+
+response_stats = ResponsePathStats()
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+# ============================================================
+# PIPELINE DE CHAT (compartido por JSON y streaming)
+# ============================================================
+
+async def run_triage(chat_request: ChatRequestV2, speculative: Optional[bool] = None) -> TriageResult:
     """
-    Chat con LEIA v2.
+    Triage primero, RAG solo si hace falta.
 
-    Mejoras sobre v1:
-    - Motor de triage anti-alucinación
-    - Citación obligatoria de fuentes
-    - Detección automática de derivación
-    - Respuestas honestas cuando no hay info
+    Las reglas del triage (solicitud directa de abogado, urgencia, tema
+    sensible, asesoría formal, problema concreto) no leen los resultados
+    RAG: si alguna decide, no se genera el embedding ni se busca.
+
+    Args:
+        chat_request: Mensaje e historial
+        speculative: Lanzar el RAG antes de las reglas y cancelarlo si no
+            se usa (default: CHAT_SPECULATIVE_RETRIEVAL)
     """
-    client = get_anthropic_client()
     triage = get_triage_engine()
-
-    # 1. Buscar en RAG
-    rag_results = get_rag_results(chat_request.message)
-
-    # 2. Analizar con motor de triage
-    triage_result = triage.analyze(
-        user_query=chat_request.message,
-        rag_results=rag_results,
-        conversation_history=[
-            {"role": m.role, "content": m.content}
-            for m in chat_request.conversation_history
-        ] if chat_request.conversation_history else None
+    service = get_retrieval_service()
+    history = [
+        {"role": m.role, "content": m.content}
+        for m in chat_request.conversation_history
+    ] if chat_request.conversation_history else None
+
+    retrieval = None
+    if SPECULATIVE_RETRIEVAL if speculative is None else speculative:
+        retrieval = asyncio.create_task(get_rag_results(chat_request.message))
+        await asyncio.sleep(0)  # deja que la petición de embedding salga primero
+
+    triage_result = triage.analyze_rules(chat_request.message, history)
+    if triage_result is not None:
+        if retrieval is not None:
+            retrieval.cancel()
+        service.record_avoided(cancelled=retrieval is not None)
+        return triage_result
+
+    rag_results = await (retrieval or get_rag_results(chat_request.message))
+    return triage.analyze_rag(chat_request.message, rag_results)
+
+
+def compact_chat_history(
+    db: Session,
+    current_user: Optional[User],
+    chat_request: ChatRequestV2
+) -> CompactedHistory:
+    """
+    Historial para Claude: últimos turnos completos y resumen de los anteriores.
+    El resumen se guarda en la conversación si es del usuario (ya validada).
+    """
+    conversation_id = chat_request.conversation_id if current_user else None
+    return get_history_compactor().compact(
+        chat_request.conversation_history, "claude-3-haiku-20240307", db, conversation_id
     )
 
-    # 3. Determinar si hay info suficiente
+
+def build_chat_prompt(
+    chat_request: ChatRequestV2,
+    triage_result: TriageResult,
+    history: Optional[CompactedHistory] = None
+):
+    """
+    Arma el prompt y los mensajes para Claude según el triage.
+
+    Args:
+        history: Historial compactado (None = historial completo del request)
+
+    Returns:
+        Tupla (triage_result, has_sufficient_info, system_prompt, messages)
+    """
+    # Determinar si hay info suficiente
     has_sufficient_info = triage_result.decision == TriageDecision.RESPOND_WITH_SOURCES
 
-    # 4. Construir prompt del sistema
+    # Construir prompt del sistema
     rag_context = format_rag_context(triage_result.sources_found) if has_sufficient_info else ""
     system_prompt = build_system_prompt(
         rag_context=rag_context,
         has_relevant_sources=has_sufficient_info
     )
 
-    # 5. Agregar instrucciones según el triage
+    # Agregar instrucciones según el triage
     if triage_result.decision == TriageDecision.NO_INFO_AVAILABLE:
         system_prompt += f"""
 
@@ -252,82 +360,29 @@ NO alargues innecesariamente. Sé conciso pero útil.
 Especialidades detectadas: {', '.join(triage_result.suggested_specialties)}
 """
 
-    # 6. Construir mensajes para Claude
+    # Construir mensajes para Claude
     messages = []
 
-    for msg in chat_request.conversation_history or []:
-        messages.append({
-            "role": msg.role,
-            "content": msg.content
-        })
+    if history is not None:
+        system_prompt += history.system_section()
+        messages.extend(history.messages)
+    else:
+        for msg in chat_request.conversation_history or []:
+            messages.append({
+                "role": msg.role,
+                "content": msg.content
+            })
 
     messages.append({
         "role": "user",
         "content": chat_request.message
     })
 
-    # 7. Llamar a Claude
-    try:
-        response = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=1500,
-            system=system_prompt,
-            messages=messages
-        )
-
-        assistant_message = response.content[0].text
-
-    except anthropic.APIError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error de API: {str(e)}"
-        )
-
-    # 8. Guardar en base de datos si hay usuario
-    conversation_id = chat_request.conversation_id
-
-    if current_user:
-        # Crear o actualizar conversación
-        if not conversation_id:
-            conversation = Conversation(
-                user_id=current_user.id,
-                title=chat_request.message[:50] + "..." if len(chat_request.message) > 50 else chat_request.message
-            )
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
-            conversation_id = conversation.id
-        else:
-            conversation = db.query(Conversation).filter(
-                Conversation.id == conversation_id,
-                Conversation.user_id == current_user.id
-            ).first()
-
-            if not conversation:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Conversación no encontrada"
-                )
-
-        # Guardar mensajes
-        user_msg = ChatMessage(
-            conversation_id=conversation_id,
-            role="user",
-            content=chat_request.message
-        )
-        db.add(user_msg)
-
-        assistant_msg = ChatMessage(
-            conversation_id=conversation_id,
-            role="assistant",
-            content=assistant_message,
-            tokens_used=response.usage.input_tokens + response.usage.output_tokens
-        )
-        db.add(assistant_msg)
+    return triage_result, has_sufficient_info, system_prompt, messages
 
-        db.commit()
 
-    # 9. Preparar fuentes para la respuesta
+def build_sources(triage_result: TriageResult) -> List[SourceInfo]:
+    """Fuentes citadas a partir de los resultados del triage"""
     sources = []
     if triage_result.sources_found:
         for doc in triage_result.sources_found:
@@ -338,41 +393,286 @@ Especialidades detectadas: {', '.join(triage_result.suggested_specialties)}
                 page=metadata.get("page"),
                 similarity=doc.get("score", 0)
             ))
+    return sources
 
-    # 10. Preparar sugerencia de derivación
-    # SOLO mostrar botón de abogado cuando:
-    # - Es urgente o sensible (requiere atención inmediata)
-    # - El usuario PIDIÓ DIRECTAMENTE un abogado
-    # NO mostrar botón para REQUIRES_LAWYER (primero orientar)
-    referral = None
-    if triage_result.decision in [
+
+def build_referral(triage_result: TriageResult) -> Optional[ReferralSuggestion]:
+    """
+    Sugerencia de derivación.
+
+    SOLO mostrar botón de abogado cuando:
+    - Es urgente o sensible (requiere atención inmediata)
+    - El usuario PIDIÓ DIRECTAMENTE un abogado
+    NO mostrar botón para REQUIRES_LAWYER (primero orientar)
+    """
+    if triage_result.decision not in [
         TriageDecision.URGENT_MATTER,
         TriageDecision.SENSITIVE_TOPIC,
         TriageDecision.DIRECT_LAWYER_REQUEST  # Usuario pidió abogado directamente
     ]:
-        urgency_map = {
-            TriageDecision.URGENT_MATTER: "urgent",
-            TriageDecision.SENSITIVE_TOPIC: "high",
-            TriageDecision.DIRECT_LAWYER_REQUEST: "high"  # Alta prioridad porque ya lo pidió
-        }
+        return None
 
-        referral = ReferralSuggestion(
-            should_refer=True,
-            urgency=urgency_map.get(triage_result.decision, "low"),
-            reason=triage_result.reason,
-            specialties=triage_result.suggested_specialties
+    urgency_map = {
+        TriageDecision.URGENT_MATTER: "urgent",
+        TriageDecision.SENSITIVE_TOPIC: "high",
+        TriageDecision.DIRECT_LAWYER_REQUEST: "high"  # Alta prioridad porque ya lo pidió
+    }
+
+    return ReferralSuggestion(
+        should_refer=True,
+        urgency=urgency_map.get(triage_result.decision, "low"),
+        reason=triage_result.reason,
+        specialties=triage_result.suggested_specialties
+    )
+
+
+def check_conversation_access(db: Session, current_user: Optional[User], conversation_id: Optional[int]):
+    """Valida que la conversación exista y sea del usuario (antes de llamar a Claude)"""
+    if not current_user or not conversation_id:
+        return
+
+    conversation = db.query(Conversation).filter(
+        Conversation.id == conversation_id,
+        Conversation.user_id == current_user.id
+    ).first()
+
+    if not conversation:
+        raise HTTPException(
+            status_code=404,
+            detail="Conversación no encontrada"
+        )
+
+
+def save_chat_messages(
+    db: Session,
+    current_user: Optional[User],
+    chat_request: ChatRequestV2,
+    assistant_message: str,
+    tokens_used: int
+) -> Optional[int]:
+    """
+    Guarda el intercambio en la base de datos si hay usuario.
+
+    Returns:
+        ID de la conversación (nueva o existente)
+    """
+    conversation_id = chat_request.conversation_id
+
+    if not current_user:
+        return conversation_id
+
+    # Crear conversación si es nueva
+    if not conversation_id:
+        conversation = Conversation(
+            user_id=current_user.id,
+            title=chat_request.message[:50] + "..." if len(chat_request.message) > 50 else chat_request.message
+        )
+        db.add(conversation)
+        db.commit()
+        db.refresh(conversation)
+        conversation_id = conversation.id
+
+    # Guardar mensajes
+    user_msg = ChatMessage(
+        conversation_id=conversation_id,
+        role="user",
+        content=chat_request.message
+    )
+    db.add(user_msg)
+
+    assistant_msg = ChatMessage(
+        conversation_id=conversation_id,
+        role="assistant",
+        content=assistant_message,
+        tokens_used=tokens_used
+    )
+    db.add(assistant_msg)
+
+    db.commit()
+    return conversation_id
+
+
+# ============================================================
+# ENDPOINT PRINCIPAL
+# ============================================================
+
+@router.post("/", response_model=ChatResponseV2)
+@limiter.limit("30/minute")
+async def chat_v2(
+    request: Request,
+    chat_request: ChatRequestV2,
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """
+    Chat con LEIA v2.
+
+    Mejoras sobre v1:
+    - Motor de triage anti-alucinación
+    - Citación obligatoria de fuentes
+    - Detección automática de derivación
+    - Respuestas honestas cuando no hay info
+    - Decisiones deterministas del triage respondidas sin LLM (TEMPLATE_DECISIONS)
+    """
+    start = time.perf_counter()
+    check_conversation_access(db, current_user, chat_request.conversation_id)
+
+    # 1. Triage (busca en RAG solo si las reglas no deciden)
+    triage_result = await run_triage(chat_request)
+
+    # 2. Prompt y mensajes (sin plantilla: turnos antiguos resumidos)
+    template = template_response(triage_result)
+    history = compact_chat_history(db, current_user, chat_request) if template is None else None
+    triage_result, has_sufficient_info, system_prompt, messages = build_chat_prompt(
+        chat_request, triage_result, history
+    )
+
+    # 3. Respuesta de plantilla (sin Claude) si la decisión lo permite
+    if template is not None:
+        conversation_id = save_chat_messages(db, current_user, chat_request, template, 0)
+        response_stats.record(
+            triage_result.decision, "template", _elapsed_ms(start),
+            estimate_llm_tokens(system_prompt, messages, template)
+        )
+        return ChatResponseV2(
+            response=template,
+            sources=build_sources(triage_result),
+            has_sufficient_info=has_sufficient_info,
+            referral=build_referral(triage_result),
+            tokens_used=0,
+            conversation_id=conversation_id
         )
 
+    # 4. Llamar a Claude
+    client = get_anthropic_client()
+    try:
+        response = await client.messages.create(
+            model="claude-3-haiku-20240307",
+            max_tokens=1500,
+            system=system_prompt,
+            messages=messages
+        )
+
+        assistant_message = response.content[0].text
+
+    except anthropic.APIError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error de API: {str(e)}"
+        )
+
+    tokens_used = response.usage.input_tokens + response.usage.output_tokens
+
+    # 5. Guardar en base de datos si hay usuario
+    conversation_id = save_chat_messages(
+        db, current_user, chat_request, assistant_message, tokens_used
+    )
+    response_stats.record(triage_result.decision, "llm", _elapsed_ms(start), tokens_used)
+
     return ChatResponseV2(
         response=assistant_message,
-        sources=sources,
+        sources=build_sources(triage_result),
         has_sufficient_info=has_sufficient_info,
-        referral=referral,
-        tokens_used=response.usage.input_tokens + response.usage.output_tokens,
+        referral=build_referral(triage_result),
+        tokens_used=tokens_used,
+        history_tokens_saved=history.tokens_saved,
         conversation_id=conversation_id
     )
 
 
+@router.post("/stream")
+@limiter.limit("30/minute")
+async def chat_v2_stream(
+    request: Request,
+    chat_request: ChatRequestV2,
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """
+    Chat con LEIA v2 en streaming (Server-Sent Events).
+
+    Eventos, en orden:
+    - triage: decisión, confianza y si hay información suficiente
+    - sources: fuentes citadas
+    - referral: sugerencia de derivación (o null)
+    - token: fragmentos de la respuesta a medida que llegan
+    - done: tokens usados, ahorrados al resumir el historial y
+      conversation_id (mensajes ya guardados)
+    - error: si Claude falla a mitad de la respuesta
+
+    Las respuestas de plantilla (sin LLM) llegan en un solo evento token.
+    """
+    start = time.perf_counter()
+    check_conversation_access(db, current_user, chat_request.conversation_id)
+
+    triage_result = await run_triage(chat_request)
+    template = template_response(triage_result)
+    history = compact_chat_history(db, current_user, chat_request) if template is None else None
+    triage_result, has_sufficient_info, system_prompt, messages = build_chat_prompt(
+        chat_request, triage_result, history
+    )
+    referral = build_referral(triage_result)
+    client = get_anthropic_client() if template is None else None
+
+    async def event_stream():
+        yield format_sse("triage", {
+            "decision": triage_result.decision.value,
+            "confidence": triage_result.confidence,
+            "has_sufficient_info": has_sufficient_info
+        })
+        yield format_sse("sources", [s.model_dump() for s in build_sources(triage_result)])
+        yield format_sse("referral", referral.model_dump() if referral else None)
+
+        if template is not None:
+            yield format_sse("token", {"text": template})
+            conversation_id = save_chat_messages(db, current_user, chat_request, template, 0)
+            response_stats.record(
+                triage_result.decision, "template", _elapsed_ms(start),
+                estimate_llm_tokens(system_prompt, messages, template)
+            )
+            yield format_sse("done", {"tokens_used": 0, "conversation_id": conversation_id})
+            return
+
+        parts = []
+        tokens_used = 0
+        try:
+            async for event, data in stream_claude(client, system_prompt, messages, max_tokens=1500):
+                if event == "token":
+                    parts.append(data)
+                    yield format_sse("token", {"text": data})
+                else:
+                    tokens_used = data
+        except anthropic.APIError as e:
+            yield format_sse("error", {"detail": f"Error de API: {str(e)}"})
+            return
+
+        conversation_id = save_chat_messages(
+            db, current_user, chat_request, "".join(parts), tokens_used
+        )
+        response_stats.record(triage_result.decision, "llm", _elapsed_ms(start), tokens_used)
+        yield format_sse("done", {
+            "tokens_used": tokens_used,
+            "history_tokens_saved": history.tokens_saved,
+            "conversation_id": conversation_id
+        })
+
+    return StreamingResponse(event_stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@router.get("/stats")
+async def chat_v2_stats():
+    """
+    Turnos, latencia promedio y tokens por decisión del triage, separados
+    en respuestas de plantilla (tokens_saved estimados) y de Claude (tokens_used),
+    y compactación del historial (resúmenes reutilizados y tokens ahorrados).
+    """
+    return {
+        "template_decisions": sorted(decision.value for decision in TEMPLATE_DECISIONS),
+        "decisions": response_stats.summary(),
+        "history": get_history_compactor().stats.summary()
+    }
+
+
 # ============================================================
 # ENDPOINT DE MATCHING RÁPIDO
 # ============================================================
@@ -511,7 +811,7 @@ async def create_case_from_chat(
     from prompts.leia_system_prompt import build_case_summary_prompt
     summary_prompt = build_case_summary_prompt(conversation_text)
 
-    response = client.messages.create(
+    response = await client.messages.create(
         model="claude-3-haiku-20240307",
         max_tokens=1024,
         messages=[{"role": "user", "content": summary_prompt}]
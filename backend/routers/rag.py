@@ -0,0 +1,36 @@
+"""
+Router para el estado del sistema RAG.
+"""
+from fastapi import APIRouter, Header, HTTPException
+from typing import Dict, Optional
+import hmac
+import os
+
+from services.retrieval_service import get_retrieval_service
+
+router = APIRouter(prefix="/api/rag", tags=["rag"])
+
+
+@router.get("/health")
+def rag_health() -> Dict:
+    """
+    Estado del servicio de recuperación: backend, vectores, latencia y caché.
+    """
+    return get_retrieval_service().health()
+
+
+@router.post("/reload")
+def rag_reload(x_reload_token: Optional[str] = Header(default=None)) -> Dict:
+    """
+    Recarga el RAG Engine (ej: después de reconstruir el índice local).
+
+    Requiere el header X-Reload-Token igual a RAG_RELOAD_TOKEN.
+    """
+    expected = os.getenv("RAG_RELOAD_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Recarga de RAG deshabilitada")
+    # Comparación en tiempo constante: no filtra por cuánto del token coincide
+    if not x_reload_token or not hmac.compare_digest(x_reload_token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Token de recarga inválido")
+
+    return get_retrieval_service().reload()
@@ -2,26 +2,33 @@
 """
 Master Script - Ejecuta el pipeline completo de RAG
 
-Pipeline:
-1. Recopila datos legales (BCN, DT, SERNAC)
+Pipeline (etapas de data_processing/pipeline_stages.py, en proceso):
+1. Recopila datos legales (BCN, DT, SERNAC) y carga apuntes
 2. Procesa y limpia textos
 3. Genera embeddings
-4. Sube a Pinecone
+4. Sube al vector store e indexa para búsqueda léxica
 5. Verifica que todo funcionó
 
+Cada fuente es una cadena independiente y las cadenas corren en paralelo.
+Las etapas cuyos inputs no cambiaron desde la última corrida se saltan.
+
 Uso:
     python run_rag_pipeline.py            # Pipeline completo
     python run_rag_pipeline.py --skip-scraping  # Solo procesamiento
     python run_rag_pipeline.py --scrape-only    # Solo recopilación
+    python run_rag_pipeline.py --streaming      # Pasos 2-4 en streaming (sin cargar todo en memoria)
+    python run_rag_pipeline.py --force          # Reprocesa aunque nada haya cambiado
 """
 
-import subprocess
 import sys
 import time
 from pathlib import Path
 from datetime import datetime
 import argparse
 
+from data_processing.dag_runner import BLOCKED, DEFAULT_MAX_WORKERS, FAILED, RAN, SKIPPED
+from data_processing.pipeline_stages import PIPELINE_STEPS, STAGE_KINDS, run_pipeline, stage_kind
+
 class RAGPipeline:
     """Orquestador del pipeline RAG completo"""
 
@@ -44,120 +51,47 @@ class RAGPipeline:
             print(f"\n[Paso {step_num}/{self.total_steps}] {message}")
             print("-" * 70)
 
-    def run_script(self, script_path, description):
+    def run_stages(self, kinds, scrape=False, force=False, max_workers=DEFAULT_MAX_WORKERS):
         """
-        Ejecuta un script Python y captura su salida
-
-        Args:
-            script_path: Ruta al script
-            description: Descripción de lo que hace
+        Ejecuta las etapas de los tipos indicados con el DAG runner
 
         Returns:
-            True si exitoso, False si falló
+            True si ninguna etapa falló ni quedó bloqueada
         """
-        print(f"\n🔄 Ejecutando: {description}")
-        print(f"   Script: {script_path}")
-
-        try:
-            result = subprocess.run(
-                [sys.executable, script_path],
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minutos timeout
-            )
-
-            if result.returncode == 0:
-                print(f"✅ {description} - COMPLETADO")
-                if self.verbose and result.stdout:
-                    print(result.stdout)
-                return True
-            else:
-                print(f"❌ {description} - FALLÓ")
-                if result.stderr:
-                    print(f"Error: {result.stderr}")
-                return False
-
-        except subprocess.TimeoutExpired:
-            print(f"❌ {description} - TIMEOUT (>5 min)")
-            return False
-        except Exception as e:
-            print(f"❌ {description} - ERROR: {e}")
-            return False
-
-    def step1_scrape_data(self):
-        """Paso 1: Recopila datos legales"""
-        self.print_step(1, "Recopilación de Datos Legales")
-
-        scripts = [
-            ("data_collection/bcn_scraper.py", "Leyes BCN LeyChile"),
-            ("data_collection/dt_scraper.py", "Guías Dirección del Trabajo"),
-            ("data_collection/sernac_scraper.py", "Información SERNAC")
-        ]
+        results = run_pipeline(kinds=kinds, scrape=scrape, force=force, max_workers=max_workers)
 
-        all_success = True
-        for script, desc in scripts:
-            if not self.run_script(script, desc):
-                all_success = False
+        failed = [result for result in results if result.status in (FAILED, BLOCKED)]
+        for result in failed:
+            print(f"❌ {result.name}: {result.detail}")
 
-        if all_success:
-            self.steps_completed += 1
-            print("\n✅ Paso 1: Datos recopilados exitosamente")
-        else:
-            print("\n⚠️  Paso 1: Algunos scrapers fallaron, continuar de todos modos")
-            self.steps_completed += 1
-
-        return True  # Continuar aunque algunos fallen
-
-    def step2_process_texts(self):
-        """Paso 2: Procesa y limpia textos"""
-        self.print_step(2, "Procesamiento de Textos")
-
-        success = self.run_script(
-            "data_processing/text_processor.py",
-            "Limpieza y chunking de textos"
-        )
-
-        if success:
-            self.steps_completed += 1
-            print("\n✅ Paso 2: Textos procesados exitosamente")
-        else:
-            print("\n❌ Paso 2: Error en procesamiento. Pipeline detenido.")
-
-        return success
-
-    def step3_generate_embeddings(self):
-        """Paso 3: Genera embeddings"""
-        self.print_step(3, "Generación de Embeddings")
-
-        success = self.run_script(
-            "data_processing/embedder.py",
-            "Embeddings con OpenAI"
-        )
+        # Un paso cuenta como completado si todas sus etapas quedaron al día
+        for step_kinds in PIPELINE_STEPS.values():
+            step_results = [result for result in results if stage_kind(result.name) in step_kinds]
+            if step_results and all(result.status in (RAN, SKIPPED) for result in step_results):
+                self.steps_completed += 1
 
-        if success:
-            self.steps_completed += 1
-            print("\n✅ Paso 3: Embeddings generados exitosamente")
-        else:
-            print("\n❌ Paso 3: Error generando embeddings. Pipeline detenido.")
+        return not failed
 
-        return success
+    def step_streaming_ingest(self):
+        """Pasos 2-4 en una sola ingesta en streaming (chunks → embeddings → vector store)"""
+        self.print_step(2, "Ingesta en streaming (chunks, embeddings y vector store)")
 
-    def step4_upload_to_pinecone(self):
-        """Paso 4: Sube vectores a Pinecone"""
-        self.print_step(4, "Carga a Pinecone Vector Database")
+        from data_processing.streaming_pipeline import ingest
 
-        success = self.run_script(
-            "rag/vector_store.py",
-            "Upload a Pinecone"
-        )
+        try:
+            summaries = ingest()
+        except Exception as e:
+            print(f"\n❌ Pasos 2-4: Error en la ingesta ({e}). Pipeline detenido.")
+            return False
 
-        if success:
-            self.steps_completed += 1
-            print("\n✅ Paso 4: Vectores subidos a Pinecone exitosamente")
+        failed = sum(summary.get("failed", 0) for summary in summaries)
+        if failed:
+            print(f"\n⚠️  Pasos 2-4: {failed} chunks sin embedding")
         else:
-            print("\n❌ Paso 4: Error subiendo a Pinecone. Pipeline detenido.")
+            self.steps_completed += 3
+            print("\n✅ Pasos 2-4: Ingesta en streaming completada")
 
-        return success
+        return True
 
     def step5_verify_system(self):
         """Paso 5: Verifica que RAG esté funcionando"""
@@ -177,7 +111,7 @@ class RAGPipeline:
         all_exist = True
         for path, name in checks:
             if path.exists():
-                files = list(path.glob("*.json"))
+                files = [f for f in path.iterdir() if f.is_file()]
                 print(f"   ✅ {name}: {len(files)} archivos")
             else:
                 print(f"   ❌ {name}: No encontrado")
@@ -191,33 +125,39 @@ class RAGPipeline:
             print("\n⚠️  Paso 5: Algunas verificaciones fallaron")
             return False
 
-    def run_full_pipeline(self, skip_scraping=False, scrape_only=False):
+    def run_full_pipeline(self, skip_scraping=False, scrape_only=False, streaming=False,
+                          force=False, max_workers=DEFAULT_MAX_WORKERS):
         """Ejecuta el pipeline completo"""
         self.start_time = time.time()
 
         self.print_header("PIPELINE RAG - JUSTICIAAI")
         print(f"Inicio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-        # Paso 1: Scraping (opcional)
-        if not skip_scraping:
-            if not self.step1_scrape_data():
-                return False
-
         if scrape_only:
-            print("\n✅ Scraping completado (solo recopilación)")
-            return True
-
-        # Paso 2: Procesamiento
-        if not self.step2_process_texts():
-            return False
-
-        # Paso 3: Embeddings
-        if not self.step3_generate_embeddings():
-            return False
-
-        # Paso 4: Pinecone
-        if not self.step4_upload_to_pinecone():
-            return False
+            self.print_step(1, "Recopilación de Datos Legales")
+            success = self.run_stages(["scrape", "load"], scrape=True, force=force, max_workers=max_workers)
+            print("\n✅ Scraping completado (solo recopilación)" if success else "\n⚠️  Algunos scrapers fallaron")
+            return success
+
+        if streaming:
+            # Paso 1 por el runner; pasos 2-4 solapados, con memoria acotada
+            kinds = ["load"] if skip_scraping else ["scrape", "load"]
+            self.print_step(1, "Recopilación de Datos Legales")
+            if not self.run_stages(kinds, scrape=not skip_scraping, force=force, max_workers=max_workers):
+                print("\n⚠️  Paso 1: Algunas etapas fallaron, continuar de todos modos")
+            if not self.step_streaming_ingest():
+                return False
+        else:
+            # Pasos 1-4 como un solo grafo: cada fuente avanza apenas su etapa anterior termina
+            self.print_step("1-4", "Recopilación, procesamiento, embeddings y vector store")
+            if not self.run_stages(
+                STAGE_KINDS,
+                scrape=not skip_scraping,
+                force=force,
+                max_workers=max_workers
+            ):
+                print("\n❌ Pasos 1-4: Hay etapas fallidas. Pipeline detenido.")
+                return False
 
         # Paso 5: Verificación
         self.step5_verify_system()
@@ -254,6 +194,22 @@ def main():
         action="store_true",
         help="Solo ejecuta los scrapers (no procesa)"
     )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Procesa, embebe y sube en streaming (una sola pasada)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ejecuta todas las etapas aunque sus inputs no hayan cambiado"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Etapas en paralelo"
+    )
     parser.add_argument(
         "-q", "--quiet",
         action="store_true",
@@ -269,7 +225,10 @@ def main():
     try:
         success = pipeline.run_full_pipeline(
             skip_scraping=args.skip_scraping,
-            scrape_only=args.scrape_only
+            scrape_only=args.scrape_only,
+            streaming=args.streaming,
+            force=args.force,
+            max_workers=args.workers
         )
 
         sys.exit(0 if success else 1)
@@ -0,0 +1,329 @@
+"""
+LEIA - Compactación del historial de conversación
+
+Cada turno reenvía el historial completo a Claude: sin tope, los tokens de
+entrada (y la latencia) crecen con el cuadrado del largo de la conversación.
+HistoryCompactor mantiene el historial dentro de un presupuesto de tokens
+por modelo:
+
+- Los últimos KEEP_TURNS turnos van textuales (un turno empieza en un
+  mensaje del usuario, así los mensajes siguen empezando por "user")
+- Los turnos anteriores se reemplazan por un resumen que va al system prompt
+- El resumen se guarda por conversación (tabla conversation_summaries, o
+  en memoria para chats anónimos) y se actualiza solo con los turnos que
+  salen de la ventana; si el historial recibido no calza con el prefijo
+  resumido (hash), se rehace completo
+
+El resumen por defecto es extractivo y local (primera línea del problema,
+luego los turnos más recientes que caben en SUMMARY_MAX_TOKENS): no agrega
+una llamada al modelo por turno. summarizer acepta otra función.
+
+Los tokens se estiman con estimate_tokens (~4 caracteres por token) más un
+costo fijo por mensaje; el ahorro se reporta como history_tokens_saved junto
+a tokens_used.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.text import estimate_tokens
+
+
+# Presupuesto de tokens del historial (mensajes previos + resumen) por modelo
+MODEL_HISTORY_BUDGETS = {
+    "claude-3-haiku-20240307": 3000,
+}
+DEFAULT_HISTORY_BUDGET = 3000
+
+# Presupuesto fijo para todos los modelos (0 = usar MODEL_HISTORY_BUDGETS)
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "0"))
+
+# Turnos recientes que se envían textuales
+KEEP_TURNS = int(os.getenv("CHAT_HISTORY_KEEP_TURNS", "3"))
+
+# Tope del resumen y largo máximo de cada línea
+SUMMARY_MAX_TOKENS = 500
+SUMMARY_LINE_CHARS = 240
+
+# Tokens de formato por mensaje (rol, separadores)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Resúmenes de chats anónimos (sin conversation_id) que se recuerdan
+MEMORY_SUMMARIES = 512
+
+
+def history_budget(model: str) -> int:
+    """Presupuesto de tokens del historial para un modelo"""
+    return HISTORY_TOKEN_BUDGET or MODEL_HISTORY_BUDGETS.get(model, DEFAULT_HISTORY_BUDGET)
+
+
+def estimate_message_tokens(messages: Iterable[Dict[str, str]]) -> int:
+    """Tokens estimados de una lista de mensajes"""
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def prefix_digest(messages: Iterable[Dict[str, str]], digest: str = "") -> str:
+    """Hash encadenado de mensajes; continuar desde digest equivale a hashear el prefijo completo"""
+    for message in messages:
+        digest = hashlib.sha256(
+            f"{digest}\x00{message['role']}\x00{message['content']}".encode("utf-8")
+        ).hexdigest()
+    return digest
+
+
+def summary_line(message: Dict[str, str]) -> str:
+    """Una línea del resumen: el mensaje del usuario o la primera oración de LEIA"""
+    text = " ".join(message["content"].split())
+    if message["role"] == "assistant":
+        end = min((i for i in (text.find(". "), text.find("? "), text.find("! ")) if i > 0), default=-1)
+        if end > 0:
+            text = text[:end + 1]
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + "…"
+    speaker = "Usuario" if message["role"] == "user" else "LEIA"
+    return f"- {speaker}: {text}"
+
+
+def update_summary(summary: Optional[str], new_messages: List[Dict[str, str]]) -> str:
+    """
+    Resumen extractivo incremental: agrega una línea por mensaje nuevo y, si
+    pasa de SUMMARY_MAX_TOKENS, descarta las líneas más antiguas salvo la
+    primera (el problema que planteó el usuario).
+    """
+    lines = summary.splitlines() if summary else []
+    lines += [summary_line(message) for message in new_messages]
+    while len(lines) > 2 and estimate_tokens("\n".join(lines)) > SUMMARY_MAX_TOKENS:
+        del lines[1]
+    return "\n".join(lines)
+
+
+@dataclass
+class SummaryState:
+    """Resumen de los primeros `covered` mensajes de una conversación"""
+    covered: int
+    digest: str
+    summary: str
+
+
+@dataclass
+class CompactedHistory:
+    """Historial listo para Claude: turnos recientes + resumen de los anteriores"""
+    messages: List[Dict[str, str]]
+    summary: Optional[str] = None
+    original_tokens: int = 0
+    compacted_tokens: int = 0
+    summarized_messages: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        """Tokens de entrada que se evitan por turno"""
+        return max(0, self.original_tokens - self.compacted_tokens)
+
+    def system_section(self) -> str:
+        """Sección para agregar al system prompt ("" si no hay resumen)"""
+        if not self.summary:
+            return ""
+        return f"""
+
+## RESUMEN DE LA CONVERSACIÓN ANTERIOR
+
+Turnos previos resumidos (los más recientes van completos en los mensajes):
+{self.summary}
+"""
+
+
+class MemorySummaryStore:
+    """Resúmenes en memoria (LRU), para chats sin conversación guardada"""
+
+    def __init__(self, max_entries: int = MEMORY_SUMMARIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, SummaryState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[SummaryState]:
+        with self._lock:
+            state = self._entries.get(key)
+            if state is not None:
+                self._entries.move_to_end(key)
+            return state
+
+    def put(self, key: str, state: SummaryState):
+        with self._lock:
+            self._entries[key] = state
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class ConversationSummaryStore:
+    """Resúmenes en la tabla conversation_summaries (uno por Conversation)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _row(self, conversation_id: int):
+        from models import ConversationSummary
+
+        return self.db.query(ConversationSummary).filter(
+            ConversationSummary.conversation_id == conversation_id
+        ).first()
+
+    def get(self, conversation_id: int) -> Optional[SummaryState]:
+        row = self._row(conversation_id)
+        if row is None:
+            return None
+        return SummaryState(row.summarized_messages, row.history_digest, row.summary)
+
+    def put(self, conversation_id: int, state: SummaryState):
+        from models import ConversationSummary
+
+        row = self._row(conversation_id)
+        if row is None:
+            row = ConversationSummary(conversation_id=conversation_id)
+            self.db.add(row)
+        row.summary = state.summary
+        row.summarized_messages = state.covered
+        row.history_digest = state.digest
+        self.db.commit()
+
+
+class CompactionStats:
+    """Contadores de compactación (expuestos en /api/v2/chat/stats)"""
+
+    COUNTERS = ("turns", "compacted", "summary_hits", "incremental_updates", "full_rebuilds", "tokens_saved")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+
+    def add(self, **counts: int):
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[name] += value
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+class HistoryCompactor:
+    """Recorta el historial a un presupuesto de tokens con un resumen incremental"""
+
+    def __init__(
+        self,
+        keep_turns: int = KEEP_TURNS,
+        budget: Optional[int] = None,
+        summarizer: Callable[[Optional[str], List[Dict[str, str]]], str] = update_summary,
+        memory_store: Optional[MemorySummaryStore] = None
+    ):
+        """
+        Args:
+            keep_turns: Turnos recientes que se envían textuales
+            budget: Tokens del historial (None = según el modelo)
+            summarizer: (resumen previo, mensajes nuevos) -> resumen actualizado
+            memory_store: Resúmenes de chats sin conversation_id
+        """
+        self.keep_turns = max(1, keep_turns)
+        self.budget = budget
+        self.summarizer = summarizer
+        self.memory_store = memory_store or MemorySummaryStore()
+        self.stats = CompactionStats()
+
+    def compact(
+        self,
+        history: Optional[Iterable[Any]],
+        model: str = "claude-3-haiku-20240307",
+        db=None,
+        conversation_id: Optional[int] = None
+    ) -> CompactedHistory:
+        """
+        Args:
+            history: Mensajes previos (dicts o modelos con role/content)
+            model: Modelo de Claude (define el presupuesto)
+            db: Sesión SQLAlchemy; con conversation_id el resumen se guarda en la conversación
+            conversation_id: Conversación ya validada para el usuario
+
+        Returns:
+            CompactedHistory con los mensajes a enviar y el resumen (si hizo falta)
+        """
+        messages = [
+            {"role": role, "content": content}
+            for role, content in (_role_content(m) for m in history or [])
+            if role in ("user", "assistant")
+        ]
+        original = estimate_message_tokens(messages)
+        budget = self.budget or history_budget(model)
+
+        start = self._window_start(messages, budget) if original > budget else 0
+        self.stats.add(turns=1)
+        if start == 0:
+            return CompactedHistory(messages, None, original, original, 0)
+
+        if db is not None and conversation_id:
+            store, key = ConversationSummaryStore(db), conversation_id
+        else:
+            # Chats anónimos: la conversación se reconoce por su primer mensaje
+            store, key = self.memory_store, prefix_digest(messages[:1])
+
+        summary = self._summarize(messages[:start], store, key)
+        kept = messages[start:]
+        compacted = CompactedHistory(
+            kept, summary, original, estimate_message_tokens(kept) + estimate_tokens(summary), start
+        )
+        self.stats.add(compacted=1, tokens_saved=compacted.tokens_saved)
+        return compacted
+
+    def _window_start(self, messages: List[Dict[str, str]], budget: int) -> int:
+        """Índice del primer mensaje textual: últimos keep_turns turnos que caben en el presupuesto"""
+        turn_starts = [i for i, m in enumerate(messages) if m["role"] == "user"]
+        if not turn_starts:
+            return 0
+
+        starts = turn_starts[-self.keep_turns:]
+        # Si aun así no caben, soltar los turnos más antiguos de la ventana
+        while len(starts) > 1 and estimate_message_tokens(messages[starts[0]:]) > budget:
+            starts.pop(0)
+        return starts[0]
+
+    def _summarize(self, evicted: List[Dict[str, str]], store, key) -> str:
+        """Resumen de los mensajes fuera de la ventana, reutilizando el guardado"""
+        state = store.get(key)
+        if (
+            state is not None
+            and state.covered <= len(evicted)
+            and prefix_digest(evicted[:state.covered]) == state.digest
+        ):
+            if state.covered == len(evicted):
+                self.stats.add(summary_hits=1)
+                return state.summary
+            summary = self.summarizer(state.summary, evicted[state.covered:])
+            digest = prefix_digest(evicted[state.covered:], state.digest)
+            self.stats.add(incremental_updates=1)
+        else:
+            summary = self.summarizer(None, evicted)
+            digest = prefix_digest(evicted)
+            self.stats.add(full_rebuilds=1)
+
+        store.put(key, SummaryState(len(evicted), digest, summary))
+        return summary
+
+
+def _role_content(message: Any):
+    if isinstance(message, dict):
+        return message.get("role"), message.get("content", "")
+    return message.role, message.content
+
+
+_history_compactor: Optional[HistoryCompactor] = None
+
+
+def get_history_compactor() -> HistoryCompactor:
+    """Singleton del compactador (comparte los resúmenes en memoria)"""
+    global _history_compactor
+    if _history_compactor is None:
+        _history_compactor = HistoryCompactor()
+    return _history_compactor
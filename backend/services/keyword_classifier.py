@@ -0,0 +1,179 @@
+"""
+LEIA - Clasificador por palabras clave
+
+Motor común para detectar áreas legales, especialidades y competencias por
+palabras clave (TriageEngine, legal_categories, pjud_constants). Cada
+módulo declara su registro categoría -> palabras clave (con peso opcional)
+y lo compila una vez en un KeywordClassifier:
+
+- Todas las palabras de todas las categorías van a un autómata
+  Aho-Corasick: una sola pasada por el texto da todas las coincidencias
+- Texto y palabras se comparan sin tildes y en minúsculas
+- Cada palabra suma su peso a su categoría una vez, aunque aparezca
+  varias veces en el texto
+
+    classifier = KeywordClassifier({
+        "laboral": ["despido", ("finiquito", 2)],
+        "familia": ["divorcio", "pensión"],
+    })
+    classifier.classify("me despidieron sin finiquito")  # [("laboral", 2)]
+
+scores_many() / classify_many() / first_many() procesan lotes (backfill de
+conversaciones, re-etiquetado de causas) recorriendo una sola vez cada
+texto distinto.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from utils.text import fold_accents
+
+
+# Palabra clave del registro: "texto" (peso 1) o ("texto", peso)
+KeywordSpec = Union[str, Tuple[str, float]]
+
+
+class AhoCorasick:
+    """Autómata Aho-Corasick: todas las ocurrencias de muchas palabras en una pasada"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, object]]):
+        """
+        Args:
+            patterns: Tuplas (palabra, etiqueta); la etiqueta se reporta al encontrarla
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+
+        outputs: List[set] = [set()]
+        for word, label in patterns:
+            if not word:
+                continue
+            state = 0
+            for char in word:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(label)
+
+        # Enlaces de falla por BFS; cada estado hereda las salidas de su sufijo y
+        # su tabla de transiciones (autómata determinista: un paso por carácter)
+        self._delta: List[Dict[str, int]] = [dict(self._goto[0])] + [{} for _ in self._goto[1:]]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            if state:
+                self._delta[state] = {**self._delta[self._fail[state]], **self._goto[state]}
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                if state:
+                    self._fail[next_state] = self._delta[self._fail[state]].get(char, 0)
+                outputs[next_state] |= outputs[self._fail[next_state]]
+
+        self._output = [frozenset(labels) for labels in outputs]
+
+    def find(self, text: str) -> set:
+        """Etiquetas de todas las palabras que aparecen en el texto"""
+        delta, output = self._delta, self._output
+        found = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class KeywordClassifier:
+    """Registro de palabras clave por categoría compilado en un solo autómata"""
+
+    def __init__(self, registry: Mapping[str, Iterable[KeywordSpec]]):
+        """
+        Args:
+            registry: Categoría -> palabras clave ("texto" o ("texto", peso)).
+                El orden de las categorías es su prioridad en los empates.
+        """
+        self.categories: List[str] = list(registry)
+        self._priority = {category: index for index, category in enumerate(self.categories)}
+
+        # Una entrada por (categoría, palabra sin tildes): "pensión" y "pension"
+        # son la misma palabra y suman una vez
+        self._entries: List[Tuple[str, float]] = []
+        seen = set()
+        patterns = []
+        for category, keywords in registry.items():
+            for spec in keywords:
+                keyword, weight = (spec, 1) if isinstance(spec, str) else spec
+                folded = fold_accents(keyword)
+                if not folded or (category, folded) in seen:
+                    continue
+                seen.add((category, folded))
+                patterns.append((folded, len(self._entries)))
+                self._entries.append((category, weight))
+
+        self._automaton = AhoCorasick(patterns)
+
+    def score_folded(self, folded: str) -> Dict[str, float]:
+        """Como scores(), para texto ya normalizado con fold_accents"""
+        scores: Dict[str, float] = {}
+        for entry in self._automaton.find(folded):
+            category, weight = self._entries[entry]
+            scores[category] = scores.get(category, 0) + weight
+        return scores
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Puntaje de cada categoría con al menos una palabra en el texto"""
+        return self.score_folded(fold_accents(text))
+
+    def rank(self, scores: Mapping[str, float], top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Ordena puntajes de mayor a menor (empates por prioridad del registro)"""
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self._priority[item[0]]))
+        return ranked[:top_k] if top_k is not None else ranked
+
+    def classify(self, text: str, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Categorías del texto con su puntaje, de la más probable a la menos"""
+        return self.rank(self.scores(text), top_k)
+
+    def best(self, text: str) -> Optional[str]:
+        """Categoría con mayor puntaje, o None si no hay coincidencias"""
+        ranked = self.classify(text, top_k=1)
+        return ranked[0][0] if ranked else None
+
+    def matches(self, text: str) -> List[str]:
+        """Categorías con alguna coincidencia, en orden de prioridad del registro"""
+        scores = self.scores(text)
+        return [category for category in self.categories if category in scores]
+
+    def first(self, text: str) -> Optional[str]:
+        """Primera categoría del registro con alguna coincidencia"""
+        return self._first(self.scores(text))
+
+    def _first(self, scores: Mapping[str, float]) -> Optional[str]:
+        return next((category for category in self.categories if category in scores), None)
+
+    def scores_many(self, texts: Iterable[str]) -> List[Dict[str, float]]:
+        """
+        Puntajes de un lote de textos; los repetidos ("sí", "gracias", el
+        mismo tribunal) se recorren una sola vez.
+
+        Returns:
+            Un dict de puntajes por texto, en el mismo orden de la entrada
+        """
+        texts = list(texts)
+        scored: Dict[str, Dict[str, float]] = {}
+        for text in texts:
+            if text not in scored:
+                scored[text] = self.scores(text)
+        return [dict(scored[text]) for text in texts]
+
+    def classify_many(self, texts: Iterable[str], top_k: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        """Rankings de un lote de textos (ver scores_many), en el orden de la entrada"""
+        return [self.rank(scores, top_k) for scores in self.scores_many(texts)]
+
+    def first_many(self, texts: Iterable[str]) -> List[Optional[str]]:
+        """first() para un lote de textos, en el orden de la entrada"""
+        return [self._first(scores) for scores in self.scores_many(texts)]
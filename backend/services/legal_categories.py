@@ -3,10 +3,12 @@ Categorías legales para LEIA.
 Define las áreas de práctica, subcategorías y criterios de derivación.
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+from services.keyword_classifier import KeywordClassifier
+
 
 class LegalCategory(str, Enum):
     """Categorías principales de práctica legal."""
@@ -463,22 +465,42 @@ def get_all_categories() -> List[Dict]:
     ]
 
 
+# Palabras clave de todas las categorías compiladas una vez (sin tildes ni mayúsculas)
+CATEGORY_CLASSIFIER = KeywordClassifier({
+    cat_id: cat_info.keywords for cat_id, cat_info in LEGAL_CATEGORIES.items()
+})
+
+
+def score_categories(text: str) -> Dict[str, int]:
+    """
+    Cuenta las palabras clave de cada categoría presentes en el texto.
+    Retorna solo las categorías con al menos una coincidencia.
+    """
+    return CATEGORY_CLASSIFIER.scores(text)
+
+
+def rank_categories(text: str, top_k: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    Categorías del texto con su puntaje, de la más probable a la menos
+    (empates en el orden de LEGAL_CATEGORIES).
+    """
+    return CATEGORY_CLASSIFIER.classify(text, top_k)
+
+
 def get_category_by_keyword(text: str) -> Optional[str]:
     """
     Detecta la categoría más probable basándose en palabras clave.
     Retorna el ID de la categoría o None.
     """
-    text_lower = text.lower()
-    best_match = None
-    best_score = 0
+    return CATEGORY_CLASSIFIER.best(text)
 
-    for cat_id, cat_info in LEGAL_CATEGORIES.items():
-        score = sum(1 for kw in cat_info.keywords if kw in text_lower)
-        if score > best_score:
-            best_score = score
-            best_match = cat_id
 
-    return best_match if best_score > 0 else None
+def classify_texts(texts: List[str], top_k: Optional[int] = None) -> List[List[Tuple[str, int]]]:
+    """
+    Clasifica un lote de textos (backfill de conversaciones, re-etiquetado).
+    Retorna un ranking de categorías por texto, en el orden de la entrada.
+    """
+    return CATEGORY_CLASSIFIER.classify_many(texts, top_k)
 
 
 def should_refer_to_lawyer(category_id: str, context: str) -> bool:
@@ -520,3 +542,16 @@ SPECIALTY_ALIASES = {
     "Derecho Comercial": "societario",
     "Marcas y Patentes": "propiedad_intelectual",
 }
+
+
+# Preguntas sugeridas del chat (/api/quick-questions). También son las
+# consultas con que se precalienta la caché de embeddings y semillas del
+# golden set de benchmarks/bench_retrieval_quality.py
+QUICK_QUESTIONS = [
+    "Me despidieron sin finiquito, ¿qué hago?",
+    "Quiero divorciarme, ¿cuáles son los pasos?",
+    "Tengo deudas que no puedo pagar",
+    "Mi arrendador no me devuelve el depósito",
+    "¿Cómo calcular la indemnización por años de servicio?",
+    "¿Qué es la pensión alimenticia y cómo se calcula?"
+]
@@ -6,6 +6,8 @@ Basado en la documentación oficial de APIs de Estadísticas del PJUD.
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+from services.keyword_classifier import KeywordClassifier
+
 
 # ==================== CORTES DE APELACIONES ====================
 
@@ -207,6 +209,20 @@ TODOS_TRIBUNALES: Dict[int, str] = {
 }
 
 
+# Palabras que identifican cada competencia, en orden de prioridad
+COMPETENCIA_KEYWORDS: Dict[str, List[str]] = {
+    "Civil": ["civil", "c-"],
+    "Cobranza": ["cobranza", "cobro"],
+    "Familia": ["familia", "f-", "alimentos", "visitas", "cuidado personal"],
+    "Laboral": ["laboral", "trabajo", "t-", "despido"],
+    "Garantia": ["garantía", "g-", "rpa", "rit"],
+    "Top": ["oral penal", "top", "o-"],
+    "Penal": ["penal"],
+}
+
+COMPETENCIA_CLASSIFIER = KeywordClassifier(COMPETENCIA_KEYWORDS)
+
+
 # ==================== FUNCIONES AUXILIARES ====================
 
 def get_corte_nombre(codigo: int) -> str:
@@ -228,25 +244,14 @@ def get_corte_codigo(nombre: str) -> Optional[int]:
 def detectar_competencia(texto: str) -> Optional[str]:
     """
     Detecta la competencia basándose en texto (RIT, nombre de tribunal, etc.).
+    Si calzan varias, gana la primera de COMPETENCIA_KEYWORDS.
     """
-    texto_lower = texto.lower()
-
-    if any(x in texto_lower for x in ["civil", "c-"]):
-        return "Civil"
-    elif any(x in texto_lower for x in ["cobranza", "cobro"]):
-        return "Cobranza"
-    elif any(x in texto_lower for x in ["familia", "f-", "alimentos", "visitas", "cuidado personal"]):
-        return "Familia"
-    elif any(x in texto_lower for x in ["laboral", "trabajo", "t-", "despido"]):
-        return "Laboral"
-    elif any(x in texto_lower for x in ["garantía", "garantia", "g-", "rpa", "rit"]):
-        return "Garantia"
-    elif any(x in texto_lower for x in ["oral penal", "top", "o-"]):
-        return "Top"
-    elif any(x in texto_lower for x in ["penal"]):
-        return "Penal"
-
-    return None
+    return COMPETENCIA_CLASSIFIER.first(texto)
+
+
+def detectar_competencias(textos: List[str]) -> List[Optional[str]]:
+    """Detecta la competencia de un lote de textos (re-etiquetado de causas)."""
+    return COMPETENCIA_CLASSIFIER.first_many(textos)
 
 
 def extraer_info_rit(rit: str) -> Dict[str, Optional[str]]:
@@ -0,0 +1,367 @@
+"""
+Retrieval Service - Servicio de recuperación compartido por todo el proceso
+
+Una sola instancia de RAGEngine (vector store + caché de embeddings) creada
+al iniciar la app y usada por todos los puntos que consultan RAG:
+main.py, main_simple.py, routers/chat_v2.py y agents/tools/rag_tools.py.
+
+- start(): crea el engine una vez y precalienta conexiones y caché
+- retrieve() / aretrieve(): búsqueda (síncrona o async) con formato de
+  resultado normalizado
+- health(): estado del backend, latencia por etapa y estadísticas de caché
+- record_avoided(): recuperaciones que el triage por reglas hizo innecesarias
+- reload(): reconstruye el engine (ej: índice nuevo) sin cortar el servicio
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from rag.rag_engine import RAGEngine, create_rag_engine
+    RAG_AVAILABLE = True
+except ImportError:
+    RAGEngine = None
+    create_rag_engine = None
+    RAG_AVAILABLE = False
+
+from rag.async_engine import AsyncRAGEngine
+from services.legal_categories import QUICK_QUESTIONS
+
+
+# Campos que todo resultado expone al nivel superior
+RESULT_FIELDS = ("text", "source", "law_name", "category", "url", "article_number")
+
+
+def normalize_result(doc: Dict) -> Dict:
+    """
+    Lleva un resultado al formato común del servicio:
+    campos planos (id, score, text, source, law_name, category, url,
+    article_number) + "metadata" con source/section/page/etc.
+    """
+    metadata = dict(doc.get("metadata") or {})
+    normalized = {
+        "id": doc.get("id", ""),
+        "score": float(doc.get("score", 0) or 0),
+    }
+
+    for field in RESULT_FIELDS:
+        default = None if field == "article_number" else ""
+        value = doc.get(field)
+        if value in (None, ""):
+            value = metadata.get(field, default)
+        normalized[field] = value
+
+        if field != "text" and value not in (None, ""):
+            metadata.setdefault(field, value)
+
+    metadata.pop("text", None)
+    normalized["metadata"] = metadata
+    return normalized
+
+
+class RetrievalService:
+    """Ciclo de vida del RAGEngine compartido por el proceso"""
+
+    def __init__(self, engine_factory: Optional[Callable[[], Optional["RAGEngine"]]] = None):
+        """
+        Args:
+            engine_factory: Función que crea el engine (por defecto create_rag_engine)
+        """
+        self._engine_factory = engine_factory or create_rag_engine
+        self._engine: Optional["RAGEngine"] = None
+        self._async_engine: Optional[AsyncRAGEngine] = None
+        self._lock = threading.Lock()
+        self._started = False
+
+        self.loaded_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+        # Contadores
+        self.retrievals = 0
+        self.errors = 0
+        self.reloads = 0
+        self.avoided = 0
+        self.cancelled = 0
+        self._retrieval_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def _build_engine(self) -> Optional["RAGEngine"]:
+        """Crea un engine nuevo; None si RAG no está configurado o falla"""
+        if self._engine_factory is None:
+            self.last_error = "Módulo RAG no disponible"
+            return None
+
+        try:
+            engine = self._engine_factory()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️  Error creando RAG Engine: {e}")
+            return None
+
+        if engine is None:
+            self.last_error = "RAG no configurado"
+        else:
+            self.loaded_at = time.time()
+            self.last_error = None
+        return engine
+
+    def start(self, warmup: bool = False) -> bool:
+        """
+        Crea el engine (una sola vez por proceso)
+
+        Args:
+            warmup: Precalentar conexión del vector store y caché de embeddings
+
+        Returns:
+            True si RAG quedó habilitado
+        """
+        with self._lock:
+            if not self._started:
+                self._engine = self._build_engine()
+                self._started = True
+
+        if warmup and self._engine is not None:
+            self.warmup()
+
+        return self._engine is not None
+
+    def reload(self) -> Dict:
+        """
+        Reconstruye el engine (ej: tras reconstruir el índice local).
+
+        El engine anterior sigue atendiendo hasta que el nuevo está listo;
+        si la recarga falla se conserva el anterior.
+        """
+        new_engine = self._build_engine()
+        if new_engine is None:
+            return {"reloaded": False, "error": self.last_error}
+
+        with self._lock:
+            old_engine = self._engine
+            # Conservar la caché de embeddings caliente entre recargas
+            if old_engine is not None and old_engine.embedding_cache is not None:
+                if new_engine.embedding_cache is not None:
+                    new_engine.embedding_cache.close()
+                new_engine.embedding_cache = old_engine.embedding_cache
+            self._engine = new_engine
+            self._started = True
+            self.reloads += 1
+
+        print("🔄 RAG Engine recargado")
+        return {"reloaded": True, **self.health()}
+
+    def warmup(self, queries: Optional[List[str]] = None) -> int:
+        """
+        Abre la conexión al vector store y carga en caché los embeddings
+        de las consultas más frecuentes.
+
+        Returns:
+            Número de consultas precalentadas
+        """
+        engine = self._engine
+        if engine is None:
+            return 0
+
+        warmed = 0
+        try:
+            if engine.vector_store is not None:
+                engine.vector_store.get_stats()
+            for query in queries if queries is not None else QUICK_QUESTIONS:
+                if engine.generate_query_embedding(query) is not None:
+                    warmed += 1
+        except Exception as e:
+            print(f"⚠️  Error en warmup de RAG: {e}")
+
+        if warmed:
+            print(f"🔥 RAG precalentado ({warmed} consultas)")
+        return warmed
+
+    def close(self):
+        """Libera recursos (caché de embeddings en disco)"""
+        with self._lock:
+            engine, self._engine = self._engine, None
+            self._async_engine = None
+            self._started = False
+
+        if engine is not None and engine.embedding_cache is not None:
+            engine.embedding_cache.close()
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @property
+    def engine(self) -> Optional["RAGEngine"]:
+        """Engine activo (se crea bajo demanda si la app no llamó start())"""
+        if not self._started:
+            self.start()
+        return self._engine
+
+    @property
+    def async_engine(self) -> Optional[AsyncRAGEngine]:
+        """Vista async del engine activo (se rehace tras un reload)"""
+        engine = self.engine
+        if engine is None:
+            return None
+        if self._async_engine is None or self._async_engine.engine is not engine:
+            self._async_engine = AsyncRAGEngine(engine)
+        return self._async_engine
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine is not None
+
+    def _record(self, elapsed: float, error: Optional[Exception] = None):
+        self.retrievals += 1
+        self._retrieval_seconds += elapsed
+        if error is not None:
+            self.errors += 1
+            self.last_error = str(error)
+            print(f"⚠️  Error en RAG: {error}")
+
+    def record_avoided(self, cancelled: bool = False):
+        """
+        Registra una recuperación evitada (el triage decidió sin RAG)
+
+        Args:
+            cancelled: La recuperación había partido en modo especulativo y se canceló
+        """
+        self.avoided += 1
+        if cancelled:
+            self.cancelled += 1
+
+    def retrieve(
+        self,
+        query: str,
+        filter: Optional[Dict] = None,
+        top_k: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Busca documentos relevantes
+
+        Args:
+            query: Consulta del usuario
+            filter: Filtro de metadata (ej: {"category": "laboral"})
+            top_k: Número de documentos (por defecto el del engine)
+
+        Returns:
+            Lista de resultados normalizados (ver normalize_result)
+        """
+        engine = self.engine
+        if engine is None:
+            return []
+
+        start = time.perf_counter()
+        try:
+            docs = engine.retrieve_context(query, filter=filter, top_k=top_k)
+        except Exception as e:
+            self._record(time.perf_counter() - start, e)
+            return []
+
+        self._record(time.perf_counter() - start)
+        return [normalize_result(doc) for doc in docs or []]
+
+    async def aretrieve(
+        self,
+        query: str,
+        filter: Optional[Dict] = None,
+        top_k: Optional[int] = None
+    ) -> List[Dict]:
+        """Versión async de retrieve() para endpoints async (no bloquea el loop)"""
+        async_engine = self.async_engine
+        if async_engine is None:
+            return []
+
+        start = time.perf_counter()
+        try:
+            docs = await async_engine.retrieve_context(query, filter=filter, top_k=top_k)
+        except Exception as e:
+            self._record(time.perf_counter() - start, e)
+            return []
+
+        self._record(time.perf_counter() - start)
+        return [normalize_result(doc) for doc in docs or []]
+
+    def build_context_prompt(self, docs: List[Dict]) -> str:
+        """Contexto para el system prompt de Claude"""
+        engine = self.engine
+        if engine is None or not docs:
+            return ""
+        return engine.build_context_prompt(docs)
+
+    def health(self) -> Dict:
+        """Estado del servicio para /api/rag/health"""
+        engine = self._engine
+        avg_ms = (self._retrieval_seconds / self.retrievals * 1000) if self.retrievals else 0.0
+
+        info = {
+            "status": "disabled",
+            "backend": None,
+            "total_vectors": None,
+            "loaded_at": self.loaded_at,
+            "retrievals": self.retrievals,
+            "errors": self.errors,
+            "reloads": self.reloads,
+            "avoided_retrievals": self.avoided,
+            "cancelled_retrievals": self.cancelled,
+            "avg_retrieval_ms": round(avg_ms, 1),
+            "last_error": self.last_error,
+            "embedding_cache": None,
+            "retrieval": None
+        }
+
+        if engine is None:
+            return info
+
+        info["status"] = "ok"
+        info["embedding_cache"] = engine.get_cache_stats()
+        info["retrieval"] = engine.get_retrieval_stats()
+
+        if engine.vector_store is not None:
+            info["backend"] = engine.vector_store.backend_name
+            stats = engine.vector_store.get_stats()
+            if stats:
+                info["total_vectors"] = stats.get("total_vectors")
+            else:
+                info["status"] = "degraded"
+
+        return info
+
+
+# Singleton para uso global
+_retrieval_service: Optional[RetrievalService] = None
+
+def get_retrieval_service() -> RetrievalService:
+    """Obtiene el servicio de recuperación del proceso"""
+    global _retrieval_service
+    if _retrieval_service is None:
+        _retrieval_service = RetrievalService()
+    return _retrieval_service
+
+
+def init_retrieval_service() -> RetrievalService:
+    """
+    Inicializa el servicio al arrancar la app (evento startup).
+    RAG_WARMUP=false desactiva el precalentamiento.
+    """
+    service = get_retrieval_service()
+    warmup = os.getenv("RAG_WARMUP", "true").lower() != "false"
+
+    if service.start(warmup=warmup):
+        print("✅ Retrieval service listo")
+    else:
+        print("ℹ️  Retrieval service sin RAG (solo Claude)")
+    return service
+
+
+def shutdown_retrieval_service():
+    """Cierra el servicio al apagar la app (evento shutdown)"""
+    global _retrieval_service
+    if _retrieval_service is not None:
+        _retrieval_service.close()
+        _retrieval_service = None
@@ -10,7 +10,8 @@ Este módulo implementa las reglas para:
 from dataclasses import dataclass
 from enum import Enum
 from typing import List, Optional, Dict, Any
-import re
+
+from services.triage_matcher import TriageMatcher
 
 
 class TriageDecision(Enum):
@@ -162,6 +163,103 @@ class TriageEngine:
         r"estafa(ron|do)?", r"me engaña(ron)?", r"fraude"
     ]
 
+    # Especialidades y sus palabras clave (en orden de prioridad)
+    SPECIALTY_KEYWORDS = {
+        "Laboral": [
+            "trabajo", "laboral", "despid", "finiquito", "sueldo",
+            "contrato de trabajo", "empleador", "trabajador", "indemniza",
+            "vacaciones", "horas extra", "sindicato", "patron", "jefe",
+            "desvincula", "echaron", "botaron", "renunci", "liquidacion",
+            "afp", "isapre", "prevision", "cotizacion", "tutela",
+            "autodespido", "nulidad del despido", "accidente laboral"
+        ],
+        "Familia": [
+            "divorcio", "pensión", "pension", "alimento", "custodia", "visita",
+            "matrimonio", "separación", "separacion", "hijo", "padre", "madre",
+            "tuición", "tuicion", "cuidado personal", "relación directa",
+            "relacion directa", "familia", "pareja", "conviviente", "manutención",
+            "manutencion", "ex esposa", "ex esposo", "ex marido", "ex mujer",
+            "violencia intrafamiliar", "vif", "adopcion", "adopción"
+        ],
+        "Civil y Contratos": [
+            "contrato", "incumplimiento", "indemnización", "perjuicio",
+            "responsabilidad civil", "promesa", "compraventa"
+        ],
+        "Arriendos": [
+            "arriend", "desahucio", "garantía", "garantia", "departamento",
+            "casa", "inmueble", "propiedad", "copropiedad", "gastos comunes",
+            "administración", "condominio", "corredora"
+        ],
+        "Deudas y Cobranza": [
+            "deuda", "cobro", "pagare", "pagaré", "cheque", "letra",
+            "embargo", "dicom", "prescripción", "prescripcion", "moroso",
+            "cobranza", "ejecutivo", "retención", "retencion"
+        ],
+        "Consumidor": [
+            "sernac", "consumidor", "garantía legal", "reclamo",
+            "producto", "servicio", "devolución", "devolucion",
+            "publicidad engañosa", "tienda", "compra", "vendedor",
+            "retracto", "falabella", "ripley", "paris", "lider",
+            "telecomunicacion", "pasaje", "aerolínea", "aerolinea"
+        ],
+        "Penal": [
+            "delito", "denuncia", "querella", "imputado", "fiscal",
+            "defensor", "penal", "crimen", "robo", "hurto", "estafa",
+            "golpe", "amenaza", "carcel", "cárcel", "preso", "detenido",
+            "citación", "citacion"
+        ],
+        "Migración": [
+            "visa", "extranjería", "extranjeria", "migración", "migracion",
+            "permanencia", "prórroga", "prorroga", "rechazo", "deportación",
+            "deportacion", "residencia", "pdi", "extranjero"
+        ],
+        "Tributario": [
+            "sii", "impuesto", "tributario", "iva", "boleta", "factura",
+            "fiscalización", "fiscalizacion", "liquidación", "liquidacion",
+            "giro", "tta", "renta"
+        ],
+        "Herencias": [
+            "herencia", "testamento", "posesión efectiva", "posesion efectiva",
+            "heredero", "sucesión", "sucesion", "partición", "particion",
+            "fallecido", "bienes"
+        ],
+        "Bancario": [
+            "banco", "crédito", "credito", "préstamo", "prestamo",
+            "hipoteca", "tarjeta", "fraude", "clonación", "clonacion",
+            "transferencia", "cuenta"
+        ],
+        "Seguros": [
+            "seguro", "póliza", "poliza", "siniestro", "cobertura",
+            "aseguradora", "peritaje"
+        ]
+    }
+
+    # Frases con que LEIA ofrece conectar con un abogado (un "sí" después es solicitud directa)
+    LAWYER_OFFER_PHRASES = [
+        "conectarte con un abogado",
+        "abogado de leia",
+        "abogados de leia",
+        "te muestro abogados",
+        "ver abogados",
+        "te conecto con",
+        "derivación",
+        "especialista en"
+    ]
+
+    # Frases con que LEIA menciona cada especialidad (para respuestas cortas como "sí")
+    SPECIALTY_MENTIONS = {
+        "Penal": ["derecho penal", "penalista", "delito", "lesiones", "querella criminal"],
+        "Laboral": ["derecho laboral", "laboralista", "despido", "finiquito"],
+        "Familia": ["derecho de familia", "familiarista", "pensión alimenticia", "divorcio", "custodia"],
+        "Seguros": ["derecho de seguros", "seguro", "póliza", "siniestro", "aseguradora"],
+        "Civil y Contratos": ["derecho civil", "civilista", "contrato"],
+        "Consumidor": ["derecho del consumidor", "consumidor", "sernac"],
+        "Arriendos": ["arriendos", "arrendamiento", "desahucio"],
+        "Deudas y Cobranza": ["deudas", "cobranza", "embargo"],
+        "Migración": ["migración", "extranjería", "visa"],
+        "Herencias": ["herencias", "sucesión", "testamento"],
+    }
+
     # Respuestas predefinidas para casos sin información
     NO_INFO_RESPONSES = {
         "default": """No tengo información sobre este tema en mis apuntes.
@@ -184,7 +282,17 @@ Para una respuesta más precisa sobre tu caso específico, te recomiendo consult
     }
 
     def __init__(self):
-        pass
+        # Todas las reglas compiladas una vez (ver services/triage_matcher.py)
+        self.matcher = TriageMatcher(
+            urgent_keywords=self.URGENT_KEYWORDS,
+            sensitive_topics=self.SENSITIVE_TOPICS,
+            lawyer_offer_phrases=self.LAWYER_OFFER_PHRASES,
+            direct_lawyer_patterns=self.DIRECT_LAWYER_REQUEST_PATTERNS,
+            advice_patterns=self.ADVICE_REQUEST_PATTERNS,
+            concrete_problem_patterns=self.CONCRETE_LEGAL_PROBLEMS,
+            specialty_keywords=self.SPECIALTY_KEYWORDS,
+            specialty_mentions=self.SPECIALTY_MENTIONS
+        )
 
     def analyze(
         self,
@@ -204,6 +312,25 @@ Para una respuesta más precisa sobre tu caso específico, te recomiendo consult
         Returns:
             TriageResult con la decisión y sugerencias
         """
+        result = self.analyze_rules(user_query, conversation_history)
+        if result is not None:
+            return result
+
+        # 5. Evaluar resultados RAG
+        return self.analyze_rag(user_query, rag_results)
+
+    def analyze_rules(
+        self,
+        user_query: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> Optional[TriageResult]:
+        """
+        Etapas por reglas del triage (0-4), que no leen los resultados RAG.
+
+        Returns:
+            TriageResult si alguna regla decide; None si hay que buscar en
+            RAG y evaluar con analyze_rag
+        """
         query_lower = user_query.lower().strip()
 
         # 0. PRIMERO: Detectar solicitud DIRECTA de abogado (respuesta breve + botón)
@@ -260,7 +387,10 @@ Para una respuesta más precisa sobre tu caso específico, te recomiendo consult
                 suggested_specialties=specialties
             )
 
-        # 5. Evaluar resultados RAG
+        return None
+
+    def analyze_rag(self, user_query: str, rag_results: List[Dict[str, Any]]) -> TriageResult:
+        """Etapa final del triage: decide según los resultados RAG"""
         return self._evaluate_rag_results(user_query, rag_results)
 
     def _is_direct_lawyer_request(self, query: str, conversation_history: Optional[List[Dict[str, str]]] = None) -> bool:
@@ -269,9 +399,8 @@ Para una respuesta más precisa sobre tu caso específico, te recomiendo consult
         Esto incluye respuestas cortas afirmativas cuando ya se ofreció un abogado.
         """
         # Verificar patrones directos
-        for pattern in self.DIRECT_LAWYER_REQUEST_PATTERNS:
-            if re.search(pattern, query, re.IGNORECASE):
-                return True
+        if self.matcher.scan(query).direct_lawyer_request:
+            return True
 
         # Si el mensaje es muy corto y afirmativo, verificar si en el historial
         # LEIA ya ofreció conectar con un abogado
@@ -280,17 +409,7 @@ Para una respuesta más precisa sobre tu caso específico, te recomiendo consult
             # Buscar en los últimos mensajes de LEIA si ofreció abogado
             for msg in reversed(conversation_history[-4:]):  # Últimos 4 mensajes
                 if msg.get("role") == "assistant":
-                    content_lower = msg.get("content", "").lower()
-                    if any(phrase in content_lower for phrase in [
-                        "conectarte con un abogado",
-                        "abogado de leia",
-                        "abogados de leia",
-                        "te muestro abogados",
-                        "ver abogados",
-                        "te conecto con",
-                        "derivación",
-                        "especialista en"
-                    ]):
+                    if self.matcher.scan(msg.get("content", "")).lawyer_offer:
                         return True
 
         return False
@@ -305,27 +424,12 @@ Para una respuesta más precisa sobre tu caso específico, te recomiendo consult
 
         # Si no encontró nada específico y hay historial
         if specialties == ["Civil y Contratos"] and conversation_history:
-            # Buscar primero en la última respuesta de LEIA si mencionó una especialidad
-            specialty_mentions = {
-                "Penal": ["derecho penal", "penalista", "delito", "lesiones", "querella criminal"],
-                "Laboral": ["derecho laboral", "laboralista", "despido", "finiquito"],
-                "Familia": ["derecho de familia", "familiarista", "pensión alimenticia", "divorcio", "custodia"],
-                "Seguros": ["derecho de seguros", "seguro", "póliza", "siniestro", "aseguradora"],
-                "Civil y Contratos": ["derecho civil", "civilista", "contrato"],
-                "Consumidor": ["derecho del consumidor", "consumidor", "sernac"],
-                "Arriendos": ["arriendos", "arrendamiento", "desahucio"],
-                "Deudas y Cobranza": ["deudas", "cobranza", "embargo"],
-                "Migración": ["migración", "extranjería", "visa"],
-                "Herencias": ["herencias", "sucesión", "testamento"],
-            }
-
-            # Revisar las últimas respuestas de LEIA
+            # Buscar primero en las últimas respuestas de LEIA si mencionó una especialidad
             for msg in reversed(conversation_history[-4:]):
                 if msg.get("role") == "assistant":
-                    content_lower = msg.get("content", "").lower()
-                    for specialty, keywords in specialty_mentions.items():
-                        if any(kw in content_lower for kw in keywords):
-                            return [specialty]
+                    mentions = self.matcher.scan(msg.get("content", "")).specialty_mentions
+                    if mentions:
+                        return [mentions[0]]
 
             # Si no encontró en LEIA, buscar en mensajes del usuario
             all_user_text = " ".join([
@@ -339,25 +443,19 @@ Para una respuesta más precisa sobre tu caso específico, te recomiendo consult
 
     def _is_urgent(self, query: str) -> bool:
         """Detecta si la consulta es urgente"""
-        return any(kw in query for kw in self.URGENT_KEYWORDS)
+        return self.matcher.scan(query).urgent
 
     def _is_sensitive(self, query: str) -> bool:
         """Detecta si el tema es sensible"""
-        return any(topic in query for topic in self.SENSITIVE_TOPICS)
+        return self.matcher.scan(query).sensitive
 
     def _requests_formal_advice(self, query: str) -> bool:
         """Detecta si el usuario pide asesoría formal"""
-        return any(
-            re.search(pattern, query)
-            for pattern in self.ADVICE_REQUEST_PATTERNS
-        )
+        return self.matcher.scan(query).advice_request
 
     def _has_concrete_legal_problem(self, query: str) -> bool:
         """Detecta si hay un problema legal concreto que amerita abogado"""
-        return any(
-            re.search(pattern, query, re.IGNORECASE)
-            for pattern in self.CONCRETE_LEGAL_PROBLEMS
-        )
+        return self.matcher.scan(query).concrete_problem
 
     def _evaluate_rag_results(
         self,
@@ -417,84 +515,8 @@ Para una respuesta más precisa sobre tu caso específico, te recomiendo consult
 
     def _detect_specialties(self, query: str) -> List[str]:
         """Detecta especialidades legales relevantes para la consulta"""
-        specialties = []
-
-        # Mapeo de categorías con palabras clave expandidas
-        specialty_keywords = {
-            "Laboral": [
-                "trabajo", "laboral", "despid", "finiquito", "sueldo",
-                "contrato de trabajo", "empleador", "trabajador", "indemniza",
-                "vacaciones", "horas extra", "sindicato", "patron", "jefe",
-                "desvincula", "echaron", "botaron", "renunci", "liquidacion",
-                "afp", "isapre", "prevision", "cotizacion", "tutela",
-                "autodespido", "nulidad del despido", "accidente laboral"
-            ],
-            "Familia": [
-                "divorcio", "pensión", "pension", "alimento", "custodia", "visita",
-                "matrimonio", "separación", "separacion", "hijo", "padre", "madre",
-                "tuición", "tuicion", "cuidado personal", "relación directa",
-                "relacion directa", "familia", "pareja", "conviviente", "manutención",
-                "manutencion", "ex esposa", "ex esposo", "ex marido", "ex mujer",
-                "violencia intrafamiliar", "vif", "adopcion", "adopción"
-            ],
-            "Civil y Contratos": [
-                "contrato", "incumplimiento", "indemnización", "perjuicio",
-                "responsabilidad civil", "promesa", "compraventa"
-            ],
-            "Arriendos": [
-                "arriend", "desahucio", "garantía", "garantia", "departamento",
-                "casa", "inmueble", "propiedad", "copropiedad", "gastos comunes",
-                "administración", "condominio", "corredora"
-            ],
-            "Deudas y Cobranza": [
-                "deuda", "cobro", "pagare", "pagaré", "cheque", "letra",
-                "embargo", "dicom", "prescripción", "prescripcion", "moroso",
-                "cobranza", "ejecutivo", "retención", "retencion"
-            ],
-            "Consumidor": [
-                "sernac", "consumidor", "garantía legal", "reclamo",
-                "producto", "servicio", "devolución", "devolucion",
-                "publicidad engañosa", "tienda", "compra", "vendedor",
-                "retracto", "falabella", "ripley", "paris", "lider",
-                "telecomunicacion", "pasaje", "aerolínea", "aerolinea"
-            ],
-            "Penal": [
-                "delito", "denuncia", "querella", "imputado", "fiscal",
-                "defensor", "penal", "crimen", "robo", "hurto", "estafa",
-                "golpe", "amenaza", "carcel", "cárcel", "preso", "detenido",
-                "citación", "citacion"
-            ],
-            "Migración": [
-                "visa", "extranjería", "extranjeria", "migración", "migracion",
-                "permanencia", "prórroga", "prorroga", "rechazo", "deportación",
-                "deportacion", "residencia", "pdi", "extranjero"
-            ],
-            "Tributario": [
-                "sii", "impuesto", "tributario", "iva", "boleta", "factura",
-                "fiscalización", "fiscalizacion", "liquidación", "liquidacion",
-                "giro", "tta", "renta"
-            ],
-            "Herencias": [
-                "herencia", "testamento", "posesión efectiva", "posesion efectiva",
-                "heredero", "sucesión", "sucesion", "partición", "particion",
-                "fallecido", "bienes"
-            ],
-            "Bancario": [
-                "banco", "crédito", "credito", "préstamo", "prestamo",
-                "hipoteca", "tarjeta", "fraude", "clonación", "clonacion",
-                "transferencia", "cuenta"
-            ],
-            "Seguros": [
-                "seguro", "póliza", "poliza", "siniestro", "cobertura",
-                "aseguradora", "peritaje"
-            ]
-        }
-
-        for specialty, keywords in specialty_keywords.items():
-            if any(kw in query for kw in keywords):
-                specialties.append(specialty)
-
-        return specialties if specialties else ["Civil y Contratos"]
+        specialties = self.matcher.scan(query).specialties
+        return list(specialties) if specialties else ["Civil y Contratos"]
 
     def _get_urgent_response(self, query: str) -> str:
         """Genera respuesta para casos urgentes"""
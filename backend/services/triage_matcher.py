@@ -0,0 +1,126 @@
+"""
+LEIA - Matcher compilado de las reglas del triage
+
+Las reglas de TriageEngine (palabras de urgencia, temas sensibles, ofertas
+de abogado, patrones de solicitud de abogado, asesoría formal, problemas
+concretos y palabras clave por especialidad) se compilan una vez:
+
+- Palabras clave (substrings): un KeywordClassifier (Aho-Corasick, ver
+  services/keyword_classifier.py) que encuentra todas las ocurrencias en
+  una sola pasada, sin importar cuántas haya
+- Patrones regex: una alternación compilada por conjunto de reglas (los
+  anclados "^...$" se evalúan aparte con un solo fullmatch)
+
+Texto y reglas se comparan sin tildes y en minúsculas ("detencion" activa
+"detención"). scan() devuelve todas las señales de un texto y se memoiza,
+así analyze, las respuestas y el historial no vuelven a recorrerlo.
+
+Medir costo por mensaje: python -m benchmarks.bench_triage
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.text import fold_accents
+from services.keyword_classifier import KeywordClassifier
+
+
+# Textos distintos cuyas señales se recuerdan (consultas repetidas, historial)
+SCAN_CACHE_SIZE = 1024
+
+
+def compile_alternation(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """Un solo regex para un conjunto de patrones, sin tildes (el texto ya viene en minúsculas)"""
+    patterns = [fold_accents(pattern) for pattern in patterns]
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+class RuleSet:
+    """
+    Conjunto de patrones regex evaluado como dos alternaciones: los anclados
+    ("^dale$") con un fullmatch del texto completo y el resto con search.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        patterns = list(patterns)
+        anchored = [p for p in patterns if p.startswith("^") and p.endswith("$")]
+        self._exact = compile_alternation(p[1:-1] for p in anchored)
+        self._search = compile_alternation(p for p in patterns if p not in anchored)
+
+    def matches(self, folded: str) -> bool:
+        """¿Algún patrón aplica al texto (ya normalizado con fold_accents)?"""
+        if self._exact is not None and self._exact.fullmatch(folded):
+            return True
+        return self._search is not None and self._search.search(folded) is not None
+
+
+@dataclass(frozen=True)
+class TriageSignals:
+    """Todo lo que las reglas del triage detectan en un texto"""
+    direct_lawyer_request: bool
+    urgent: bool
+    sensitive: bool
+    lawyer_offer: bool
+    advice_request: bool
+    concrete_problem: bool
+    specialties: Tuple[str, ...]
+    specialty_mentions: Tuple[str, ...]
+
+
+class TriageMatcher:
+    """Reglas del triage compiladas; scan() las evalúa todas sobre un texto"""
+
+    def __init__(
+        self,
+        urgent_keywords: Iterable[str],
+        sensitive_topics: Iterable[str],
+        lawyer_offer_phrases: Iterable[str],
+        direct_lawyer_patterns: Iterable[str],
+        advice_patterns: Iterable[str],
+        concrete_problem_patterns: Iterable[str],
+        specialty_keywords: Dict[str, List[str]],
+        specialty_mentions: Dict[str, List[str]],
+        cache_size: int = SCAN_CACHE_SIZE
+    ):
+        """
+        Args:
+            urgent_keywords / sensitive_topics / lawyer_offer_phrases: Palabras
+                buscadas como substring
+            direct_lawyer_patterns / advice_patterns / concrete_problem_patterns: Regex
+            specialty_keywords: Especialidad -> palabras clave (en orden de prioridad)
+            specialty_mentions: Especialidad -> frases con que LEIA la menciona
+            cache_size: Textos cuyas señales se memoizan
+        """
+        self._keywords = KeywordClassifier({
+            "urgent": urgent_keywords,
+            "sensitive": sensitive_topics,
+            "lawyer_offer": lawyer_offer_phrases,
+            **{f"specialty:{specialty}": words for specialty, words in specialty_keywords.items()},
+            **{f"mention:{specialty}": words for specialty, words in specialty_mentions.items()},
+        })
+        self._specialty_order = list(specialty_keywords)
+        self._mention_order = list(specialty_mentions)
+
+        self._direct = RuleSet(direct_lawyer_patterns)
+        self._advice = RuleSet(advice_patterns)
+        self._concrete = RuleSet(concrete_problem_patterns)
+
+        self.scan = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _scan(self, text: str) -> TriageSignals:
+        folded = fold_accents(text.strip())
+        labels = self._keywords.score_folded(folded)
+        return TriageSignals(
+            direct_lawyer_request=self._direct.matches(folded),
+            urgent="urgent" in labels,
+            sensitive="sensitive" in labels,
+            lawyer_offer="lawyer_offer" in labels,
+            advice_request=self._advice.matches(folded),
+            concrete_problem=self._concrete.matches(folded),
+            specialties=tuple(s for s in self._specialty_order if f"specialty:{s}" in labels),
+            specialty_mentions=tuple(s for s in self._mention_order if f"mention:{s}" in labels)
+        )
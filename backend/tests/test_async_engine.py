@@ -0,0 +1,146 @@
+"""
+Tests para la ruta async de RAG (rag/async_engine.py).
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.async_engine import AsyncRAGEngine, close_async_clients, get_async_anthropic_client
+from rag.embedding_cache import QueryEmbeddingCache
+from rag.rag_engine import RAGEngine
+from services.retrieval_service import RetrievalService
+
+
+class FakeVectorStore:
+    """Vector store con resultados fijos."""
+
+    backend_name = "pinecone"
+
+    def __init__(self):
+        self.calls = []
+
+    def get_stats(self):
+        return {"total_vectors": 2}
+
+    def get_query_stats(self):
+        return {}
+
+    def search(self, query_vector, top_k=5, filter=None):
+        self.calls.append((top_k, filter))
+        return [
+            {"id": "a", "score": 0.9, "text": "Artículo 161", "law_name": "Código del Trabajo", "metadata": {}},
+            {"id": "b", "score": 0.2, "text": "irrelevante", "metadata": {}},
+        ]
+
+
+class FakeEmbeddings:
+    """Imita AsyncOpenAI().embeddings."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, model, input):
+        self.calls += 1
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[0.1, 0.2, 0.3])])
+
+
+class FakeMessages:
+    """Imita AsyncAnthropic().messages."""
+
+    def __init__(self):
+        self.kwargs = None
+
+    async def create(self, **kwargs):
+        self.kwargs = kwargs
+        return SimpleNamespace(
+            content=[SimpleNamespace(text="Según el Código del Trabajo...")],
+            usage=SimpleNamespace(input_tokens=10, output_tokens=5),
+        )
+
+
+def make_engine(monkeypatch, cache=None):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return RAGEngine(vector_store=FakeVectorStore(), embedding_cache=cache)
+
+
+class TestAsyncRAGEngine:
+    """Tests del engine async."""
+
+    def test_retrieve_context_filters_by_threshold(self, monkeypatch):
+        """retrieve_context aplica el umbral del engine síncrono."""
+        engine = make_engine(monkeypatch)
+        async_engine = AsyncRAGEngine(engine, openai_client=SimpleNamespace(embeddings=FakeEmbeddings()))
+
+        docs = asyncio.run(async_engine.retrieve_context("despido", filter={"category": "laboral"}, top_k=2))
+
+        assert [d["id"] for d in docs] == ["a"]
+        assert engine.vector_store.calls == [(2, {"category": "laboral"})]
+
+    def test_embedding_cache_shared(self, monkeypatch):
+        """La ruta async usa la misma caché de embeddings."""
+        embeddings = FakeEmbeddings()
+        engine = make_engine(monkeypatch, cache=QueryEmbeddingCache())
+        async_engine = AsyncRAGEngine(engine, openai_client=SimpleNamespace(embeddings=embeddings))
+
+        asyncio.run(async_engine.retrieve_context("¿Qué es el finiquito?"))
+        asyncio.run(async_engine.retrieve_context("que es el finiquito"))
+
+        assert embeddings.calls == 1
+        assert engine.get_cache_stats()["memory_hits"] == 1
+
+    def test_generate_response(self, monkeypatch):
+        """generate_response arma el prompt con contexto y devuelve fuentes."""
+        engine = make_engine(monkeypatch)
+        async_engine = AsyncRAGEngine(engine, openai_client=SimpleNamespace(embeddings=FakeEmbeddings()))
+        messages = FakeMessages()
+
+        result = asyncio.run(async_engine.generate_response(
+            "me despidieron",
+            [{"role": "user", "content": "hola"}, {"role": "assistant", "content": "hola!"}],
+            SimpleNamespace(messages=messages),
+            "Eres LEIA",
+        ))
+
+        assert result["tokens_used"] == 15
+        assert result["sources_used"] == 1
+        assert "CONTEXTO LEGAL RELEVANTE" in messages.kwargs["system"]
+        assert messages.kwargs["messages"][-1] == {"role": "user", "content": "me despidieron"}
+
+
+class TestRetrievalServiceAsync:
+    """Tests de aretrieve en el servicio compartido."""
+
+    def test_aretrieve_normalizes(self, monkeypatch):
+        """aretrieve devuelve el formato normalizado del servicio."""
+        engine = make_engine(monkeypatch)
+        service = RetrievalService(engine_factory=lambda: engine)
+        service.async_engine._openai_client = SimpleNamespace(embeddings=FakeEmbeddings())
+
+        docs = asyncio.run(service.aretrieve("despido"))
+
+        assert docs[0]["metadata"]["law_name"] == "Código del Trabajo"
+        assert service.health()["retrievals"] == 1
+
+
+class TestAsyncClients:
+    """Tests del ciclo de vida de los clientes compartidos"""
+
+    def test_new_client_after_shutdown(self, monkeypatch):
+        """Tras close_async_clients se crea un cliente nuevo (no se reusa uno cerrado)"""
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+
+        async def lifecycle():
+            first = get_async_anthropic_client()
+            await close_async_clients()
+            second = get_async_anthropic_client()
+            await close_async_clients()
+            return first, second
+
+        first, second = asyncio.run(lifecycle())
+
+        assert first is not second
+        assert first.is_closed() and second.is_closed()
@@ -0,0 +1,107 @@
+"""
+Tests para el motor async de embeddings (data_processing/batch_embedder.py),
+contra el servidor falso de benchmarks/fake_embeddings_server.py.
+"""
+
+import asyncio
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.fake_embeddings_server import create_app
+from data_processing.batch_embedder import BatchEmbeddingEngine, pack_batches, parse_reset_duration
+from data_processing.embedder import Embedder
+from data_processing.embedding_store import ContentEmbeddingStore, content_hash
+
+DIMENSION = 8
+
+
+def make_engine(app, **kwargs):
+    return BatchEmbeddingEngine(
+        api_key="test",
+        base_url="http://fake/v1",
+        transport=httpx.ASGITransport(app=app),
+        **kwargs
+    )
+
+
+class TestBatching:
+    """Tests de empaquetado y headers."""
+
+    def test_pack_batches_by_tokens(self):
+        """Los batches respetan el presupuesto de tokens, no una cantidad fija."""
+        items = [(f"k{i}", "x" * 400) for i in range(10)]  # ~100 tokens cada uno
+
+        batches = pack_batches(items, max_batch_tokens=300)
+
+        assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+
+    def test_parse_reset_duration(self):
+        """Formatos de x-ratelimit-reset-* de OpenAI."""
+        assert parse_reset_duration("20ms") == 0.02
+        assert parse_reset_duration("6m0s") == 360.0
+        assert parse_reset_duration("1.5") == 1.5
+
+
+class TestBatchEmbeddingEngine:
+    """Tests del motor contra el servidor falso."""
+
+    def test_rate_limited_run_completes(self):
+        """Con 429 del servidor, todos los textos terminan embebidos."""
+        app = create_app(dimensions=DIMENSION, latency_ms=5, requests_per_window=3, window_seconds=0.2)
+        engine = make_engine(app, max_concurrency=6, max_batch_tokens=50)
+        items = [(f"k{i}", f"texto legal número {i} " * 5) for i in range(40)]
+
+        result = asyncio.run(engine.embed(items))
+
+        assert len(result["vectors"]) == 40
+        assert result["failed"] == {}
+        assert result["stats"]["throttled"] > 0
+
+    def test_invalid_item_does_not_drop_batch(self):
+        """Un input inválido falla solo; el resto del batch se embebe."""
+        app = create_app(dimensions=DIMENSION, latency_ms=1)
+        engine = make_engine(app)
+        items = [("a", "uno"), ("b", "INVALID"), ("c", "tres")]
+
+        result = asyncio.run(engine.embed(items))
+
+        assert set(result["vectors"]) == {"a", "c"}
+        assert list(result["failed"]) == ["b"]
+
+
+class TestEmbedderResume:
+    """Tests de reanudación vía el embedding store."""
+
+    def test_resume_sends_only_remaining(self, tmp_path):
+        """Tras una corrida interrumpida, solo se envían los textos faltantes."""
+        texts = [f"artículo {i}" for i in range(6)]
+        chunks_file = tmp_path / "ley_chunks.json"
+        with open(chunks_file, 'w', encoding='utf-8') as f:
+            json.dump([{"chunk_id": f"c{i}", "text": t, "metadata": {}} for i, t in enumerate(texts)], f)
+
+        store = ContentEmbeddingStore(tmp_path / "store.sqlite3")
+        app = create_app(dimensions=DIMENSION, latency_ms=1)
+        model = "text-embedding-3-small"
+
+        # Corrida interrumpida: solo alcanzaron a guardarse 4 textos
+        partial = make_engine(app, model=model)
+        keys = [(content_hash(t, model, DIMENSION), t) for t in texts[:4]]
+        asyncio.run(partial.embed(keys, on_batch=lambda pairs: store.put_many(pairs, model, DIMENSION)))
+        sent_before = app.state.stats["texts"]
+
+        embedder = Embedder(
+            api_key="test",
+            embedding_store=store,
+            base_url="http://fake/v1",
+            transport=httpx.ASGITransport(app=app)
+        )
+        embedder.embedding_dim = DIMENSION
+        summary = embedder.process_chunks_file(chunks_file, tmp_path / "ley_chunks_embedded.json")
+
+        assert app.state.stats["texts"] - sent_before == 2
+        assert summary["successful_embeddings"] == 6
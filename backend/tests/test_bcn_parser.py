@@ -0,0 +1,82 @@
+"""
+Tests para el parser de leyes BCN (data_collection/bcn_parser.py) y su uso
+en BCNScraper contra el sitio legal falso.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.fake_legal_site import create_app
+from data_collection.bcn_parser import article_number, iter_articles, parse_law
+from data_collection.bcn_scraper import BCNScraper
+from data_collection.crawler import AsyncCrawler
+
+
+PAGE = """<html><head><title>Norma</title><script>var menu = "Artículo 99";</script></head><body>
+<div class="menu">Inicio · Buscar · Ayuda · Contacto</div>
+<div class="art"><span>Artículo 161 bis.-</span> El empleador podrá poner <a href="#">término</a> al contrato.
+<p>1.- Necesidades de la empresa.</p><p>2.- Desahucio escrito del empleador.</p></div>
+<div class="art"><div class="art-texto">Artículo 2°.- Toda persona tiene derecho a la libre elección.</div></div>
+<p class="articulo">Artículo primero transitorio.- Esta ley entra en vigencia desde su publicación.</p>
+</body></html>"""
+
+
+class TestBCNParser:
+    """Tests de extracción de artículos."""
+
+    def test_real_article_numbers(self):
+        """El número sale del encabezado "Artículo N", no de la posición."""
+        numbers = [article["article_number"] for article in iter_articles(PAGE)]
+
+        assert numbers == ["161 bis", "2", "primero transitorio"]
+        assert article_number("Art. 5o ter del código") == "5 ter"
+        assert article_number("Artículos transitorios") is None
+
+    def test_compact_output_keeps_incisos(self):
+        """Sin keep_html no hay HTML en la salida, y los incisos quedan en líneas propias."""
+        law = parse_law(PAGE, {"id": "207436", "name": "Código del Trabajo"})
+        first = law["articles"][0]
+
+        assert law["total_articles"] == 3
+        assert "html" not in first
+        assert first["content"].split("\n")[1:] == ["1.- Necesidades de la empresa.", "2.- Desahucio escrito del empleador."]
+        assert "término al contrato" in first["content"]
+
+    def test_keep_html(self):
+        """Con keep_html cada artículo conserva su HTML original."""
+        articles = list(iter_articles(PAGE, keep_html=True))
+
+        assert articles[0]["html"].startswith('<div class="art">')
+
+    def test_full_text_fallback(self):
+        """Sin contenedores por artículo se divide el texto de div#textolei."""
+        html = (
+            "<html><body><div id='textolei'><p>Artículo 1.- La ley es una declaración de la voluntad soberana.</p>"
+            "<p>Se entiende también el inciso segundo.</p><p>Artículo 2.- La costumbre no constituye derecho.</p></div></body></html>"
+        )
+
+        articles = list(iter_articles(html))
+
+        assert [article["article_number"] for article in articles] == ["1", "2"]
+        assert articles[0]["content"].endswith("inciso segundo.")
+
+
+class TestBCNScraper:
+    """Tests del scraper completo contra el sitio falso."""
+
+    def test_scrape_all_priority_laws(self, tmp_path):
+        """Cada ley prioritaria se descarga de su URL y se guarda con números reales."""
+        app = create_app()
+        crawler = AsyncCrawler(cache_dir=tmp_path / "http", min_delay=0.0, transport=httpx.ASGITransport(app=app))
+        scraper = BCNScraper(output_dir=str(tmp_path / "bcn"), crawler=crawler)
+
+        results = scraper.scrape_all_priority_laws()
+
+        assert len(results) == len(BCNScraper.PRIORITY_LAWS)
+        assert all(law["articles"][0]["article_number"] == "1" for law in results)
+        assert "alimentos" in results[-1]["articles"][0]["content"]
+        assert scraper.get_summary()["total_laws"] == len(BCNScraper.PRIORITY_LAWS)
@@ -0,0 +1,150 @@
+"""
+Tests para la carga masiva de vectores (rag/bulk_upsert.py) y la
+verificación de ids de VectorStore.
+"""
+
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.bulk_upsert import BulkUpserter, pack_by_bytes, read_dead_letters, record_payload_bytes
+from rag.vector_store import VectorStore
+
+DIMENSION = 4
+
+
+class ApiError(Exception):
+    """Error con status HTTP, como los del cliente de Pinecone."""
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FlakyBackend:
+    """Backend remoto falso: falla los primeros intentos y rechaza ids 'malo'."""
+
+    name = "fake"
+    rebuilds_on_write = False
+    sync_target = "fake:test"
+
+    def __init__(self, transient_failures=0):
+        self.transient_failures = transient_failures
+        self.reject_prefix = "malo"
+        self.vectors = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors):
+        with self._lock:
+            self.calls += 1
+            if self.transient_failures:
+                self.transient_failures -= 1
+                raise ApiError(503)
+        if self.reject_prefix and any(vector_id.startswith(self.reject_prefix) for vector_id, _, _ in vectors):
+            raise ApiError(400)
+        with self._lock:
+            self.vectors.update({vector_id: metadata for vector_id, _, metadata in vectors})
+        return len(vectors)
+
+    def existing_ids(self, ids):
+        return set(ids) & set(self.vectors)
+
+    def describe(self):
+        return {"total_vectors": len(self.vectors)}
+
+
+def make_records(count, prefix="ley"):
+    return [(f"{prefix}_{i}", [0.1] * DIMENSION, {"category": "laboral", "text": "x" * 50}) for i in range(count)]
+
+
+class TestPackByBytes:
+    """Tests del armado de batches por tamaño de payload."""
+
+    def test_batches_respect_byte_budget(self):
+        """Ningún batch supera el presupuesto de bytes ni el máximo de vectores."""
+        records = make_records(50)
+        budget = record_payload_bytes(records[0]) * 7
+
+        batches = list(pack_by_bytes(records, max_batch_bytes=budget, max_batch_vectors=5))
+
+        assert sum(len(batch) for batch in batches) == 50
+        assert all(len(batch) <= 5 for batch in batches)
+        assert all(sum(record_payload_bytes(r) for r in batch) <= budget for batch in batches)
+
+
+class TestBulkUpserter:
+    """Tests de reintentos, aislamiento de errores y dead-letter."""
+
+    def test_transient_errors_are_retried(self):
+        """Los 503 se reintentan y ningún vector se pierde."""
+        backend = FlakyBackend(transient_failures=3)
+        confirmed = []
+
+        result = BulkUpserter(
+            backend.upsert, max_workers=3, max_batch_vectors=10, backoff_base=0.001, dead_letter_path=None
+        ).run(make_records(45), on_batch=confirmed.extend)
+
+        assert result["upserted"] == 45
+        assert result["retries"] == 3
+        assert len(backend.vectors) == 45
+        assert sorted(confirmed) == sorted(backend.vectors)
+
+    def test_bad_record_isolated_to_dead_letter(self, tmp_path):
+        """Un 400 parte el batch: solo el vector inválido termina en el dead-letter."""
+        backend = FlakyBackend()
+        dead_letter = tmp_path / "dead.jsonl"
+        records = make_records(20)
+        records.insert(7, ("malo_1", [0.5] * DIMENSION, {"category": "laboral"}))
+
+        result = BulkUpserter(
+            backend.upsert, max_workers=2, max_batch_vectors=8, backoff_base=0.001, dead_letter_path=dead_letter
+        ).run(records)
+
+        assert result["upserted"] == 20
+        assert result["failed_ids"] == ["malo_1"]
+        assert [record[0] for record in read_dead_letters(dead_letter)] == ["malo_1"]
+
+
+class TestVerifyAndDeadLetters:
+    """Tests de VectorStore.verify_index y retry_dead_letters."""
+
+    def make_store(self, tmp_path, backend):
+        store = VectorStore(
+            backend="local",
+            dimension=DIMENSION,
+            local_index_dir=str(tmp_path / "index"),
+            upsert_workers=2,
+            dead_letter_path=str(tmp_path / "dead.jsonl")
+        )
+        store.backend = backend
+        return store
+
+    def test_verify_reports_missing_ids(self, tmp_path):
+        """La verificación detecta ids esperados que no llegaron al índice."""
+        backend = FlakyBackend()
+        store = self.make_store(tmp_path, backend)
+        store.upsert_vectors(make_records(10))
+
+        report = store.verify_index([f"ley_{i}" for i in range(12)])
+
+        assert report["missing"] == ["ley_10", "ley_11"]
+        assert (report["index_total"], report["ok"]) == (10, False)
+
+    def test_retry_dead_letters(self, tmp_path):
+        """Los vectores del dead-letter se suben cuando el backend se recupera."""
+        backend = FlakyBackend()
+        store = self.make_store(tmp_path, backend)
+        records = make_records(5) + [("malo_1", [0.5] * DIMENSION, {"category": "laboral"})]
+
+        first = store.upsert_vectors(records)
+        assert first["failed_ids"] == ["malo_1"]
+
+        backend.reject_prefix = None
+        retried = store.retry_dead_letters()
+
+        assert (retried["upserted_count"], retried["failed_count"]) == (1, 0)
+        assert "malo_1" in backend.vectors
+        assert not (tmp_path / "dead.jsonl").exists()
@@ -0,0 +1,259 @@
+"""
+Tests para los endpoints de chat en streaming (SSE).
+"""
+
+import json
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, Conversation
+from routers import chat_v2
+
+
+class FakeStream:
+    """Imita el context manager de AsyncAnthropic().messages.stream()."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    @property
+    def text_stream(self):
+        async def generator():
+            for chunk in self.chunks:
+                yield chunk
+        return generator()
+
+    async def get_final_message(self):
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=20, output_tokens=7))
+
+
+class FakeClaude:
+    """Cliente async de Claude que responde en fragmentos."""
+
+    def __init__(self, chunks):
+        self.messages = SimpleNamespace(stream=lambda **kwargs: FakeStream(chunks))
+
+
+def parse_sse(text):
+    """Convierte el cuerpo SSE en una lista de (evento, data)."""
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def setup_fakes(monkeypatch, chunks=("Hola", ", te ", "ayudo.")):
+    async def no_rag(query):
+        return []
+
+    monkeypatch.setattr(chat_v2, "get_anthropic_client", lambda: FakeClaude(list(chunks)))
+    monkeypatch.setattr(chat_v2, "get_rag_results", no_rag)
+    # Estos tests cubren el streaming de Claude: sin respuestas de plantilla
+    monkeypatch.setattr(chat_v2, "TEMPLATE_DECISIONS", set())
+
+
+class TestChatV2Stream:
+    """Tests de /api/v2/chat/stream."""
+
+    def test_metadata_before_tokens(self, client, monkeypatch):
+        """Triage, fuentes y derivación se emiten antes de los tokens."""
+        setup_fakes(monkeypatch)
+
+        response = client.post("/api/v2/chat/stream", json={"message": "Sí, quiero un abogado"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        names = [name for name, _ in events]
+
+        assert names[:3] == ["triage", "sources", "referral"]
+        assert names[-1] == "done"
+        assert "".join(data["text"] for name, data in events if name == "token") == "Hola, te ayudo."
+        assert events[0][1]["decision"] == "direct_lawyer_request"
+        assert events[2][1]["should_refer"] is True
+        assert events[-1][1]["tokens_used"] == 27
+
+    def test_persists_messages_at_end(self, client, monkeypatch, auth_headers, db_session):
+        """Con usuario autenticado se guardan los mensajes al terminar."""
+        setup_fakes(monkeypatch)
+
+        response = client.post(
+            "/api/v2/chat/stream",
+            json={"message": "¿Qué es el finiquito?"},
+            headers=auth_headers,
+        )
+
+        done = parse_sse(response.text)[-1][1]
+        assert done["conversation_id"] is not None
+
+        rows = db_session.query(ChatMessage).filter(
+            ChatMessage.conversation_id == done["conversation_id"]
+        ).order_by(ChatMessage.id).all()
+        assert [r.role for r in rows] == ["user", "assistant"]
+        assert rows[1].content == "Hola, te ayudo."
+        assert rows[1].tokens_used == 27
+
+    def test_long_history_is_compacted(self, client, monkeypatch):
+        """Un historial largo llega a Claude resumido y el ahorro sale en done."""
+        setup_fakes(monkeypatch)
+        sent = {}
+
+        def stream(**kwargs):
+            sent.update(kwargs)
+            return FakeStream(["Ok"])
+
+        monkeypatch.setattr(chat_v2, "get_anthropic_client", lambda: SimpleNamespace(messages=SimpleNamespace(stream=stream)))
+        history = []
+        for i in range(10):
+            history.append({"role": "user", "content": f"Consulta {i} sobre mi arriendo"})
+            history.append({"role": "assistant", "content": "El arrendador debe devolver la garantía. " * 100})
+
+        response = client.post(
+            "/api/v2/chat/stream",
+            json={"message": "¿Qué es el finiquito?", "conversation_history": history},
+        )
+
+        done = parse_sse(response.text)[-1][1]
+        assert done["history_tokens_saved"] > 0
+        assert len(sent["messages"]) < len(history) + 1
+        assert sent["messages"][0]["role"] == "user"
+        assert "Consulta 0 sobre mi arriendo" in sent["system"]
+
+    def test_unknown_conversation_fails_before_streaming(self, client, monkeypatch, auth_headers):
+        """Una conversación ajena devuelve 404 sin abrir el stream."""
+        setup_fakes(monkeypatch)
+
+        response = client.post(
+            "/api/v2/chat/stream",
+            json={"message": "hola", "conversation_id": 999},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 404
+
+
+class TestChatStream:
+    """Tests de /api/chat/stream."""
+
+    def test_stream_tokens(self, client, monkeypatch):
+        """El endpoint v1 emite fuentes, tokens y done."""
+        import main
+
+        monkeypatch.setattr(main, "get_async_anthropic_client", lambda: FakeClaude(["Respuesta ", "legal"]))
+
+        response = client.post("/api/chat/stream", json={"message": "¿Cómo calculo mi indemnización?"})
+
+        events = parse_sse(response.text)
+        assert events[0] == ("sources", {"rag_enabled": False, "sources": []})
+        assert [data["text"] for name, data in events if name == "token"] == ["Respuesta ", "legal"]
+        assert events[-1] == ("done", {"tokens_used": 27, "history_tokens_saved": 0})
+
+
+class TestCreateCaseFromChat:
+    """Tests de /api/v2/chat/create-case con el cliente async de Claude."""
+
+    def test_creates_case_from_summary(self, client, monkeypatch, auth_headers, db_session, test_user):
+        """El resumen de Claude (async) se convierte en un caso."""
+        summary = {"summary": "Despido sin finiquito", "legal_area": "Laboral", "urgency": "high"}
+
+        async def create(**kwargs):
+            return SimpleNamespace(content=[SimpleNamespace(text=json.dumps(summary))])
+
+        monkeypatch.setattr(
+            chat_v2, "get_anthropic_client",
+            lambda: SimpleNamespace(messages=SimpleNamespace(create=create))
+        )
+        conversation = Conversation(user_id=test_user.id, title="Despido")
+        db_session.add(conversation)
+        db_session.commit()
+        db_session.add(ChatMessage(conversation_id=conversation.id, role="user", content="Me despidieron"))
+        db_session.commit()
+
+        response = client.post(
+            f"/api/v2/chat/create-case?conversation_id={conversation.id}",
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "created"
+        assert response.json()["legal_area"] == "Laboral"
+
+
+class TestMainSimpleChat:
+    """Tests del historial compactado en los endpoints de main_simple."""
+
+    @staticmethod
+    def long_history():
+        history = []
+        for i in range(10):
+            history.append({"role": "user", "content": f"Consulta {i} sobre mi arriendo"})
+            history.append({"role": "assistant", "content": "El arrendador debe devolver la garantía. " * 100})
+        return history
+
+    def test_fallback_compacts_history(self, client, monkeypatch):
+        """Sin RAG, /api/chat envía el historial resumido y devuelve el ahorro."""
+        import main_simple
+        from fastapi.testclient import TestClient
+
+        sent = {}
+
+        async def create(**kwargs):
+            sent.update(kwargs)
+            return SimpleNamespace(
+                content=[SimpleNamespace(text="Ok")],
+                usage=SimpleNamespace(input_tokens=20, output_tokens=7)
+            )
+
+        monkeypatch.setattr(main_simple, "get_async_rag_engine", lambda: None)
+        monkeypatch.setattr(
+            main_simple, "get_async_anthropic_client",
+            lambda: SimpleNamespace(messages=SimpleNamespace(create=create))
+        )
+        history = self.long_history()
+
+        response = TestClient(main_simple.app).post(
+            "/api/chat",
+            json={"message": "¿Qué es el finiquito?", "conversation_history": history},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["history_tokens_saved"] > 0
+        assert len(sent["messages"]) < len(history) + 1
+        assert "Consulta 0 sobre mi arriendo" in sent["system"]
+
+    def test_stream_compacts_history(self, client, monkeypatch):
+        """/api/chat/stream envía el historial resumido y reporta el ahorro en done."""
+        import main_simple
+        from fastapi.testclient import TestClient
+
+        sent = {}
+
+        def stream(**kwargs):
+            sent.update(kwargs)
+            return FakeStream(["Ok"])
+
+        monkeypatch.setattr(
+            main_simple, "get_async_anthropic_client",
+            lambda: SimpleNamespace(messages=SimpleNamespace(stream=stream))
+        )
+        history = self.long_history()
+
+        response = TestClient(main_simple.app).post(
+            "/api/chat/stream",
+            json={"message": "¿Qué es el finiquito?", "conversation_history": history},
+        )
+
+        done = parse_sse(response.text)[-1][1]
+        assert done["history_tokens_saved"] > 0
+        assert len(sent["messages"]) < len(history) + 1
+        assert "Consulta 0 sobre mi arriendo" in sent["system"]
@@ -0,0 +1,148 @@
+"""
+Tests para el chunk store (rag/chunk_store.py): texto completo fuera de la
+metadata del índice e hidratación de resultados en RAGEngine.
+"""
+
+import re
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processing.text_processor import TextProcessor
+from rag.chunk_store import ChunkStore, merge_overlap
+from rag.rag_engine import RAGEngine
+from rag.vector_store import METADATA_TEXT_CHARS, chunk_metadata, format_match
+
+
+def law_chunks():
+    """Una ley con un artículo corto y uno largo (varios chunks con solapamiento)"""
+    long_article = " ".join(
+        f"Oración {i} sobre el término del contrato de trabajo y la indemnización por años de servicio."
+        for i in range(60)
+    )
+    law = {
+        "source": "BCN",
+        "law_name": "Código del Trabajo",
+        "category": "laboral",
+        "articles": [
+            {"article_number": "160", "content": "El contrato termina sin derecho a indemnización por conductas graves."},
+            {"article_number": "161", "content": long_article},
+        ]
+    }
+    return TextProcessor(chunk_size=120, chunk_overlap=30).process_law_data(law, "codigo_trabajo")
+
+
+class FakeVectorStore:
+    """Vector store que devuelve solo ids y scores, como Pinecone sin metadata."""
+
+    backend_name = "pinecone"
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.calls = []
+
+    def search(self, query_vector, top_k=5, filter=None, include_metadata=True):
+        self.calls.append(include_metadata)
+        return [{"id": chunk_id, "score": 0.9, "text": "", "metadata": {}} for chunk_id in self.ids[:top_k]]
+
+    def get_query_stats(self):
+        return {}
+
+
+class TestChunkStore:
+    """Tests de construcción, hidratación y expansión a vecinos."""
+
+    def test_full_text_in_store(self, tmp_path):
+        """El store guarda el chunk completo; la metadata del índice, solo el comienzo."""
+        chunks = law_chunks()
+        ChunkStore.build(chunks, tmp_path / "store.sqlite3")
+        store = ChunkStore(tmp_path / "store.sqlite3")
+
+        stored = store.get_many([chunk["chunk_id"] for chunk in chunks])
+
+        assert chunk_metadata(chunks[1])["text"] == chunks[1]["text"][:METADATA_TEXT_CHARS]
+        assert "text" not in store.get_many([chunks[1]["chunk_id"]])[chunks[1]["chunk_id"]]["metadata"]
+        assert len(store) == len(chunks)
+        assert all(stored[chunk["chunk_id"]]["text"] == chunk["text"] for chunk in chunks)
+
+    def test_hydrate_fills_text_and_fields(self, tmp_path):
+        """Un resultado con solo id y score recibe texto, ley y artículo."""
+        chunks = law_chunks()
+        ChunkStore.build(chunks, tmp_path / "store.sqlite3")
+
+        result = ChunkStore(tmp_path / "store.sqlite3").hydrate([{"id": chunks[2]["chunk_id"], "score": 0.8}])[0]
+
+        assert result["text"] == chunks[2]["text"]
+        assert result["law_name"] == "Código del Trabajo"
+        assert result["article_number"] == "161"
+        assert "expanded_chunks" not in result["metadata"]
+
+    def test_expansion_respects_budget_and_overlap(self, tmp_path):
+        """La expansión suma vecinos contiguos dentro del presupuesto sin repetir el solapamiento."""
+        chunks = law_chunks()
+        ChunkStore.build(chunks, tmp_path / "store.sqlite3")
+        store = ChunkStore(tmp_path / "store.sqlite3")
+        middle = chunks[3]
+
+        result = store.hydrate([{"id": middle["chunk_id"], "score": 0.8}], expand_tokens=3 * middle["tokens"])[0]
+        expanded = result["metadata"]["expanded_chunks"]
+        pieces = [chunk for chunk in chunks if chunk["chunk_id"] in expanded]
+
+        assert middle["chunk_id"] in expanded and 2 <= len(expanded) <= 3
+        assert [chunk["chunk_number"] for chunk in pieces] == list(range(pieces[0]["chunk_number"], pieces[-1]["chunk_number"] + 1))
+        assert len(result["text"]) < sum(len(chunk["text"]) for chunk in pieces)
+        sentences = re.findall(r"Oración \d+ ", result["text"])
+        assert len(sentences) == len(set(sentences))
+
+    def test_merge_overlap(self):
+        """Solo se quita un solapamiento real (oraciones completas repetidas)."""
+        first = "Primera oración del artículo. Segunda oración que se repite."
+        second = "Segunda oración que se repite. Tercera oración."
+
+        assert merge_overlap(first, second) == "Primera oración del artículo. Segunda oración que se repite. Tercera oración."
+        assert merge_overlap("termina en a", "a comienza") == "termina en a\n\na comienza"
+
+
+class TestRAGEngineHydration:
+    """Tests de RAGEngine con chunk store."""
+
+    def test_index_returns_ids_only(self, tmp_path, monkeypatch):
+        """Con chunk store la búsqueda pide solo ids y el contexto trae el texto completo."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        chunks = law_chunks()
+        ChunkStore.build(chunks, tmp_path / "store.sqlite3")
+        vector_store = FakeVectorStore([chunks[1]["chunk_id"]])
+        engine = RAGEngine(vector_store=vector_store, chunk_store=ChunkStore(tmp_path / "store.sqlite3"))
+        engine._embed_query = lambda query: [0.1]
+
+        results = engine.retrieve_context("indemnización por años de servicio")
+
+        assert vector_store.calls == [False]
+        assert results[0]["text"] == chunks[1]["text"]
+        assert "hydrate_ms" in engine.get_retrieval_stats()["stages"]["last"]
+
+    def test_without_store_text_comes_from_metadata(self, monkeypatch):
+        """Sin chunk store, el texto sale de la metadata y los resultados sin texto se descartan."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        chunks = law_chunks()
+        metadata = chunk_metadata(chunks[0])
+        legacy = {key: value for key, value in chunk_metadata(chunks[1]).items() if key != "text"}
+
+        class MetadataVectorStore(FakeVectorStore):
+            def search(self, query_vector, top_k=5, filter=None, include_metadata=True):
+                self.calls.append(include_metadata)
+                return [
+                    format_match(chunks[0]["chunk_id"], 0.9, metadata),
+                    format_match(chunks[1]["chunk_id"], 0.85, legacy),
+                ]
+
+        vector_store = MetadataVectorStore([])
+        engine = RAGEngine(vector_store=vector_store)
+        engine._embed_query = lambda query: [0.1]
+
+        results = engine.retrieve_context("contrato termina por conductas graves")
+
+        assert vector_store.calls == [True]
+        assert [doc["id"] for doc in results] == [chunks[0]["chunk_id"]]
+        assert results[0]["text"] == chunks[0]["text"]
@@ -0,0 +1,83 @@
+"""
+Tests para el chunker por tokens (data_processing/chunker.py) y su uso en
+TextProcessor.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processing.chunker import Chunker, token_histogram
+from data_processing.text_processor import TextProcessor
+
+
+def long_article(sentences):
+    return " ".join(f"Oración número {i} sobre la terminación del contrato de trabajo." for i in range(sentences))
+
+
+class TestChunker:
+    """Tests de presupuesto de tokens, límites estructurales y solapamiento."""
+
+    def test_chunks_respect_budget_and_are_even(self):
+        """Ningún chunk supera el máximo y el último no queda diminuto."""
+        chunker = Chunker(max_tokens=100, overlap_tokens=20)
+
+        chunks = chunker.split(long_article(80))
+        tokens = [count for _, count, _ in chunks]
+
+        assert len(chunks) > 1
+        assert max(tokens) <= 100
+        assert min(tokens) >= 0.5 * max(tokens)
+
+    def test_overlap_repeats_whole_sentences(self):
+        """El chunk siguiente empieza con la(s) última(s) oración(es) del anterior."""
+        chunker = Chunker(max_tokens=100, overlap_tokens=20)
+
+        first, second = [text for text, _, _ in chunker.split(long_article(20))][:2]
+        last_sentence = first.rsplit(". ", 1)[-1]
+
+        assert second.startswith(last_sentence)
+
+    def test_headings_open_new_chunks(self):
+        """Un capítulo nuevo no comparte chunk con el anterior; un título solo se une al contenido."""
+        text = (
+            "TÍTULO I\nDe los contratos\n\nArtículo 1.- El contrato es un acuerdo.\n\n"
+            "CAPÍTULO II\nDe las obligaciones\n\nArtículo 2.- Toda obligación tiene un objeto."
+        )
+
+        chunks = Chunker(max_tokens=200, overlap_tokens=20).split(text)
+
+        assert [heading for _, _, heading in chunks] == ["TÍTULO I", "CAPÍTULO II"]
+        assert "Artículo 1" in chunks[0][0] and "Artículo 2" not in chunks[0][0]
+        assert chunks[1][0].startswith("CAPÍTULO II\nDe las obligaciones")
+
+    def test_histogram_buckets(self):
+        """Cada conteo cae en su rango y los grandes en el último."""
+        histogram = dict(token_histogram([10, 40, 40, 300, 5000]))
+
+        assert (histogram["0-31"], histogram["32-63"], histogram["256-383"], histogram["1024+"]) == (1, 2, 1, 1)
+
+
+class TestTextProcessorChunks:
+    """Tests de los chunks que genera TextProcessor a partir de una ley."""
+
+    def test_article_chunk_ids_are_unique(self):
+        """Los chunks de distintos artículos de una ley no comparten chunk_id."""
+        law = {
+            "source": "BCN",
+            "law_name": "Código del Trabajo",
+            "articles": [
+                {"article_number": 161, "content": "El empleador podrá poner término al contrato."},
+                {"article_number": 162, "content": long_article(60)},
+            ]
+        }
+
+        chunks = TextProcessor(chunk_size=100, chunk_overlap=20).process_law_data(law, "codigo_trabajo")
+        ids = [chunk["chunk_id"] for chunk in chunks]
+
+        assert len(ids) == len(set(ids))
+        assert chunks[0]["metadata"]["article_number"] == 161
+        assert all(chunk["metadata"]["article_number"] == 162 for chunk in chunks[1:])
+        assert all(chunk["total_chunks"] == len(chunks) for chunk in chunks)
+        assert all(chunk["tokens"] <= 100 for chunk in chunks)
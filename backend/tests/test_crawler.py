@@ -0,0 +1,107 @@
+"""
+Tests para el crawler async con GET condicional (data_collection/crawler.py)
+contra el sitio legal falso de benchmarks/fake_legal_site.py.
+"""
+
+import sys
+import os
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.fake_legal_site import amend_law, create_app
+from data_collection.crawler import AsyncCrawler, write_json_if_changed
+
+
+BASE = "http://fake-bcn.test/leychile/navegar?idNorma="
+
+
+def make_crawler(app, tmp_path, **kwargs):
+    options = {"min_delay": 0.0, "backoff_base": 0.01}
+    options.update(kwargs)
+    return AsyncCrawler(cache_dir=tmp_path / "http", transport=httpx.ASGITransport(app=app), **options)
+
+
+class TestConditionalGet:
+    """Tests de la caché HTTP y las revalidaciones con ETag."""
+
+    def test_second_fetch_is_not_modified(self, tmp_path):
+        """Una segunda descarga responde 304 y devuelve el cuerpo cacheado sin cambios."""
+        app = create_app()
+        url = BASE + "207436"
+
+        first = make_crawler(app, tmp_path).fetch_all_sync([url])[0]
+        second = make_crawler(app, tmp_path).fetch_all_sync([url])[0]
+
+        assert (first.status, first.changed) == (200, True)
+        assert (second.status, second.changed, second.from_cache) == (304, False, True)
+        assert second.text == first.text
+        assert app.state.stats["not_modified"] == 1
+
+    def test_amended_law_is_downloaded_again(self, tmp_path):
+        """Si la ley cambia, el servidor responde 200 y el resultado queda marcado como cambiado."""
+        app = create_app()
+        url = BASE + "207436"
+        make_crawler(app, tmp_path).fetch_all_sync([url])
+
+        amend_law(app, "207436", ["Texto reformado del artículo."])
+        result = make_crawler(app, tmp_path).fetch_all_sync([url])[0]
+
+        assert (result.status, result.changed) == (200, True)
+        assert "Texto reformado" in result.text
+
+
+class TestPoliteness:
+    """Tests de límites por host y reintentos."""
+
+    def test_per_host_concurrency_limit(self, tmp_path):
+        """Nunca hay más requests simultáneos al host que el límite configurado."""
+        app = create_app(latency_ms=30)
+        urls = [BASE + law_id for law_id in app.state.laws]
+
+        results = make_crawler(app, tmp_path, per_host_concurrency=2).fetch_all_sync(urls)
+
+        assert all(result.ok for result in results)
+        assert app.state.stats["max_in_flight"] == 2
+
+    def test_min_delay_between_requests(self, tmp_path):
+        """Los inicios de request al mismo host quedan separados por al menos min_delay."""
+        app = create_app()
+        urls = [BASE + law_id for law_id in list(app.state.laws)[:3]]
+
+        make_crawler(app, tmp_path, per_host_concurrency=3, min_delay=0.05).fetch_all_sync(urls)
+        times = app.state.request_times
+
+        assert all(later - earlier >= 0.045 for earlier, later in zip(times, times[1:]))
+
+    def test_unavailable_is_retried(self, tmp_path):
+        """Un 503 con Retry-After se reintenta y la descarga termina bien."""
+        app = create_app(fail_first=2, retry_after=0.01)
+        crawler = make_crawler(app, tmp_path)
+
+        result = crawler.fetch_all_sync([BASE + "61438"])[0]
+
+        assert result.status == 200
+        assert crawler.stats["retries"] == 2
+        assert crawler.stats["failed"] == 0
+
+
+class TestWriteJsonIfChanged:
+    """Tests de la escritura idempotente de los JSON de leyes y guías."""
+
+    def test_volatile_fields_are_ignored(self, tmp_path):
+        """Cambiar solo scraped_at no reescribe el archivo; cambiar el contenido sí."""
+        path = tmp_path / "ley.json"
+        data = {"law_name": "Ley 19.496", "articles": [1, 2], "scraped_at": "2025-01-01"}
+
+        assert write_json_if_changed(path, data) is True
+        mtime = path.stat().st_mtime_ns
+        time.sleep(0.01)
+
+        assert write_json_if_changed(path, dict(data, scraped_at="2025-06-01")) is False
+        assert path.stat().st_mtime_ns == mtime
+        assert write_json_if_changed(path, dict(data, articles=[1, 2, 3])) is True
+        assert json.loads(path.read_text(encoding="utf-8"))["articles"] == [1, 2, 3]
@@ -0,0 +1,139 @@
+"""
+Tests para el runner del pipeline (data_processing/dag_runner.py) y el
+grafo de etapas de data_processing/pipeline_stages.py.
+"""
+
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from data_processing.dag_runner import BLOCKED, DISABLED, FAILED, RAN, SKIPPED, DAGRunner, Stage
+from data_processing.pipeline_stages import build_pipeline
+
+
+def copy_stage(name, src, dst, calls, deps=None):
+    """Etapa de juguete: copia src en dst en mayúsculas."""
+    def run():
+        calls.append(name)
+        dst.write_text(src.read_text().upper())
+    return Stage(name=name, run=run, inputs=[str(src)], outputs=[str(dst)], deps=deps or [])
+
+
+def statuses(results):
+    return {result.name: result.status for result in results}
+
+
+class TestDAGRunner:
+    """Tests de huellas, paralelismo y propagación de fallos."""
+
+    def make_runner(self, tmp_path, stages, **kwargs):
+        return DAGRunner(stages, state_path=tmp_path / "state.json", base_dir=tmp_path, **kwargs)
+
+    def test_skips_unchanged_and_reruns_changed(self, tmp_path):
+        """Una segunda corrida salta todo; cambiar un input reejecuta solo su cadena."""
+        (tmp_path / "a.txt").write_text("a")
+        (tmp_path / "b.txt").write_text("b")
+        calls = []
+
+        def stages():
+            return [
+                copy_stage("a1", tmp_path / "a.txt", tmp_path / "a1.txt", calls),
+                copy_stage("a2", tmp_path / "a1.txt", tmp_path / "a2.txt", calls, deps=["a1"]),
+                copy_stage("b1", tmp_path / "b.txt", tmp_path / "b1.txt", calls),
+            ]
+
+        first = self.make_runner(tmp_path, stages()).run()
+        assert set(statuses(first).values()) == {RAN}
+
+        calls.clear()
+        second = self.make_runner(tmp_path, stages()).run()
+        assert set(statuses(second).values()) == {SKIPPED}
+        assert calls == []
+
+        (tmp_path / "a.txt").write_text("a modificado")
+        third = self.make_runner(tmp_path, stages()).run()
+        assert statuses(third) == {"a1": RAN, "a2": RAN, "b1": SKIPPED}
+        assert (tmp_path / "a2.txt").read_text() == "A MODIFICADO"
+
+        # Un output borrado también obliga a reejecutar
+        (tmp_path / "b1.txt").unlink()
+        fourth = self.make_runner(tmp_path, stages()).run()
+        assert statuses(fourth)["b1"] == RAN
+
+    def test_independent_stages_run_in_parallel(self, tmp_path):
+        """Dos etapas sin dependencias entre sí se ejecutan a la vez."""
+        barrier = threading.Barrier(2, timeout=5)
+        stages = [Stage(name=name, run=barrier.wait, always_run=True) for name in ("bcn", "dt")]
+
+        results = self.make_runner(tmp_path, stages, max_workers=2).run()
+
+        assert set(statuses(results).values()) == {RAN}
+
+    def test_failure_blocks_dependents_only(self, tmp_path):
+        """Un fallo bloquea a sus dependientes y no deja huella; el resto sigue."""
+        def boom():
+            raise RuntimeError("sin conexión")
+
+        stages = [
+            Stage(name="scrape:bcn", run=boom, always_run=True),
+            Stage(name="chunk:bcn", run=lambda: None, deps=["scrape:bcn"]),
+            Stage(name="embed:bcn", run=lambda: None, deps=["chunk:bcn"]),
+            Stage(name="chunk:dt", run=lambda: time.sleep(0.01)),
+            Stage(name="embed:dt", run=lambda: None, deps=["chunk:dt"], enabled=False, disabled_reason="sin API key"),
+        ]
+
+        results = self.make_runner(tmp_path, stages).run()
+
+        assert statuses(results) == {
+            "scrape:bcn": FAILED,
+            "chunk:bcn": BLOCKED,
+            "embed:bcn": BLOCKED,
+            "chunk:dt": RAN,
+            "embed:dt": DISABLED,
+        }
+        assert "sin conexión" in results[[r.name for r in results].index("scrape:bcn")].detail
+
+    def test_invalid_graphs_raise(self, tmp_path):
+        """Dependencias inexistentes y ciclos se detectan al construir el runner."""
+        with pytest.raises(ValueError):
+            self.make_runner(tmp_path, [Stage(name="a", run=lambda: None, deps=["x"])])
+        with pytest.raises(ValueError):
+            self.make_runner(tmp_path, [
+                Stage(name="a", run=lambda: None, deps=["b"]),
+                Stage(name="b", run=lambda: None, deps=["a"]),
+            ])
+
+
+class TestBuildPipeline:
+    """Tests de la forma del grafo de etapas."""
+
+    def test_one_chain_per_source(self, tmp_path, monkeypatch):
+        """Cada fuente presente tiene su cadena y las etapas globales dependen de todas."""
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setenv("VECTOR_STORE_BACKEND", "local")
+        (tmp_path / "raw" / "dt").mkdir(parents=True)
+        (tmp_path / "raw" / "apuntes" / "civil").mkdir(parents=True)
+
+        stages = {stage.name: stage for stage in build_pipeline(
+            raw_dir=tmp_path / "raw",
+            processed_dir=tmp_path / "processed",
+            embeddings_dir=tmp_path / "embeddings",
+            lexical_dir=tmp_path / "lexical"
+        )}
+
+        assert set(stages) == {
+            "chunk:dt", "embed:dt",
+            "load:apuntes/civil", "chunk:apuntes/civil", "embed:apuntes/civil",
+            "lexical_index", "chunk_store", "upsert"
+        }
+        assert stages["chunk:apuntes/civil"].deps == ["load:apuntes/civil"]
+        assert set(stages["upsert"].deps) == {"embed:dt", "embed:apuntes/civil"}
+        assert set(stages["lexical_index"].deps) == {"chunk:dt", "chunk:apuntes/civil"}
+        assert stages["chunk_store"].deps == stages["lexical_index"].deps
+        assert not stages["embed:dt"].enabled
+        assert stages["upsert"].enabled
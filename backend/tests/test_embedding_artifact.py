@@ -0,0 +1,93 @@
+"""
+Tests para el artefacto binario de embeddings (data_processing/embedding_artifact.py).
+"""
+
+import json
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+from data_processing.embedding_artifact import (
+    EmbeddingArtifact,
+    EmbeddingArtifactWriter,
+    convert_json_file,
+    find_embedding_files,
+)
+from rag.vector_store import VectorStore, chunk_to_vector
+
+
+def make_chunk(i, dimension=8):
+    return {
+        "chunk_id": f"ley_chunk_{i}",
+        "text": f"Artículo {i} del Código del Trabajo",
+        "metadata": {"source": "BCN", "law_name": "Código del Trabajo", "category": "laboral", "article_number": i},
+        "chunk_number": i,
+        "total_chunks": 3,
+        "embedding": [float(i + 1)] * dimension,
+        "embedding_model": "text-embedding-3-small",
+    }
+
+
+class TestEmbeddingArtifact:
+    """Tests de escritura y lectura en streaming."""
+
+    def test_roundtrip(self, tmp_path):
+        """Los chunks leídos son los escritos, con el vector en float32."""
+        chunks = [make_chunk(i) for i in range(3)]
+        with EmbeddingArtifactWriter(tmp_path / "ley_embedded", dimension=8, model="m") as writer:
+            for chunk in chunks:
+                writer.write_chunk(chunk)
+
+        with EmbeddingArtifact(tmp_path / "ley_embedded.npy") as artifact:
+            assert len(artifact) == 3
+            assert artifact.model == "m"
+            assert artifact.vectors.dtype == np.float16
+
+            loaded = list(artifact.iter_chunks())
+            assert loaded[2]["embedding"] == [3.0] * 8
+            assert loaded[2]["metadata"]["law_name"] == "Código del Trabajo"
+            assert artifact.get("ley_chunk_1")["chunk_number"] == 1
+
+            vector_id, vector, metadata = list(artifact.iter_vectors())[0]
+            assert (vector_id, metadata) == (chunk_to_vector(chunks[0])[0], chunk_to_vector(chunks[0])[2])
+            assert vector.dtype == np.float32
+
+        # Es un .npy estándar
+        assert np.load(tmp_path / "ley_embedded.npy").shape == (3, 8)
+
+    def test_failed_write_leaves_no_artifact(self, tmp_path):
+        """Un error a mitad de escritura no publica archivos parciales."""
+        try:
+            with EmbeddingArtifactWriter(tmp_path / "ley_embedded", dimension=8) as writer:
+                writer.write_chunk(make_chunk(0))
+                writer.write(make_chunk(1), [1.0, 2.0])
+        except ValueError:
+            pass
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestConversion:
+    """Tests del conversor desde *_embedded.json."""
+
+    def test_convert_and_load_local_index(self, tmp_path):
+        """El artefacto convertido se prefiere al JSON y se carga en el índice local."""
+        json_file = tmp_path / "ley_chunks_embedded.json"
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump([make_chunk(i) for i in range(3)], f, indent=2)
+
+        summary = convert_json_file(json_file)
+        assert summary["converted"] == 3
+        assert find_embedding_files(tmp_path) == [tmp_path / "ley_chunks_embedded.npy"]
+
+        store = VectorStore(backend="local", dimension=8, local_index_dir=str(tmp_path / "index"))
+        summaries = store.load_all_embeddings(tmp_path)
+
+        assert summaries[0]["vectors_upserted"] == 3
+        results = store.search([3.0] * 8, top_k=1)
+        assert results[0]["law_name"] == "Código del Trabajo"
+        store.backend.index.close()
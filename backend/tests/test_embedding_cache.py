@@ -0,0 +1,113 @@
+"""
+Tests para la caché de embeddings de consultas (rag/embedding_cache.py).
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.embedding_cache import QueryEmbeddingCache, normalize_query
+
+
+MODEL = "text-embedding-3-small"
+
+
+class FakeEmbedder:
+    """Cuenta llamadas a la 'API' de embeddings."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return [float(len(text)), 0.5, -0.25]
+
+
+class TestNormalizeQuery:
+    """Tests de normalización de la clave."""
+
+    def test_case_accents_and_whitespace(self):
+        """Mayúsculas, tildes y espacios no cambian la clave."""
+        assert normalize_query("  ¿Cuánto   es la PENSIÓN? ") == "cuanto es la pension"
+        assert normalize_query("Sí") == normalize_query("si")
+
+
+class TestQueryEmbeddingCache:
+    """Tests de la caché en memoria y en disco."""
+
+    def test_memory_hit_avoids_api_call(self):
+        """La segunda consulta equivalente no llama a la API."""
+        cache = QueryEmbeddingCache()
+        embed = FakeEmbedder()
+
+        first = cache.get_or_compute("¿Qué es el finiquito?", MODEL, embed)
+        second = cache.get_or_compute("que es el FINIQUITO", MODEL, embed)
+
+        assert embed.calls == 1
+        assert second == first
+        stats = cache.get_stats()
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_model_is_part_of_key(self):
+        """Distintos modelos no comparten entradas."""
+        cache = QueryEmbeddingCache()
+        embed = FakeEmbedder()
+
+        cache.get_or_compute("despido", MODEL, embed)
+        cache.get_or_compute("despido", "text-embedding-3-large", embed)
+
+        assert embed.calls == 2
+
+    def test_failures_are_not_cached(self):
+        """Si la API falla (None) se reintenta la próxima vez."""
+        cache = QueryEmbeddingCache()
+
+        assert cache.get_or_compute("hola", MODEL, lambda text: None) is None
+        assert cache.get("hola", MODEL) is None
+
+    def test_memory_lru_eviction(self):
+        """El LRU en memoria respeta su tamaño máximo."""
+        cache = QueryEmbeddingCache(max_memory_entries=2)
+        embed = FakeEmbedder()
+
+        for text in ("uno", "dos", "tres"):
+            cache.get_or_compute(text, MODEL, embed)
+
+        assert cache.get_stats()["memory_entries"] == 2
+        assert cache.get("uno", MODEL) is None
+        assert cache.get("tres", MODEL) is not None
+
+    def test_disk_persists_between_instances(self, tmp_path):
+        """El store SQLite sobrevive a un reinicio del proceso."""
+        db_path = tmp_path / "cache.sqlite3"
+        embed = FakeEmbedder()
+
+        cache = QueryEmbeddingCache(db_path=db_path)
+        original = cache.get_or_compute("pensión de alimentos", MODEL, embed)
+        cache.close()
+
+        reopened = QueryEmbeddingCache(db_path=db_path)
+        cached = reopened.get_or_compute("pension de alimentos", MODEL, embed)
+
+        assert embed.calls == 1
+        assert cached == pytest.approx(original)
+        assert reopened.get_stats()["disk_hits"] == 1
+        reopened.close()
+
+    def test_disk_eviction(self, tmp_path, monkeypatch):
+        """El store en disco elimina las entradas menos usadas."""
+        monkeypatch.setattr("rag.embedding_cache.EVICTION_CHECK_INTERVAL", 1)
+        cache = QueryEmbeddingCache(db_path=tmp_path / "cache.sqlite3", max_disk_entries=3)
+        embed = FakeEmbedder()
+
+        for i in range(10):
+            cache.get_or_compute(f"consulta {i}", MODEL, embed)
+
+        stats = cache.get_stats()
+        assert stats["disk_entries"] == 3
+        assert stats["evictions"] >= 7
+        cache.close()
@@ -0,0 +1,98 @@
+"""
+Tests para los perfiles de embeddings (rag/embedding_profiles.py), el índice
+local int8 con rescore y el harness de evaluación por perfil.
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+from benchmarks.bench_embedding_profiles import evaluate_profiles, fixture_vectors
+from data_processing.embedder import Embedder
+from data_processing.embedding_store import ContentEmbeddingStore, content_hash
+from rag.embedding_profiles import EMBEDDING_PROFILES, get_profile, reduce_dimensions
+from rag.local_index import LocalVectorIndex
+from rag.rag_engine import RAGEngine
+
+
+class TestProfiles:
+    """Tests de perfiles y reducción de dimensiones."""
+
+    def test_get_profile_from_env(self, monkeypatch):
+        """EMBEDDING_PROFILE elige el perfil; un nombre desconocido es un error."""
+        monkeypatch.setenv("EMBEDDING_PROFILE", "tiny")
+
+        assert get_profile().dimensions == 256 and get_profile().dtype == "int8"
+        assert get_profile("full").api_dimensions is None
+        with pytest.raises(ValueError):
+            get_profile("enorme")
+
+    def test_reduce_dimensions_renormalizes(self):
+        """El vector reducido es el prefijo con norma 1."""
+        reduced = reduce_dimensions([3.0, 4.0, 12.0], 2)
+
+        assert reduced == pytest.approx([0.6, 0.8])
+
+    def test_reduced_profile_reuses_native_vectors(self, tmp_path):
+        """Con dimensiones reducidas, los vectores completos del store evitan la API."""
+        store = ContentEmbeddingStore(tmp_path / "store.sqlite3")
+        native = [1.0, 0.0] + [0.0] * 1534
+        store.put_many([(content_hash("texto", "text-embedding-3-small", 1536), native)], "text-embedding-3-small", 1536)
+        embedder = Embedder(api_key="test", embedding_store=store, dimensions=256)
+
+        reduced = embedder.reduce_native_vectors({content_hash("texto", embedder.model, 256): "texto"})
+
+        assert embedder.dimension_options() == {"dimensions": 256}
+        assert list(reduced.values())[0] == pytest.approx([1.0] + [0.0] * 255)
+
+
+class TestQuantizedIndex:
+    """Tests del índice local int8."""
+
+    @pytest.mark.parametrize("rescore", [False, True])
+    def test_int8_search_close_to_float(self, tmp_path, rescore):
+        """int8 encuentra los mismos vecinos que float32; con rescore los scores son float."""
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((500, 64)).astype(np.float32)
+        records = [(f"doc_{i}", vectors[i].tolist(), {"category": "laboral"}) for i in range(500)]
+        LocalVectorIndex.build(records, tmp_path / "f32", dimension=64, nlist=0)
+        LocalVectorIndex.build(records, tmp_path / "i8", dimension=64, dtype="int8", nlist=0, rescore=rescore)
+        exact, quantized = LocalVectorIndex(tmp_path / "f32"), LocalVectorIndex(tmp_path / "i8")
+
+        overlap = [
+            len({r[0] for r in exact.search(vectors[i], 10)} & {r[0] for r in quantized.search(vectors[i], 10)})
+            for i in range(0, 500, 25)
+        ]
+
+        assert sum(overlap) / (10 * len(overlap)) >= 0.9
+        assert quantized.search(vectors[3], 1)[0][0] == "doc_3"
+        assert quantized.get_stats()["rescore"] is rescore
+        first = next(quantized.iter_records())
+        assert np.dot(first[1], vectors[int(first[0][4:])]) / np.linalg.norm(vectors[int(first[0][4:])]) > 0.99
+
+
+class TestProfileHarness:
+    """Tests del harness de evaluación y de la integración con RAGEngine."""
+
+    def test_harness_reports_recall_memory_latency(self):
+        """El perfil completo tiene recall 1.0; los reducidos ocupan menos memoria."""
+        vectors = fixture_vectors(count=400, queries=20)
+
+        rows = {row["profile"]: row for row in evaluate_profiles(vectors["corpus"], vectors["queries"], top_k=5)}
+
+        assert set(rows) == set(EMBEDDING_PROFILES)
+        assert rows["full"]["recall"] == 1.0
+        assert rows["tiny"]["index_bytes"] < rows["compact"]["index_bytes"] < rows["full"]["index_bytes"]
+        assert all(row["p50_ms"] > 0 for row in rows.values())
+
+    def test_engine_requests_profile_dimensions(self):
+        """Las consultas piden las dimensiones del perfil y la caché las separa por largo."""
+        engine = RAGEngine(embedding_dimensions=256)
+
+        assert engine.embedding_options() == {"dimensions": 256}
+        assert engine.cache_model == "text-embedding-3-small@256"
+        assert RAGEngine().cache_model == "text-embedding-3-small"
@@ -0,0 +1,102 @@
+"""
+Tests para el embedding incremental (data_processing/embedding_store.py).
+"""
+
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processing.embedder import Embedder
+from data_processing.embedding_store import ContentEmbeddingStore
+from rag.vector_store import VectorStore
+
+DIMENSION = 4
+
+
+class CountingEmbedder(Embedder):
+    """Embedder que no llama a OpenAI y cuenta los textos enviados."""
+
+    def __init__(self, store):
+        super().__init__(api_key="test", embedding_store=store)
+        self.embedding_dim = DIMENSION
+        self.sent = []
+
+    def embed_pending(self, items):
+        self.sent.extend(text for _, text in items)
+        return {key: [float(len(text)), 1.0, 0.0, 0.5] for key, text in items}
+
+
+def write_chunks(path, texts):
+    chunks = [
+        {"chunk_id": f"ley_chunk_{i}", "text": text, "metadata": {"law_name": "Ley 19.496", "category": "consumidor"}}
+        for i, text in enumerate(texts)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chunks, f)
+
+
+class TestIncrementalEmbedding:
+    """Tests de reutilización de embeddings por hash de contenido."""
+
+    def test_only_changed_chunks_hit_the_api(self, tmp_path):
+        """La segunda corrida solo embebe el chunk cambiado y reporta el diff."""
+        store = ContentEmbeddingStore(tmp_path / "store.sqlite3")
+        chunks_file = tmp_path / "ley_chunks.json"
+        output = tmp_path / "out" / "ley_chunks_embedded.json"
+
+        write_chunks(chunks_file, ["uno", "dos", "tres"])
+        first = CountingEmbedder(store)
+        first.process_chunks_file(chunks_file, output)
+        assert first.sent == ["uno", "dos", "tres"]
+
+        write_chunks(chunks_file, ["uno", "dos cambiado"])
+        second = CountingEmbedder(store)
+        summary = second.process_chunks_file(chunks_file, output)
+
+        assert second.sent == ["dos cambiado"]
+        assert (summary["reused"], summary["changed"], summary["removed"], summary["unchanged"]) == (1, 1, 1, 1)
+
+    def test_previous_output_seeds_store(self, tmp_path):
+        """Una salida anterior sin store se importa en vez de volver a pagarla."""
+        chunks_file = tmp_path / "ley_chunks.json"
+        output = tmp_path / "ley_chunks_embedded.json"
+        write_chunks(chunks_file, ["uno", "dos"])
+
+        CountingEmbedder(ContentEmbeddingStore(tmp_path / "old.sqlite3")).process_chunks_file(chunks_file, output)
+
+        fresh = CountingEmbedder(ContentEmbeddingStore(tmp_path / "new.sqlite3"))
+        summary = fresh.process_chunks_file(chunks_file, output)
+
+        assert fresh.sent == []
+        assert summary["reused"] == 2
+
+
+class TestVectorSync:
+    """Tests de la sincronización incremental con el vector store."""
+
+    def test_sync_pushes_only_diff(self, tmp_path):
+        """Solo se suben chunks nuevos/cambiados y se borran los eliminados."""
+        store = ContentEmbeddingStore(tmp_path / "store.sqlite3")
+        chunks_file = tmp_path / "ley_chunks.json"
+        embeddings_dir = tmp_path / "embeddings"
+        output = embeddings_dir / "ley_chunks_embedded.json"
+        vector_store = VectorStore(backend="local", dimension=DIMENSION, local_index_dir=str(tmp_path / "index"))
+
+        write_chunks(chunks_file, ["uno", "dos", "tres"])
+        CountingEmbedder(store).process_chunks_file(chunks_file, output)
+        first = vector_store.sync_embeddings(embeddings_dir, store=store)
+        assert (first["added"], first["vectors_upserted"]) == (3, 3)
+
+        write_chunks(chunks_file, ["uno", "dos cambiado"])
+        CountingEmbedder(store).process_chunks_file(chunks_file, output)
+        second = vector_store.sync_embeddings(embeddings_dir, store=store)
+
+        assert (second["changed"], second["removed"], second["unchanged"]) == (1, 1, 1)
+        assert (second["vectors_upserted"], second["vectors_deleted"]) == (1, 1)
+        assert vector_store.get_stats()["total_vectors"] == 2
+
+        third = vector_store.sync_embeddings(embeddings_dir, store=store)
+        assert third["vectors_upserted"] == 0
+        vector_store.backend.index.close()
@@ -0,0 +1,102 @@
+"""
+Tests de la compactación del historial (services/history_compactor.py):
+ventana de turnos recientes, resumen incremental y caché por conversación.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Conversation, ConversationSummary
+from services.history_compactor import HistoryCompactor, estimate_message_tokens, update_summary
+
+
+def make_history(turns: int):
+    """Conversación de `turns` turnos con respuestas largas de LEIA"""
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Pregunta {i} sobre mi despido y el finiquito"})
+        history.append({
+            "role": "assistant",
+            "content": f"Respuesta {i}. Según el artículo 162 del Código del Trabajo " + "el empleador debe avisar. " * 40
+        })
+    return history
+
+
+class SpySummarizer:
+    """Registra cuántos mensajes nuevos recibe en cada llamada"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, summary, new_messages):
+        self.calls.append((summary is not None, len(new_messages)))
+        return update_summary(summary, new_messages)
+
+
+class TestWindow:
+    """Tests de la ventana y el presupuesto"""
+
+    def test_short_history_is_verbatim(self):
+        """Bajo el presupuesto, el historial pasa completo y sin resumen"""
+        history = make_history(2)
+
+        compacted = HistoryCompactor(keep_turns=1, budget=10_000).compact(history)
+
+        assert compacted.messages == history
+        assert compacted.summary is None
+        assert compacted.tokens_saved == 0
+        assert compacted.system_section() == ""
+
+    def test_long_history_keeps_recent_turns(self):
+        """Sobre el presupuesto: últimos turnos completos y resumen de los anteriores"""
+        history = make_history(8)
+
+        compacted = HistoryCompactor(keep_turns=2, budget=800).compact(history)
+
+        assert compacted.messages == history[-4:]
+        assert compacted.messages[0]["role"] == "user"
+        assert compacted.summarized_messages == 12
+        assert compacted.summary.splitlines()[0] == "- Usuario: Pregunta 0 sobre mi despido y el finiquito"
+        assert "Respuesta 5." in compacted.summary and "empleador" not in compacted.summary
+        assert compacted.tokens_saved > estimate_message_tokens(history) // 2
+        assert "RESUMEN DE LA CONVERSACIÓN ANTERIOR" in compacted.system_section()
+
+
+class TestRollingSummary:
+    """Tests del resumen incremental"""
+
+    def test_only_new_evicted_turns_are_summarized(self):
+        """El resumen guardado se reutiliza y se actualiza con los turnos que salen"""
+        spy = SpySummarizer()
+        compactor = HistoryCompactor(keep_turns=2, budget=800, summarizer=spy)
+
+        first = compactor.compact(make_history(6))
+        again = compactor.compact(make_history(6))
+        later = compactor.compact(make_history(7))
+        edited = make_history(7)
+        edited[0]["content"] = "Otra conversación"
+        compactor.compact(edited)
+
+        assert spy.calls == [(False, 8), (True, 2), (False, 10)]
+        assert again.summary == first.summary
+        assert later.summary == update_summary(None, make_history(7)[:10])
+        assert compactor.stats.summary()["summary_hits"] == 1
+
+    def test_summary_cached_per_conversation(self, db_session):
+        """Con conversación, el resumen vive en conversation_summaries"""
+        conversation = Conversation(title="Despido")
+        db_session.add(conversation)
+        db_session.commit()
+
+        HistoryCompactor(keep_turns=2, budget=800).compact(make_history(5), db=db_session, conversation_id=conversation.id)
+        spy = SpySummarizer()
+        HistoryCompactor(keep_turns=2, budget=800, summarizer=spy).compact(
+            make_history(6), db=db_session, conversation_id=conversation.id
+        )
+
+        row = db_session.query(ConversationSummary).filter_by(conversation_id=conversation.id).one()
+        assert spy.calls == [(True, 2)]
+        assert row.summarized_messages == 8
+        assert row.summary.startswith("- Usuario: Pregunta 0")
@@ -0,0 +1,74 @@
+"""
+Tests del clasificador por palabras clave (services/keyword_classifier.py)
+y de los módulos que lo usan: legal_categories y pjud_constants.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.keyword_classifier import KeywordClassifier
+from services.legal_categories import LEGAL_CATEGORIES, classify_texts, get_category_by_keyword, score_categories
+from services.pjud_constants import detectar_competencia, detectar_competencias
+
+
+class TestKeywordClassifier:
+    """Tests del motor de clasificación"""
+
+    def test_weighted_ranking(self):
+        """Suma el peso de cada palabra una vez; empates por orden del registro"""
+        classifier = KeywordClassifier({
+            "laboral": ["despid", ("finiquito", 2)],
+            "familia": ["pensión", "pension", "hijo"],
+            "civil": ["contrato"],
+        })
+
+        ranked = classifier.classify("Me despidieron sin finiquito, finiquito! y tengo un hijo con pensión")
+
+        assert ranked == [("laboral", 3), ("familia", 2)]
+        assert classifier.best("firmé un contrato por mi hijo") == "familia"
+        assert classifier.first("contrato de mi hijo") == "familia"
+        assert classifier.classify("nada que ver") == []
+
+    def test_batch_matches_single(self):
+        """classify_many da lo mismo que classify, en el orden de entrada"""
+        classifier = KeywordClassifier({"a": ["uno"], "b": ["dos", "uno"]})
+        texts = ["uno", "dos", "uno", "tres"]
+
+        batch = classifier.classify_many(texts)
+
+        assert batch == [classifier.classify(text) for text in texts]
+        assert classifier.first_many(texts) == ["a", "b", "a", None]
+
+
+class TestCallers:
+    """legal_categories y pjud_constants sobre el motor común"""
+
+    def test_legal_categories_match_keyword_counting(self):
+        """Con las tildes de las palabras clave, puntajes iguales a contarlas una por una"""
+        texts = [
+            "me despidieron y no me pagan el finiquito",
+            "quiero el divorcio y la pensión de alimentos",
+            "el arrendador no me devuelve la garantía del departamento",
+            "me llego una cobranza por una deuda del banco",
+        ]
+
+        for text in texts:
+            expected = {
+                cat_id: sum(1 for kw in info.keywords if kw in text)
+                for cat_id, info in LEGAL_CATEGORIES.items()
+            }
+            assert score_categories(text) == {k: v for k, v in expected.items() if v}, text
+
+        assert get_category_by_keyword(texts[0]) == "laboral"
+        assert [ranking[0][0] for ranking in classify_texts(texts)] == [get_category_by_keyword(t) for t in texts]
+        assert "consumidor" in score_categories("reclamo en el sernac")
+
+    def test_detectar_competencia_priority(self):
+        """La competencia sigue el orden de prioridad (civil antes que familia)"""
+        assert detectar_competencia("C-1234-2024") == "Civil"
+        assert detectar_competencia("Juzgado de Familia de Santiago") == "Familia"
+        assert detectar_competencia("Garantía de Temuco") == "Garantia"
+        assert detectar_competencia("") is None
+        assert detectar_competencias(["cobranza laboral", "oral penal"]) == ["Cobranza", "Top"]
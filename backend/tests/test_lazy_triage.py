@@ -0,0 +1,85 @@
+"""
+Tests del triage con recuperación perezosa (routers/chat_v2.run_triage).
+"""
+
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routers import chat_v2
+from routers.chat_v2 import ChatRequestV2, run_triage
+from services.retrieval_service import RetrievalService
+from services.triage_engine import TriageDecision, TriageEngine
+
+
+RELEVANT = [{"id": "codigo_trabajo_1", "score": 0.9, "text": "El finiquito...", "metadata": {}}]
+
+
+def setup_fakes(monkeypatch, delay=0.0):
+    """RAG falso que registra llamadas y cancelaciones; servicio con contadores propios"""
+    calls = {"started": 0, "cancelled": 0}
+
+    async def fake_rag(query):
+        calls["started"] += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls["cancelled"] += 1
+            raise
+        return RELEVANT
+
+    service = RetrievalService(engine_factory=lambda: None)
+    monkeypatch.setattr(chat_v2, "get_rag_results", fake_rag)
+    monkeypatch.setattr(chat_v2, "get_retrieval_service", lambda: service)
+    return calls, service
+
+
+class TestLazyTriage:
+    """Tests de run_triage"""
+
+    def test_rule_decision_skips_retrieval(self, monkeypatch):
+        """Si una regla decide, no se busca en RAG y se cuenta como evitada"""
+        calls, service = setup_fakes(monkeypatch)
+
+        result = asyncio.run(run_triage(ChatRequestV2(message="Sí, quiero un abogado")))
+
+        assert result.decision == TriageDecision.DIRECT_LAWYER_REQUEST
+        assert calls["started"] == 0
+        assert service.health()["avoided_retrievals"] == 1
+
+    def test_general_question_retrieves(self, monkeypatch):
+        """Sin decisión por reglas, el triage evalúa los resultados RAG"""
+        calls, service = setup_fakes(monkeypatch)
+
+        result = asyncio.run(run_triage(ChatRequestV2(message="¿Qué es el finiquito?")))
+
+        assert result.decision == TriageDecision.RESPOND_WITH_SOURCES
+        assert result.sources_found == RELEVANT
+        assert calls["started"] == 1
+        assert service.avoided == 0
+
+    def test_speculative_retrieval_cancelled_on_early_exit(self, monkeypatch):
+        """En modo especulativo el RAG parte antes y se cancela si una regla decide"""
+        calls, service = setup_fakes(monkeypatch, delay=1.0)
+
+        async def run():
+            result = await run_triage(ChatRequestV2(message="Me están amenazando de muerte"), speculative=True)
+            await asyncio.sleep(0)
+            return result
+
+        result = asyncio.run(run())
+
+        assert result.decision == TriageDecision.URGENT_MATTER
+        assert calls == {"started": 1, "cancelled": 1}
+        assert (service.avoided, service.cancelled) == (1, 1)
+
+    def test_rules_plus_rag_match_analyze(self):
+        """analyze_rules + analyze_rag decide lo mismo que analyze"""
+        triage = TriageEngine()
+        queries = ["Necesito un abogado", "Me despidieron sin pagarme", "¿Qué es el finiquito?", "hola"]
+
+        for query in queries:
+            staged = triage.analyze_rules(query) or triage.analyze_rag(query, RELEVANT)
+            assert staged.decision == triage.analyze(query, RELEVANT).decision
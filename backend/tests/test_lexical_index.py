@@ -0,0 +1,189 @@
+"""
+Tests para el índice léxico BM25 y la búsqueda híbrida (rag/lexical_index.py, rag/hybrid.py).
+"""
+
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.async_engine import AsyncRAGEngine
+from rag.hybrid import EXACT_MATCH_RANK, EXACT_MATCH_SCORE, cited_identifiers, lexical_matches, reciprocal_rank_fusion
+from rag.lexical_index import LexicalIndex, analyze
+from rag.rag_engine import RAGEngine
+
+
+DOCUMENTS = [
+    ("ct_161", "Código del Trabajo artículo 161 El empleador podrá poner término al contrato invocando necesidades de la empresa",
+     {"text": "Art. 161 necesidades de la empresa", "law_name": "Código del Trabajo", "category": "laboral", "article_number": "161"}),
+    ("ct_163", "Código del Trabajo artículo 163 indemnización por años de servicio equivalente a treinta días",
+     {"text": "Art. 163 indemnización", "law_name": "Código del Trabajo", "category": "laboral", "article_number": "163"}),
+    ("ley_19496", "Ley 19.496 sobre protección de los derechos de los consumidores",
+     {"text": "Ley del consumidor", "law_name": "Ley 19.496", "category": "consumidor"}),
+    ("familia_1", "Las pensiones de alimentos se fijan según las necesidades del alimentario",
+     {"text": "Pensión de alimentos", "law_name": "Ley 14.908", "category": "familia"}),
+]
+
+
+class FakeVectorStore:
+    """Vector store con un ranking fijo (ignora el vector)."""
+
+    backend_name = "local"
+
+    def __init__(self, results):
+        self.results = results
+
+    def search(self, query_vector, top_k=5, filter=None):
+        return self.results[:top_k]
+
+    def get_query_stats(self):
+        return {}
+
+
+class TestAnalyzer:
+    """Tests del analizador español."""
+
+    def test_accents_and_plurals(self):
+        """'Artículos' y 'artículo' comparten término."""
+        assert analyze("Artículos") == analyze("articulo")
+        assert analyze("indemnizaciones") == analyze("indemnización")
+
+    def test_legal_identifiers(self):
+        """Números de ley y RIT se normalizan como tokens exactos."""
+        assert "19496" in analyze("Ley 19.496")
+        terms = analyze("RIT C-1234-2024")
+        assert "c-1234-2024" in terms and "1234" in terms
+
+    def test_abbreviations_and_stopwords(self):
+        """'art.' se expande y las stopwords se eliminan."""
+        assert analyze("art. 161 de la ley") == analyze("artículo 161 ley")
+
+
+class TestLexicalIndex:
+    """Tests de construcción y búsqueda BM25."""
+
+    def test_exact_article_ranks_first(self, tmp_path):
+        """La consulta por número de artículo trae ese artículo primero."""
+        LexicalIndex.build(DOCUMENTS, tmp_path)
+        index = LexicalIndex(tmp_path)
+
+        results = index.search("¿Qué dice el art. 161?")
+        assert results[0][0] == "ct_161"
+        assert results[0][3]["article_number"] == "161"
+
+        assert index.search("ley 19496")[0][0] == "ley_19496"
+        index.close()
+
+    def test_category_filter(self, tmp_path):
+        """El filtro por categoría excluye documentos de otras áreas."""
+        LexicalIndex.build(DOCUMENTS, tmp_path)
+        index = LexicalIndex(tmp_path)
+
+        results = index.search("necesidades", filter={"category": "familia"})
+        assert [doc_id for doc_id, *_ in results] == ["familia_1"]
+
+        results = index.search("necesidades", filter={"category": {"$in": ["laboral"]}})
+        assert [doc_id for doc_id, *_ in results] == ["ct_161"]
+        index.close()
+
+    def test_unknown_terms(self, tmp_path):
+        """Consultas sin términos del vocabulario no retornan resultados."""
+        LexicalIndex.build(DOCUMENTS, tmp_path)
+        index = LexicalIndex(tmp_path)
+
+        assert index.search("xyzzy") == []
+        index.close()
+
+
+class TestHybridRetrieval:
+    """Tests de la fusión RRF en RAGEngine."""
+
+    def test_rrf_combines_both_lists(self):
+        """Un documento presente en ambas listas queda sobre los de una sola."""
+        vector = [{"id": "a", "score": 0.8}, {"id": "b", "score": 0.75}]
+        lexical = [{"id": "b", "score": 0.9}, {"id": "c", "score": 0.5}]
+
+        fused = reciprocal_rank_fusion(vector, lexical)
+
+        assert [doc["id"] for doc in fused] == ["b", "a", "c"]
+        assert fused[0]["score"] == 0.75
+        assert fused[0]["lexical_score"] == 0.9
+        assert fused[2]["score"] == 0.0
+
+    def test_exact_match_ranked_first(self, tmp_path, monkeypatch):
+        """El artículo citado sube al primer lugar aunque el vector lo rankee bajo."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        LexicalIndex.build(DOCUMENTS, tmp_path)
+        store = FakeVectorStore([
+            {"id": "familia_1", "score": 0.74, "text": "Pensión", "metadata": {}},
+            {"id": "ct_161", "score": 0.71, "text": "Art. 161 necesidades de la empresa", "metadata": {}},
+        ])
+        engine = RAGEngine(vector_store=store, lexical_index=LexicalIndex(tmp_path))
+        engine._embed_query = lambda query: [0.1]
+
+        results = engine.retrieve_context("artículo 161 código del trabajo")
+
+        assert results[0]["id"] == "ct_161"
+        assert results[0]["vector_score"] == 0.71
+        assert results[0]["score"] == EXACT_MATCH_SCORE
+        assert results[0]["lexical_score"] >= 0.7
+        stats = engine.get_retrieval_stats()
+        assert stats["mode"] == "hybrid"
+        assert set(stats["stages"]["last"]) == {"embedding_ms", "vector_ms", "lexical_ms", "fusion_ms"}
+
+    def test_lexical_coverage_does_not_pass_threshold(self, tmp_path, monkeypatch):
+        """Una cobertura léxica completa no pasa el umbral sin similitud vectorial (NO_INFO)."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        LexicalIndex.build(DOCUMENTS, tmp_path)
+        engine = RAGEngine(vector_store=FakeVectorStore([]), lexical_index=LexicalIndex(tmp_path))
+        engine._embed_query = lambda query: None
+
+        lexical = engine.search_lexical("derechos de los consumidores", 3, None, {})
+        results = asyncio.run(AsyncRAGEngine(engine).retrieve_context("derechos de los consumidores"))
+
+        assert lexical[0]["id"] == "ley_19496" and lexical[0]["score"] >= engine.similarity_threshold
+        assert results == []
+
+    def test_exact_citation_passes_without_vector(self, tmp_path, monkeypatch):
+        """El artículo o la ley citados por número vuelven aunque solo los encuentre BM25."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        LexicalIndex.build(DOCUMENTS, tmp_path)
+        engine = RAGEngine(vector_store=FakeVectorStore([]), lexical_index=LexicalIndex(tmp_path))
+        engine._embed_query = lambda query: None
+
+        results = engine.retrieve_context("¿Qué dice el art. 161?")
+        law = asyncio.run(AsyncRAGEngine(engine).retrieve_context("Ley N° 19.496 consumidores"))
+
+        assert [doc["id"] for doc in results] == ["ct_161"]
+        assert results[0]["exact_match"] and results[0]["score"] == EXACT_MATCH_SCORE
+        assert results[0]["vector_score"] == 0.0
+        assert [doc["id"] for doc in law] == ["ley_19496"]
+
+    def test_citation_of_another_law_is_not_exact(self, tmp_path, monkeypatch):
+        """Un artículo con el mismo número pero de otra ley citada no se acepta."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        LexicalIndex.build(DOCUMENTS, tmp_path)
+        engine = RAGEngine(vector_store=FakeVectorStore([]), lexical_index=LexicalIndex(tmp_path))
+        engine._embed_query = lambda query: None
+
+        assert engine.retrieve_context("artículo 161 de la Ley 14.908") == []
+
+
+class TestCitations:
+    """Tests de las citas exactas de artículos y leyes."""
+
+    def test_cited_identifiers(self):
+        """Se reconocen abreviaturas, N° y separador de miles."""
+        assert cited_identifiers("¿Qué dice el art. 161 de la Ley N° 19.496?") == {"articulo:161", "ley:19496"}
+        assert cited_identifiers("artículo 3 bis") == {"articulo:3"}
+        assert cited_identifiers("me despidieron hace 3 años") == set()
+
+    def test_only_top_ranked_hits_are_exact(self):
+        """Solo los primeros EXACT_MATCH_RANK resultados BM25 se marcan como cita exacta."""
+        metadata = {"law_name": "Código del Trabajo", "article_number": "161"}
+        results = [(f"doc_{i}", 1.0, 1.0, metadata) for i in range(EXACT_MATCH_RANK + 1)]
+
+        matches = lexical_matches(results, "artículo 161")
+
+        assert [bool(m.get("exact_match")) for m in matches] == [True] * EXACT_MATCH_RANK + [False]
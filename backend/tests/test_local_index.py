@@ -0,0 +1,196 @@
+"""
+Tests para el índice vectorial local (rag/local_index.py).
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+from rag.local_index import LocalVectorIndex
+
+
+DIM = 32
+
+
+def make_records(count, seed=0):
+    """Genera tuplas (id, vector, metadata) deterministas."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, DIM)).astype(np.float32)
+    categories = ["laboral", "familia", "consumidor"]
+    return [
+        (
+            f"doc_{i}",
+            vectors[i].tolist(),
+            {
+                "text": f"Texto {i}",
+                "category": categories[i % 3],
+                "source": "BCN LeyChile" if i % 2 else "DT",
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def brute_force(records, query, top_k, category=None):
+    """Top-k exacto por similitud coseno."""
+    q = np.asarray(query) / np.linalg.norm(query)
+    scored = []
+    for vector_id, vector, metadata in records:
+        if category and metadata["category"] != category:
+            continue
+        v = np.asarray(vector) / np.linalg.norm(vector)
+        scored.append((float(v @ q), vector_id))
+    scored.sort(reverse=True)
+    return [vector_id for _, vector_id in scored[:top_k]]
+
+
+class TestLocalVectorIndex:
+    """Tests de construcción y búsqueda del índice local."""
+
+    def test_exact_search_matches_brute_force(self, tmp_path):
+        """Sin IVF, la búsqueda es exacta."""
+        records = make_records(300)
+        LocalVectorIndex.build(records, tmp_path, dimension=DIM, nlist=0)
+        index = LocalVectorIndex(tmp_path)
+
+        query = records[7][1]
+        results = index.search(query, top_k=5)
+
+        assert [r[0] for r in results] == brute_force(records, query, 5)
+        assert results[0][0] == "doc_7"
+        assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+        index.close()
+
+    def test_ivf_search_finds_exact_vector(self, tmp_path):
+        """Con IVF, un vector del índice se encuentra a sí mismo."""
+        records = make_records(2000)
+        manifest = LocalVectorIndex.build(records, tmp_path, dimension=DIM, nlist=20, nprobe=4)
+        index = LocalVectorIndex(tmp_path)
+
+        assert manifest["nlist"] == 20
+        for i in (0, 123, 1999):
+            results = index.search(records[i][1], top_k=3)
+            assert results[0][0] == f"doc_{i}"
+        index.close()
+
+    def test_category_filter(self, tmp_path):
+        """El filtro por categoría solo devuelve esa categoría."""
+        records = make_records(600)
+        LocalVectorIndex.build(records, tmp_path, dimension=DIM, nlist=10, nprobe=1)
+        index = LocalVectorIndex(tmp_path)
+
+        query = records[1][1]
+        results = index.search(query, top_k=10, filter={"category": "familia"})
+
+        assert len(results) == 10
+        assert all(r[2]["category"] == "familia" for r in results)
+
+        results_in = index.search(query, top_k=10, filter={"category": {"$in": ["laboral"]}})
+        assert all(r[2]["category"] == "laboral" for r in results_in)
+
+        assert index.search(query, top_k=5, filter={"category": "inexistente"}) == []
+        index.close()
+
+    def test_filter_on_other_metadata(self, tmp_path):
+        """Filtros sobre otros campos se evalúan sobre la metadata."""
+        records = make_records(200)
+        LocalVectorIndex.build(records, tmp_path, dimension=DIM, nlist=0)
+        index = LocalVectorIndex(tmp_path)
+
+        results = index.search(records[3][1], top_k=5, filter={"source": {"$eq": "DT"}})
+
+        assert results
+        assert all(r[2]["source"] == "DT" for r in results)
+        index.close()
+
+    def test_float16_and_upsert_semantics(self, tmp_path):
+        """float16 se guarda en disco y los ids duplicados se sobrescriben."""
+        records = make_records(50)
+        updated = ("doc_0", records[1][1], {"text": "nuevo", "category": "laboral"})
+        LocalVectorIndex.build(records + [updated], tmp_path, dimension=DIM, dtype="float16")
+        index = LocalVectorIndex(tmp_path)
+
+        assert len(index) == 50
+        assert index.vectors.dtype == np.float16
+        results = index.search(records[1][1], top_k=2)
+        assert {r[0] for r in results} == {"doc_0", "doc_1"}
+        index.close()
+
+    def test_dimension_mismatch(self, tmp_path):
+        """Vectores con dimensiones incorrectas se rechazan."""
+        with pytest.raises(ValueError):
+            LocalVectorIndex.build([("x", [0.1] * 5, {})], tmp_path, dimension=DIM)
+
+    def test_missing_index(self, tmp_path):
+        """Cargar un directorio sin índice lanza FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            LocalVectorIndex(tmp_path / "no_existe")
+
+
+class TestIncrementalWrites:
+    """Tests de borrado con tombstones y upsert sin reentrenar IVF."""
+
+    def test_delete_marks_rows_without_rebuild(self, tmp_path):
+        """Un delete no reescribe las matrices y las filas dejan de aparecer."""
+        records = make_records(300)
+        manifest = LocalVectorIndex.build(records, tmp_path, dimension=DIM, nlist=0)
+        index = LocalVectorIndex(tmp_path)
+
+        assert index.delete(["doc_7", "doc_8", "no_existe"]) == 2
+
+        reopened = LocalVectorIndex(tmp_path)
+        assert reopened.manifest["built_at"] == manifest["built_at"]
+        for current in (index, reopened):
+            assert len(current) == 298
+            assert "doc_7" not in {r[0] for r in current.search(records[7][1], top_k=5)}
+            assert "doc_7" not in set(current.iter_ids())
+            assert sum(ns["vector_count"] for ns in current.get_stats()["namespaces"].values()) == 298
+        index.close()
+        reopened.close()
+
+    def test_upsert_reuses_centroids(self, tmp_path):
+        """El upsert del backend reutiliza los centroides y compacta los borrados."""
+        from rag.vector_store import LocalIndexBackend
+
+        records = make_records(2000)
+        LocalVectorIndex.build(records, tmp_path, dimension=DIM, nlist=20, nprobe=4)
+        backend = LocalIndexBackend(tmp_path, dimension=DIM, metric="cosine")
+        centroids = backend.index.centroids.copy()
+
+        backend.delete(["doc_1", "doc_2"])
+        backend.upsert([("nuevo", records[5][1], {"category": "familia"})])
+
+        assert np.array_equal(backend.index.centroids, centroids)
+        assert backend.index.trained_count == 2000
+        assert len(backend.index) == backend.index.row_count == 1999
+        assert not (tmp_path / "deleted.npy").exists()
+        assert {r[0] for r in backend.index.search(records[5][1], top_k=2)} == {"doc_5", "nuevo"}
+        assert isinstance(next(iter(backend.index.iter_records()))[1], np.ndarray)
+        backend.index.close()
+
+
+class TestVectorStoreLocalBackend:
+    """Tests de VectorStore con backend local."""
+
+    def test_search_contract(self, tmp_path):
+        """VectorStore(backend='local') respeta el formato de resultados."""
+        from rag.vector_store import VectorStore
+
+        store = VectorStore(backend="local", dimension=DIM, local_index_dir=str(tmp_path))
+        assert store.search([0.1] * DIM, top_k=3) == []
+
+        records = make_records(40)
+        assert store.upsert_vectors(records)["upserted_count"] == 40
+
+        results = store.search(records[5][1], top_k=3, filter={"category": records[5][2]["category"]})
+        assert results[0]["id"] == "doc_5"
+        assert set(results[0]) >= {"id", "score", "text", "source", "law_name", "category", "url", "article_number"}
+        assert store.get_stats()["total_vectors"] == 40
+
+        # Upsert incremental conserva los vectores anteriores
+        store.upsert_vectors([("nuevo", records[0][1], {"category": "familia"})])
+        assert store.get_stats()["total_vectors"] == 41
@@ -0,0 +1,96 @@
+"""
+Tests para la extracción en paralelo (data_collection/parallel_extractor.py)
+y el manifiesto de archivos ya extraídos de DocumentLoader.
+"""
+
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from data_collection.document_loader import DocumentLoader
+from data_collection.parallel_extractor import ExtractionManifest, ParallelExtractor
+
+
+def write_docx(path, paragraphs):
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(str(path))
+
+
+class TestParallelExtractor:
+    """Tests del pool de extracción."""
+
+    def test_pool_matches_sequential(self, tmp_path):
+        """Con varios procesos se obtiene el mismo texto que en uno solo."""
+        for i in range(6):
+            (tmp_path / f"apunte_{i}.txt").write_text(f"Contrato de arrendamiento número {i}.", encoding="utf-8")
+        write_docx(tmp_path / "manual.docx", ["Capítulo I", "", "Del contrato de trabajo"])
+        files = sorted(tmp_path.iterdir())
+
+        sequential = {r.path.name: r.units for r in ParallelExtractor(max_workers=1).extract(files)}
+        parallel = {r.path.name: r.units for r in ParallelExtractor(max_workers=2).extract(files)}
+
+        assert parallel == sequential
+        assert parallel["manual.docx"] == ["Capítulo I", "Del contrato de trabajo"]
+        assert parallel["apunte_3.txt"] == ["Contrato de arrendamiento número 3."]
+
+    def test_errors_are_reported_per_file(self, tmp_path):
+        """Un archivo ilegible no corta la extracción del resto."""
+        (tmp_path / "roto.docx").write_bytes(b"no es un docx")
+        (tmp_path / "ok.txt").write_text("Texto válido", encoding="utf-8")
+
+        results = {r.path.name: r for r in ParallelExtractor(max_workers=2).extract(sorted(tmp_path.iterdir()))}
+
+        assert results["roto.docx"].error
+        assert results["ok.txt"].error is None
+
+
+class TestExtractionManifest:
+    """Tests del manifiesto y del salto de archivos sin cambios."""
+
+    def test_unchanged_files_are_skipped(self, tmp_path, monkeypatch):
+        """Una segunda corrida solo vuelve a extraer el archivo modificado."""
+        folder = tmp_path / "apuntes" / "civil"
+        folder.mkdir(parents=True)
+        (folder / "a.txt").write_text("Posesión efectiva.", encoding="utf-8")
+        (folder / "b.txt").write_text("Prescripción adquisitiva.", encoding="utf-8")
+
+        def make_loader():
+            return DocumentLoader(
+                output_dir=str(tmp_path / "apuntes"),
+                workers=1,
+                manifest_path=str(tmp_path / "manifest.json")
+            )
+
+        first = make_loader().process_folder(folder, "civil")
+        assert len(first) == 2
+
+        loaded = []
+        loader = make_loader()
+        original = loader.load_file
+        monkeypatch.setattr(loader, "load_file", lambda path, category: loaded.append(path.name) or original(path, category))
+
+        (folder / "b.txt").write_text("Prescripción extintiva.", encoding="utf-8")
+        second = loader.process_folder(folder, "civil")
+
+        assert loaded == ["b.txt"]
+        assert sorted(doc["content"] for doc in second) == ["Posesión efectiva.", "Prescripción extintiva."]
+        with open(folder / "b.json", encoding="utf-8") as f:
+            assert json.load(f)["content"] == "Prescripción extintiva."
+
+    def test_touched_file_with_same_content_is_unchanged(self, tmp_path):
+        """Si solo cambia el mtime, el hash decide."""
+        path = tmp_path / "a.txt"
+        path.write_text("Mismo contenido", encoding="utf-8")
+        manifest = ExtractionManifest(tmp_path / "manifest.json")
+        manifest.record(path)
+
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+
+        assert manifest.is_unchanged(path)
@@ -0,0 +1,209 @@
+"""
+Tests para las particiones por área legal y el ruteo de consultas
+(rag/partitions.py) en el índice local y en RAGEngine.
+"""
+
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+from rag.local_index import LocalVectorIndex
+from rag.partitions import QueryRouter, partition_for
+from rag.rag_engine import RAGEngine
+from rag import vector_store as vector_store_module
+from rag.vector_store import PineconeBackend, VectorStore, chunk_metadata
+
+
+DIM = 16
+CATEGORIES = ["terminacion_contrato", "laboral", "familia", "garantias"]
+
+
+def make_records(count=240, seed=0):
+    """Vectores agrupados por categoría (cada área alrededor de su propio centro)."""
+    rng = np.random.default_rng(seed)
+    centers = {"laboral": 0, "familia": 1, "consumidor": 2}
+    records = []
+    for i in range(count):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        vector = rng.standard_normal(DIM) * 0.1
+        vector[centers[partition_for(category)]] += 1.0
+        records.append((f"doc_{i}", vector.tolist(), {"category": category, "text": f"Documento {i}"}))
+    return records
+
+
+def axis(position):
+    vector = np.zeros(DIM)
+    vector[position] = 1.0
+    return vector.tolist()
+
+
+class TestPartitioning:
+    """Tests de asignación de particiones y búsqueda por partición."""
+
+    def test_partition_for_categories(self):
+        """Las categorías de cada fuente caen en su área legal; el resto en general."""
+        chunk = {"chunk_id": "dt_1", "text": "", "metadata": {"category": "terminacion_contrato"}}
+
+        assert chunk_metadata(chunk)["partition"] == "laboral"
+        assert partition_for("comercial") == "societario"
+        assert partition_for("procesal") == "general"
+        assert partition_for(None) == "general"
+
+    @pytest.mark.parametrize("nlist", [0, 8])
+    def test_partition_search_stays_in_partition(self, tmp_path, nlist):
+        """Una búsqueda por partición solo devuelve filas de esas particiones."""
+        records = make_records()
+        LocalVectorIndex.build(records, tmp_path, dimension=DIM, nlist=nlist, nprobe=2)
+        index = LocalVectorIndex(tmp_path)
+
+        results = index.search(axis(0), top_k=10, partitions=["familia"])
+
+        assert index.partitions == ["consumidor", "familia", "laboral"]
+        assert len(results) == 10
+        assert all(metadata["category"] == "familia" for _, _, metadata in results)
+        assert index.get_stats()["namespaces"]["laboral"]["vector_count"] == 120
+        index.close()
+
+
+class TestQueryRouter:
+    """Tests de predicción de particiones."""
+
+    def test_routes_confident_queries(self):
+        """Una consulta con palabras clave de un área va a su partición."""
+        router = QueryRouter()
+
+        assert router.route("Me despidieron sin finiquito").partitions == ["laboral"]
+        assert router.route("arriendo de un departamento").partitions == ["civil"]
+
+    def test_low_confidence_goes_global(self):
+        """Sin palabras clave, o con el área fuera del índice, la búsqueda es global."""
+        router = QueryRouter()
+
+        assert router.route("¿Qué dice el artículo 5?").partitions == []
+        assert router.route("arriendo de un departamento", available=["laboral"]).partitions == []
+
+
+class TestRAGEngineRouting:
+    """Tests de RAGEngine con router sobre el índice local."""
+
+    @pytest.fixture
+    def engine(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        LocalVectorIndex.build(make_records(), tmp_path, dimension=DIM, nlist=0)
+        store = VectorStore(backend="local", dimension=DIM, local_index_dir=str(tmp_path))
+        engine = RAGEngine(vector_store=store, router=QueryRouter(max_partitions=1), shadow_rate=1.0)
+        engine._embed_query = lambda query: axis(1) if "divorcio" in query else axis(0)
+        return engine
+
+    def test_routes_and_reports_per_route(self, engine):
+        """La consulta ruteada, la global y la de respaldo quedan en las estadísticas."""
+        routed = engine.retrieve_context("despido y finiquito")
+        engine.retrieve_context("¿Qué dice el artículo 5?")
+        fallback = engine.retrieve_context("finiquito por divorcio del empleador despido")
+
+        routes = engine.get_retrieval_stats()["routing"]["routes"]
+
+        assert routed and all(partition_for(doc["category"]) == "laboral" for doc in routed)
+        assert routes["partition"]["queries"] == 1 and routes["partition"]["recall"] == 1.0
+        assert routes["global"]["queries"] == 1
+        assert routes["fallback"]["queries"] == 1
+        assert all(doc["category"] == "familia" for doc in fallback)
+
+    def test_explicit_category_filter_skips_routing(self, engine):
+        """Un filtro de categoría explícito busca en todo el índice."""
+        results = engine.retrieve_context("despido y finiquito", filter={"category": "garantias"})
+
+        assert results == [] or all(doc["category"] == "garantias" for doc in results)
+        assert list(engine.get_retrieval_stats()["routing"]["routes"]) == ["global"]
+
+
+class FakePineconeIndex:
+    """Índice de Pinecone en memoria: namespace -> {id: (valores, metadata)}."""
+
+    def __init__(self, namespaces):
+        self.namespaces = namespaces
+        self.requests = []
+
+    def describe_index_stats(self):
+        return SimpleNamespace(namespaces={ns: {"vector_count": len(v)} for ns, v in self.namespaces.items() if v})
+
+    def upsert(self, vectors, namespace):
+        self.requests.append(("upsert", namespace))
+        self.namespaces.setdefault(namespace, {}).update({i: (values, meta) for i, values, meta in vectors})
+        return SimpleNamespace(upserted_count=len(vectors))
+
+    def delete(self, ids, namespace):
+        self.requests.append(("delete", namespace))
+        for vector_id in ids:
+            self.namespaces.get(namespace, {}).pop(vector_id, None)
+
+    def fetch(self, ids, namespace):
+        stored = self.namespaces.get(namespace, {})
+        return SimpleNamespace(vectors={
+            i: SimpleNamespace(values=stored[i][0], metadata=stored[i][1]) for i in ids if i in stored
+        })
+
+    def list(self, namespace):
+        yield list(self.namespaces.get(namespace, {}))
+
+    def query(self, vector, top_k, filter, include_metadata, namespace):
+        self.requests.append(("query", namespace))
+        stored = self.namespaces.get(namespace, {})
+        matches = [
+            SimpleNamespace(id=i, score=float(np.dot(vector, values)), metadata=meta)
+            for i, (values, meta) in stored.items()
+        ]
+        return SimpleNamespace(matches=sorted(matches, key=lambda m: -m.score)[:top_k])
+
+
+class TestPineconeNamespaces:
+    """Tests de la migración del namespace sin partición en Pinecone."""
+
+    @pytest.fixture
+    def index(self, monkeypatch):
+        index = FakePineconeIndex({
+            "": {
+                "old": ([1.0, 0.0], {"category": "familia"}),
+                "moved": ([0.0, 1.0], {"category": "laboral"}),
+            },
+            "laboral": {"moved": ([0.6, 0.8], {"category": "laboral", "partition": "laboral"})},
+        })
+        client = SimpleNamespace(list_indexes=lambda: [SimpleNamespace(name="leia-legal")], Index=lambda name: index)
+        monkeypatch.setenv("PINECONE_API_KEY", "test")
+        monkeypatch.setattr(vector_store_module, "PINECONE_AVAILABLE", True)
+        monkeypatch.setattr(vector_store_module, "Pinecone", lambda api_key: client, raising=False)
+        return index
+
+    def test_upsert_does_not_touch_legacy_namespace(self, index):
+        """El upsert escribe solo en la partición; "" se consulta hasta migrar."""
+        backend = PineconeBackend("leia-legal", 2, "cosine")
+
+        backend.upsert([("new", [1.0, 0.0], {"partition": "familia"})])
+        results = backend.query([1.0, 0.0], top_k=3)
+
+        assert ("delete", "") not in index.requests
+        assert {doc["id"] for doc in results} == {"new", "old", "moved"}
+        assert backend.query_stats()["legacy_namespace"] is True
+        assert backend.query_stats()["namespace_requests"] == 3
+
+    def test_migration_moves_vectors_once(self, index):
+        """La migración mueve lo que falta, no pisa copias nuevas y deja de consultar ""."""
+        backend = PineconeBackend("leia-legal", 2, "cosine")
+
+        result = backend.migrate_legacy_namespace()
+        index.requests.clear()
+        backend.query([1.0, 0.0], top_k=3)
+
+        assert result == {"migrated": 1, "skipped": 1, "batches": 1}
+        assert index.namespaces[""] == {}
+        assert index.namespaces["familia"]["old"][1]["partition"] == "familia"
+        assert index.namespaces["laboral"]["moved"][0] == [0.6, 0.8]
+        assert sorted(index.requests) == [("query", "familia"), ("query", "laboral")]
+        assert backend.query_stats() == {
+            "queries": 1, "namespace_requests": 2, "avg_fanout": 2.0, "global_fanout": 2, "legacy_namespace": False
+        }
@@ -0,0 +1,113 @@
+"""
+Tests del benchmark de recuperación con preguntas golden
+(benchmarks/bench_retrieval_quality.py).
+
+TestRegressionGate es el gate de CI: corre el stack offline sobre el corpus
+fijo y falla si recall@k, MRR o la tasa de NO_INFO_AVAILABLE empeoran
+respecto de benchmarks/golden/baseline.json. Si el cambio es intencional:
+python -m benchmarks.bench_retrieval_quality --update-baseline
+
+numpy está en requirements.txt: sin él el gate falla en vez de saltarse.
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_retrieval_quality import (
+    GOLDEN_SET_VERSION,
+    OFFLINE_SIMILARITY_THRESHOLD,
+    build_offline_engine,
+    check_baseline,
+    close_offline_engine,
+    corpus_sources,
+    load_baseline,
+    load_corpus_chunks,
+    load_golden_set,
+    run_benchmark,
+    score_query,
+)
+
+
+class TestGoldenSet:
+    """Tests de consistencia del golden set"""
+
+    def test_expected_sources_exist_in_corpus(self):
+        """Cada fuente esperada existe en el corpus (evita typos que bajan el recall)"""
+        sources = corpus_sources(load_corpus_chunks())
+
+        missing = [
+            (entry["id"], source)
+            for entry in load_golden_set()
+            for source in entry["expected_sources"]
+            if source not in sources
+        ]
+
+        assert missing == []
+
+    def test_score_query(self):
+        """recall@k por fuente esperada y MRR por la primera fuente correcta"""
+        results = [
+            {"id": "codigo_trabajo_3", "article_number": "162"},
+            {"id": "codigo_trabajo_5", "article_number": "168"},
+            {"id": "guia_garantia_arriendo_0", "article_number": None},
+        ]
+
+        scored = score_query(["codigo_trabajo:168", "guia_garantia_arriendo", "codigo_civil:2515"], results)
+
+        assert scored["recall"] == pytest.approx(2 / 3)
+        assert scored["reciprocal_rank"] == 0.5
+        assert score_query([], results)["recall"] is None
+
+    def test_exact_citation_is_lexical_only(self, tmp_path):
+        """lex-01 vuelve solo por la cita exacta: su similitud vectorial no pasa el umbral"""
+        entry = next(e for e in load_golden_set() if e["id"] == "lex-01")
+        engine = build_offline_engine(load_corpus_chunks(), tmp_path)
+        try:
+            results = engine.retrieve_context(entry["question"], top_k=5)
+        finally:
+            close_offline_engine(engine)
+
+        assert score_query(entry["expected_sources"], results)["reciprocal_rank"] == 1.0
+        assert results[0]["exact_match"]
+        assert results[0]["vector_score"] < OFFLINE_SIMILARITY_THRESHOLD
+
+
+class TestRegressionGate:
+    """Gate de regresión contra el baseline versionado"""
+
+    def test_no_regression_against_baseline(self):
+        """El stack offline cumple el baseline del golden set"""
+        baseline = load_baseline()
+
+        summary = run_benchmark(top_k=baseline["top_k"])
+
+        assert baseline["golden_set_version"] == GOLDEN_SET_VERSION
+        assert check_baseline(summary, baseline) == []
+        assert set(summary["latency"]) >= {"vector_ms", "lexical_ms", "hydrate_ms", "triage_ms", "total_ms"}
+
+    def test_gate_detects_regression(self):
+        """Un umbral de triage más exigente sube NO_INFO y el gate lo reporta"""
+        baseline = load_baseline()
+
+        summary = run_benchmark(top_k=baseline["top_k"], triage_threshold=0.99, warmup=0)
+
+        assert any("NO_INFO" in failure for failure in check_baseline(summary, baseline))
+
+    def test_latency_only_with_explicit_cap(self):
+        """El baseline versionado no fija latencia; un tope explícito sí se revisa"""
+        baseline = load_baseline()
+        summary = {
+            "golden_set_version": baseline["golden_set_version"],
+            "top_k": baseline["top_k"],
+            "recall_at_k": 1.0,
+            "mrr": 1.0,
+            "no_info_rate_answerable": 0.0,
+            "latency": {"total_ms": {"p50": 400.0, "p95": 900.0}},
+        }
+
+        assert "max_p95_total_ms" not in baseline
+        assert check_baseline(summary, baseline) == []
+        assert len(check_baseline(summary, {**baseline, "max_p95_total_ms": 50.0})) == 1
@@ -0,0 +1,150 @@
+"""
+Tests para el servicio de recuperación compartido (services/retrieval_service.py).
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.retrieval_service import RetrievalService, normalize_result
+
+
+class FakeVectorStore:
+    """Vector store mínimo para el servicio."""
+
+    backend_name = "fake"
+
+    def get_stats(self):
+        return {"total_vectors": 2}
+
+
+class FakeEngine:
+    """Engine con la misma interfaz que RAGEngine."""
+
+    def __init__(self, label="v1"):
+        self.label = label
+        self.vector_store = FakeVectorStore()
+        self.embedding_cache = None
+        self.top_k = 3
+        self.embedded = []
+
+    def retrieve_context(self, query, filter=None, top_k=None):
+        return [{
+            "id": "doc_1",
+            "score": 0.9,
+            "text": f"{self.label}: {query}",
+            "source": "apunte.pdf",
+            "category": "laboral",
+            "metadata": {"source": "apunte.pdf", "page": "4", "category": "laboral"},
+        }]
+
+    def generate_query_embedding(self, query):
+        self.embedded.append(query)
+        return [0.1, 0.2]
+
+    def build_context_prompt(self, docs):
+        return "\n".join(d["text"] for d in docs)
+
+    def get_cache_stats(self):
+        return None
+
+    def get_retrieval_stats(self):
+        return {"mode": "vector", "stages": {"avg": {}, "last": {}}}
+
+
+class TestNormalizeResult:
+    """Tests del formato de resultado común."""
+
+    def test_flat_result_gets_metadata(self):
+        """Resultados planos (VectorStore.search) exponen también 'metadata'."""
+        doc = normalize_result({"id": "a", "score": 0.8, "text": "t", "source": "BCN", "law_name": "Código del Trabajo"})
+
+        assert doc["metadata"]["source"] == "BCN"
+        assert doc["metadata"]["law_name"] == "Código del Trabajo"
+        assert doc["article_number"] is None
+        assert "text" not in doc["metadata"]
+
+    def test_nested_result_gets_flat_fields(self):
+        """Resultados con 'metadata' exponen los campos al nivel superior."""
+        doc = normalize_result({"id": "b", "score": 0.7, "metadata": {"source": "apunte.pdf", "section": "II", "text": "x"}})
+
+        assert doc["source"] == "apunte.pdf"
+        assert doc["text"] == "x"
+        assert doc["metadata"]["section"] == "II"
+
+
+class TestRetrievalService:
+    """Tests del ciclo de vida del servicio."""
+
+    def test_engine_created_once(self):
+        """El engine se crea una sola vez aunque haya muchas consultas."""
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return FakeEngine()
+
+        service = RetrievalService(engine_factory=factory)
+        for _ in range(5):
+            results = service.retrieve("despido")
+
+        assert len(calls) == 1
+        assert results[0]["metadata"]["page"] == "4"
+        assert service.health()["retrievals"] == 5
+
+    def test_disabled_when_not_configured(self):
+        """Sin configuración, el servicio responde vacío y status 'disabled'."""
+        service = RetrievalService(engine_factory=lambda: None)
+
+        assert service.retrieve("hola") == []
+        assert service.enabled is False
+        assert service.health()["status"] == "disabled"
+
+    def test_warmup_and_health(self):
+        """El warmup embebe las consultas frecuentes y health reporta el backend."""
+        engine = FakeEngine()
+        service = RetrievalService(engine_factory=lambda: engine)
+        service.start(warmup=True)
+
+        assert len(engine.embedded) == 6
+        health = service.health()
+        assert health["status"] == "ok"
+        assert health["backend"] == "fake"
+        assert health["total_vectors"] == 2
+
+    def test_reload_swaps_engine_and_keeps_old_on_failure(self):
+        """reload() cambia el engine; si falla conserva el anterior."""
+        engines = iter([FakeEngine("v1"), FakeEngine("v2"), None])
+        service = RetrievalService(engine_factory=lambda: next(engines))
+
+        assert service.retrieve("q")[0]["text"] == "v1: q"
+        assert service.reload()["reloaded"] is True
+        assert service.retrieve("q")[0]["text"] == "v2: q"
+
+        assert service.reload()["reloaded"] is False
+        assert service.retrieve("q")[0]["text"] == "v2: q"
+
+
+class TestRagRouter:
+    """Tests de los endpoints /api/rag."""
+
+    def test_health_endpoint(self, client):
+        """GET /api/rag/health responde con el estado del servicio."""
+        response = client.get("/api/rag/health")
+
+        assert response.status_code == 200
+        assert "status" in response.json()
+
+    def test_reload_requires_token(self, client, monkeypatch):
+        """POST /api/rag/reload sin token configurado está deshabilitado."""
+        monkeypatch.delenv("RAG_RELOAD_TOKEN", raising=False)
+
+        assert client.post("/api/rag/reload").status_code == 403
+
+    def test_reload_rejects_wrong_token(self, client, monkeypatch):
+        """Con token configurado, un token distinto o ausente es 401."""
+        monkeypatch.setenv("RAG_RELOAD_TOKEN", "secreto")
+
+        assert client.post("/api/rag/reload").status_code == 401
+        assert client.post("/api/rag/reload", headers={"X-Reload-Token": "secret"}).status_code == 401
@@ -0,0 +1,123 @@
+"""
+Tests para la ingesta en streaming (data_processing/streaming_pipeline.py),
+con embeddings del servidor falso y un vector store remoto en memoria.
+"""
+
+import asyncio
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.fake_embeddings_server import create_app
+from data_processing.embedder import Embedder
+from data_processing.embedding_artifact import EmbeddingArtifact
+from data_processing.embedding_store import ContentEmbeddingStore
+from data_processing.streaming_pipeline import StreamingPipeline
+from rag.vector_store import VectorStore
+
+DIMENSION = 8
+
+
+class MemoryBackend:
+    """Backend remoto falso: guarda los vectores en un dict."""
+
+    name = "memory"
+    rebuilds_on_write = False
+    sync_target = "memory:test"
+
+    def __init__(self, on_upsert=None):
+        self.vectors = {}
+        self.on_upsert = on_upsert
+
+    def upsert(self, vectors):
+        if self.on_upsert:
+            self.on_upsert(self)
+        self.vectors.update({vector_id: metadata for vector_id, _, metadata in vectors})
+        return len(vectors)
+
+    def delete(self, ids):
+        for vector_id in ids:
+            self.vectors.pop(vector_id, None)
+        return len(ids)
+
+
+def guide(paragraphs):
+    return {
+        "source": "DT",
+        "title": "Guía laboral",
+        "category": "laboral",
+        "content": "\n\n".join(paragraphs)
+    }
+
+
+def make_pipeline(tmp_path, backend, app, **kwargs):
+    embedder = Embedder(
+        api_key="test",
+        embedding_store=ContentEmbeddingStore(tmp_path / "store.sqlite3"),
+        base_url="http://fake/v1",
+        transport=httpx.ASGITransport(app=app)
+    )
+    embedder.embedding_dim = DIMENSION
+
+    vector_store = VectorStore(backend="local", dimension=DIMENSION, local_index_dir=str(tmp_path / "index"))
+    vector_store.backend = backend
+
+    return StreamingPipeline(
+        embedder,
+        vector_store=vector_store,
+        processed_dir=tmp_path / "processed",
+        embeddings_dir=tmp_path / "embeddings",
+        **kwargs
+    )
+
+
+class TestStreamingPipeline:
+    """Tests de la ingesta documentos → chunks → embeddings → upsert."""
+
+    def test_end_to_end_and_incremental_rerun(self, tmp_path):
+        """Genera los artefactos, sube todo y una segunda corrida solo aplica el diff."""
+        backend = MemoryBackend()
+        app = create_app(dimensions=DIMENSION, latency_ms=1)
+        docs = [("guia_1", guide(["Despido injustificado. " * 20, "Indemnización por años de servicio. " * 20])),
+                ("guia_2", guide(["Feriado anual de quince días hábiles."]))]
+
+        summary = asyncio.run(make_pipeline(tmp_path, backend, app).run_source("bcn", docs))
+
+        assert (summary["documents"], summary["chunks"], summary["upserted"]) == (2, 3, 3)
+        with open(tmp_path / "processed" / "bcn_chunks.jsonl", encoding="utf-8") as f:
+            assert len([json.loads(line) for line in f]) == 3
+        with EmbeddingArtifact(tmp_path / "embeddings" / "bcn_chunks_embedded.npy") as artifact:
+            assert len(artifact) == 3
+        assert set(backend.vectors) == {"guia_1_0", "guia_1_1", "guia_2_0"}
+
+        # La guía 2 se retiró: no se vuelve a embeber nada y su vector se borra
+        sent_before = app.state.stats["texts"]
+        rerun = asyncio.run(make_pipeline(tmp_path, backend, app).run_source("bcn", docs[:1]))
+
+        assert app.state.stats["texts"] == sent_before
+        assert (rerun["reused"], rerun["upserted"], rerun["unchanged"], rerun["deleted"]) == (2, 0, 2, 1)
+        assert set(backend.vectors) == {"guia_1_0", "guia_1_1"}
+
+    def test_backpressure_bounds_documents_in_flight(self, tmp_path):
+        """La carga no se adelanta al upsert más allá de lo que caben en las colas."""
+        pulled = [0]
+        lag = []
+
+        def documents():
+            for i in range(120):
+                pulled[0] += 1
+                yield f"guia_{i}", guide([f"Párrafo número {i} de la guía."])
+
+        backend = MemoryBackend(on_upsert=lambda b: lag.append(pulled[0] - len(b.vectors)))
+        app = create_app(dimensions=DIMENSION, latency_ms=1)
+        pipeline = make_pipeline(tmp_path, backend, app, queue_size=2, embed_batch=4, upsert_batch=2)
+
+        summary = asyncio.run(pipeline.run_source("bcn", documents()))
+
+        assert summary["upserted"] == 120
+        # 4 documentos en cola + 2 + 2 chunks en cola + una tanda por etapa
+        assert max(lag) <= 16
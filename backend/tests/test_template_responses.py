@@ -0,0 +1,72 @@
+"""
+Tests de las respuestas de plantilla sin LLM en chat v2 (TEMPLATE_DECISIONS).
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage
+from routers import chat_v2
+from routers.chat_v2 import ResponsePathStats, parse_template_decisions
+from services.triage_engine import TriageDecision
+from tests.test_chat_stream import parse_sse
+
+
+def setup_fakes(monkeypatch):
+    """Sin RAG, sin cliente de Claude y con estadísticas nuevas"""
+    async def no_rag(query):
+        return []
+
+    def no_claude():
+        raise AssertionError("no se debe llamar a Claude")
+
+    stats = ResponsePathStats()
+    monkeypatch.setattr(chat_v2, "get_rag_results", no_rag)
+    monkeypatch.setattr(chat_v2, "get_anthropic_client", no_claude)
+    monkeypatch.setattr(chat_v2, "response_stats", stats)
+    return stats
+
+
+class TestTemplateResponses:
+    """Tests del camino sin LLM"""
+
+    def test_direct_lawyer_request_without_llm(self, client, monkeypatch, auth_headers, db_session):
+        """La plantilla responde, se guardan los mensajes y se devuelve la derivación"""
+        stats = setup_fakes(monkeypatch)
+
+        response = client.post("/api/v2/chat/", json={"message": "Sí, quiero un abogado"}, headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["response"].startswith("Perfecto, te conecto con abogados")
+        assert data["tokens_used"] == 0
+        assert data["referral"]["should_refer"] is True
+
+        rows = db_session.query(ChatMessage).filter(
+            ChatMessage.conversation_id == data["conversation_id"]
+        ).order_by(ChatMessage.id).all()
+        assert [r.role for r in rows] == ["user", "assistant"]
+        assert rows[1].content == data["response"]
+
+        template = stats.summary()["direct_lawyer_request"]["template"]
+        assert template["turns"] == 1 and template["tokens_saved"] > 500
+
+    def test_stream_template_single_token(self, client, monkeypatch):
+        """En streaming la plantilla llega en un solo evento token"""
+        setup_fakes(monkeypatch)
+
+        response = client.post("/api/v2/chat/stream", json={"message": "Sí, quiero un abogado"})
+
+        events = parse_sse(response.text)
+        assert [name for name, _ in events] == ["triage", "sources", "referral", "token", "done"]
+        assert events[3][1]["text"].startswith("Perfecto, te conecto")
+        assert events[-1][1]["tokens_used"] == 0
+
+    def test_parse_template_decisions(self):
+        """Valores conocidos se aceptan; desconocidos se ignoran; vacío = siempre Claude"""
+        decisions = parse_template_decisions("direct_lawyer_request, URGENT_MATTER,otra")
+
+        assert decisions == {TriageDecision.DIRECT_LAWYER_REQUEST, TriageDecision.URGENT_MATTER}
+        assert parse_template_decisions("") == set()
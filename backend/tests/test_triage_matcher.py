@@ -0,0 +1,69 @@
+"""
+Tests del matcher compilado del triage (services/triage_matcher.py):
+Aho-Corasick, equivalencia con la evaluación regla por regla y tildes.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_triage import legacy_signals
+from services.triage_engine import TriageEngine
+from services.keyword_classifier import AhoCorasick
+
+
+class TestAhoCorasick:
+    """Tests del autómata"""
+
+    def test_finds_overlapping_words(self):
+        """Encuentra palabras solapadas y contenidas en otras en una pasada"""
+        automaton = AhoCorasick([("he", "a"), ("she", "b"), ("hers", "c"), ("his", "d")])
+
+        assert automaton.find("ushers") == {"a", "b", "c"}
+        assert automaton.find("this") == {"d"}
+        assert automaton.find("xyz") == set()
+
+
+class TestTriageMatcher:
+    """Tests del matcher sobre las reglas reales de TriageEngine"""
+
+    MESSAGES = [
+        "si",
+        "si, por favor",
+        "dame un abogado laboral",
+        "me despidieron y no me dieron finiquito",
+        "tengo audiencia manana",
+        "qué debo hacer si mi arrendatario no paga el arriendo",
+        "mi expareja no paga la pensión de alimentos de mis hijos",
+        "quiero hablar con un abogado por una herencia",
+        "hay violencia en mi casa",
+        "me embargaron la cuenta por una deuda",
+    ]
+
+    def test_matches_rule_by_rule_evaluation(self):
+        """Con las tildes de las reglas, las señales son las mismas que regla por regla"""
+        engine = TriageEngine()
+
+        for message in self.MESSAGES:
+            assert engine.matcher.scan(message) == legacy_signals(engine, message), message
+
+    def test_accent_folding(self):
+        """Consulta y reglas se comparan sin tildes ni mayúsculas"""
+        engine = TriageEngine()
+
+        assert engine._is_urgent("detencion de mi hijo")
+        assert engine._is_direct_lawyer_request("pasame un abogado")
+        assert engine._is_direct_lawyer_request("Pásame un abogado")
+        assert engine._is_direct_lawyer_request("Sí")
+
+    def test_specialties_in_priority_order(self):
+        """Las especialidades salen en el orden de SPECIALTY_KEYWORDS"""
+        engine = TriageEngine()
+        order = list(engine.SPECIALTY_KEYWORDS)
+
+        specialties = engine._detect_specialties("me despidieron y además tengo un problema con mi arriendo")
+
+        assert len(specialties) >= 2
+        assert specialties == sorted(specialties, key=order.index)
+        assert engine._detect_specialties("hola") == ["Civil y Contratos"]
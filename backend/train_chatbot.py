@@ -21,6 +21,11 @@ Uso:
     python train_chatbot.py --step 3     # Solo ejecutar paso 3 (embeddings)
     python train_chatbot.py --step 4     # Solo ejecutar paso 4 (Pinecone)
     python train_chatbot.py --status     # Ver estado actual
+    python train_chatbot.py --force      # Reprocesar aunque nada haya cambiado
+
+Los pasos corren como etapas de data_processing/pipeline_stages.py: las
+fuentes se procesan en paralelo y lo que no cambió desde la última corrida
+se salta.
 """
 
 import os
@@ -116,214 +121,83 @@ def check_requirements():
     return len(errors) == 0, errors, warnings
 
 
-def step1_scrape_data():
-    """Paso 1: Ejecutar scrapers para recopilar datos legales"""
-    print_step(1, "RECOPILANDO DATOS LEGALES")
-
-    from data_collection.bcn_scraper import BCNScraper
-    from data_collection.dt_scraper import DTScraper
-    from data_collection.sernac_scraper import SERNACScraper
-    from data_collection.document_loader import DocumentLoader
-
-    results = []
-
-    # Primero: Procesar apuntes del abogado (si existen)
-    print("\n📚 Procesando apuntes legales personalizados...")
-    try:
-        loader = DocumentLoader()
-        apuntes_summary = loader.process_all()
-        if apuntes_summary["total_documents"] > 0:
-            results.append({"source": "APUNTES", "items": apuntes_summary["total_documents"]})
-            print_success(f"APUNTES: {apuntes_summary['total_documents']} documentos ({apuntes_summary['total_words']:,} palabras)")
-        else:
-            print_warning("No hay apuntes en data/raw/apuntes/")
-            print("   → Copia tus PDFs/Word a las carpetas: civil, procesal, leyes, etc.")
-    except Exception as e:
-        print_error(f"Error procesando apuntes: {e}")
+def run_step(step: int, scrape: bool = False, force: bool = False):
+    """Ejecuta las etapas de un paso con el DAG runner (se saltan las que no cambiaron)"""
+    from data_processing.dag_runner import BLOCKED, DISABLED, FAILED
+    from data_processing.pipeline_stages import PIPELINE_STEPS, run_pipeline
 
-    # BCN - Leyes (Código del Trabajo, Civil, Consumidor)
-    print("\n📜 Descargando leyes desde Biblioteca del Congreso Nacional...")
-    try:
-        bcn_scraper = BCNScraper()
-        bcn_results = bcn_scraper.scrape_all_priority_laws()
-        results.append({"source": "BCN", "items": len(bcn_results)})
-        print_success(f"BCN: {len(bcn_results)} leyes descargadas")
-    except Exception as e:
-        print_error(f"Error en BCN Scraper: {e}")
-
-    # DT - Guías laborales
-    print("\n👷 Descargando guías de la Dirección del Trabajo...")
-    try:
-        dt_scraper = DTScraper()
-        dt_results = dt_scraper.scrape_guias_laborales()
-        results.append({"source": "DT", "items": len(dt_results)})
-        print_success(f"DT: {len(dt_results)} guías descargadas")
-    except Exception as e:
-        print_error(f"Error en DT Scraper: {e}")
-
-    # SERNAC - Derechos del consumidor
-    print("\n🛒 Descargando guías de SERNAC...")
-    try:
-        sernac_scraper = SERNACScraper()
-        sernac_results = sernac_scraper.scrape_consumer_guides()
-        results.append({"source": "SERNAC", "items": len(sernac_results)})
-        print_success(f"SERNAC: {len(sernac_results)} guías descargadas")
-    except Exception as e:
-        print_error(f"Error en SERNAC Scraper: {e}")
+    results = run_pipeline(kinds=PIPELINE_STEPS[step], scrape=scrape, force=force)
 
-    print("\n" + "-" * 50)
-    total = sum(r["items"] for r in results)
-    print_success(f"Total documentos recopilados: {total}")
+    for result in results:
+        if result.status == FAILED:
+            print_error(f"{result.name}: {result.detail}")
+        elif result.status in (BLOCKED, DISABLED):
+            print_warning(f"{result.name} {result.status}: {result.detail}")
 
     return results
 
 
-def step2_process_texts():
-    """Paso 2: Procesar textos y dividir en chunks"""
-    print_step(2, "PROCESANDO TEXTOS")
-
-    from data_processing.text_processor import TextProcessor
-
-    processor = TextProcessor(chunk_size=1000, chunk_overlap=200)
-
-    base_dir = Path("data/raw")
-    output_dir = Path("data/processed")
-
-    # Fuentes estándar + carpetas de apuntes
-    sources = ["bcn", "dt", "sernac"]
-    apuntes_categories = ["todos", "civil", "procesal", "leyes", "laboral", "familia", "consumidor", "penal"]
-
-    all_chunks = 0
+def step1_scrape_data(force: bool = False):
+    """Paso 1: Ejecutar scrapers y cargar apuntes del abogado"""
+    print_step(1, "RECOPILANDO DATOS LEGALES")
 
-    # Procesar fuentes estándar
-    for source in sources:
-        source_dir = base_dir / source
-        if source_dir.exists() and list(source_dir.glob("*.json")):
-            print(f"\n📄 Procesando {source.upper()}...")
-            try:
-                summary = processor.process_directory(source_dir, output_dir)
-                all_chunks += summary["total_chunks"]
-                print_success(f"{source.upper()}: {summary['total_chunks']} chunks generados")
-            except Exception as e:
-                print_error(f"Error procesando {source}: {e}")
+    if not Path("data/raw/apuntes").exists():
+        print_warning("No hay apuntes en data/raw/apuntes/")
+        print("   → Copia tus PDFs/Word a las carpetas: civil, procesal, leyes, etc.")
 
-    # Procesar apuntes personalizados
-    apuntes_dir = base_dir / "apuntes"
-    for category in apuntes_categories:
-        category_dir = apuntes_dir / category
-        if category_dir.exists() and list(category_dir.glob("*.json")):
-            print(f"\n📚 Procesando apuntes de {category.upper()}...")
-            try:
-                summary = processor.process_directory(category_dir, output_dir)
-                all_chunks += summary["total_chunks"]
-                print_success(f"APUNTES {category.upper()}: {summary['total_chunks']} chunks generados")
-            except Exception as e:
-                print_error(f"Error procesando apuntes {category}: {e}")
+    return run_step(1, scrape=True, force=force)
 
-    print("\n" + "-" * 50)
-    print_success(f"Total chunks generados: {all_chunks}")
 
-    return all_chunks
+def step2_process_texts(force: bool = False):
+    """Paso 2: Procesar textos, dividir en chunks e indexar para búsqueda léxica"""
+    print_step(2, "PROCESANDO TEXTOS")
+    return run_step(2, force=force)
 
 
-def step3_generate_embeddings():
+def step3_generate_embeddings(force: bool = False):
     """Paso 3: Generar embeddings con OpenAI"""
     print_step(3, "GENERANDO EMBEDDINGS")
 
     if not os.getenv("OPENAI_API_KEY"):
         print_error("OPENAI_API_KEY no configurada. No se pueden generar embeddings.")
         print("   → Agrega tu API key a backend/.env")
-        return 0
-
-    from data_processing.embedder import Embedder
-
-    try:
-        embedder = Embedder()
-    except ValueError as e:
-        print_error(str(e))
-        return 0
-
-    input_dir = Path("data/processed")
-    output_dir = Path("data/embeddings")
-
-    chunk_files = list(input_dir.glob("*_chunks.json"))
-
-    if not chunk_files:
-        print_warning("No hay archivos de chunks para procesar.")
-        print("   → Ejecuta primero el paso 2 (procesamiento)")
-        return 0
+        return []
 
-    total_embeddings = 0
+    results = run_step(3, force=force)
 
-    for chunk_file in chunk_files:
-        output_file = output_dir / f"{chunk_file.stem.replace('_chunks', '')}_embedded.json"
-        print(f"\n🔄 Procesando {chunk_file.name}...")
+    embedded = sum(result.value["embedded"] for result in results if result.value)
+    if embedded:
+        # Estimar costo de lo que efectivamente fue a la API
+        cost = (embedded * 300 / 1_000_000) * 0.02  # ~300 tokens por chunk
+        print(f"💰 Costo estimado: ${cost:.4f} USD")
 
-        try:
-            summary = embedder.process_chunks_file(chunk_file, output_file)
-            total_embeddings += summary["successful_embeddings"]
-            print_success(f"{summary['successful_embeddings']} embeddings generados")
-        except Exception as e:
-            print_error(f"Error generando embeddings: {e}")
-
-    print("\n" + "-" * 50)
-    print_success(f"Total embeddings generados: {total_embeddings}")
-
-    # Estimar costo
-    estimated_tokens = total_embeddings * 300  # ~300 tokens por chunk
-    cost = (estimated_tokens / 1_000_000) * 0.02
-    print(f"💰 Costo estimado: ${cost:.4f} USD")
-
-    return total_embeddings
+    return results
 
 
-def step4_upload_to_pinecone():
-    """Paso 4: Subir embeddings a Pinecone"""
+def step4_upload_to_pinecone(force: bool = False):
+    """Paso 4: Subir embeddings al vector store"""
     print_step(4, "SUBIENDO A PINECONE")
 
-    if not os.getenv("PINECONE_API_KEY"):
+    if os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower() != "local" and not os.getenv("PINECONE_API_KEY"):
         print_error("PINECONE_API_KEY no configurada.")
         print("   → Obtén una gratis en: https://app.pinecone.io")
         print("   → Agrega a backend/.env: PINECONE_API_KEY=...")
-        return 0
-
-    try:
-        from rag.vector_store import VectorStore
-    except ImportError as e:
-        print_error(f"Error importando VectorStore: {e}")
-        return 0
-
-    embeddings_dir = Path("data/embeddings")
-    embedding_files = list(embeddings_dir.glob("*_embedded.json"))
-
-    if not embedding_files:
-        print_warning("No hay archivos de embeddings para subir.")
-        print("   → Ejecuta primero el paso 3 (embeddings)")
-        return 0
+        return []
 
-    try:
-        print("🔌 Conectando a Pinecone...")
-        vector_store = VectorStore()
-
-        summaries = vector_store.load_all_embeddings(embeddings_dir)
-
-        total_upserted = sum(s["vectors_upserted"] for s in summaries)
+    from data_processing.dag_runner import FAILED
 
-        print("\n" + "-" * 50)
-        print_success(f"Total vectores subidos: {total_upserted}")
+    results = run_step(4, force=force)
 
-        # Mostrar estadísticas
-        stats = vector_store.get_stats()
-        if stats:
-            print(f"\n📊 Estadísticas del índice:")
-            print(f"   • Total vectores: {stats['total_vectors']}")
-            print(f"   • Capacidad usada: {stats['index_fullness']*100:.2f}%")
+    for result in results:
+        if result.value:
+            summary = result.value
+            print_success(f"Total vectores subidos: {summary['vectors_upserted']} ({summary['unchanged']} sin cambios)")
+            if summary["vectors_deleted"]:
+                print_success(f"Vectores eliminados: {summary['vectors_deleted']}")
+        elif result.status == FAILED:
+            print("   → Reintentar fallidos con: python -m rag.vector_store --retry-dead-letters")
 
-        return total_upserted
-
-    except Exception as e:
-        print_error(f"Error subiendo a Pinecone: {e}")
-        return 0
+    return results
 
 
 def show_status():
@@ -363,12 +237,10 @@ def show_status():
     print("\n📄 Chunks procesados (data/processed/):")
     processed_dir = Path("data/processed")
     if processed_dir.exists():
-        files = list(processed_dir.glob("*_chunks.json"))
-        for f in files:
-            import json
-            with open(f) as fp:
-                chunks = json.load(fp)
-            print(f"   • {f.name}: {len(chunks)} chunks")
+        from data_processing.text_processor import find_chunk_files, iter_chunks_file
+
+        for f in find_chunk_files(processed_dir):
+            print(f"   • {f.name}: {sum(1 for _ in iter_chunks_file(f))} chunks")
     else:
         print("   • No hay chunks procesados")
 
@@ -376,12 +248,17 @@ def show_status():
     print("\n🔢 Embeddings generados (data/embeddings/):")
     embeddings_dir = Path("data/embeddings")
     if embeddings_dir.exists():
-        files = list(embeddings_dir.glob("*_embedded.json"))
-        for f in files:
-            import json
-            with open(f) as fp:
-                embeddings = json.load(fp)
-            print(f"   • {f.name}: {len(embeddings)} embeddings")
+        from data_processing.embedding_artifact import EmbeddingArtifact, find_embedding_files
+
+        for f in find_embedding_files(embeddings_dir):
+            if f.suffix == ".npy":
+                with EmbeddingArtifact(f) as artifact:
+                    count = len(artifact)
+            else:
+                import json
+                with open(f) as fp:
+                    count = len(json.load(fp))
+            print(f"   • {f.name}: {count} embeddings")
     else:
         print("   • No hay embeddings generados")
 
@@ -411,7 +288,7 @@ def show_status():
             print("   • RAG integrado en main.py: No (ejecuta train_chatbot.py para integrar)")
 
 
-def run_full_pipeline():
+def run_full_pipeline(force: bool = False):
     """Ejecuta todo el pipeline de entrenamiento"""
     print_header("ENTRENAMIENTO DE LEIA - CHATBOT LEGAL")
     print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -427,23 +304,11 @@ def run_full_pipeline():
     if warnings:
         print_warning("\n⚠️  Hay advertencias, pero puedes continuar parcialmente.")
 
-    # Paso 1: Recopilar datos
-    step1_scrape_data()
-
-    # Paso 2: Procesar textos
-    step2_process_texts()
-
-    # Paso 3: Generar embeddings
-    if os.getenv("OPENAI_API_KEY"):
-        step3_generate_embeddings()
-    else:
-        print_warning("\nSaltando paso 3 (embeddings) - OPENAI_API_KEY no configurada")
-
-    # Paso 4: Subir a Pinecone
-    if os.getenv("PINECONE_API_KEY"):
-        step4_upload_to_pinecone()
-    else:
-        print_warning("\nSaltando paso 4 (Pinecone) - PINECONE_API_KEY no configurada")
+    # Pasos 1-4 como un solo grafo: cada fuente avanza apenas su etapa anterior
+    # termina, y las que no cambiaron desde la última corrida se saltan
+    # (embeddings y Pinecone quedan deshabilitados si falta su API key)
+    from data_processing.pipeline_stages import run_pipeline
+    run_pipeline(scrape=True, force=force)
 
     # Resumen final
     print_header("ENTRENAMIENTO COMPLETADO")
@@ -461,6 +326,8 @@ def main():
                        help="Ejecutar solo un paso específico")
     parser.add_argument("--status", action="store_true",
                        help="Mostrar estado actual del sistema")
+    parser.add_argument("--force", action="store_true",
+                       help="Reprocesar aunque los datos no hayan cambiado")
 
     args = parser.parse_args()
 
@@ -468,18 +335,18 @@ def main():
         show_status()
     elif args.step == 1:
         check_requirements()
-        step1_scrape_data()
+        step1_scrape_data(force=args.force)
     elif args.step == 2:
         check_requirements()
-        step2_process_texts()
+        step2_process_texts(force=args.force)
     elif args.step == 3:
         check_requirements()
-        step3_generate_embeddings()
+        step3_generate_embeddings(force=args.force)
     elif args.step == 4:
         check_requirements()
-        step4_upload_to_pinecone()
+        step4_upload_to_pinecone(force=args.force)
     else:
-        run_full_pipeline()
+        run_full_pipeline(force=args.force)
 
 
 if __name__ == "__main__":
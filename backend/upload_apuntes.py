@@ -3,11 +3,21 @@
 Script para procesar apuntes legales y subirlos a Pinecone
 
 Procesa PDFs y DOCX, genera embeddings y sube a Pinecone vectorstore.
+
+La extracción de texto corre en un pool de procesos (por archivo y por
+rango de páginas en PDFs grandes). Los archivos ya subidos que no
+cambiaron se saltan según data/cache/upload_apuntes_manifest.json.
+
+Uso:
+    python upload_apuntes.py
+    python upload_apuntes.py --workers 16
+    python upload_apuntes.py --force     # Reprocesar aunque no hayan cambiado
 """
 
 import os
 import json
 import hashlib
+import argparse
 from pathlib import Path
 from typing import List, Dict
 from dotenv import load_dotenv
@@ -27,38 +37,44 @@ except ImportError as e:
     print("  pip install openai pinecone-client PyPDF2 python-docx")
     exit(1)
 
+from rag.partitions import partition_for
+from data_processing.chunker import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, Chunker
+from data_collection.parallel_extractor import (
+    ExtractionManifest,
+    ParallelExtractor,
+    extract_docx_paragraphs,
+    extract_pdf_pages,
+)
+
 # Configuración
 APUNTES_DIR = Path("/Users/solangemendez/Downloads/apuntes leia")
 INDEX_NAME = "leia-legal"
-CHUNK_SIZE = 1000  # caracteres por chunk
-CHUNK_OVERLAP = 200  # overlap entre chunks
+CHUNK_SIZE = DEFAULT_MAX_TOKENS  # tokens por chunk
+CHUNK_OVERLAP = DEFAULT_OVERLAP_TOKENS  # tokens de overlap entre chunks
+MANIFEST_PATH = Path("data/cache/upload_apuntes_manifest.json")
+
+
+def units_to_text(units: List[str]) -> str:
+    """Une páginas o párrafos extraídos, una línea por unidad"""
+    return "".join(unit + "\n" for unit in units if unit)
 
 
 def extract_text_from_pdf(file_path: Path) -> str:
     """Extrae texto de un PDF"""
-    text = ""
     try:
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+        return units_to_text(extract_pdf_pages(file_path))
     except Exception as e:
         print(f"  ⚠️  Error leyendo PDF {file_path.name}: {e}")
-    return text
+        return ""
 
 
 def extract_text_from_docx(file_path: Path) -> str:
     """Extrae texto de un DOCX"""
-    text = ""
     try:
-        doc = Document(file_path)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
+        return units_to_text(extract_docx_paragraphs(file_path))
     except Exception as e:
         print(f"  ⚠️  Error leyendo DOCX {file_path.name}: {e}")
-    return text
+        return ""
 
 
 def extract_text(file_path: Path) -> str:
@@ -74,30 +90,10 @@ def extract_text(file_path: Path) -> str:
 
 
 def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
-    """Divide texto en chunks con overlap"""
+    """Divide texto en chunks por tokens, con el mismo motor que TextProcessor"""
     if not text:
         return []
-
-    chunks = []
-    start = 0
-
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-
-        # Intentar cortar en un punto natural (., \n)
-        if end < len(text):
-            last_period = chunk.rfind('.')
-            last_newline = chunk.rfind('\n')
-            cut_point = max(last_period, last_newline)
-            if cut_point > chunk_size * 0.5:  # Solo si está después de la mitad
-                chunk = chunk[:cut_point + 1]
-                end = start + cut_point + 1
-
-        chunks.append(chunk.strip())
-        start = end - overlap
-
-    return [c for c in chunks if len(c) > 50]  # Filtrar chunks muy pequeños
+    return [chunk for chunk, _, _ in Chunker(max_tokens=chunk_size, overlap_tokens=overlap).split(text)]
 
 
 def generate_embedding(text: str, client) -> List[float]:
@@ -136,6 +132,11 @@ def get_category(filename: str) -> str:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Procesar apuntes y subirlos a Pinecone")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Procesos para extraer texto")
+    parser.add_argument("--force", action="store_true", help="Reprocesar archivos sin cambios")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("PROCESADOR DE APUNTES PARA LEIA")
     print("=" * 60)
@@ -174,22 +175,37 @@ def main():
 
     index = pc.Index(INDEX_NAME)
 
-    # Procesar archivos
+    # Procesar archivos (los ya subidos y sin cambios se saltan)
     files = list(APUNTES_DIR.glob("*.pdf")) + list(APUNTES_DIR.glob("*.docx"))
     print(f"\n📂 Encontrados {len(files)} archivos para procesar")
 
+    manifest = ExtractionManifest(MANIFEST_PATH)
+    if not args.force:
+        unchanged = [f for f in files if manifest.is_unchanged(f)]
+        if unchanged:
+            print(f"⏭️  {len(unchanged)} archivos sin cambios desde la última subida")
+        files = [f for f in files if f not in unchanged]
+
     all_vectors = []
+    processed_files = []
+
+    extractor = ParallelExtractor(max_workers=args.workers)
+    for i, result in enumerate(extractor.extract(files), 1):
+        file_path = result.path
+        print(f"\n[{i}/{len(files)}] Procesando: {file_path.name} (extraído en {result.seconds:.1f}s)")
 
-    for i, file_path in enumerate(files, 1):
-        print(f"\n[{i}/{len(files)}] Procesando: {file_path.name}")
+        if result.error:
+            print(f"  ⚠️  Error leyendo {file_path.name}: {result.error}")
+            continue
 
-        # Extraer texto
-        text = extract_text(file_path)
+        # Texto extraído
+        text = units_to_text(result.units)
         if not text:
             print("  ⚠️  Sin texto extraído, saltando...")
             continue
 
         print(f"  📄 {len(text)} caracteres extraídos")
+        processed_files.append((file_path, result.pages))
 
         # Dividir en chunks
         chunks = chunk_text(text)
@@ -211,6 +227,7 @@ def main():
                     "text": chunk[:1000],  # Límite de Pinecone
                     "source": file_path.name,
                     "category": category,
+                    "partition": partition_for(category),
                     "chunk_number": j,
                     "total_chunks": len(chunks)
                 }
@@ -222,17 +239,32 @@ def main():
 
         print(f"  ✅ {len(chunks)} embeddings generados - Categoría: {category}")
 
-    # Subir a Pinecone
+    # Subir a Pinecone, un namespace por partición (área legal, ver rag/partitions.py)
     print(f"\n📤 Subiendo {len(all_vectors)} vectores a Pinecone...")
 
+    by_namespace: Dict[str, List] = {}
+    for vector in all_vectors:
+        by_namespace.setdefault(vector[2]["partition"], []).append(vector)
+
     batch_size = 100
-    for i in range(0, len(all_vectors), batch_size):
-        batch = all_vectors[i:i + batch_size]
-        try:
-            index.upsert(vectors=batch)
-            print(f"  ✅ Batch {i // batch_size + 1}: {len(batch)} vectores")
-        except Exception as e:
-            print(f"  ❌ Error en batch: {e}")
+    upload_errors = 0
+    for namespace, vectors in by_namespace.items():
+        for i in range(0, len(vectors), batch_size):
+            batch = vectors[i:i + batch_size]
+            try:
+                index.upsert(vectors=batch, namespace=namespace)
+                print(f"  ✅ Batch {i // batch_size + 1} ({namespace}): {len(batch)} vectores")
+            except Exception as e:
+                upload_errors += 1
+                print(f"  ❌ Error en batch: {e}")
+
+    # Solo si todo subió: la próxima corrida salta estos archivos
+    if upload_errors == 0:
+        for file_path, pages in processed_files:
+            manifest.record(file_path, pages=pages, index=INDEX_NAME)
+        manifest.save()
+    else:
+        print("  ⚠️  Hubo batches con error: los archivos se reprocesarán en la próxima corrida")
 
     # Verificar
     stats = index.describe_index_stats()
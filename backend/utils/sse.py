@@ -0,0 +1,32 @@
+"""
+Utilidades para respuestas Server-Sent Events (SSE).
+
+Formato de cada evento:
+    event: <nombre>
+    data: <json>
+"""
+import json
+from typing import Any
+
+# Evitar que proxies (nginx, Railway) acumulen la respuesta
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Serializa un evento SSE.
+
+    Args:
+        event: Nombre del evento (triage, sources, token, done, error...)
+        data: Payload serializable a JSON
+
+    Returns:
+        Texto del evento terminado en línea vacía
+    """
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
@@ -0,0 +1,15 @@
+"""
+Utilidades de texto en español: normalización y estimación de tokens.
+"""
+import unicodedata
+
+
+def fold_accents(text: str) -> str:
+    """Minúsculas y sin tildes ("Artículo" -> "articulo"); conserva la ñ como n"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida de tokens (~4 caracteres por token en español)"""
+    return max(1, len(text) // 4)